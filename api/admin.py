@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Task, TaskCompletion, UserProfile, InviteCode, EmailCampaign, EmailSubscriptionType, UserEmailSubscription, SocialNetwork, UserSocialProfile, PostCategory, PostTag, BlogPost, TwitterServiceAccount, ActionType, TwitterUserMapping, PaymentTransaction, TaskReport, ActionLanding, BuyLanding, Landing, Withdrawal, OnboardingProgress, Review, ApiKey, CrowdTask, CacheEntry
+from .models import Task, TaskCompletion, UserProfile, InviteCode, EmailCampaign, EmailSubscriptionType, UserEmailSubscription, SocialNetwork, UserSocialProfile, PostCategory, PostTag, BlogPost, TwitterServiceAccount, ActionType, TwitterUserMapping, PaymentTransaction, TaskReport, ActionLanding, BuyLanding, Landing, Withdrawal, OnboardingProgress, Review, ApiKey, CrowdTask, CacheEntry, OutboxEvent, FirebaseIdentity, EmailCampaignDelivery, DailyJobRun, WebhookSubscription, WebhookDelivery
 from django.utils import timezone
 import logging
 from django.template import Template, Context
@@ -15,6 +15,8 @@ from django.forms import forms, Form
 from django.forms.widgets import FileInput
 from django.urls import path
 from .admin_views import business_metrics
+from .cache_backends import get_cache_stats
+from . import campaigns, leaderboard
 import uuid
 from django.contrib import messages
 from django.contrib.auth.models import User
@@ -236,6 +238,7 @@ class TaskCompletionAdmin(admin.ModelAdmin):
                     user_profile.completed_tasks_count += 1
                     user_profile.bonus_tasks_completed += 1
                     user_profile.save()
+                    leaderboard.record_completion_count(user_profile.completed_tasks_count)
 
                     messages.success(
                         request, 
@@ -737,6 +740,7 @@ class TaskAdmin(admin.ModelAdmin):
                                     user_profile.completed_tasks_count += 1
                                     user_profile.bonus_tasks_completed += 1
                                     user_profile.save()
+                                    leaderboard.record_completion_count(user_profile.completed_tasks_count)
                                     
                                     obj.actions_completed += 1
                                     logger.info(f"[Admin] Added auto completion for user {user.id} on task {obj.id}")
@@ -1372,58 +1376,39 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 @admin.register(EmailCampaign)
 class EmailCampaignAdmin(admin.ModelAdmin):
-    list_display = ('subject', 'subscription_type', 'status', 'created_at', 'sent_at')
+    list_display = ('subject', 'subscription_type', 'status', 'total_recipients', 'successful_sends', 'failed_sends', 'created_at', 'sent_at')
     list_filter = ('status', 'subscription_type')
     actions = ['send_campaign']
 
     def send_campaign(self, request, queryset):
-        email_service = EmailService()
-        
+        """Sends DRAFT campaigns and resumes interrupted (SENDING/FAILED) ones from the delivery ledger"""
         for campaign in queryset:
-            if campaign.status != 'DRAFT':
+            if campaign.status == 'COMPLETED':
                 continue
+            try:
+                counts = campaigns.run_campaign(campaign)
+                self.message_user(
+                    request,
+                    f'Campaign "{campaign.subject}": {counts.get("SENT", 0)} sent, {counts.get("FAILED", 0)} failed, {counts.get("SKIPPED", 0)} skipped.',
+                    level=messages.SUCCESS
+                )
+            except Exception as e:
+                self.message_user(request, f'Campaign "{campaign.subject}" failed: {str(e)}', level=messages.ERROR)
 
-            subscribers = UserEmailSubscription.objects.filter(
-                subscription_type=campaign.subscription_type,
-                is_subscribed=True
-            ).select_related('user')
-
-            campaign.status = 'SENDING'
-            campaign.save()
-
-            total = subscribers.count()
-            success = 0
-            failed = 0
-
-            for subscription in subscribers:
-                unsubscribe_url = f"{settings.SITE_URL}/unsubscribe/{subscription.unsubscribe_token}/"
-                
-                context = {
-                    'user': subscription.user,
-                    'unsubscribe_url': unsubscribe_url,
-                    'campaign': campaign
-                }
-                
-                html_content = Template(campaign.body_html).render(Context(context))
-                
-                if email_service.send_email(
-                    subscription.user.email,
-                    campaign.subject,
-                    html_content,
-                    campaign.id
-                ):
-                    success += 1
-                else:
-                    failed += 1
+    send_campaign.short_description = "Send selected campaigns"
 
-            campaign.status = 'COMPLETED'
-            campaign.total_recipients = total
-            campaign.successful_sends = success
-            campaign.failed_sends = failed
-            campaign.sent_at = timezone.now()
-            campaign.save()
+@admin.register(EmailCampaignDelivery)
+class EmailCampaignDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('campaign', 'user', 'email', 'status', 'sent_at', 'updated_at')
+    list_filter = ('status', 'campaign')
+    search_fields = ('email', 'user__username')
+    raw_id_fields = ('campaign', 'user')
 
-    send_campaign.short_description = "Send selected campaigns"
+@admin.register(DailyJobRun)
+class DailyJobRunAdmin(admin.ModelAdmin):
+    list_display = ('job', 'run_date', 'status', 'processed', 'last_id', 'started_at', 'finished_at')
+    list_filter = ('job', 'status')
+    readonly_fields = ('started_at', 'finished_at')
 
 @admin.register(EmailSubscriptionType)
 class EmailSubscriptionTypeAdmin(admin.ModelAdmin):
@@ -3040,22 +3025,14 @@ class ActionLandingAdmin(admin.ModelAdmin):
         """
         Clear cache for selected ActionLanding entries
         """
-        from django.core.cache import cache
-        
-        cache.delete('action_landings_list_all_all')
+        from . import landing_cache
         
         count = 0
-        for landing in queryset:
-            cache.delete(f'action_landing_{landing.slug}')
-            cache.delete(f'action_landing_by_path_{landing.slug}')
-            
-            if landing.social_network and landing.action:
-                social_code = landing.social_network.code.lower()
-                action_code = landing.action.upper()
-                path_key = f'{social_code}/{action_code.lower()}'
-                cache.delete(f'action_landing_by_path_{path_key}')
-                cache.delete(f'action_landings_list_{social_code}_{action_code}')
-            
+        for landing in queryset.select_related('social_network'):
+            landing_cache.invalidate_action_landing(
+                slugs=[landing.slug],
+                network_codes=[landing.social_network.code if landing.social_network_id else None]
+            )
             count += 1
         
         self.message_user(
@@ -3151,15 +3128,11 @@ class BuyLandingAdmin(admin.ModelAdmin):
         """
         Clear cache for selected BuyLanding entries
         """
-        from django.core.cache import cache
+        from . import landing_cache
         
-        cache.delete('buy_landings_list')
-        cache.delete('buy_landings_all')
-        
-        count = 0
-        for landing in queryset:
-            cache.delete(f'buy_landing_{landing.slug}')
-            count += 1
+        slugs = list(queryset.values_list('slug', flat=True))
+        landing_cache.invalidate_buy_landing(slugs=slugs)
+        count = len(slugs)
         
         self.message_user(
             request,
@@ -3639,6 +3612,7 @@ class ApiKeyAdmin(admin.ModelAdmin):
         'last_used_at',
         'created_at',
         'expires_at',
+        'rate_limit_per_minute',
         'is_expired_display'
     ]
     list_filter = [
@@ -3660,7 +3634,7 @@ class ApiKeyAdmin(admin.ModelAdmin):
     ]
     fieldsets = (
         ('Основная информация', {
-            'fields': ('user', 'name', 'is_active')
+            'fields': ('user', 'name', 'is_active', 'rate_limit_per_minute')
         }),
         ('Ключ (скрыт)', {
             'fields': ('get_masked_key_full', 'key_hash'),
@@ -3711,8 +3685,10 @@ class ApiKeyAdmin(admin.ModelAdmin):
 @admin.register(CacheEntry)
 class CacheEntryAdmin(admin.ModelAdmin):
     """
-    Admin for viewing and managing cache entries
+    Admin for viewing and managing cache entries.
+    Above the list: hit/miss counters of the two-tier cache per key prefix.
     """
+    change_list_template = 'admin/cacheentry_change_list.html'
     list_display = (
         'cache_key',
         'get_type',
@@ -3769,10 +3745,83 @@ class CacheEntryAdmin(admin.ModelAdmin):
     
     delete_selected_cache.short_description = 'Delete selected cache entries'
     
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        try:
+            extra_context['cache_stats'] = get_cache_stats()
+        except Exception as e:
+            logger.error(f"[CacheEntryAdmin] Error loading cache stats: {str(e)}")
+            extra_context['cache_stats'] = []
+        return super().changelist_view(request, extra_context=extra_context)
+
     def has_add_permission(self, request):
         """Prevent manual creation of cache entries"""
         return False
     
     def has_change_permission(self, request, obj=None):
         """Prevent editing of cache entries"""
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event_type', 'status', 'attempts', 'next_attempt_at', 'created_at', 'processed_at')
+    list_filter = ('event_type', 'status')
+    search_fields = ('last_error',)
+    readonly_fields = ('created_at', 'processed_at')
+    ordering = ('-id',)
+    actions = ['retry_events']
+
+    def retry_events(self, request, queryset):
+        """Returns selected events to the queue (worker picks them up within a minute)"""
+        count = queryset.exclude(status='DONE').update(
+            status='PENDING',
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f'{count} event(s) queued for retry.', level=messages.SUCCESS)
+
+    retry_events.short_description = 'Retry selected events'
+
+
+@admin.register(WebhookSubscription)
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'api_key', 'url', 'is_active', 'last_success_at', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('url', 'api_key__user__username')
+    raw_id_fields = ('api_key',)
+    readonly_fields = ('created_at', 'last_success_at', 'last_error')
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'subscription', 'event_type', 'status', 'attempts', 'response_status', 'next_attempt_at', 'created_at', 'delivered_at')
+    list_filter = ('event_type', 'status')
+    search_fields = ('last_error',)
+    raw_id_fields = ('subscription',)
+    readonly_fields = ('created_at', 'delivered_at')
+    ordering = ('-id',)
+    actions = ['retry_deliveries']
+
+    def retry_deliveries(self, request, queryset):
+        """Returns selected deliveries to the queue (the worker picks them up within seconds)"""
+        count = queryset.exclude(status='DONE').update(
+            status='PENDING',
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f'{count} deliveries queued for retry.', level=messages.SUCCESS)
+
+    retry_deliveries.short_description = 'Retry selected deliveries'
+
+
+@admin.register(FirebaseIdentity)
+class FirebaseIdentityAdmin(admin.ModelAdmin):
+    list_display = ('uid', 'email', 'email_verified', 'disabled', 'not_found', 'synced_at')
+    list_filter = ('disabled', 'not_found', 'email_verified')
+    search_fields = ('uid', 'email')
+    readonly_fields = ('uid', 'email', 'email_verified', 'disabled', 'not_found', 'synced_at')
+
+    def has_add_permission(self, request):
+        """Rows are written by the Firebase sync only"""
+        return False
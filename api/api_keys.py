@@ -0,0 +1,147 @@
+"""
+Public API key lookups without a write per request.
+
+Validated keys are cached under their hash for KEY_CACHE_TIMEOUT seconds
+(never past expires_at) together with the owner, so repeated calls of the
+public API (integrators polling get_task_status) do no query for auth. The
+entry is dropped when the key is saved or deleted (deactivation, new key,
+admin edits); expiry is re-checked in memory on every hit. The prefix is
+listed in the default cache's LOCAL_EXCLUDE_PREFIXES, so the entry lives only
+in the shared tier and a deactivated key is rejected by every worker at once.
+
+last_used_at and the per-day request counters (ApiKeyDailyUsage) are
+write-behind: each process remembers the latest use and the number of
+accepted / throttled requests per key and writes them in one batch at most
+every USAGE_FLUSH_INTERVAL seconds, after the response has been sent
+(request_finished) and at exit.
+"""
+from datetime import timedelta
+import atexit
+import hashlib
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+
+from .models import ApiKey, ApiKeyDailyUsage
+
+logger = logging.getLogger('api')
+
+KEY_CACHE_PREFIX = 'api_key'
+KEY_CACHE_TIMEOUT = 60
+USAGE_FLUSH_INTERVAL = 60
+
+_usage_lock = threading.Lock()
+_pending_usage = {}  # {api_key_id: datetime последнего использования}
+_pending_counts = {}  # {(api_key_id, date): [requests, throttled]}
+_last_flush = time.monotonic()
+
+
+def hash_api_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _cache_key(key_hash):
+    return f"{KEY_CACHE_PREFIX}:{key_hash}"
+
+
+def invalidate(key_hash):
+    cache.delete(_cache_key(key_hash))
+
+
+def _load(key_hash):
+    api_key_obj = ApiKey.objects.select_related('user').filter(key_hash=key_hash, is_active=True).first()
+    if api_key_obj is None:
+        return None
+    timeout = KEY_CACHE_TIMEOUT
+    if api_key_obj.expires_at:
+        timeout = min(timeout, int((api_key_obj.expires_at - timezone.now()).total_seconds()))
+    if timeout > 0:
+        cache.set(_cache_key(key_hash), api_key_obj, timeout)
+    return api_key_obj
+
+
+def get_active_key(raw_key):
+    """Active, non-expired ApiKey (with user) for a raw key, or None."""
+    key_hash = hash_api_key(raw_key)
+    api_key_obj = cache.get(_cache_key(key_hash))
+    if api_key_obj is None:
+        api_key_obj = _load(key_hash)
+        if api_key_obj is None:
+            return None
+    if api_key_obj.is_expired():
+        invalidate(key_hash)
+        return None
+    return api_key_obj
+
+
+def record_usage(api_key_id, throttled=False, used_at=None):
+    """Remembers one public API call of the key (accepted or throttled)."""
+    used_at = used_at or timezone.now()
+    with _usage_lock:
+        _pending_usage[api_key_id] = used_at
+        counts = _pending_counts.setdefault((api_key_id, timezone.localdate(used_at)), [0, 0])
+        counts[1 if throttled else 0] += 1
+
+
+def _add_daily_usage(api_key_id, day, requests, throttled):
+    lookup = {'api_key_id': api_key_id, 'date': day}
+    increments = {'requests': F('requests') + requests, 'throttled': F('throttled') + throttled}
+    if ApiKeyDailyUsage.objects.filter(**lookup).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            ApiKeyDailyUsage.objects.create(requests=requests, throttled=throttled, **lookup)
+    except IntegrityError:
+        # Строку успел создать другой процесс
+        ApiKeyDailyUsage.objects.filter(**lookup).update(**increments)
+
+
+def flush_usage(force=False):
+    """
+    Writes remembered last_used_at values with one UPDATE ... CASE and adds
+    the request counters to ApiKeyDailyUsage. Without `force` does nothing
+    until USAGE_FLUSH_INTERVAL has passed. Returns the number of keys written.
+    """
+    global _pending_usage, _pending_counts, _last_flush
+    with _usage_lock:
+        if not _pending_usage or (not force and time.monotonic() - _last_flush < USAGE_FLUSH_INTERVAL):
+            return 0
+        pending, _pending_usage = _pending_usage, {}
+        counts, _pending_counts = _pending_counts, {}
+        _last_flush = time.monotonic()
+
+    try:
+        ApiKey.objects.filter(id__in=pending).update(last_used_at=Case(
+            *[When(id=key_id, then=Value(used_at)) for key_id, used_at in pending.items()],
+            output_field=DateTimeField(),
+        ))
+        for (key_id, day), (requests, throttled) in counts.items():
+            _add_daily_usage(key_id, day, requests, throttled)
+    except Exception as e:
+        logger.error(f"[api_keys] Error flushing usage of {len(pending)} keys: {str(e)}")
+        return 0
+    return len(pending)
+
+
+def get_daily_usage(api_key_id, days=7):
+    """[{'date', 'requests', 'throttled'}] of the last `days` days, newest first."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        ApiKeyDailyUsage.objects.filter(api_key_id=api_key_id, date__gte=since)
+        .order_by('-date')
+        .values('date', 'requests', 'throttled')
+    )
+
+
+def _flush_after_request(**kwargs):
+    flush_usage()
+
+
+request_finished.connect(_flush_after_request, dispatch_uid='api_keys_flush_usage')
+atexit.register(flush_usage, force=True)
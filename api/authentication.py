@@ -1,8 +1,7 @@
 from firebase_admin import auth
 from rest_framework import authentication
 from rest_framework import exceptions
-from django.contrib.auth.models import User
-from django.conf import settings
+from . import firebase_tokens
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,23 +15,9 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         token = auth_header.split(" ")[1]
         
         try:
-            decoded_token = auth.verify_id_token(
-                token,
-                check_revoked=True
-            )
-            
-            logger.info(f"[FirebaseAuth] Token verified for user: {decoded_token.get('uid')}")
-            
-            try:
-                user = User.objects.get(username=decoded_token.get("uid"))
-                return (user, None)
-            except User.DoesNotExist:
-                user = User.objects.create_user(
-                    username=decoded_token.get("uid"),
-                    email=decoded_token.get("email", "")
-                )
-                logger.info(f"[FirebaseAuth] Created new user: {user.username}")
-                return (user, None)
+            # Проверенные токены и пользователи кэшируются (см. api/firebase_tokens.py)
+            decoded_token = firebase_tokens.verify_token(token)
+            return (firebase_tokens.get_user(decoded_token), None)
 
         except auth.RevokedIdTokenError:
             logger.error("Token has been revoked")
@@ -0,0 +1,342 @@
+"""
+Two-tier cache backend.
+
+Level 1 is an in-process LRU with a short TTL, level 2 is any other configured
+Django cache (the "shared" alias: DatabaseCache by default, Redis when
+REDIS_URL is set). Reads of hot keys (landings, median speed) are served from
+process memory and only fall through to the shared backend on a local miss.
+
+Writes and deletes go to both levels. Other processes may keep a stale local
+copy for at most LOCAL_TIMEOUT seconds, so the local TTL should stay short.
+Keys that must not be stale (generation counters, auth entries that get
+revoked) are listed in LOCAL_EXCLUDE_PREFIXES. With a Redis shared backend they
+always go to Redis. With any other shared backend (DatabaseCache) a read per
+request would be a database query, so they keep a local copy for
+EXCLUDED_LOCAL_TIMEOUT seconds instead: staleness is bounded by a couple of
+seconds rather than LOCAL_TIMEOUT, and a warning is logged once.
+
+get_or_set() is stampede-protected: within a process only one thread
+recomputes a missing key, and across processes a short-lived lock key in the
+shared backend lets one worker compute while the others wait for its result.
+
+Hit/miss counters of get() are collected per key prefix (see METRIC_PREFIXES),
+flushed to the shared backend every STATS_FLUSH_INTERVAL seconds and shown in
+the CacheEntry admin.
+"""
+from collections import OrderedDict
+import logging
+import pickle
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger('api')
+
+# Префиксы ключей, по которым считаем hit/miss (самый длинный подходящий выигрывает)
+METRIC_PREFIXES = (
+    'action_landings_list',
+    'action_landing_by_path',
+    'action_landing',
+    'buy_landings',
+    'buy_landing',
+    'median_speed',
+    'platform_stats',
+    'feed_stats',
+    'cache_gen',
+    'firebase_token',
+    'firebase_uid_user',
+)
+OTHER_PREFIX = 'other'
+# Счётчики поколений: bump в одном процессе должен сразу быть виден остальным
+DEFAULT_LOCAL_EXCLUDE_PREFIXES = ('cache_gen:',)
+METRIC_KINDS = ('local_hits', 'shared_hits', 'misses')
+STATS_KEY_TEMPLATE = 'cache_stats:{prefix}:{kind}'
+
+_MISSING = object()
+
+
+def metric_prefix(key):
+    best = OTHER_PREFIX
+    for prefix in METRIC_PREFIXES:
+        if key.startswith(prefix) and (best == OTHER_PREFIX or len(prefix) > len(best)):
+            best = prefix
+    return best
+
+
+class TwoTierCache(BaseCache):
+    """
+    OPTIONS:
+      SHARED_ALIAS          alias of the level 2 cache in CACHES (default 'shared')
+      LOCAL_MAX_ENTRIES     size of the in-process LRU (default 1000)
+      LOCAL_TIMEOUT         max age of a local copy in seconds (default 30)
+      LOCK_TIMEOUT          lifetime of the cross-process recompute lock (default 10)
+      LOCK_WAIT             how long other workers wait for the lock holder (default 2)
+      STATS_FLUSH_INTERVAL  how often counters are pushed to the shared cache (default 60)
+      LOCAL_EXCLUDE_PREFIXES  key prefixes that skip level 1 (default ('cache_gen:',))
+      EXCLUDED_LOCAL_TIMEOUT  local TTL of those keys when the shared cache is not Redis (default 2)
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS') or {})
+        self._shared_alias = options.pop('SHARED_ALIAS', 'shared')
+        self._local_max_entries = int(options.pop('LOCAL_MAX_ENTRIES', 1000))
+        self._local_timeout = float(options.pop('LOCAL_TIMEOUT', 30))
+        self._lock_timeout = int(options.pop('LOCK_TIMEOUT', 10))
+        self._lock_wait = float(options.pop('LOCK_WAIT', 2))
+        self._stats_flush_interval = float(options.pop('STATS_FLUSH_INTERVAL', 60))
+        self._local_exclude_prefixes = tuple(
+            options.pop('LOCAL_EXCLUDE_PREFIXES', DEFAULT_LOCAL_EXCLUDE_PREFIXES)
+        )
+        self._excluded_local_timeout = float(options.pop('EXCLUDED_LOCAL_TIMEOUT', 2))
+        self._excluded_ttl = None  # вычисляется при первом обращении: shared ещё может быть не создан
+        super().__init__(dict(params, OPTIONS=options))
+
+        self._local = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self._counters = {}
+        self._last_flush = time.monotonic()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # --- level 1 -------------------------------------------------------------
+
+    def _excluded_timeout(self):
+        if self._excluded_ttl is None:
+            if isinstance(self.shared, RedisCache):
+                self._excluded_ttl = 0.0
+            else:
+                self._excluded_ttl = self._excluded_local_timeout
+                if self._excluded_ttl > 0 and self._local_exclude_prefixes:
+                    logger.warning(
+                        f"[cache] Shared cache '{self._shared_alias}' is not Redis: keys {self._local_exclude_prefixes} "
+                        f"are kept in process memory for {self._excluded_ttl:g}s"
+                    )
+        return self._excluded_ttl
+
+    def _max_local_ttl(self, key):
+        if key.startswith(self._local_exclude_prefixes):
+            return self._excluded_timeout()
+        return self._local_timeout
+
+    def _is_local(self, key):
+        return self._max_local_ttl(key) > 0
+
+    def _local_get(self, local_key):
+        with self._lock:
+            item = self._local.get(local_key)
+            if item is None:
+                return _MISSING
+            expires_at, payload = item
+            if expires_at <= time.monotonic():
+                del self._local[local_key]
+                return _MISSING
+            self._local.move_to_end(local_key)
+        return pickle.loads(payload)
+
+    def _local_set(self, local_key, value, timeout, max_ttl=None):
+        ttl = self._local_timeout if max_ttl is None else max_ttl
+        if timeout is not None and timeout != DEFAULT_TIMEOUT:
+            if timeout <= 0:
+                self._local_delete(local_key)
+                return
+            ttl = min(ttl, timeout)
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[local_key] = (time.monotonic() + ttl, payload)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, local_key):
+        with self._lock:
+            return self._local.pop(local_key, None) is not None
+
+    # --- Django cache API ----------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        value = self._lookup(key, version, record=True)
+        return default if value is _MISSING else value
+
+    def _lookup(self, key, version, record):
+        local_key = self.make_and_validate_key(key, version=version)
+        is_local = self._is_local(key)
+        value = self._local_get(local_key) if is_local else _MISSING
+        if value is not _MISSING:
+            if record:
+                self._record(key, 'local_hits')
+            return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if record:
+            self._record(key, 'misses' if value is _MISSING else 'shared_hits')
+        if value is not _MISSING and is_local:
+            self._local_set(local_key, value, None, self._max_local_ttl(key))
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(key, value, timeout=timeout, version=version)
+        if self._is_local(key):
+            self._local_set(local_key, value, timeout, self._max_local_ttl(key))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        added = self.shared.add(key, value, timeout=timeout, version=version)
+        if added and self._is_local(key):
+            self._local_set(local_key, value, timeout, self._max_local_ttl(key))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._local_delete(local_key)
+        return self.shared.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._local_delete(local_key)
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        if self._local_get(local_key) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._local_delete(local_key)
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+    def clear_local(self):
+        """Drops only this process' level 1 copies."""
+        with self._lock:
+            self._local.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Stampede-protected get_or_set. Hit/miss counters are recorded by get() only:
+        views check the cache with get() first and call get_or_set() on a miss.
+        """
+        value = self._lookup(key, version, record=False)
+        if value is not _MISSING:
+            return value
+
+        with self._key_lock(key):
+            # Пока ждали блокировку, значение мог посчитать другой поток
+            local_key = self.make_and_validate_key(key, version=version)
+            value = self._local_get(local_key)
+            if value is not _MISSING:
+                return value
+
+            lock_key = f'{key}:lock'
+            if self.shared.add(lock_key, 1, timeout=self._lock_timeout, version=version):
+                try:
+                    return self._compute_and_set(key, default, timeout, version)
+                finally:
+                    self.shared.delete(lock_key, version=version)
+
+            # Значение считает другой процесс: ждём его результат, иначе считаем сами
+            deadline = time.monotonic() + self._lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = self.shared.get(key, _MISSING, version=version)
+                if value is not _MISSING:
+                    if self._is_local(key):
+                        self._local_set(local_key, value, timeout, self._max_local_ttl(key))
+                    return value
+            return self._compute_and_set(key, default, timeout, version)
+
+    def _compute_and_set(self, key, default, timeout, version):
+        value = default() if callable(default) else default
+        if value is not None:
+            self.set(key, value, timeout=timeout, version=version)
+        return value
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+                if len(self._key_locks) > self._local_max_entries:
+                    # Старые блокировки не нужны — держим словарь ограниченным
+                    for stale_key in list(self._key_locks)[:len(self._key_locks) // 2]:
+                        if stale_key != key and not self._key_locks[stale_key].locked():
+                            del self._key_locks[stale_key]
+            return lock
+
+    # --- hit/miss counters ---------------------------------------------------
+
+    def _record(self, key, kind):
+        if key.startswith('cache_stats:'):
+            return
+        counter = (metric_prefix(key), kind)
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + 1
+            due = time.monotonic() - self._last_flush >= self._stats_flush_interval
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Adds this process' counters to the shared ones."""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            self._last_flush = time.monotonic()
+        for (prefix, kind), count in counters.items():
+            stats_key = STATS_KEY_TEMPLATE.format(prefix=prefix, kind=kind)
+            try:
+                try:
+                    self.shared.incr(stats_key, count)
+                except ValueError:
+                    if not self.shared.add(stats_key, count, timeout=None):
+                        self.shared.incr(stats_key, count)
+            except Exception as e:
+                logger.error(f"[cache] Error flushing stats for {stats_key}: {str(e)}")
+
+    def get_stats(self):
+        """
+        Aggregated counters of all processes:
+        [{'prefix', 'local_hits', 'shared_hits', 'misses', 'hit_rate'}, ...]
+        """
+        self.flush_stats()
+        prefixes = METRIC_PREFIXES + (OTHER_PREFIX,)
+        keys = [STATS_KEY_TEMPLATE.format(prefix=p, kind=k) for p in prefixes for k in METRIC_KINDS]
+        values = self.shared.get_many(keys)
+
+        rows = []
+        for prefix in prefixes:
+            row = {'prefix': prefix}
+            for kind in METRIC_KINDS:
+                row[kind] = values.get(STATS_KEY_TEMPLATE.format(prefix=prefix, kind=kind), 0)
+            total = row['local_hits'] + row['shared_hits'] + row['misses']
+            if not total:
+                continue
+            row['hit_rate'] = round((row['local_hits'] + row['shared_hits']) * 100 / total, 1)
+            rows.append(row)
+        return rows
+
+    def reset_stats(self):
+        with self._lock:
+            self._counters = {}
+        prefixes = METRIC_PREFIXES + (OTHER_PREFIX,)
+        self.shared.delete_many([
+            STATS_KEY_TEMPLATE.format(prefix=p, kind=k) for p in prefixes for k in METRIC_KINDS
+        ])
+
+
+def get_cache_stats(alias='default'):
+    """Hit/miss counters of a TwoTierCache alias ([] for other backends)."""
+    backend = caches[alias]
+    if not isinstance(backend, TwoTierCache):
+        return []
+    return backend.get_stats()
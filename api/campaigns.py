@@ -0,0 +1,248 @@
+"""
+Campaign engine for EmailCampaign.
+
+prepare_campaign() writes one EmailCampaignDelivery row per recipient (the
+ledger), dispatch_campaign() sends the PENDING rows in chunks on a pool of
+worker threads. Every chunk goes through EmailService.send_bulk (one backend
+connection per chunk, one token bucket shared by all workers, so the global
+rate stays within the SES/SMTP quota) and is checkpointed in the ledger
+right after sending.
+
+A campaign interrupted by a crash or restart is resumed by calling
+dispatch_campaign() again: SENT rows are never sent twice, and rows that were
+in flight (SENDING) are marked FAILED instead of being re-sent, because the
+message may already have left.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.template import Context, Template
+from django.utils import timezone
+
+from . import firebase_identity
+from .email_service import EmailService, TokenBucket
+from .models import EmailCampaign, EmailCampaignDelivery, UserEmailSubscription
+
+logger = logging.getLogger('api')
+
+LEDGER_BATCH_SIZE = 1000
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def ensure_subscriptions(subscription_type, user_ids):
+    """
+    {user_id: UserEmailSubscription} for the given users, creating missing
+    (subscribed) rows in bulk instead of a get_or_create per recipient.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    subscriptions = {}
+    for chunk in _chunks(user_ids, LEDGER_BATCH_SIZE):
+        existing = UserEmailSubscription.objects.filter(subscription_type=subscription_type, user_id__in=chunk)
+        subscriptions.update((subscription.user_id, subscription) for subscription in existing)
+        missing = [user_id for user_id in chunk if user_id not in subscriptions]
+        if missing:
+            UserEmailSubscription.objects.bulk_create(
+                [UserEmailSubscription(user_id=user_id, subscription_type=subscription_type, is_subscribed=True) for user_id in missing],
+                ignore_conflicts=True,
+            )
+            created = UserEmailSubscription.objects.filter(subscription_type=subscription_type, user_id__in=missing)
+            subscriptions.update((subscription.user_id, subscription) for subscription in created)
+    return subscriptions
+
+
+def prepare_campaign(campaign, user_ids=None):
+    """
+    Fills the delivery ledger. Without user_ids the recipients are the subscribers
+    of campaign.subscription_type; with user_ids missing subscriptions are created
+    and unsubscribed users are left out. Safe to call again (existing rows are kept).
+    Returns the number of recipients.
+    """
+    if user_ids is None:
+        recipient_ids = list(UserEmailSubscription.objects.filter(
+            subscription_type=campaign.subscription_type, is_subscribed=True
+        ).order_by('user_id').values_list('user_id', flat=True))
+    else:
+        subscriptions = ensure_subscriptions(campaign.subscription_type, user_ids)
+        recipient_ids = sorted(user_id for user_id, subscription in subscriptions.items() if subscription.is_subscribed)
+
+    for chunk in _chunks(recipient_ids, LEDGER_BATCH_SIZE):
+        EmailCampaignDelivery.objects.bulk_create(
+            [EmailCampaignDelivery(campaign=campaign, user_id=user_id) for user_id in chunk],
+            ignore_conflicts=True,
+        )
+
+    total = campaign.deliveries.count()
+    EmailCampaign.objects.filter(pk=campaign.pk).update(total_recipients=total)
+    campaign.total_recipients = total
+    logger.info(f"[campaigns] Campaign {campaign.id}: {total} recipients in the ledger")
+    return total
+
+
+def render_campaign_message(campaign, template, delivery, subscription, email):
+    """Default renderer: campaign.body_html as a Django template."""
+    unsubscribe_url = f"{settings.SITE_URL}/api/unsubscribe/{subscription.unsubscribe_token}/"
+    context = {
+        'user': delivery.user,
+        'user_email': email,
+        'site_url': settings.SITE_URL,
+        'unsubscribe_url': unsubscribe_url,
+        'campaign': campaign,
+    }
+    return {
+        'to_email': email,
+        'subject': campaign.subject,
+        'html_content': template.render(Context(context)),
+        'unsubscribe_url': unsubscribe_url,
+    }
+
+
+def _claim(campaign, size):
+    """Moves up to `size` PENDING rows to SENDING and returns their ids."""
+    with transaction.atomic():
+        ids = list(
+            EmailCampaignDelivery.objects.select_for_update(skip_locked=True)
+            .filter(campaign=campaign, status='PENDING')
+            .order_by('id')
+            .values_list('id', flat=True)[:size]
+        )
+        if ids:
+            EmailCampaignDelivery.objects.filter(id__in=ids).update(status='SENDING')
+    return ids
+
+
+def _send_chunk(campaign, template, delivery_ids, bucket, email_service):
+    deliveries = list(
+        EmailCampaignDelivery.objects.filter(id__in=delivery_ids).select_related('user').order_by('id')
+    )
+    subscriptions = {
+        subscription.user_id: subscription
+        for subscription in UserEmailSubscription.objects.filter(
+            subscription_type=campaign.subscription_type,
+            user_id__in=[delivery.user_id for delivery in deliveries],
+        )
+    }
+    firebase_emails = firebase_identity.get_emails(
+        [delivery.user.username for delivery in deliveries if not delivery.user.email],
+        include_disabled=False,
+    )
+
+    skipped, messages, message_deliveries = {}, [], []
+    for delivery in deliveries:
+        subscription = subscriptions.get(delivery.user_id)
+        email = delivery.user.email or firebase_emails.get(delivery.user.username)
+        if subscription is None or not subscription.is_subscribed:
+            skipped[delivery.id] = 'Unsubscribed'
+        elif not email:
+            skipped[delivery.id] = 'No email'
+        else:
+            try:
+                messages.append(render_campaign_message(campaign, template, delivery, subscription, email))
+                message_deliveries.append(delivery)
+            except Exception as e:
+                logger.error(f"[campaigns] Error rendering campaign {campaign.id} for user {delivery.user_id}: {str(e)}")
+                skipped[delivery.id] = f'Render error: {str(e)}'
+
+    results = email_service.send_bulk(messages, batch_size=len(messages) or 1, bucket=bucket)
+
+    # Чекпоинт: результат каждого письма сразу фиксируется в журнале
+    now = timezone.now()
+    for delivery, result in zip(message_deliveries, results):
+        delivery.email = result['to_email']
+        if result['sent']:
+            delivery.status, delivery.sent_at, delivery.error = 'SENT', now, None
+        else:
+            delivery.status, delivery.error = 'FAILED', result['error']
+    for delivery in deliveries:
+        if delivery.id in skipped:
+            delivery.status, delivery.error = 'SKIPPED', skipped[delivery.id]
+    EmailCampaignDelivery.objects.bulk_update(deliveries, ['status', 'email', 'error', 'sent_at'])
+    return sum(1 for result in results if result['sent'])
+
+
+def update_campaign_counters(campaign):
+    """Recomputes successful/failed counters from the ledger."""
+    counts = dict(
+        campaign.deliveries.order_by().values('status').annotate(total=Count('id')).values_list('status', 'total')
+    )
+    EmailCampaign.objects.filter(pk=campaign.pk).update(
+        successful_sends=counts.get('SENT', 0),
+        failed_sends=counts.get('FAILED', 0),
+    )
+    return counts
+
+
+def _worker(campaign, template, bucket, chunk_size):
+    email_service = EmailService()
+    sent = 0
+    while True:
+        delivery_ids = _claim(campaign, chunk_size)
+        if not delivery_ids:
+            return sent
+        sent += _send_chunk(campaign, template, delivery_ids, bucket, email_service)
+        update_campaign_counters(campaign)
+
+
+def _thread_worker(*args):
+    try:
+        return _worker(*args)
+    finally:
+        # У каждого потока своё соединение с БД — закрываем его
+        connection.close()
+
+
+def dispatch_campaign(campaign, workers=None, chunk_size=None, rate=None):
+    """
+    Sends all PENDING deliveries of a prepared campaign. Returns the ledger
+    counts by status ({'SENT': ..., 'FAILED': ..., ...}).
+    """
+    workers = workers or getattr(settings, 'EMAIL_CAMPAIGN_WORKERS', 4)
+    if connection.vendor == 'sqlite':
+        # SQLite (локальная разработка) не допускает параллельных записей из потоков
+        workers = 1
+    chunk_size = chunk_size or getattr(settings, 'EMAIL_BATCH_SIZE', 50)
+    bucket = TokenBucket(getattr(settings, 'EMAIL_SEND_RATE', None) if rate is None else rate)
+    template = Template(campaign.body_html)
+
+    # Строки, которые были в отправке при падении процесса, повторно не шлём
+    interrupted = campaign.deliveries.filter(status='SENDING').update(
+        status='FAILED', error='Interrupted while sending; not retried to avoid a duplicate'
+    )
+    if interrupted:
+        logger.warning(f"[campaigns] Campaign {campaign.id}: {interrupted} in-flight deliveries marked FAILED")
+
+    EmailCampaign.objects.filter(pk=campaign.pk).update(status='SENDING')
+    started = timezone.now()
+    try:
+        if workers == 1:
+            _worker(campaign, template, bucket, chunk_size)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'campaign-{campaign.id}') as pool:
+                futures = [pool.submit(_thread_worker, campaign, template, bucket, chunk_size) for _ in range(workers)]
+                for future in futures:
+                    future.result()
+    except Exception as e:
+        logger.error(f"[campaigns] Campaign {campaign.id} failed: {str(e)}", exc_info=True)
+        update_campaign_counters(campaign)
+        EmailCampaign.objects.filter(pk=campaign.pk).update(status='FAILED')
+        raise
+
+    counts = update_campaign_counters(campaign)
+    EmailCampaign.objects.filter(pk=campaign.pk).update(status='COMPLETED', sent_at=timezone.now())
+    campaign.refresh_from_db()
+    logger.info(
+        f"[campaigns] Campaign {campaign.id} completed in {(timezone.now() - started).total_seconds():.1f}s: {counts}"
+    )
+    return counts
+
+
+def run_campaign(campaign, user_ids=None, workers=None, rate=None):
+    """prepare_campaign + dispatch_campaign."""
+    prepare_campaign(campaign, user_ids=user_ids)
+    return dispatch_campaign(campaign, workers=workers, rate=rate)
@@ -0,0 +1,124 @@
+"""
+Set-based daily profile jobs.
+
+Both jobs used to load every paid profile and save it one at a time, which
+also fired the UserProfile pre_save signal (an extra SELECT per profile).
+Here each job is a chunked `UPDATE ... SET x = CASE status ... END` over
+UserProfile id ranges, so the per-profile logic runs inside the database.
+
+Every run owns a DailyJobRun ledger row (job, run_date). After each chunk the
+ledger's last_id is advanced in the same transaction as the chunk's UPDATE,
+with the ledger row locked, so:
+
+  * a cron retry after a crash continues from the last committed chunk;
+  * a retry (or a concurrent run) of a completed job is a no-op;
+  * no chunk is applied twice, which matters for the balance grant.
+"""
+from calendar import monthrange
+import logging
+import math
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import DailyJobRun, UserProfile
+
+logger = logging.getLogger('api')
+
+CHUNK_SIZE = 5000
+
+REFRESH_TASKS_JOB = 'refresh_available_tasks'
+GRANT_POINTS_JOB = 'grant_subscription_points'
+
+PAID_STATUSES = ['MEMBER', 'BUDDY', 'MATE']
+# Месячный пакет очков подписки, начисляется равными долями каждый день
+MONTHLY_SUBSCRIPTION_POINTS = {
+    'BUDDY': 250,
+    'MATE': 1000,
+}
+
+
+def _status_case(values):
+    """CASE status WHEN ... THEN ... END for a {status: value} mapping."""
+    return Case(
+        *[When(status=status, then=Value(value)) for status, value in values.items()],
+        output_field=IntegerField(),
+    )
+
+
+def _get_run(job, run_date):
+    try:
+        run, _ = DailyJobRun.objects.get_or_create(job=job, run_date=run_date)
+    except IntegrityError:
+        # Параллельный запуск успел создать строку
+        run = DailyJobRun.objects.get(job=job, run_date=run_date)
+    return run
+
+
+def run_chunked_update(job, queryset, values, run_date=None, chunk_size=CHUNK_SIZE):
+    """
+    Applies queryset.update(**values) in UserProfile id chunks under the
+    (job, run_date) ledger row. Returns the DailyJobRun.
+    """
+    run_date = run_date or timezone.localdate()
+    run = _get_run(job, run_date)
+    if run.status == 'COMPLETED':
+        logger.info(f"[daily_jobs] {job} for {run_date} already completed ({run.processed} profiles), skipping")
+        return run
+
+    if run.last_id:
+        logger.info(f"[daily_jobs] Resuming {job} for {run_date} after profile {run.last_id}")
+
+    while True:
+        with transaction.atomic():
+            # Блокируем строку журнала: чанк и чекпоинт коммитятся вместе
+            run = DailyJobRun.objects.select_for_update().get(pk=run.pk)
+            if run.status == 'COMPLETED':
+                break
+            ids = list(
+                queryset.filter(id__gt=run.last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                run.status = 'COMPLETED'
+                run.finished_at = timezone.now()
+                run.save(update_fields=['status', 'finished_at'])
+                break
+
+            updated = queryset.filter(id__gt=run.last_id, id__lte=ids[-1]).update(**values)
+            run.last_id = ids[-1]
+            run.processed += updated
+            run.save(update_fields=['last_id', 'processed'])
+
+    logger.info(f"[daily_jobs] {job} for {run_date} completed: {run.processed} profiles")
+    return run
+
+
+def refresh_available_tasks(run_date=None, chunk_size=CHUNK_SIZE):
+    """Resets available_tasks of paid profiles to their daily limit."""
+    limits = {status: UserProfile.DAILY_TASK_LIMITS[status] for status in PAID_STATUSES}
+    return run_chunked_update(
+        REFRESH_TASKS_JOB,
+        UserProfile.objects.filter(status__in=PAID_STATUSES),
+        {'available_tasks': _status_case(limits)},
+        run_date=run_date,
+        chunk_size=chunk_size,
+    )
+
+
+def daily_subscription_points(run_date):
+    """{status: points} granted per day in the month of run_date."""
+    days_in_month = monthrange(run_date.year, run_date.month)[1]
+    return {status: math.ceil(points / days_in_month) for status, points in MONTHLY_SUBSCRIPTION_POINTS.items()}
+
+
+def grant_daily_subscription_points(run_date=None, chunk_size=CHUNK_SIZE):
+    """Adds the daily share of the monthly subscription points to BUDDY/MATE balances."""
+    run_date = run_date or timezone.localdate()
+    return run_chunked_update(
+        GRANT_POINTS_JOB,
+        UserProfile.objects.filter(status__in=list(MONTHLY_SUBSCRIPTION_POINTS)),
+        {'balance': F('balance') + _status_case(daily_subscription_points(run_date))},
+        run_date=run_date,
+        chunk_size=chunk_size,
+    )
@@ -0,0 +1,163 @@
+"""
+Per-user daily earnings for task_completion_stats.
+
+DailyEarningStat holds one row per user and day with the number of completed
+tasks and the rewards earned (points and USD). The row is incremented after
+commit from the TaskCompletion post_save signal and can be recomputed with the
+`rebuild_daily_earnings` management command. As for platform_stats, deleted
+completions are not subtracted; the rebuild corrects them.
+
+Daily and monthly series are then read from at most one row per day of the
+range (366 for a year) instead of aggregating the user's completions joined to
+Task on every request. The ranges stay rolling (`now - 7 days` .. `now`): the
+partial first and last days are aggregated from TaskCompletion within the
+exact bounds and only the whole days in between come from the rollup. Hourly
+series (the `day` period) only cover one day and are still computed from
+TaskCompletion.
+"""
+from datetime import datetime, time, timedelta
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import DailyEarningStat, TaskCompletion
+
+logger = logging.getLogger('api')
+
+POINT_TO_USD = 0.01  # 1 поинт = $0.01
+
+
+def completion_reward(task):
+    """Reward of one completion in points: (original_price / actions_required) / 2."""
+    return task.original_price / task.actions_required / 2
+
+
+def record_completion(completion):
+    """Adds a single completion to the user's rollup row of its day."""
+    points = completion_reward(completion.task)
+    lookup = {
+        'user_id': completion.user_id,
+        'date': timezone.localdate(completion.created_at or timezone.now()),
+    }
+    increments = {
+        'tasks': F('tasks') + 1,
+        'points': F('points') + points,
+        'usd': F('usd') + points * POINT_TO_USD,
+    }
+    if DailyEarningStat.objects.filter(**lookup).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DailyEarningStat.objects.create(tasks=1, points=points, usd=points * POINT_TO_USD, **lookup)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        DailyEarningStat.objects.filter(**lookup).update(**increments)
+
+
+def _reward_points():
+    # Cast: иначе в БД целочисленное деление
+    return Cast('task__original_price', FloatField()) / F('task__actions_required') / 2
+
+
+def rebuild_daily_earnings(days=None, user_ids=None):
+    """
+    Recomputes rollup rows from TaskCompletion for the last `days` days
+    (including today) or the whole history, optionally for some users only.
+    Returns the number of rollup rows written.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1) if days else None
+    completions = TaskCompletion.objects.all()
+    rollup = DailyEarningStat.objects.all()
+    if since:
+        completions = completions.filter(created_at__date__gte=since)
+        rollup = rollup.filter(date__gte=since)
+    if user_ids is not None:
+        completions = completions.filter(user_id__in=user_ids)
+        rollup = rollup.filter(user_id__in=user_ids)
+
+    grouped = completions.annotate(day=TruncDate('created_at')).values('user_id', 'day').annotate(
+        total=Count('id'),
+        points=Sum(_reward_points()),
+    ).order_by()
+
+    rows = [
+        DailyEarningStat(
+            user_id=row['user_id'],
+            date=row['day'],
+            tasks=row['total'],
+            points=row['points'] or 0,
+            usd=(row['points'] or 0) * POINT_TO_USD,
+        )
+        for row in grouped.iterator()
+    ]
+    with transaction.atomic():
+        rollup.delete()
+        DailyEarningStat.objects.bulk_create(rows, batch_size=1000)
+
+    logger.info(f"[earnings] Rebuilt {len(rows)} daily earnings rows since {since or 'the beginning'}")
+    return len(rows)
+
+
+def _point(period_date, tasks, points):
+    return {
+        'period_date': period_date,
+        'tasks_completed': tasks,
+        'total_earnings_points': float(points or 0),
+        'total_earnings_usd': float(points or 0) * POINT_TO_USD,
+    }
+
+
+def _edge_days(user, start_dt, end_dt):
+    """[(date, tasks, points)] of the first and last day of the range, within the exact bounds."""
+    start_date, end_date = timezone.localdate(start_dt), timezone.localdate(end_dt)
+    first_day_end = timezone.make_aware(datetime.combine(start_date + timedelta(days=1), time.min))
+    last_day_start = timezone.make_aware(datetime.combine(end_date, time.min))
+    completions = TaskCompletion.objects.filter(user=user, created_at__gte=start_dt, created_at__lte=end_dt)
+    if start_date != end_date:
+        completions = completions.filter(
+            Q(created_at__lt=first_day_end) | Q(created_at__gte=last_day_start)
+        )
+    rows = completions.annotate(day=TruncDate('created_at')).values('day').annotate(
+        total=Count('id'),
+        points=Sum(_reward_points()),
+    ).order_by()
+    return [(row['day'], row['total'], row['points'] or 0) for row in rows]
+
+
+def get_daily_series(user, start_dt, end_dt, by_month=False):
+    """
+    [{'period_date', 'tasks_completed', 'total_earnings_points', 'total_earnings_usd'}]
+    per day (or per month, as the first day of the month) of completions between
+    the two datetimes inclusive, days without completions omitted.
+    """
+    start_date, end_date = timezone.localdate(start_dt), timezone.localdate(end_dt)
+    rows = list(DailyEarningStat.objects.filter(
+        user=user, date__gt=start_date, date__lt=end_date
+    ).values_list('date', 'tasks', 'points'))
+    rows = sorted(rows + _edge_days(user, start_dt, end_dt))
+
+    if not by_month:
+        return [_point(day, tasks, points) for day, tasks, points in rows]
+
+    months = {}
+    for day, tasks, points in rows:
+        month = months.setdefault(day.replace(day=1), [0, 0.0])
+        month[0] += tasks
+        month[1] += points
+    return [_point(month, tasks, points) for month, (tasks, points) in months.items()]
+
+
+def get_hourly_series(user, start_dt, end_dt):
+    """Hourly series from TaskCompletion for short ranges (a day)."""
+    rows = TaskCompletion.objects.filter(
+        user=user, created_at__gte=start_dt, created_at__lte=end_dt
+    ).annotate(
+        period_date=TruncHour('created_at')
+    ).values('period_date').annotate(
+        tasks=Count('id'),
+        points=Sum(_reward_points()),
+    ).order_by('period_date')
+    return [_point(row['period_date'], row['tasks'], row['points']) for row in rows]
@@ -1,101 +1,184 @@
 import logging
-from django.core.mail import EmailMultiAlternatives
+import threading
+import time
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
 import os
 from email.utils import formataddr
 
 logger = logging.getLogger(__name__)
 
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: `rate` messages per second on average,
+    bursts of up to `capacity` messages. rate=None disables limiting.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate or 1))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        if not self.rate:
+            return
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Токен можно взять в долг: ожидание = время, за которое долг восполнится
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            self._sleep(wait)
+
+
 class EmailService:
-    def send_email(self, to_email, subject, html_content, unsubscribe_url=None, campaign_id=None, bcc_email=None, attachments=None):
-        # Определяем какой email backend используется
-        email_backend = getattr(settings, 'EMAIL_BACKEND', 'unknown')
-        email_backend_type = getattr(settings, 'EMAIL_BACKEND_TYPE', 'unknown')
-        
-        logger.info(f"=" * 80)
-        logger.info(f"EMAIL SENDING STARTED")
-        logger.info(f"Backend Type: {email_backend_type}")
-        logger.info(f"Backend Class: {email_backend}")
-        if email_backend_type == 'ses':
-            logger.info(f"AWS SES Region: {getattr(settings, 'AWS_SES_REGION_NAME', 'not set')}")
-            logger.info(f"AWS SES Configuration Set: {getattr(settings, 'AWS_SES_CONFIGURATION_SET', 'not set')}")
-        logger.info(f"To: {to_email}")
-        logger.info(f"Subject: {subject}")
-        logger.info(f"Content length: {len(html_content)} chars")
-        logger.info(f"From: {settings.DEFAULT_FROM_EMAIL}")
+    def build_message(self, to_email, subject, html_content, unsubscribe_url=None, campaign_id=None, bcc_email=None, attachments=None, connection=None):
+        """EmailMultiAlternatives with the sender name, List-Unsubscribe and SES headers."""
         # Корректно формируем список для bcc
         if bcc_email:
             if isinstance(bcc_email, str):
                 bcc = [bcc_email]
-                logger.info(f"BCC is a string, converted to list: {bcc}")
             elif isinstance(bcc_email, list):
                 bcc = bcc_email
-                logger.info(f"BCC is a list: {bcc}")
             else:
                 logger.error(f"BCC email has unsupported type: {type(bcc_email)}. Value: {bcc_email}")
                 bcc = None
         else:
             bcc = None
-            logger.info("No BCC specified")
+
+        # Создаем EmailMultiAlternatives с красивым именем отправителя
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body='',
+            from_email=formataddr(('🧗‍♀️ Upvote.Club', settings.DEFAULT_FROM_EMAIL)),
+            to=[to_email],
+            bcc=bcc,
+            connection=connection
+        )
+
+        # Добавляем HTML версию
+        email.attach_alternative(html_content, "text/html")
+
+        # Добавляем вложения, если есть
+        if attachments:
+            for filename, content, mimetype in attachments:
+                email.attach(filename, content, mimetype)
+
+        # Добавляем заголовки
+        headers = {}
+
+        if unsubscribe_url:
+            headers.update({
+                'List-Unsubscribe': f'<{unsubscribe_url}>, <mailto:{settings.DEFAULT_FROM_EMAIL}?subject=unsubscribe>',
+                'List-Unsubscribe-Post': 'List-Unsubscribe=One-Click',
+                'List-Owner': f'<mailto:{settings.DEFAULT_FROM_EMAIL}>',
+                'List-Id': '<mail.upvote.club>',
+            })
+
+        # Добавляем SES заголовки только если используем SES и есть Configuration Set
+        if getattr(settings, 'EMAIL_BACKEND_TYPE', None) == 'ses':
+            ses_config_set = getattr(settings, 'AWS_SES_CONFIGURATION_SET', None)
+            if ses_config_set:
+                headers['X-SES-CONFIGURATION-SET'] = ses_config_set
+
+        if headers:
+            email.extra_headers = headers
+
+        logger.debug(
+            f"Built email to {to_email}: subject={subject!r}, {len(html_content)} chars, "
+            f"bcc={bcc}, attachments={len(attachments) if attachments else 0}, unsubscribe={bool(unsubscribe_url)}"
+        )
+        return email
+
+    def send_email(self, to_email, subject, html_content, unsubscribe_url=None, campaign_id=None, bcc_email=None, attachments=None, connection=None):
+        email_backend_type = getattr(settings, 'EMAIL_BACKEND_TYPE', 'unknown')
         try:
-            # Создаем EmailMultiAlternatives с красивым именем отправителя
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body='',
-                from_email=formataddr(('🧗‍♀️ Upvote.Club', settings.DEFAULT_FROM_EMAIL)),
-                to=[to_email],
-                bcc=bcc
+            email = self.build_message(
+                to_email, subject, html_content,
+                unsubscribe_url=unsubscribe_url,
+                campaign_id=campaign_id,
+                bcc_email=bcc_email,
+                attachments=attachments,
+                connection=connection,
             )
-            
-            # Добавляем HTML версию
-            email.attach_alternative(html_content, "text/html")
-            logger.info("HTML content attached")
-            
-            # Добавляем вложения, если есть
-            if attachments:
-                for filename, content, mimetype in attachments:
-                    email.attach(filename, content, mimetype)
-                logger.info(f"Attached {len(attachments)} files to email")
-            
-            # Добавляем заголовки
-            headers = {}
-            
-            if unsubscribe_url:
-                headers.update({
-                    'List-Unsubscribe': f'<{unsubscribe_url}>, <mailto:{settings.DEFAULT_FROM_EMAIL}?subject=unsubscribe>',
-                    'List-Unsubscribe-Post': 'List-Unsubscribe=One-Click',
-                    'List-Owner': f'<mailto:{settings.DEFAULT_FROM_EMAIL}>',
-                    'List-Id': '<mail.upvote.club>',
-                })
-                logger.info(f"Added unsubscribe header: {unsubscribe_url}")
-            
-            # Добавляем SES заголовки только если используем SES и есть Configuration Set
-            if email_backend_type == 'ses':
-                ses_config_set = getattr(settings, 'AWS_SES_CONFIGURATION_SET', None)
-                if ses_config_set:
-                    headers.update({
-                        'X-SES-CONFIGURATION-SET': ses_config_set,
-                    })
-                    logger.info(f"Added SES Configuration Set: {ses_config_set}")
-                else:
-                    logger.info("No SES Configuration Set specified (tracking via default SES settings)")
-            
-            if headers:
-                email.extra_headers = headers
-            
-            logger.info(f"Attempting to send email via {email_backend_type.upper()}")
             email.send(fail_silently=False)
-            
-            logger.info(f"✓ Email sent successfully via {email_backend_type.upper()} to {to_email}")
-            logger.info(f"=" * 80)
+            logger.info(f"✓ Email sent via {email_backend_type.upper()} to {to_email}: {subject}")
             return True
-            
+
         except Exception as e:
-            logger.error(f"=" * 80)
-            logger.error(f"✗ FAILED to send email via {email_backend_type.upper()}")
-            logger.error(f"To: {to_email}")
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Error message: {str(e)}")
-            logger.error(f"Backend: {email_backend}")
-            logger.error(f"=" * 80)
-            return False
\ No newline at end of file
+            logger.error(
+                f"✗ FAILED to send email via {email_backend_type.upper()} to {to_email} "
+                f"(backend {getattr(settings, 'EMAIL_BACKEND', 'unknown')}): {type(e).__name__}: {str(e)}"
+            )
+            return False
+
+    def send_bulk(self, messages, batch_size=None, rate=None, connection_factory=None, bucket=None):
+        """
+        Sends many emails reusing one backend connection per batch.
+
+        messages: iterable of dicts with send_email() keyword arguments.
+        rate: max messages per second (token bucket, default settings.EMAIL_SEND_RATE;
+              0 disables limiting). batch_size: messages per connection
+              (default settings.EMAIL_BATCH_SIZE). bucket: a TokenBucket shared by
+              several concurrent send_bulk calls (overrides rate).
+
+        Returns a list of {'to_email', 'sent', 'error'} in the order of `messages`.
+        A failed message does not stop the batch; a broken connection is reopened.
+        """
+        batch_size = batch_size or getattr(settings, 'EMAIL_BATCH_SIZE', 50)
+        if rate is None:
+            rate = getattr(settings, 'EMAIL_SEND_RATE', None)
+        connection_factory = connection_factory or get_connection
+        bucket = bucket or TokenBucket(rate)
+        email_backend_type = getattr(settings, 'EMAIL_BACKEND_TYPE', 'unknown').upper()
+
+        messages = list(messages)
+        results = []
+        started = time.monotonic()
+        for start in range(0, len(messages), batch_size):
+            batch = messages[start:start + batch_size]
+            connection = connection_factory()
+            try:
+                connection.open()
+            except Exception as e:
+                logger.error(f"✗ Could not open {email_backend_type} connection: {type(e).__name__}: {str(e)}")
+                results.extend({'to_email': m['to_email'], 'sent': False, 'error': str(e)} for m in batch)
+                continue
+
+            try:
+                for message in batch:
+                    bucket.acquire()
+                    try:
+                        email = self.build_message(connection=connection, **message)
+                        sent = bool(connection.send_messages([email]))
+                        results.append({'to_email': message['to_email'], 'sent': sent, 'error': None if sent else 'Not sent'})
+                    except Exception as e:
+                        logger.error(f"✗ FAILED to send email via {email_backend_type} to {message['to_email']}: {type(e).__name__}: {str(e)}")
+                        results.append({'to_email': message['to_email'], 'sent': False, 'error': str(e)})
+                        # Соединение могло оборваться — переоткрываем для оставшихся писем
+                        try:
+                            connection.close()
+                            connection.open()
+                        except Exception:
+                            pass
+            finally:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+        sent_count = sum(1 for result in results if result['sent'])
+        duration = time.monotonic() - started
+        logger.info(
+            f"Bulk email via {email_backend_type}: {sent_count}/{len(results)} sent in {duration:.1f}s "
+            f"({sent_count / duration if duration else 0:.1f} msg/s)"
+        )
+        return results
@@ -0,0 +1,136 @@
+"""
+Local mirror of Firebase Auth identities (uid -> email, disabled flag).
+
+Email pipelines used to call auth.get_user(uid) once per user, i.e. one HTTPS
+round trip per recipient. They now resolve emails through get_emails() /
+get_email(), which read the FirebaseIdentity table and only go to Firebase
+for uids that are missing or older than MIRROR_MAX_AGE, using batched
+auth.get_users calls of up to 100 identifiers.
+
+The whole mirror is refreshed by the `sync_firebase_users` command (paged
+auth.list_users), scheduled before the daily email runs.
+"""
+from datetime import timedelta
+import logging
+
+from django.utils import timezone
+from firebase_admin import auth
+
+from .models import FirebaseIdentity
+
+logger = logging.getLogger('api')
+
+MIRROR_MAX_AGE = timedelta(days=1)
+GET_USERS_BATCH_SIZE = 100  # лимит auth.get_users
+LIST_USERS_PAGE_SIZE = 1000  # лимит auth.list_users
+UPSERT_FIELDS = ['email', 'email_verified', 'disabled', 'not_found', 'synced_at']
+
+
+def _identity_from_record(record, synced_at):
+    return FirebaseIdentity(
+        uid=record.uid,
+        email=record.email,
+        email_verified=bool(record.email_verified),
+        disabled=bool(record.disabled),
+        not_found=False,
+        synced_at=synced_at,
+    )
+
+
+def _upsert(identities):
+    if identities:
+        FirebaseIdentity.objects.bulk_create(
+            identities,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['uid'],
+            update_fields=UPSERT_FIELDS,
+        )
+
+
+def refresh(uids, fail_silently=True):
+    """
+    Re-reads the given uids from Firebase in batches of 100 and updates the mirror.
+    Returns {uid: FirebaseIdentity}. Uids Firebase does not know are stored with not_found=True.
+    """
+    uids = list(dict.fromkeys(uid for uid in uids if uid))
+    identities = {}
+    for start in range(0, len(uids), GET_USERS_BATCH_SIZE):
+        chunk = uids[start:start + GET_USERS_BATCH_SIZE]
+        try:
+            result = auth.get_users([auth.UidIdentifier(uid) for uid in chunk])
+        except Exception as e:
+            if not fail_silently:
+                raise
+            logger.error(f"[firebase_identity] Error getting {len(chunk)} Firebase users: {str(e)}")
+            continue
+
+        now = timezone.now()
+        batch = [_identity_from_record(record, now) for record in result.users]
+        batch += [
+            FirebaseIdentity(uid=identifier.uid, not_found=True, synced_at=now)
+            for identifier in result.not_found
+        ]
+        _upsert(batch)
+        identities.update((identity.uid, identity) for identity in batch)
+    return identities
+
+
+def get_identities(uids, max_age=MIRROR_MAX_AGE, fail_silently=True):
+    """
+    {uid: FirebaseIdentity} for the given uids. Missing or stale mirror rows are
+    refreshed from Firebase in batches; if Firebase is unavailable the stale
+    rows are returned as they are.
+    """
+    uids = list(dict.fromkeys(uid for uid in uids if uid))
+    identities = {}
+    for start in range(0, len(uids), 1000):
+        identities.update(
+            (identity.uid, identity)
+            for identity in FirebaseIdentity.objects.filter(uid__in=uids[start:start + 1000])
+        )
+
+    fresh_after = timezone.now() - max_age if max_age is not None else None
+    to_refresh = [
+        uid for uid in uids
+        if uid not in identities or (fresh_after is not None and identities[uid].synced_at < fresh_after)
+    ]
+    if to_refresh:
+        identities.update(refresh(to_refresh, fail_silently=fail_silently))
+    return identities
+
+
+def get_emails(uids, include_disabled=True, max_age=MIRROR_MAX_AGE, fail_silently=True):
+    """{uid: email} for the uids that exist in Firebase and have an email."""
+    return {
+        uid: identity.email
+        for uid, identity in get_identities(uids, max_age=max_age, fail_silently=fail_silently).items()
+        if identity.email and not identity.not_found and (include_disabled or not identity.disabled)
+    }
+
+
+def get_email(uid, include_disabled=True, max_age=MIRROR_MAX_AGE):
+    """Email of a single Firebase user or None."""
+    return get_emails([uid], include_disabled=include_disabled, max_age=max_age).get(uid)
+
+
+def sync_all(page_size=LIST_USERS_PAGE_SIZE):
+    """
+    Copies every Firebase user into the mirror, one list_users page at a time.
+    Mirror rows not seen during the sync are marked not_found.
+    Returns the number of synced users.
+    """
+    started_at = timezone.now()
+    synced = 0
+    page = auth.list_users(max_results=page_size)
+    while page:
+        now = timezone.now()
+        _upsert([_identity_from_record(record, now) for record in page.users])
+        synced += len(page.users)
+        page = page.get_next_page()
+
+    removed = FirebaseIdentity.objects.filter(
+        synced_at__lt=started_at, not_found=False
+    ).update(not_found=True, synced_at=timezone.now())
+    logger.info(f"[firebase_identity] Synced {synced} Firebase users, {removed} no longer exist")
+    return synced
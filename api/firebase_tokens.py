@@ -0,0 +1,96 @@
+"""
+Cached Firebase ID token verification for FirebaseAuthentication.
+
+auth.verify_id_token(check_revoked=True) costs an HTTPS call to Firebase
+(the revocation check reads the user record) on every API request. Verified
+claims are now cached under the SHA-256 of the token:
+
+  * the entry expires together with the token (its `exp` claim), so an
+    expired token is never served from the cache;
+  * the revocation / disabled-user check is repeated at most once per
+    REVOCATION_CHECK_INTERVAL seconds per token (FIREBASE_AUTH setting);
+    a failed re-check evicts the entry and fails the request.
+
+The public keys used for signature checks are fetched by the SDK through the
+auth client's shared HTTP session and kept according to Google's
+Cache-Control headers, so cached or not, no per-request key download happens.
+
+The uid -> User mapping is cached as well (USER_CACHE_TIMEOUT, dropped on
+User save/delete), so the user lookup / lazy creation only hits the database
+on a miss.
+
+Both prefixes are listed in the default cache's LOCAL_EXCLUDE_PREFIXES: an
+eviction must reach every worker at once, not after the in-process TTL.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from firebase_admin import auth
+
+logger = logging.getLogger('api')
+
+TOKEN_CACHE_PREFIX = 'firebase_token'
+USER_CACHE_PREFIX = 'firebase_uid_user'
+DEFAULT_REVOCATION_CHECK_INTERVAL = 300  # 5 минут
+DEFAULT_USER_CACHE_TIMEOUT = 300
+
+
+def _setting(name, default):
+    return getattr(settings, 'FIREBASE_AUTH', {}).get(name, default)
+
+
+def token_cache_key(token):
+    return f"{TOKEN_CACHE_PREFIX}:{hashlib.sha256(token.encode('utf-8')).hexdigest()}"
+
+
+def _verify_and_cache(token, key):
+    claims = auth.verify_id_token(token, check_revoked=True)
+    timeout = int(claims.get('exp', 0) - time.time())
+    if timeout > 0:
+        cache.set(key, {'claims': claims, 'checked_at': time.time()}, timeout)
+    return claims
+
+
+def verify_token(token):
+    """
+    Claims of a valid, non-revoked ID token. Raises the same auth errors as
+    auth.verify_id_token(check_revoked=True).
+    """
+    key = token_cache_key(token)
+    entry = cache.get(key)
+    now = time.time()
+    if entry is None or entry['claims'].get('exp', 0) <= now:
+        return _verify_and_cache(token, key)
+
+    if now - entry['checked_at'] >= _setting('REVOCATION_CHECK_INTERVAL', DEFAULT_REVOCATION_CHECK_INTERVAL):
+        try:
+            return _verify_and_cache(token, key)
+        except Exception:
+            cache.delete(key)
+            raise
+    return entry['claims']
+
+
+def get_user(claims):
+    """Django user of the token's uid, created on first sign-in."""
+    uid = claims.get('uid')
+    key = f"{USER_CACHE_PREFIX}:{uid}"
+    user = cache.get(key)
+    if user is not None:
+        return user
+
+    try:
+        user = User.objects.get(username=uid)
+    except User.DoesNotExist:
+        user = User.objects.create_user(username=uid, email=claims.get('email', ''))
+        logger.info(f"[firebase_tokens] Created new user: {user.username}")
+    cache.set(key, user, _setting('USER_CACHE_TIMEOUT', DEFAULT_USER_CACHE_TIMEOUT))
+    return user
+
+
+def invalidate_user(username):
+    cache.delete(f"{USER_CACHE_PREFIX}:{username}")
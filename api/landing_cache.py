@@ -0,0 +1,153 @@
+"""
+Generation-based cache keys for ActionLanding / BuyLanding endpoints.
+
+Every cached landing response depends on one or more tags (all action landings,
+action landings of one social network, one slug, ...). Each tag has a
+generation counter in the cache, and the counter values are part of the cache
+key. Saving a landing bumps the generations of its tags, so every dependent
+list/detail/path entry becomes unreachable in O(1), including keys built from
+arbitrary query params or paths that cannot be enumerated. Orphaned entries
+simply expire or get culled.
+
+A missing counter (evicted, cache cleared) is re-initialised from the current
+time in milliseconds, so it never comes back to a value that was used before.
+
+Counters are permanent, so they are only created for tags built from validated
+input (an existing slug, a known social network code). Lookups with raw request
+input pass create=False: a missing counter reads as 0, a value nothing is ever
+stored under, so the lookup misses and the view validates the input before
+caching with create=True.
+"""
+import logging
+import secrets
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger('api')
+
+GENERATION_KEY_TEMPLATE = 'cache_gen:{tag}'
+LANDING_CACHE_TIMEOUT = 31536000  # 1 год
+
+SOCIAL_NETWORK_CODES_KEY = 'social_network_codes'
+
+# Теги
+ACTION_LANDINGS_TAG = 'action_landings'
+BUY_LANDINGS_TAG = 'buy_landings'
+
+
+def _generation_key(tag):
+    return GENERATION_KEY_TEMPLATE.format(tag=tag)
+
+
+def _initial_generation():
+    return int(time.time() * 1000)
+
+
+def _new_generation():
+    # Важно только неравенство старому значению, порядок не нужен
+    return _initial_generation() * 1000 + secrets.randbelow(1000)
+
+
+def get_generations(*tags, create=True):
+    """
+    {tag: generation} for the given tags. Missing counters are created, or
+    read as 0 with create=False.
+    """
+    keys = {tag: _generation_key(tag) for tag in tags}
+    values = cache.get_many(list(keys.values()))
+    generations = {}
+    for tag, key in keys.items():
+        value = values.get(key)
+        if value is None and not create:
+            value = 0
+        elif value is None:
+            value = _initial_generation()
+            if not cache.add(key, value, timeout=None):
+                value = cache.get(key, value)
+        generations[tag] = value
+    return generations
+
+
+def versioned_key(base_key, *tags, create=True):
+    """base_key with the current generations of `tags` appended."""
+    generations = get_generations(*tags, create=create)
+    return f"{base_key}:g{'.'.join(str(generations[tag]) for tag in tags)}"
+
+
+def bump(*tags):
+    """Invalidates every cache entry that depends on any of the tags."""
+    for tag in set(tags):
+        # Новое уникальное значение вместо incr: DatabaseCache.incr — это
+        # get + set, и два одновременных bump могли дать одно и то же число
+        cache.set(_generation_key(tag), _new_generation(), timeout=None)
+
+
+def social_network_codes():
+    """{CODE: code} of all social networks, cached until a network is saved or deleted."""
+    codes = cache.get(SOCIAL_NETWORK_CODES_KEY)
+    if codes is None:
+        from .models import SocialNetwork
+        codes = {code.upper(): code for code in SocialNetwork.objects.values_list('code', flat=True)}
+        cache.set(SOCIAL_NETWORK_CODES_KEY, codes, LANDING_CACHE_TIMEOUT)
+    return codes
+
+
+def invalidate_social_network_codes():
+    cache.delete(SOCIAL_NETWORK_CODES_KEY)
+
+
+# --- ActionLanding -------------------------------------------------------------
+
+def action_network_tag(network_code):
+    return f'action_landings:{network_code.lower()}'
+
+
+def action_slug_tag(slug):
+    return f'action_landing:{slug}'
+
+
+def action_landings_list_key(social_network_code=None, action_code=None, create=True):
+    base = f'action_landings_list_{social_network_code or "all"}_{action_code or "all"}'
+    if social_network_code:
+        return versioned_key(base, action_network_tag(social_network_code), create=create)
+    return versioned_key(base, ACTION_LANDINGS_TAG, create=create)
+
+
+def action_landing_key(slug, create=True):
+    return versioned_key(f'action_landing_{slug}', action_slug_tag(slug), create=create)
+
+
+def action_landing_by_path_key(social_network_code, path_normalized):
+    """
+    Все варианты пути зависят только от лендингов соцсети из первого сегмента.
+    social_network_code должен быть уже проверен по SocialNetwork: счётчик
+    поколения создаётся навсегда, и произвольный ввод не должен его заводить.
+    """
+    return versioned_key(f'action_landing_by_path_{path_normalized}', action_network_tag(social_network_code))
+
+
+def invalidate_action_landing(slugs=(), network_codes=()):
+    tags = [ACTION_LANDINGS_TAG]
+    tags += [action_slug_tag(slug) for slug in slugs if slug]
+    tags += [action_network_tag(code) for code in network_codes if code]
+    bump(*tags)
+
+
+# --- BuyLanding ----------------------------------------------------------------
+
+def buy_slug_tag(slug):
+    return f'buy_landing:{slug}'
+
+
+def buy_landings_key(name):
+    """name: 'list' or 'all'"""
+    return versioned_key(f'buy_landings_{name}', BUY_LANDINGS_TAG)
+
+
+def buy_landing_key(slug, create=True):
+    return versioned_key(f'buy_landing_{slug}', buy_slug_tag(slug), create=create)
+
+
+def invalidate_buy_landing(slugs=()):
+    bump(BUY_LANDINGS_TAG, *[buy_slug_tag(slug) for slug in slugs if slug])
@@ -0,0 +1,137 @@
+"""
+Community leaderboard by UserProfile.completed_tasks_count.
+
+Ranks are answered from a histogram of completed_tasks_count
+(CompletedTasksBucket: "N users have completed exactly K tasks") instead of
+COUNT(*) scans over UserProfile:
+
+  * complete_task moves the user from bucket K to K+1 right after its
+    transaction commits (record_completion_count), so the shared bucket rows
+    are not locked for the whole request;
+  * the histogram is cached as a snapshot (sorted counts + suffix sums), so
+    "rank of a user with K tasks" is a binary search over the snapshot;
+  * the top list is an index scan over completed_tasks_count, cached as well;
+  * `rebuild_leaderboard` recomputes the histogram from UserProfile nightly and
+    after manual changes (admin actions that bump completed_tasks_count).
+
+Rank semantics are unchanged: 1 + number of users with strictly more tasks;
+total_users counts users with at least one completed task.
+"""
+from bisect import bisect_right
+import logging
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import CompletedTasksBucket, UserProfile
+
+logger = logging.getLogger('api')
+
+LEADERBOARD_SNAPSHOT_CACHE_KEY = 'leaderboard:snapshot'
+LEADERBOARD_TOP_CACHE_KEY = 'leaderboard:top'
+LEADERBOARD_CACHE_TIMEOUT = 300  # 5 минут
+LEADERBOARD_MAX_TOP = 100
+
+
+def _add_to_bucket(completed_tasks, delta):
+    lookup = {'completed_tasks': completed_tasks}
+    if CompletedTasksBucket.objects.filter(**lookup).update(users=F('users') + delta):
+        return
+    try:
+        with transaction.atomic():
+            CompletedTasksBucket.objects.create(users=delta, **lookup)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        CompletedTasksBucket.objects.filter(**lookup).update(users=F('users') + delta)
+
+
+def record_completion_count(new_count):
+    """Moves one user from bucket new_count - 1 to new_count."""
+    if new_count - 1 > 0:
+        CompletedTasksBucket.objects.filter(completed_tasks=new_count - 1).update(users=F('users') - 1)
+    _add_to_bucket(new_count, 1)
+
+
+def rebuild_leaderboard():
+    """
+    Recomputes the histogram from UserProfile with one grouped query.
+    Returns the number of buckets written.
+    """
+    grouped = UserProfile.objects.filter(completed_tasks_count__gt=0).values(
+        'completed_tasks_count'
+    ).annotate(total=Count('id')).order_by()
+
+    rows = [
+        CompletedTasksBucket(completed_tasks=row['completed_tasks_count'], users=row['total'])
+        for row in grouped
+    ]
+    with transaction.atomic():
+        CompletedTasksBucket.objects.all().delete()
+        CompletedTasksBucket.objects.bulk_create(rows, batch_size=1000)
+
+    cache.delete_many([LEADERBOARD_SNAPSHOT_CACHE_KEY, LEADERBOARD_TOP_CACHE_KEY])
+    logger.info(f"[leaderboard] Rebuilt {len(rows)} completed-tasks buckets")
+    return len(rows)
+
+
+def compute_snapshot():
+    """
+    {'counts': [K ascending], 'at_or_above': [users with >= K tasks], 'total_users'}
+    from the histogram (one query over the distinct task counts).
+    """
+    buckets = list(
+        CompletedTasksBucket.objects.filter(completed_tasks__gt=0, users__gt=0)
+        .order_by('completed_tasks')
+        .values_list('completed_tasks', 'users')
+    )
+    counts = [completed_tasks for completed_tasks, _ in buckets]
+    at_or_above = []
+    running = 0
+    for _, users in reversed(buckets):
+        running += users
+        at_or_above.append(running)
+    at_or_above.reverse()
+    return {'counts': counts, 'at_or_above': at_or_above, 'total_users': running}
+
+
+def get_snapshot():
+    snapshot = cache.get(LEADERBOARD_SNAPSHOT_CACHE_KEY)
+    if snapshot is None:
+        snapshot = compute_snapshot()
+        cache.set(LEADERBOARD_SNAPSHOT_CACHE_KEY, snapshot, LEADERBOARD_CACHE_TIMEOUT)
+    return snapshot
+
+
+def get_rank(completed_tasks):
+    """Community rank of a user with `completed_tasks` completed tasks."""
+    completed_tasks = completed_tasks or 0
+    snapshot = get_snapshot()
+    index = bisect_right(snapshot['counts'], completed_tasks)
+    users_above = snapshot['at_or_above'][index] if index < len(snapshot['counts']) else 0
+    return {
+        'rank': users_above + 1,
+        'total_users': snapshot['total_users'],
+        'completed_tasks': completed_tasks,
+    }
+
+
+def get_top(limit=10):
+    """Top `limit` (at most LEADERBOARD_MAX_TOP) users by completed tasks."""
+    limit = max(1, min(limit, LEADERBOARD_MAX_TOP))
+    top = cache.get(LEADERBOARD_TOP_CACHE_KEY)
+    if top is None:
+        rows = UserProfile.objects.filter(completed_tasks_count__gt=0).order_by(
+            '-completed_tasks_count', 'id'
+        ).values_list('completed_tasks_count', flat=True)[:LEADERBOARD_MAX_TOP]
+        top = []
+        # Публичный список: только место и число заданий, без данных профиля
+        for position, completed_tasks in enumerate(rows):
+            # Одинаковое число заданий — одинаковое место
+            if top and top[-1]['completed_tasks'] == completed_tasks:
+                rank = top[-1]['rank']
+            else:
+                rank = position + 1
+            top.append({'rank': rank, 'completed_tasks': completed_tasks})
+        cache.set(LEADERBOARD_TOP_CACHE_KEY, top, LEADERBOARD_CACHE_TIMEOUT)
+    return top[:limit]
@@ -3,7 +3,7 @@ from django.utils import timezone
 from django.conf import settings
 from django.contrib.auth.models import User
 from api.models import UserProfile
-from firebase_admin import auth
+from api import firebase_identity
 import stripe
 import logging
 
@@ -136,6 +136,10 @@ class Command(BaseCommand):
         self.stdout.write(f'  Processing {total_users} non-FREE users (skipping FREE users)...')
         logger.info(f"Processing {total_users} non-FREE users")
         
+        users = list(users)
+        # Email из локального зеркала Firebase вместо get_user на каждого пользователя
+        emails = firebase_identity.get_emails([user.username for user in users])
+        
         processed = 0
         for user in users:
             processed += 1
@@ -145,13 +149,9 @@ class Command(BaseCommand):
             try:
                 firebase_uid = user.username
                 
-                # Get email from Firebase
-                try:
-                    firebase_user = auth.get_user(firebase_uid)
-                    email = firebase_user.email
-                except Exception as e:
-                    logger.warning(f"Could not get Firebase email for UID {firebase_uid}: {str(e)}")
-                    email = None
+                email = emails.get(firebase_uid)
+                if not email:
+                    logger.warning(f"Could not get Firebase email for UID {firebase_uid}")
                 
                 user_data.append({
                     'user': user,
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from api.models import Task, TaskCompletion
+from api.utils.url_normalizer import normalize_url
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Fills normalized_post_url for Task and TaskCompletion rows (used by duplicate detection)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk_update')
+        parser.add_argument('--all', action='store_true', help='Recompute every row, not only empty ones')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        tasks = Task.objects.all()
+        completions = TaskCompletion.objects.all()
+        if not options['all']:
+            tasks = tasks.filter(normalized_post_url='')
+            completions = completions.filter(normalized_post_url='')
+
+        task_rows = (
+            Task(id=task_id, normalized_post_url=normalize_url(post_url))
+            for task_id, post_url in tasks.values_list('id', 'post_url').iterator(chunk_size=batch_size)
+        )
+        updated_tasks = self._bulk_update(Task, task_rows, batch_size)
+        self.stdout.write(f"Tasks updated: {updated_tasks}")
+
+        completion_rows = (
+            TaskCompletion(id=completion_id, normalized_post_url=normalize_url(post_url or task_post_url))
+            for completion_id, post_url, task_post_url in completions.values_list(
+                'id', 'post_url', 'task__post_url'
+            ).iterator(chunk_size=batch_size)
+        )
+        updated_completions = self._bulk_update(TaskCompletion, completion_rows, batch_size)
+        self.stdout.write(f"Task completions updated: {updated_completions}")
+
+        msg = f"Backfilled normalized_post_url: {updated_tasks} tasks, {updated_completions} completions"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
+
+    def _bulk_update(self, model, rows, batch_size):
+        updated = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, ['normalized_post_url'])
+                updated += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['normalized_post_url'])
+            updated += len(batch)
+        return updated
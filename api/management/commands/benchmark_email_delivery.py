@@ -0,0 +1,118 @@
+from django.core.management.base import BaseCommand
+from django.core.mail import get_connection
+from django.test.utils import override_settings
+from api.email_service import EmailService
+import logging
+import socketserver
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server: accepts everything, stores nothing. `latency` simulates a network round trip."""
+
+    def reply(self, line):
+        time.sleep(self.server.latency)
+        self.wfile.write(f'{line}\r\n'.encode())
+        self.wfile.flush()
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 stand-in ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.wfile.write(b'250-stand-in\r\n')
+                self.reply('250 SIZE 35882577')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.messages += 1
+                self.reply('250 OK queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                # HELO, MAIL FROM, RCPT TO, RSET, NOOP
+                self.reply('250 OK')
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), StandInSMTPHandler)
+        self.latency = latency
+        self.connections = 0
+        self.messages = 0
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks per-message send_email vs pooled send_bulk against a local SMTP stand-in (messages/second)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help='Messages per run')
+        parser.add_argument('--latency-ms', type=float, default=5, help='Simulated round trip of every SMTP reply')
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages per connection in send_bulk')
+        parser.add_argument('--rate', type=float, default=0, help='Token bucket rate for send_bulk (0 = unlimited)')
+
+    @override_settings(DEFAULT_FROM_EMAIL='benchmark@upvote.club')
+    def handle(self, *args, **options):
+        server = StandInSMTPServer(options['latency_ms'] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        def connection():
+            return get_connection(
+                'django.core.mail.backends.smtp.EmailBackend',
+                host='127.0.0.1', port=server.server_address[1],
+                username='', password='', use_tls=False, use_ssl=False,
+            )
+
+        count = options['messages']
+        messages = [
+            {
+                'to_email': f'user{i}@example.com',
+                'subject': 'Benchmark',
+                'html_content': '<p>Hello</p>' * 50,
+                'unsubscribe_url': f'https://upvote.club/api/unsubscribe/{i}/',
+            }
+            for i in range(count)
+        ]
+        email_service = EmailService()
+        # Подробные логи писем не мешают замеру
+        logging.disable(logging.INFO)
+        try:
+            started = time.monotonic()
+            for message in messages:
+                # Как раньше: новое соединение на каждое письмо
+                email_service.send_email(connection=connection(), **message)
+            before = time.monotonic() - started
+            before_connections = server.connections
+
+            started = time.monotonic()
+            results = email_service.send_bulk(
+                messages,
+                batch_size=options['batch_size'],
+                rate=options['rate'],
+                connection_factory=connection,
+            )
+            after = time.monotonic() - started
+        finally:
+            logging.disable(logging.NOTSET)
+            server.shutdown()
+            server.server_close()
+
+        failed = sum(1 for result in results if not result['sent'])
+        self.stdout.write(f"send_email per message: {count} msgs, {before_connections} connections, {before:.2f}s, {count / before:.1f} msg/s")
+        self.stdout.write(
+            f"send_bulk (batch {options['batch_size']}): {count} msgs, {server.connections - before_connections} connections, "
+            f"{after:.2f}s, {count / after:.1f} msg/s, {failed} failed"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {before / after:.1f}x"))
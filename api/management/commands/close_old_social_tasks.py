@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from api.models import Task, UserProfile, EmailSubscriptionType, UserEmailSubscription
-from api.utils.email_utils import get_firebase_email
+from api import firebase_identity
 from api.email_service import EmailService
 import logging
 from datetime import timedelta
@@ -23,8 +23,11 @@ class Command(BaseCommand):
         tasks = Task.objects.filter(
             status='ACTIVE',
             created_at__lte=cutoff
-        ).exclude(social_network__code__in=EXCLUDED_SOCIAL_CODES).order_by('created_at')[:10]
-        total = tasks.count()
+        ).exclude(social_network__code__in=EXCLUDED_SOCIAL_CODES).select_related(
+            'creator', 'social_network'
+        ).order_by('created_at')[:10]
+        tasks = list(tasks)
+        total = len(tasks)
         self.stdout.write(f"[INFO] Найдено {total} задач для обработки")
         logger.info(f"[close_old_social_tasks] Found {total} tasks to process")
 
@@ -34,6 +37,8 @@ class Command(BaseCommand):
             defaults={'description': 'Notifications about social tasks closed by system after 24h'}
         )
 
+        emails = firebase_identity.get_emails([task.creator.username for task in tasks])
+
         for task in tasks:
             try:
                 logger.info(f"[close_old_social_tasks] Processing task {task.id} (creator: {task.creator.username})")
@@ -65,7 +70,7 @@ class Command(BaseCommand):
                 logger.info(f"[close_old_social_tasks] User {profile.user.username} balance: {old_balance} -> {profile.balance}, available_tasks: {old_available_tasks} -> {profile.available_tasks}")
 
                 # Получаем email через Firebase
-                email = get_firebase_email(task.creator.username)
+                email = emails.get(task.creator.username)
                 if not email:
                     logger.error(f"[close_old_social_tasks] No email for user {profile.user.username}")
                     continue
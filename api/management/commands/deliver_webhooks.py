@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from api.webhooks import DEFAULT_BATCH_SIZE, deliver_due
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Sends pending WebhookDelivery rows (task status changes) to the API key owners\' webhook URLs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Deliveries claimed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep running and poll for new deliveries (worker mode)')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between polls in --loop mode')
+
+    def handle(self, *args, **options):
+        while True:
+            # Воркер живёт долго: не держим оборванное соединение с БД
+            close_old_connections()
+            delivered, failed = deliver_due(batch_size=options['batch_size'])
+            if not options['loop']:
+                break
+            if not delivered and not failed:
+                time.sleep(options['interval'])
+        msg = f"Webhooks delivered: {delivered} events, {failed} failed"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
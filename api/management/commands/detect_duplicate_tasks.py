@@ -6,7 +6,7 @@ import logging
 from api.email_service import EmailService
 from django.template.loader import render_to_string
 from django.conf import settings
-from firebase_admin import auth
+from api import firebase_identity
 from urllib.parse import urlparse, urlunparse, parse_qs
 import re
 
@@ -122,12 +122,12 @@ class Command(BaseCommand):
                     
                     if duplicate_tasks:
                         logger.info(f"[detect_duplicate_tasks] Found {len(duplicate_tasks)} tasks from other users that will be deleted")
+                        emails = firebase_identity.get_emails([task.creator.username for task in duplicate_tasks])
                         
                         for task in duplicate_tasks:
                             try:
-                                # Получаем email пользователя из Firebase
-                                firebase_user = auth.get_user(task.creator.username)
-                                user_email = firebase_user.email
+                                # Email пользователя из зеркала Firebase
+                                user_email = emails.get(task.creator.username)
                                 
                                 if not user_email:
                                     logger.error(f"[detect_duplicate_tasks] No email found in Firebase for user {task.creator.username}")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.campaigns import run_campaign
+from api.models import EmailCampaign
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Sends an EmailCampaign on a pool of worker threads; re-running resumes it from the delivery ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_id', type=int)
+        parser.add_argument('--workers', type=int, default=None, help='Worker threads (default: settings.EMAIL_CAMPAIGN_WORKERS)')
+        parser.add_argument('--rate', type=float, default=None, help='Emails per second for all workers (default: settings.EMAIL_SEND_RATE)')
+
+    def handle(self, *args, **options):
+        try:
+            campaign = EmailCampaign.objects.get(id=options['campaign_id'])
+        except EmailCampaign.DoesNotExist:
+            raise CommandError(f"Campaign {options['campaign_id']} does not exist")
+        if campaign.status == 'COMPLETED':
+            self.stdout.write(self.style.WARNING(f'Campaign {campaign.id} is already completed'))
+            return
+
+        counts = run_campaign(campaign, workers=options['workers'], rate=options['rate'])
+        msg = f"Campaign {campaign.id} completed: {counts}"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
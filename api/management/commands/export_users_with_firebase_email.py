@@ -3,7 +3,7 @@ import os
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.contrib.auth.models import User
-from firebase_admin import auth
+from api import firebase_identity
 from api.models import UserProfile
 from api.email_service import EmailService
 from datetime import datetime
@@ -84,6 +84,10 @@ class Command(BaseCommand):
                     'Created At',
                 ]
                 writer.writerow(headers)
+
+                # Данные Firebase из локального зеркала (недостающие догружаются пачками по 100)
+                profiles = list(profiles)
+                identities = firebase_identity.get_identities([profile.user.username for profile in profiles])
                 
                 # Обрабатываем каждого пользователя
                 for index, profile in enumerate(profiles, 1):
@@ -98,21 +102,20 @@ class Command(BaseCommand):
                         firebase_error = ''
                         
                         if firebase_uid:
-                            try:
-                                firebase_user = auth.get_user(firebase_uid)
-                                firebase_email = firebase_user.email or ''
-                                email_disabled = firebase_user.disabled if hasattr(firebase_user, 'disabled') else False
-                                email_verified = firebase_user.email_verified if hasattr(firebase_user, 'email_verified') else False
+                            identity = identities.get(firebase_uid)
+                            if identity is None:
+                                firebase_error = 'Error: Firebase lookup failed'
+                                logger.error(f"[export_users] Error getting Firebase user {firebase_uid}")
+                            elif identity.not_found:
+                                firebase_error = 'User not found in Firebase'
+                                logger.warning(f"[export_users] Firebase user not found: {firebase_uid}")
+                            else:
+                                firebase_email = identity.email or ''
+                                email_disabled = identity.disabled
+                                email_verified = identity.email_verified
                                 
                                 if email_disabled:
                                     disabled_count += 1
-                                    
-                            except auth.UserNotFoundError:
-                                firebase_error = 'User not found in Firebase'
-                                logger.warning(f"[export_users] Firebase user not found: {firebase_uid}")
-                            except Exception as e:
-                                firebase_error = f'Error: {str(e)[:50]}'
-                                logger.error(f"[export_users] Error getting Firebase user {firebase_uid}: {str(e)}")
                         
                         # Если email отключен, добавляем пометку
                         email_display = firebase_email
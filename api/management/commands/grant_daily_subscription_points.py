@@ -1,79 +1,39 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from api.models import UserProfile
-from calendar import monthrange
+from api.daily_jobs import daily_subscription_points, grant_daily_subscription_points
+from datetime import date
 import logging
-import math
+import time
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
     help = 'Grant daily subscription points to BUDDY and MATE users based on their monthly allocation'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None, help='Run date (YYYY-MM-DD, default: today). A date is granted only once')
+
     def handle(self, *args, **options):
-        now = timezone.now()
-        current_year = now.year
-        current_month = now.month
-        
-        days_in_month = monthrange(current_year, current_month)[1]
-        
-        buddy_daily_points = 250 / days_in_month
-        mate_daily_points = 1000 / days_in_month
+        run_date = options['date'] or timezone.localdate()
+        points = daily_subscription_points(run_date)
         
         logger.info(f"""
             Starting daily subscription points grant:
-            Time: {now}
-            Days in current month: {days_in_month}
-            BUDDY daily allocation: {buddy_daily_points:.2f} points
-            MATE daily allocation: {mate_daily_points:.2f} points
+            Run date: {run_date}
+            BUDDY daily allocation: {points['BUDDY']} points
+            MATE daily allocation: {points['MATE']} points
         """)
         
         try:
-            buddy_users = UserProfile.objects.filter(status='BUDDY')
-            mate_users = UserProfile.objects.filter(status='MATE')
-            
-            buddy_count = 0
-            mate_count = 0
-            
-            for profile in buddy_users:
-                old_balance = profile.balance
-                points_to_add = math.ceil(buddy_daily_points)
-                profile.balance += points_to_add
-                profile.save(update_fields=['balance'])
-                
-                buddy_count += 1
-                logger.info(f"""
-                    Granted points to BUDDY user:
-                    User ID: {profile.user.id}
-                    Username: {profile.user.username}
-                    Email: {profile.user.email}
-                    Old balance: {old_balance}
-                    Points added: {points_to_add}
-                    New balance: {profile.balance}
-                """)
-            
-            for profile in mate_users:
-                old_balance = profile.balance
-                points_to_add = math.ceil(mate_daily_points)
-                profile.balance += points_to_add
-                profile.save(update_fields=['balance'])
-                
-                mate_count += 1
-                logger.info(f"""
-                    Granted points to MATE user:
-                    User ID: {profile.user.id}
-                    Username: {profile.user.username}
-                    Email: {profile.user.email}
-                    Old balance: {old_balance}
-                    Points added: {points_to_add}
-                    New balance: {profile.balance}
-                """)
+            started = time.monotonic()
+            run = grant_daily_subscription_points(run_date)
             
             success_message = f"""
-                Successfully granted daily subscription points:
-                - BUDDY users: {buddy_count} users received {math.ceil(buddy_daily_points)} points each
-                - MATE users: {mate_count} users received {math.ceil(mate_daily_points)} points each
-                - Total users processed: {buddy_count + mate_count}
+                Daily subscription points for {run_date}: {run.status}
+                - BUDDY users received {points['BUDDY']} points each
+                - MATE users received {points['MATE']} points each
+                - Total users processed: {run.processed}
+                - Duration: {time.monotonic() - started:.1f}s
             """
             
             self.stdout.write(self.style.SUCCESS(success_message))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api.outbox import DEFAULT_BATCH_SIZE, process_outbox
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Processes pending OutboxEvent rows (referral reward emails etc.)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Events claimed per batch')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after N batches (default: until the outbox is drained)')
+
+    def handle(self, *args, **options):
+        processed, failed = process_outbox(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        msg = f"Outbox processed: {processed} done, {failed} failed"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from api.platform_stats import rebuild_completion_stats
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recomputes DailyCompletionStat rollup (platform stats) from TaskCompletion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Only recompute the last N days (default: whole history)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_completion_stats(days=options['days'])
+        msg = f"Completion stats rebuilt: {rows} rollup rows"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
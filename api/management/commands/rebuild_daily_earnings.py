@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from api.earnings import rebuild_daily_earnings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recomputes DailyEarningStat rollup (task completion stats) from TaskCompletion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Only recompute the last N days (default: whole history)')
+        parser.add_argument('--user-id', type=int, action='append', dest='user_ids', help='Only recompute these users (repeatable)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_earnings(days=options['days'], user_ids=options['user_ids'])
+        msg = f"Daily earnings rebuilt: {rows} rollup rows"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api.leaderboard import rebuild_leaderboard
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recomputes the community leaderboard histogram (CompletedTasksBucket) from UserProfile'
+
+    def handle(self, *args, **options):
+        buckets = rebuild_leaderboard()
+        msg = f"Leaderboard rebuilt: {buckets} completed-tasks buckets"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
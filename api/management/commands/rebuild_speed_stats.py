@@ -0,0 +1,19 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from api.speed_stats import rebuild_speed_stats
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Recomputes completion speed percentiles (CompletionSpeedStat) for the median speed calculator'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None, help='Day of completed tasks, YYYY-MM-DD (default: yesterday)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_speed_stats(day=options['date'])
+        msg = f"Completion speed stats rebuilt: {rows} rows"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
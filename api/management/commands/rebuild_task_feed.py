@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from api.task_feed import rebuild_task_feed
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Rebuilds the precomputed performer feed (TaskFeedEntry) from ACTIVE tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk upsert')
+
+    def handle(self, *args, **options):
+        upserted, removed = rebuild_task_feed(batch_size=options['batch_size'])
+        msg = f"Task feed rebuilt: {upserted} entries upserted, {removed} stale entries removed"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -4,7 +4,7 @@ from api.models import UserProfile, Task
 from api.utils.email_utils import send_daily_tasks_email
 import logging
 import time
-from firebase_admin import auth
+from api import firebase_identity
 from django.db import models
 from django.utils import timezone
 from datetime import timedelta
@@ -14,14 +14,6 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     help = 'Send daily tasks emails to users with available tasks'
 
-    def get_firebase_email(self, firebase_uid):
-        try:
-            user = auth.get_user(firebase_uid)
-            return user.email
-        except Exception as e:
-            logger.error(f"Error getting Firebase email for UID {firebase_uid}: {str(e)}")
-            return None
-
     def get_available_tasks(self):
         """Получает список всех доступных заданий"""
         try:
@@ -70,12 +62,18 @@ class Command(BaseCommand):
             user__is_active=True
         ).select_related('user')
         
-        logger.info(f"Found {profiles.count()} active profiles with tasks")
-            
+        profiles = list(profiles)
+        logger.info(f"Found {len(profiles)} active profiles with tasks")
+
+        # Один проход по зеркалу Firebase вместо запроса get_user на каждого пользователя
+        emails = firebase_identity.get_emails(
+            [profile.user.username for profile in profiles], include_disabled=False
+        )
+
         users_with_email = []
         for profile in profiles:
             firebase_uid = profile.user.username
-            email = self.get_firebase_email(firebase_uid)
+            email = emails.get(firebase_uid)
             
             if email and not any(domain in email.lower() for domain in ['@inbox.ondmarc.com', '@test.com']):
                 profile.user.email = email
@@ -1,175 +1,118 @@
 from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import connection
 from django.utils import timezone
-from django.contrib.auth.models import User
-from django.db.models import Count, Q
-from datetime import timedelta
+from itertools import islice
 import logging
-from ...models import TaskCompletion, UserEmailSubscription, EmailSubscriptionType
-from ...utils.email_utils import send_weekly_recap_email
+import time
+from ... import firebase_identity
+from ...email_service import EmailService
+from ...models import UserEmailSubscription, EmailSubscriptionType
+from ...utils.email_utils import build_weekly_recap_email
+from ...weekly_recap import iter_recaps, week_bounds
 
 logger = logging.getLogger(__name__)
 
+
+class QueryCounter:
+    """connection.execute_wrapper, считающий SQL-запросы (работает и без DEBUG)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
 class Command(BaseCommand):
     help = 'Sends weekly recap emails to users (should be run on Mondays)'
 
-    def get_tasks_stats(self, user, current_week_start, previous_week_start):
-        """
-        Получает статистику по заданиям за текущую и предыдущую неделю
-        """
-        # Текущая неделя
-        current_week_tasks = TaskCompletion.objects.filter(
-            user=user,
-            created_at__gte=current_week_start,
-            created_at__lt=current_week_start + timedelta(days=7)
-        ).count()
-
-        previous_week_tasks = TaskCompletion.objects.filter(
-            user=user,
-            created_at__gte=previous_week_start,
-            created_at__lt=current_week_start
-        ).count()
-
-        if previous_week_tasks > 0:
-            change_percentage = ((current_week_tasks - previous_week_tasks) / previous_week_tasks) * 100
-        else:
-            change_percentage = 100 if current_week_tasks > 0 else 0
-
-        return current_week_tasks, change_percentage
-
-    def get_network_stats(self, user, current_week_start):
-        """
-        Получает статистику по действиям в разных соцсетях
-        """
-        # Получаем статистику по типам действий для каждой соцсети
-        network_stats = TaskCompletion.objects.filter(
-            user=user,
-            created_at__gte=current_week_start,
-            created_at__lt=current_week_start + timedelta(days=7)
-        ).values(
-            'task__social_network__name',
-            'task__type'
-        ).annotate(
-            count=Count('id')
-        ).order_by('task__social_network__name', '-count')
-
-        # Группируем по соцсетям
-        networks = {}
-        emoji_map = {
-            'LIKE': '❤️',
-            'REPOST': '🔄',
-            'COMMENT': '💬',
-            'FOLLOW': '👥',
-            'SAVE': '🔖',
-            'CONNECT': '🤝',
-            'RESTACK': '📢',
-            'UPVOTE': '⬆️',
-        }
-
-        for stat in network_stats:
-            network_name = stat['task__social_network__name']
-            if network_name not in networks:
-                networks[network_name] = {
-                    'name': network_name,
-                    'actions': []
-                }
-            
-            networks[network_name]['actions'].append({
-                'name': stat['task__type'],
-                'count': stat['count'],
-                'emoji': emoji_map.get(stat['task__type'], '🎯')
-            })
-
-        return list(networks.values())
-
-    def get_leaderboard(self, current_week_start):
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Recaps rendered and sent per batch (default: settings.EMAIL_BATCH_SIZE)')
+
+    def send_recaps(self, subscriptions, current_week_start, batch_size):
         """
-        Получает топ-10 пользователей по заработанным очкам за неделю
+        Рендерит и отправляет отчеты пачками по мере чтения из iter_recaps.
+        Возвращает (success_count, error_count).
         """
-        return User.objects.filter(
-            taskcompletion__created_at__gte=current_week_start,
-            taskcompletion__created_at__lt=current_week_start + timedelta(days=7)
-        ).annotate(
-            points=Count('taskcompletion')
-        ).order_by('-points')[:10].values('username', 'points')
+        email_service = EmailService()
+        success_count = 0
+        error_count = 0
+        recaps = iter_recaps(subscriptions, current_week_start)
+
+        while True:
+            batch = list(islice(recaps, batch_size))
+            if not batch:
+                return success_count, error_count
+
+            # Email из зеркала Firebase — одним запросом на пачку
+            emails = firebase_identity.get_emails([subscription.user.username for subscription, _ in batch])
+
+            messages = []
+            for subscription, data in batch:
+                user = subscription.user
+                user_email = emails.get(user.username)
+                if not user_email:
+                    error_count += 1
+                    logger.error(f"Could not get Firebase email for user {user.username}")
+                    continue
+                try:
+                    messages.append(build_weekly_recap_email(user, data, user_email, subscription))
+                except Exception as e:
+                    error_count += 1
+                    logger.error(f"Error rendering recap for user {user.username}: {str(e)}")
+
+            results = email_service.send_bulk(messages, batch_size=batch_size)
+            for result in results:
+                if result['sent']:
+                    success_count += 1
+                else:
+                    error_count += 1
+                    logger.error(f"Failed to send recap to {result['to_email']}: {result['error']}")
 
     def handle(self, *args, **options):
         now = timezone.now()
-        
+
         # Проверяем, что сегодня понедельник (0 = понедельник в datetime.weekday())
         if now.weekday() != 0:
             self.stdout.write(self.style.WARNING('Today is not Monday. Skipping weekly recap.'))
             return
 
         logger.info("Starting weekly recap email sending")
+        started = time.monotonic()
+        query_counter = QueryCounter()
+        batch_size = options.get('batch_size') or getattr(settings, 'EMAIL_BATCH_SIZE', 50)
 
-        # Получаем начало текущей и предыдущей недели
-        current_week_start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7)
-        previous_week_start = current_week_start - timedelta(days=7)
-
-        # Получаем тип подписки
-        subscription_type, _ = EmailSubscriptionType.objects.get_or_create(
-            name='weekly_recap',
-            defaults={'description': 'Weekly performance recap emails'}
-        )
-
-        # Получаем всех подписанных пользователей
-        subscribed_users = UserEmailSubscription.objects.filter(
-            subscription_type=subscription_type,
-            is_subscribed=True
-        ).select_related('user')
-
-        total_users = subscribed_users.count()
-        success_count = 0
-        error_count = 0
+        # Получаем начало текущей недели
+        _, current_week_start, _ = week_bounds(now)
 
-        logger.info(f"Found {total_users} subscribed users")
+        with connection.execute_wrapper(query_counter):
+            # Получаем тип подписки
+            subscription_type, _ = EmailSubscriptionType.objects.get_or_create(
+                name='weekly_recap',
+                defaults={'description': 'Weekly performance recap emails'}
+            )
 
-        for subscription in subscribed_users:
-            try:
-                user = subscription.user
-                logger.info(f"Processing user {user.username}")
-
-                # Собираем статистику
-                total_tasks, change_percentage = self.get_tasks_stats(
-                    user, 
-                    current_week_start, 
-                    previous_week_start
-                )
-
-                # Если у пользователя нет активности за две недели, пропускаем
-                if total_tasks == 0 and change_percentage == 0:
-                    logger.info(f"No activity for user {user.username}, skipping")
-                    continue
+            # Получаем всех подписанных пользователей
+            subscribed_users = UserEmailSubscription.objects.filter(
+                subscription_type=subscription_type,
+                is_subscribed=True
+            )
 
-                data = {
-                    'total_tasks': total_tasks,
-                    'tasks_change_percentage': round(change_percentage, 1),
-                    'networks': self.get_network_stats(user, current_week_start),
-                    'leaderboard': self.get_leaderboard(current_week_start)
-                }
+            total_users = subscribed_users.count()
+            logger.info(f"Found {total_users} subscribed users")
 
-                if send_weekly_recap_email(user, data):
-                    success_count += 1
-                    logger.info(f"Successfully sent recap to {user.username}")
-                else:
-                    error_count += 1
-                    logger.error(f"Failed to send recap to {user.username}")
+            success_count, error_count = self.send_recaps(subscribed_users, current_week_start, batch_size)
 
-            except Exception as e:
-                error_count += 1
-                logger.error(f"Error processing user {user.username}: {str(e)}")
+        duration = time.monotonic() - started
 
         # Выводим итоговую статистику
-        self.stdout.write(self.style.SUCCESS(
-            f"""Weekly recap sending completed:
-            Total users: {total_users}
-            Successful: {success_count}
-            Failed: {error_count}"""
-        ))
-
-        logger.info(f"""
-            Weekly recap completed:
+        summary = f"""Weekly recap sending completed:
             Total users: {total_users}
             Successful: {success_count}
             Failed: {error_count}
-        """) 
\ No newline at end of file
+            Duration: {duration:.1f}s
+            Queries: {query_counter.count}"""
+        self.stdout.write(self.style.SUCCESS(summary))
+        logger.info(summary)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from api.firebase_identity import LIST_USERS_PAGE_SIZE, sync_all
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Copies all Firebase Auth users into the local FirebaseIdentity mirror (uid -> email)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=LIST_USERS_PAGE_SIZE, help='Users per list_users page (max 1000)')
+
+    def handle(self, *args, **options):
+        synced = sync_all(page_size=options['page_size'])
+        msg = f"Firebase users synced: {synced}"
+        logger.info(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-17 23:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0117_cacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskFeedEntry',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_entry', serialize=False, to='api.task')),
+                ('type', models.CharField(max_length=20)),
+                ('task_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('dedup_key', models.CharField(help_text='social_network_id:type:normalized post_url, used to hide already completed posts', max_length=1100)),
+                ('is_pinned', models.BooleanField(default=False)),
+                ('creator_priority', models.PositiveSmallIntegerField(default=4, help_text='Creator status priority: MATE=0, BUDDY=1, MEMBER=2, FREE=3')),
+                ('remaining_actions', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('social_network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.socialnetwork')),
+            ],
+            options={
+                'verbose_name': 'Task Feed Entry',
+                'verbose_name_plural': 'Task Feed Entries',
+                'indexes': [models.Index(fields=['is_pinned', 'creator_priority', 'remaining_actions', '-created_at'], name='api_taskfee_is_pinn_636908_idx'), models.Index(fields=['social_network', 'is_pinned'], name='api_taskfee_social__69aeb3_idx'), models.Index(fields=['dedup_key'], name='api_taskfee_dedup_k_a3171e_idx'), models.Index(fields=['creator'], name='api_taskfee_creator_7cc2be_idx')],
+            },
+        ),
+    ]
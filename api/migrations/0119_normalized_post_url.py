@@ -0,0 +1,48 @@
+# Generated by Django 4.2.16 on 2026-10-17 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0118_task_feed_entry'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='taskfeedentry',
+            name='api_taskfee_dedup_k_a3171e_idx',
+        ),
+        migrations.RemoveField(
+            model_name='taskfeedentry',
+            name='dedup_key',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='normalized_post_url',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Canonical host/path key of post_url used for duplicate detection', max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='taskcompletion',
+            name='normalized_post_url',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Canonical host/path key of the completed post (see Task.normalized_post_url)', max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='taskfeedentry',
+            name='normalized_post_url',
+            field=models.CharField(blank=True, default='', max_length=1000),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['type', 'social_network', 'normalized_post_url'], name='api_task_type_d5db58_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcompletion',
+            index=models.Index(fields=['user', 'normalized_post_url'], name='api_taskcom_user_id_501f4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskfeedentry',
+            index=models.Index(fields=['type', 'social_network', 'normalized_post_url'], name='api_taskfee_type_d5156c_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-17 23:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0119_normalized_post_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCompletionStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('action', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('social_network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_completion_stats', to='api.socialnetwork')),
+            ],
+            options={
+                'verbose_name': 'Daily Completion Stat',
+                'verbose_name_plural': 'Daily Completion Stats',
+                'indexes': [models.Index(fields=['date'], name='api_dailyco_date_ef502d_idx')],
+                'unique_together': {('date', 'social_network', 'action')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-17 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0121_outbox_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FirebaseIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.CharField(max_length=128, unique=True)),
+                ('email', models.CharField(blank=True, max_length=254, null=True)),
+                ('email_verified', models.BooleanField(default=False)),
+                ('disabled', models.BooleanField(default=False)),
+                ('not_found', models.BooleanField(default=False, help_text='The uid does not exist in Firebase (anymore)')),
+                ('synced_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Firebase Identity',
+                'verbose_name_plural': 'Firebase Identities',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0123_email_campaign_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyJobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=50)),
+                ('run_date', models.DateField()),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('COMPLETED', 'Completed')], default='RUNNING', max_length=20)),
+                ('last_id', models.BigIntegerField(default=0, help_text='Last processed UserProfile id')),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-run_date', 'job'],
+                'unique_together': {('job', 'run_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.16 on 2026-10-18 00:09
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_buckets(apps, schema_editor):
+    UserProfile = apps.get_model('api', 'UserProfile')
+    CompletedTasksBucket = apps.get_model('api', 'CompletedTasksBucket')
+    grouped = UserProfile.objects.filter(completed_tasks_count__gt=0).values(
+        'completed_tasks_count'
+    ).annotate(total=Count('id')).order_by()
+    CompletedTasksBucket.objects.bulk_create(
+        [CompletedTasksBucket(completed_tasks=row['completed_tasks_count'], users=row['total']) for row in grouped],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0124_daily_job_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletedTasksBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_tasks', models.PositiveIntegerField(unique=True)),
+                ('users', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Completed Tasks Bucket',
+                'verbose_name_plural': 'Completed Tasks Buckets',
+            },
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='completed_tasks_count',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-18 00:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0125_completed_tasks_bucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEarningStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('tasks', models.IntegerField(default=0)),
+                ('points', models.FloatField(default=0, help_text='Sum of rewards: original_price / actions_required / 2 per completion')),
+                ('usd', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_earnings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Earning Stat',
+                'verbose_name_plural': 'Daily Earning Stats',
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-18 00:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0126_daily_earning_stat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletionSpeedStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('action', models.CharField(max_length=20)),
+                ('actions_required', models.PositiveIntegerField(default=0)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('p50_minutes', models.FloatField()),
+                ('p90_minutes', models.FloatField()),
+                ('social_network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='speed_stats', to='api.socialnetwork')),
+            ],
+            options={
+                'verbose_name': 'Completion Speed Stat',
+                'verbose_name_plural': 'Completion Speed Stats',
+                'unique_together': {('date', 'social_network', 'action', 'actions_required')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-18 00:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0127_completion_speed_stat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='rate_limit_per_minute',
+            field=models.PositiveIntegerField(blank=True, help_text='Requests per minute (burst of the same size); empty = PUBLIC_API_RATE_LIMIT_PER_MINUTE', null=True),
+        ),
+        migrations.CreateModel(
+            name='ApiKeyDailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('throttled', models.PositiveIntegerField(default=0)),
+                ('api_key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usage', to='api.apikey')),
+            ],
+            options={
+                'verbose_name': 'API Key Daily Usage',
+                'verbose_name_plural': 'API Key Daily Usage',
+                'unique_together': {('api_key', 'date')},
+            },
+        ),
+    ]
@@ -10,6 +10,7 @@ import tweepy
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.db import models
+from .utils.url_normalizer import normalize_url
 
 class UserProfile(models.Model):
     DISCOUNT_RATES = {
@@ -18,6 +19,12 @@ class UserProfile(models.Model):
         'BUDDY': 0,
         'MATE': 40
     }
+    DAILY_TASK_LIMITS = {
+        'FREE': 2,
+        'MEMBER': 1,
+        'BUDDY': 10,
+        'MATE': 10000,
+    }
     
     _is_updating = False
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -49,7 +56,7 @@ class UserProfile(models.Model):
     daily_task_limit = models.IntegerField(default=0)
     auto_actions_enabled = models.BooleanField(default=False)
     last_auto_action_at = models.DateTimeField(null=True, blank=True)
-    completed_tasks_count = models.IntegerField(default=0)
+    completed_tasks_count = models.IntegerField(default=0, db_index=True)
     bonus_tasks_completed = models.IntegerField(default=0, help_text='Number of bonus tasks completed')
     game_rewards_claimed = models.IntegerField(default=0, help_text='Number of game rewards claimed by user')
     last_reward_at_task_count = models.IntegerField(default=0, help_text='Number of completed bonus tasks when last reward was claimed')
@@ -162,6 +169,19 @@ class UserProfile(models.Model):
         help_text='Timestamp when welcome/confirmation email was sent'
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем загруженный статус: pre_save сравнивает с ним без лишнего SELECT
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.status
+
     def save(self, *args, **kwargs):
         is_new = self.pk is None
         
@@ -179,16 +199,12 @@ class UserProfile(models.Model):
         else:
             super().save(*args, **kwargs)
 
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'status' in update_fields:
+            self._loaded_status = self.status
+
     def get_daily_task_limit(self):
-        if self.status == 'FREE':
-            return 2
-        elif self.status == 'MEMBER':
-            return 1
-        elif self.status == 'BUDDY':
-            return 10
-        elif self.status == 'MATE':
-            return 10000
-        return 0
+        return self.DAILY_TASK_LIMITS.get(self.status, 0)
 
     def update_available_tasks(self, save=True):
         if self.status == 'FREE':
@@ -320,10 +336,19 @@ class UserProfile(models.Model):
         return total_potential / 2  # Делим на 2, так как награда - половина от цены задания
 
 @receiver(pre_save, sender=UserProfile)
-def update_tasks_on_status_change(sender, instance, **kwargs):
+def update_tasks_on_status_change(sender, instance, update_fields=None, **kwargs):
+    # Статус не сохраняется или не менялся с момента загрузки — SELECT не нужен
+    if update_fields is not None and 'status' not in update_fields:
+        instance._status_changed = False
+        return
+    if instance.pk and getattr(instance, '_loaded_status', None) == instance.status:
+        instance._status_changed = False
+        return
+
     try:
         if instance.pk:
             old_instance = UserProfile.objects.get(pk=instance.pk)
+            instance._status_changed = old_instance.status != instance.status
             if old_instance.status != instance.status:
                 new_daily_limit = instance.get_daily_task_limit()
                 
@@ -396,6 +421,13 @@ class Task(models.Model):
         help_text='Type of task: Engagement or Crowd'
     )
     post_url = models.URLField(max_length=1000)
+    normalized_post_url = models.CharField(
+        max_length=1000,
+        blank=True,
+        default='',
+        editable=False,
+        help_text='Canonical host/path key of post_url used for duplicate detection'
+    )
     price = models.IntegerField()
     actions_required = models.IntegerField()
     actions_completed = models.IntegerField(default=0)
@@ -486,6 +518,7 @@ class Task(models.Model):
             models.Index(fields=['social_network', 'type']),
             models.Index(fields=['post_url']),
             models.Index(fields=['task_type']),
+            models.Index(fields=['type', 'social_network', 'normalized_post_url']),
         ]
 
     def complete(self):
@@ -496,9 +529,28 @@ class Task(models.Model):
             self.completion_duration = now - self.created_at
         self.save()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Загруженный статус: post_save отличает смену статуса (вебхуки) без лишнего SELECT
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.status
+
     def save(self, *args, **kwargs):
         # Отключили автопин: теперь is_pinned управляется только явным выбором на фронте/админке
+        self.normalized_post_url = normalize_url(self.post_url)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'post_url' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'normalized_post_url'}
         super().save(*args, **kwargs)
+        if update_fields is None or 'status' in update_fields:
+            self._loaded_status = self.status
 
 class CrowdTask(models.Model):
     """
@@ -600,6 +652,44 @@ class CrowdTask(models.Model):
         text_preview = self.text[:50] + '...' if len(self.text) > 50 else self.text
         return f"CrowdTask for Task #{task_id}: {text_preview}"
 
+class TaskFeedEntry(models.Model):
+    """
+    Precomputed ranking row for an ACTIVE task in the performer feed.
+    Maintained by api.task_feed on Task and UserProfile changes.
+    """
+    task = models.OneToOneField(
+        'Task',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_entry'
+    )
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    social_network = models.ForeignKey('SocialNetwork', on_delete=models.CASCADE, related_name='+')
+    type = models.CharField(max_length=20)
+    task_type = models.CharField(max_length=20, null=True, blank=True)
+    normalized_post_url = models.CharField(max_length=1000, blank=True, default='')
+    is_pinned = models.BooleanField(default=False)
+    creator_priority = models.PositiveSmallIntegerField(
+        default=4,
+        help_text='Creator status priority: MATE=0, BUDDY=1, MEMBER=2, FREE=3'
+    )
+    remaining_actions = models.IntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Task Feed Entry'
+        verbose_name_plural = 'Task Feed Entries'
+        indexes = [
+            models.Index(fields=['is_pinned', 'creator_priority', 'remaining_actions', '-created_at']),
+            models.Index(fields=['social_network', 'is_pinned']),
+            models.Index(fields=['type', 'social_network', 'normalized_post_url']),
+            models.Index(fields=['creator']),
+        ]
+
+    def __str__(self):
+        return f"Feed entry for task #{self.task_id} (priority {self.creator_priority}, remaining {self.remaining_actions})"
+
 class TaskCompletion(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(null=True, blank=True)
@@ -607,6 +697,13 @@ class TaskCompletion(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     action = models.CharField(max_length=50)
     post_url = models.CharField(max_length=1000, null=True, blank=True)
+    normalized_post_url = models.CharField(
+        max_length=1000,
+        blank=True,
+        default='',
+        editable=False,
+        help_text='Canonical host/path key of the completed post (see Task.normalized_post_url)'
+    )
     metadata = models.JSONField(null=True, blank=True)
     is_auto = models.BooleanField(default=False)
 
@@ -615,11 +712,173 @@ class TaskCompletion(models.Model):
         indexes = [
             models.Index(fields=['user', 'task']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['user', 'normalized_post_url']),
         ]
 
     def __str__(self):
         return f"{self.user.username} - {self.action} - {self.task.id}"
 
+    def save(self, *args, **kwargs):
+        if not self.normalized_post_url:
+            self.normalized_post_url = normalize_url(self.post_url or self.task.post_url)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def completed_post_exists(cls, user):
+        """
+        Exists() over the user's completions of the same post (normalized URL),
+        action type and social network as the outer Task/TaskFeedEntry row.
+        """
+        return models.Exists(
+            cls.objects.filter(
+                user=user,
+                normalized_post_url=models.OuterRef('normalized_post_url'),
+                task__type=models.OuterRef('type'),
+                task__social_network_id=models.OuterRef('social_network_id'),
+            )
+        )
+
+class DailyCompletionStat(models.Model):
+    """
+    Rollup of TaskCompletion counts per (day, social network, action).
+    Incremented on every completion and recomputed by `rebuild_completion_stats`.
+    """
+    date = models.DateField()
+    social_network = models.ForeignKey('SocialNetwork', on_delete=models.CASCADE, related_name='daily_completion_stats')
+    action = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Daily Completion Stat'
+        verbose_name_plural = 'Daily Completion Stats'
+        unique_together = ('date', 'social_network', 'action')
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.social_network_id} {self.action}: {self.count}"
+
+class DailyEarningStat(models.Model):
+    """
+    Per-user daily rollup of completed tasks and earned rewards for
+    task_completion_stats (see api/earnings.py). Incremented on every completion
+    and recomputed by `rebuild_daily_earnings`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_earnings')
+    date = models.DateField()
+    tasks = models.IntegerField(default=0)
+    points = models.FloatField(default=0, help_text='Sum of rewards: original_price / actions_required / 2 per completion')
+    usd = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = 'Daily Earning Stat'
+        verbose_name_plural = 'Daily Earning Stats'
+        unique_together = ('user', 'date')
+
+    def __str__(self):
+        return f"{self.user_id} {self.date}: {self.tasks} tasks, {self.points} points"
+
+class CompletedTasksBucket(models.Model):
+    """
+    Histogram of UserProfile.completed_tasks_count for the community leaderboard
+    (see api/leaderboard.py): how many users have completed exactly N tasks.
+    Moved by one user on every completion and recomputed by `rebuild_leaderboard`.
+    """
+    completed_tasks = models.PositiveIntegerField(unique=True)
+    users = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Completed Tasks Bucket'
+        verbose_name_plural = 'Completed Tasks Buckets'
+
+    def __str__(self):
+        return f"{self.completed_tasks} tasks: {self.users} users"
+
+class CompletionSpeedStat(models.Model):
+    """
+    Completion speed percentiles (created_at -> completed_at, minutes) of tasks
+    completed on `date`, per network, action and actions_required, for the
+    public median speed calculator (see api/speed_stats.py).
+    actions_required = 0 holds the network x action row over all counts.
+    Recomputed nightly by `rebuild_speed_stats`.
+    """
+    ANY_ACTIONS_COUNT = 0
+
+    date = models.DateField()
+    social_network = models.ForeignKey('SocialNetwork', on_delete=models.CASCADE, related_name='speed_stats')
+    action = models.CharField(max_length=20)
+    actions_required = models.PositiveIntegerField(default=ANY_ACTIONS_COUNT)
+    samples = models.PositiveIntegerField(default=0)
+    p50_minutes = models.FloatField()
+    p90_minutes = models.FloatField()
+
+    class Meta:
+        verbose_name = 'Completion Speed Stat'
+        verbose_name_plural = 'Completion Speed Stats'
+        unique_together = ('date', 'social_network', 'action', 'actions_required')
+
+    def __str__(self):
+        return f"{self.date} {self.social_network_id}/{self.action}/{self.actions_required}: p50 {self.p50_minutes}"
+
+class OutboxEvent(models.Model):
+    """
+    Transactional outbox: side effects (Firebase lookups, emails) are written as
+    rows in the same transaction as the business change and executed later by
+    the `process_outbox` worker (see api/outbox.py).
+    """
+    TYPE_CHOICES = [
+        ('REFERRAL_REWARD', 'Referral reward (20 tasks)'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    event_type = models.CharField(max_length=50, choices=TYPE_CHOICES)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text='When the event may be picked up next (also the lease expiry while PROCESSING)'
+    )
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Outbox Event'
+        verbose_name_plural = 'Outbox Events'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk} ({self.status})"
+
+class FirebaseIdentity(models.Model):
+    """
+    Local mirror of Firebase Auth users (User.username is the Firebase uid).
+    Kept fresh by the `sync_firebase_users` command and by batched lookups
+    in api/firebase_identity.py.
+    """
+    uid = models.CharField(max_length=128, unique=True)
+    email = models.CharField(max_length=254, null=True, blank=True)
+    email_verified = models.BooleanField(default=False)
+    disabled = models.BooleanField(default=False)
+    not_found = models.BooleanField(default=False, help_text='The uid does not exist in Firebase (anymore)')
+    synced_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Firebase Identity'
+        verbose_name_plural = 'Firebase Identities'
+
+    def __str__(self):
+        return f"{self.uid} ({self.email or '-'})"
+
 class EmailSubscriptionType(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
@@ -674,6 +933,63 @@ class EmailCampaign(models.Model):
     def __str__(self):
         return f"{self.subject} ({self.status})"
 
+class EmailCampaignDelivery(models.Model):
+    """
+    Per-recipient ledger of an EmailCampaign (see api/campaigns.py).
+    A campaign can be resumed after a crash: only PENDING rows are sent again.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+        ('SKIPPED', 'Skipped'),
+    ]
+
+    campaign = models.ForeignKey(EmailCampaign, on_delete=models.CASCADE, related_name='deliveries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    email = models.CharField(max_length=254, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    error = models.TextField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('campaign', 'user')
+        indexes = [
+            models.Index(fields=['campaign', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign_id} -> {self.user_id} ({self.status})"
+
+class DailyJobRun(models.Model):
+    """
+    Ledger of set-based daily jobs (see api/daily_jobs.py): one row per job and
+    day. The job checkpoints the last processed profile id after every chunk in
+    the same transaction as the chunk's UPDATE, so a retried run resumes where
+    it stopped and never applies a chunk twice.
+    """
+    STATUS_CHOICES = [
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+    ]
+
+    job = models.CharField(max_length=50)
+    run_date = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='RUNNING')
+    last_id = models.BigIntegerField(default=0, help_text='Last processed UserProfile id')
+    processed = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('job', 'run_date')
+        ordering = ['-run_date', 'job']
+
+    def __str__(self):
+        return f"{self.job} {self.run_date} ({self.status})"
+
 class SocialNetwork(models.Model):
     name = models.CharField(max_length=50, unique=True)
     code = models.CharField(max_length=20, unique=True)
@@ -1728,6 +2044,7 @@ class ApiKey(models.Model):
     last_used_at = models.DateTimeField(null=True, blank=True, help_text='Last time the API key was used')
     created_at = models.DateTimeField(auto_now_add=True, help_text='When the API key was created')
     expires_at = models.DateTimeField(null=True, blank=True, help_text='Optional expiration date for the API key')
+    rate_limit_per_minute = models.PositiveIntegerField(null=True, blank=True, help_text='Requests per minute (burst of the same size); empty = PUBLIC_API_RATE_LIMIT_PER_MINUTE')
     
     class Meta:
         verbose_name = 'API Key'
@@ -1752,6 +2069,86 @@ class ApiKey(models.Model):
         return self.is_active and not self.is_expired()
 
 
+class WebhookSubscription(models.Model):
+    """
+    URL that receives signed task status change events of the API key owner's
+    tasks (see api/webhooks.py) instead of polling get_task_status.
+    """
+    api_key = models.ForeignKey(ApiKey, on_delete=models.CASCADE, related_name='webhooks')
+    url = models.URLField(max_length=1000)
+    secret = models.CharField(max_length=64, help_text='HMAC-SHA256 key of the X-Webhook-Signature header')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Webhook Subscription'
+        verbose_name_plural = 'Webhook Subscriptions'
+        unique_together = ('api_key', 'url')
+
+    def __str__(self):
+        return f"{self.url} ({'active' if self.is_active else 'inactive'})"
+
+
+class WebhookDelivery(models.Model):
+    """
+    One event for one webhook subscription. The `deliver_webhooks` worker
+    POSTs due events of a subscription together and retries failures with
+    exponential backoff.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text='When the event may be sent next (also the lease expiry while PROCESSING)'
+    )
+    last_error = models.TextField(null=True, blank=True)
+    response_status = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Webhook Delivery'
+        verbose_name_plural = 'Webhook Deliveries'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} -> {self.subscription_id} ({self.status})"
+
+
+class ApiKeyDailyUsage(models.Model):
+    """
+    Public API calls per key and day (see api/api_keys.py): accepted requests
+    and requests rejected by the rate limiter. Counted in process memory and
+    written in batches.
+    """
+    api_key = models.ForeignKey(ApiKey, on_delete=models.CASCADE, related_name='daily_usage')
+    date = models.DateField()
+    requests = models.PositiveIntegerField(default=0)
+    throttled = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'API Key Daily Usage'
+        verbose_name_plural = 'API Key Daily Usage'
+        unique_together = ('api_key', 'date')
+
+    def __str__(self):
+        return f"{self.api_key_id} {self.date}: {self.requests} requests, {self.throttled} throttled"
+
+
 class CacheEntry(models.Model):
     """
     Proxy model for viewing django_cache_table contents in admin
@@ -1783,5 +2180,9 @@ class CacheEntry(models.Model):
             return 'BuyLanding'
         elif 'action_landing' in self.cache_key:
             return 'ActionLanding'
+        elif 'median_speed' in self.cache_key:
+            return 'MedianSpeed'
+        elif 'cache_stats:' in self.cache_key:
+            return 'CacheStats'
         else:
             return 'Other'
\ No newline at end of file
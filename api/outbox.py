@@ -0,0 +1,183 @@
+"""
+Transactional outbox for side effects of request handlers.
+
+The request only inserts a compact OutboxEvent row inside its own transaction
+(`enqueue`), so the event exists if and only if the business change committed.
+The `process_outbox` management command (also scheduled in CRONJOBS) drains
+pending events in batches, does the slow third-party work (Firebase lookups,
+emails) outside of any request or row lock, and retries failures with
+exponential backoff.
+
+Handlers receive all claimed events of their type at once so lookups can be
+batched, and return {event_id: error_message} for the events that failed.
+"""
+from datetime import timedelta
+import logging
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import firebase_identity
+from .email_service import EmailService
+from .models import OutboxEvent
+
+logger = logging.getLogger('api')
+
+REFERRAL_REWARD = 'REFERRAL_REWARD'
+
+DEFAULT_BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+# Сколько событие считается занятым воркером; после этого его может забрать другой
+LEASE = timedelta(minutes=10)
+
+
+def enqueue(event_type, payload):
+    """Adds an event to the outbox. Call inside the transaction of the business change."""
+    return OutboxEvent.objects.create(event_type=event_type, payload=payload)
+
+
+def _retry_delay(attempts):
+    return timedelta(minutes=min(2 ** attempts, 360))
+
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Marks up to batch_size due events as PROCESSING and returns them.
+    Events of a crashed worker become due again when their lease expires.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='PENDING') | Q(status='PROCESSING'), next_attempt_at__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        OutboxEvent.objects.filter(id__in=ids).update(
+            status='PROCESSING',
+            next_attempt_at=now + LEASE,
+        )
+    return list(OutboxEvent.objects.filter(id__in=ids).order_by('id'))
+
+
+def _finish(events, errors):
+    now = timezone.now()
+    done_ids = [event.id for event in events if event.id not in errors]
+    if done_ids:
+        OutboxEvent.objects.filter(id__in=done_ids).update(
+            status='DONE', processed_at=now, last_error=None, attempts=F('attempts') + 1
+        )
+    for event in events:
+        if event.id not in errors:
+            continue
+        attempts = event.attempts + 1
+        failed = attempts >= MAX_ATTEMPTS
+        OutboxEvent.objects.filter(id=event.id).update(
+            status='FAILED' if failed else 'PENDING',
+            attempts=attempts,
+            last_error=str(errors[event.id])[:2000],
+            next_attempt_at=now + _retry_delay(attempts),
+            payload=event.payload,
+        )
+        log = logger.error if failed else logger.warning
+        log(f"[outbox] Event {event.id} ({event.event_type}) attempt {attempts} failed: {errors[event.id]}")
+
+
+def process_outbox(batch_size=DEFAULT_BATCH_SIZE, max_batches=None):
+    """
+    Drains due outbox events. Returns (processed, failed).
+    """
+    processed = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        events = claim_batch(batch_size)
+        if not events:
+            break
+        batches += 1
+
+        by_type = {}
+        for event in events:
+            by_type.setdefault(event.event_type, []).append(event)
+
+        for event_type, typed_events in by_type.items():
+            handler = HANDLERS.get(event_type)
+            if handler is None:
+                errors = {event.id: f'No handler for {event_type}' for event in typed_events}
+            else:
+                try:
+                    errors = handler(typed_events)
+                except Exception as e:
+                    logger.error(f"[outbox] Handler for {event_type} crashed: {str(e)}", exc_info=True)
+                    errors = {event.id: str(e) for event in typed_events}
+            _finish(typed_events, errors)
+            processed += len(typed_events) - len(errors)
+            failed += len(errors)
+
+    if processed or failed:
+        logger.info(f"[outbox] Processed {processed} events, {failed} failed")
+    return processed, failed
+
+
+# --- Handlers ------------------------------------------------------------------
+
+REFERRAL_INVITED_EMAIL = {
+    'subject': 'Congratulations! You completed 20 tasks and earned 30 extra points!',
+    'html_content': (
+        "<p>Congratulations! You completed your first 20 tasks!</p>"
+        "<p>You received 30 extra points as a reward.</p>"
+        "<p>Invite more friends: <a href='https://upvote.club/dashboard/referral' target='_blank'>https://upvote.club/dashboard/referral</a></p>"
+    ),
+}
+REFERRAL_INVITER_EMAIL = {
+    'subject': 'Your friend completed 20 tasks - You earned 30 points!',
+    'html_content': (
+        "<p>Great news! Your friend completed 20 tasks!</p>"
+        "<p>You received 30 points as a reward.</p>"
+        "<p>Invite more friends: <a href='https://upvote.club/dashboard/referral' target='_blank'>https://upvote.club/dashboard/referral</a></p>"
+    ),
+}
+
+
+def handle_referral_rewards(events):
+    """
+    Emails both sides of a referral reward. payload: {'user_id', 'inviter_id', 'sent': [...]}
+    'sent' records the roles already emailed so a retry does not send them twice.
+    """
+    user_ids = set()
+    for event in events:
+        user_ids.update([event.payload.get('user_id'), event.payload.get('inviter_id')])
+    usernames = dict(User.objects.filter(id__in=user_ids).values_list('id', 'username'))
+    emails = firebase_identity.get_emails(usernames.values(), fail_silently=False)
+
+    email_service = EmailService()
+    errors = {}
+    for event in events:
+        sent = event.payload.setdefault('sent', [])
+        recipients = (
+            ('invited', event.payload.get('user_id'), REFERRAL_INVITED_EMAIL),
+            ('inviter', event.payload.get('inviter_id'), REFERRAL_INVITER_EMAIL),
+        )
+        for role, user_id, message in recipients:
+            if role in sent:
+                continue
+            email = emails.get(usernames.get(user_id))
+            if not email:
+                # Нет пользователя или email в Firebase — повторять бессмысленно
+                sent.append(role)
+                continue
+            if email_service.send_email(to_email=email, **message):
+                sent.append(role)
+                logger.info(f"[outbox] Sent referral reward email ({role}) to {email}")
+            else:
+                errors[event.id] = f'Failed to send {role} email to {email}'
+        if event.id not in errors:
+            OutboxEvent.objects.filter(id=event.id).update(payload=event.payload)
+    return errors
+
+
+HANDLERS = {
+    REFERRAL_REWARD: handle_referral_rewards,
+}
@@ -0,0 +1,183 @@
+"""
+Platform-wide completion statistics for public landing pages.
+
+Counts live in the DailyCompletionStat rollup (one row per day, social network
+and action) instead of being computed with COUNT(*) over TaskCompletion.
+The rollup is incremented after commit from the TaskCompletion post_save signal
+and can be recomputed with the `rebuild_completion_stats` management command.
+
+Deleted completions (only ever removed by a CASCADE from Task or User) are not
+subtracted: a post_delete receiver would make Django load every completion of a
+deleted task. The nightly rebuild corrects the last days; older days are
+corrected by running the command without --days.
+
+Days are UTC days of TaskCompletion.created_at everywhere (increment, rebuild
+and "yesterday"), like the original per-request queries.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+import logging
+
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyCompletionStat, SocialNetwork, TaskCompletion
+
+logger = logging.getLogger('api')
+
+PLATFORM_STATS_CACHE_KEY = 'platform_stats'
+PLATFORM_STATS_CACHE_TIMEOUT = 600  # 10 минут
+REACH_MULTIPLIER = 100
+
+
+def _utc_date(value):
+    return value.astimezone(dt_timezone.utc).date()
+
+
+def _utc_today():
+    return _utc_date(timezone.now())
+
+
+def record_completion(completion):
+    """Adds a single completion to today's rollup row."""
+    day = _utc_date(completion.created_at or timezone.now())
+    lookup = {
+        'date': day,
+        'social_network_id': completion.task.social_network_id,
+        'action': completion.action,
+    }
+    if DailyCompletionStat.objects.filter(**lookup).update(count=F('count') + 1):
+        return
+    try:
+        with transaction.atomic():
+            DailyCompletionStat.objects.create(count=1, **lookup)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        DailyCompletionStat.objects.filter(**lookup).update(count=F('count') + 1)
+
+
+def rebuild_completion_stats(days=None):
+    """
+    Recomputes rollup rows from TaskCompletion for the last `days` days
+    (including today), or for the whole history if days is None.
+    Returns the number of rollup rows written.
+    """
+    since = _utc_today() - timedelta(days=days - 1) if days else None
+    completions = TaskCompletion.objects.all()
+    rollup = DailyCompletionStat.objects.all()
+    if since:
+        completions = completions.filter(
+            created_at__gte=datetime.combine(since, time.min, tzinfo=dt_timezone.utc)
+        )
+        rollup = rollup.filter(date__gte=since)
+
+    grouped = completions.annotate(day=TruncDate('created_at', tzinfo=dt_timezone.utc)).values(
+        'day', 'task__social_network_id', 'action'
+    ).annotate(total=Count('id')).order_by()
+
+    with transaction.atomic():
+        # Блокируем запись в агрегат до конца пересчёта: выполнение, закоммиченное
+        # между чтением и заменой строк, иначе потерялось бы или посчиталось дважды.
+        # Чтение лендингов блокировка не задерживает; в SQLite запись и так одна —
+        # её захватывает DELETE перед чтением.
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {DailyCompletionStat._meta.db_table} IN EXCLUSIVE MODE')
+        rollup.delete()
+        rows = [
+            DailyCompletionStat(
+                date=row['day'],
+                social_network_id=row['task__social_network_id'],
+                action=row['action'],
+                count=row['total'],
+            )
+            for row in grouped
+        ]
+        DailyCompletionStat.objects.bulk_create(rows, batch_size=1000)
+
+    cache.delete(PLATFORM_STATS_CACHE_KEY)
+    logger.info(f"[platform_stats] Rebuilt {len(rows)} rollup rows since {since or 'the beginning'}")
+    return len(rows)
+
+
+def _action_entry(action, total, yesterday):
+    return {
+        'action': action,
+        'total': total,
+        'yesterday': yesterday,
+        'reach': total * REACH_MULTIPLIER,
+        'reach_yesterday': yesterday * REACH_MULTIPLIER
+    }
+
+
+def compute_platform_stats():
+    """Builds the get_platform_stats payload from one grouped query over the rollup."""
+    yesterday = _utc_today() - timedelta(days=1)
+
+    grouped = DailyCompletionStat.objects.values('social_network_id', 'action').annotate(
+        total=Sum('count'),
+        yesterday=Sum('count', filter=Q(date=yesterday)),
+    ).order_by('action')
+
+    networks = {
+        network.id: {
+            'code': network.code,
+            'network_name': network.name,
+            'total': 0,
+            'yesterday': 0,
+            'actions': [],
+        }
+        for network in SocialNetwork.objects.only('id', 'code', 'name')
+    }
+    by_action = {}
+    total_actions = total_actions_yesterday = 0
+
+    for row in grouped:
+        total = row['total'] or 0
+        day_total = row['yesterday'] or 0
+        if total <= 0:
+            continue
+        network = networks.get(row['social_network_id'])
+        if network is not None:
+            network['total'] += total
+            network['yesterday'] += day_total
+            network['actions'].append(_action_entry(row['action'], total, day_total))
+        action_totals = by_action.setdefault(row['action'], [0, 0])
+        action_totals[0] += total
+        action_totals[1] += day_total
+        total_actions += total
+        total_actions_yesterday += day_total
+
+    stats_by_network = {}
+    for network in networks.values():
+        stats_by_network[network['code']] = {
+            'network_name': network['network_name'],
+            'total': network['total'],
+            'yesterday': network['yesterday'],
+            'reach': network['total'] * REACH_MULTIPLIER,
+            'reach_yesterday': network['yesterday'] * REACH_MULTIPLIER,
+            'actions': network['actions']
+        }
+
+    return {
+        'total_actions': total_actions,
+        'total_actions_yesterday': total_actions_yesterday,
+        'reach': total_actions * REACH_MULTIPLIER,
+        'reach_yesterday': total_actions_yesterday * REACH_MULTIPLIER,
+        'by_network': stats_by_network,
+        'by_action': [
+            _action_entry(action, totals[0], totals[1])
+            for action, totals in sorted(by_action.items())
+        ]
+    }
+
+
+def get_platform_stats():
+    """Cached platform stats payload."""
+    stats = cache.get(PLATFORM_STATS_CACHE_KEY)
+    if stats is None:
+        stats = compute_platform_stats()
+        cache.set(PLATFORM_STATS_CACHE_KEY, stats, PLATFORM_STATS_CACHE_TIMEOUT)
+    return stats
@@ -6,19 +6,22 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import transaction
-from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db.models import Q
+from django.core.validators import URLValidator
 from .models import (
     ApiKey, 
     Task, 
     UserProfile, 
-    SocialNetwork
+    SocialNetwork,
+    WebhookSubscription
 )
 from .serializers import TaskSerializer, CrowdTaskSerializer
 from .constants import BONUS_ACTION_COUNTRIES, BONUS_ACTION_RATE
+from .utils.url_normalizer import normalize_url
+from . import api_keys, rate_limit, task_feed, webhooks
+from functools import wraps
 import logging
-import hashlib
 import secrets
 import hmac
 
@@ -27,7 +30,7 @@ logger = logging.getLogger('api')
 
 def _hash_api_key(key: str) -> str:
     """Хеширует API ключ для безопасного хранения"""
-    return hashlib.sha256(key.encode()).hexdigest()
+    return api_keys.hash_api_key(key)
 
 
 def _verify_api_key(key: str, key_hash: str) -> bool:
@@ -52,75 +55,86 @@ def _authenticate_api_key(api_key: str):
         return None
     
     try:
-        # Ищем ключ по хешу
-        key_hash = _hash_api_key(api_key)
-        api_key_obj = ApiKey.objects.select_related('user', 'user__userprofile').get(
-            key_hash=key_hash,
-            is_active=True
-        )
-        
-        # Проверяем, не истек ли срок действия
-        if api_key_obj.is_expired():
-            logger.warning(f"[public_api] API key expired for user {api_key_obj.user.id}")
+        # Ключ берётся из кэша, last_used_at пишется пачкой (см. api/api_keys.py)
+        api_key_obj = api_keys.get_active_key(api_key)
+        if not api_key_obj:
+            logger.warning(f"[public_api] Invalid or expired API key attempted")
             return None
         
-        # Обновляем время последнего использования
-        api_key_obj.last_used_at = timezone.now()
-        api_key_obj.save(update_fields=['last_used_at'])
-        
-        logger.info(f"[public_api] API key authenticated for user {api_key_obj.user.id}")
+        logger.info(f"[public_api] API key authenticated for user {api_key_obj.user_id}")
         return api_key_obj
-    except ApiKey.DoesNotExist:
-        logger.warning(f"[public_api] Invalid API key attempted")
-        return None
     except Exception as e:
         logger.error(f"[public_api] Error authenticating API key: {str(e)}", exc_info=True)
         return None
 
 
-def _normalize_url(raw_url: str) -> str:
-    """Normalize URL for duplicate detection.
-    Rules:
-      - ignore query and fragment
-      - lowercase hostname
-      - drop trailing '/'
-      - treat http/https as the same (ignore scheme)
-      - strip leading 'www.'
-    Returns a comparison key in the form 'host/path'.
+def _rate_limited(view):
+    """
+    Аутентифицирует API ключ (request.api_key_obj), списывает токен из его
+    корзины и добавляет заголовки X-RateLimit-* к ответу; при исчерпании — 429.
+    Запросы без валидного ключа проходят дальше: view сама вернёт 401.
     """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.api_key_obj = _authenticate_api_key(_get_api_key_from_request(request))
+        if not request.api_key_obj:
+            return view(request, *args, **kwargs)
+
+        result = rate_limit.consume(request.api_key_obj)
+        api_keys.record_usage(request.api_key_obj.id, throttled=not result.allowed)
+        if result.allowed:
+            response = view(request, *args, **kwargs)
+        else:
+            logger.warning(f"[public_api] Rate limit exceeded for API key {request.api_key_obj.id}")
+            response = Response(
+                {
+                    'success': False,
+                    'error': f'Rate limit exceeded ({result.limit} requests per minute). Retry in {result.retry_after} seconds.'
+                },
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        for header, value in rate_limit.headers(result).items():
+            response[header] = value
+        return response
+    return wrapper
+
+
+def _format_serializer_errors(serializer_errors):
+    """Ошибки сериализатора одной строкой: 'field: message; ...'"""
+    error_messages = []
+    for field, errors in serializer_errors.items():
+        if isinstance(errors, list):
+            for error in errors:
+                if isinstance(error, dict):
+                    error_messages.append(f"{field}: {', '.join(str(v) for v in error.values())}")
+                else:
+                    error_messages.append(f"{field}: {str(error)}")
+        else:
+            error_messages.append(f"{field}: {str(errors)}")
+    return '; '.join(error_messages) if error_messages else 'Validation error'
+
+
+def _bonus_actions(user_profile, actions_required):
+    """Бонусные (бесплатные) действия для заказчиков из BONUS_ACTION_COUNTRIES"""
+    chosen_country = (user_profile.chosen_country or user_profile.country_code or '').upper()
+    if not chosen_country or chosen_country not in BONUS_ACTION_COUNTRIES:
+        return 0
     try:
-        from urllib.parse import urlsplit
-        parts = urlsplit(raw_url)
-        netloc = parts.netloc.lower()
-        # unify common mobile/bare subdomains
-        for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-            if netloc.startswith(prefix):
-                netloc = netloc[len(prefix):]
-                break
-        # map known domain aliases to a canonical host
-        if netloc in {'youtu.be', 'youtube-nocookie.com'}:
-            netloc = 'youtube.com'
-        path = parts.path.rstrip('/') if parts.path != '/' else ''
-        return f"{netloc}{path}"
+        return int(round(int(actions_required) * BONUS_ACTION_RATE))
     except Exception:
-        safe = (raw_url or '')
-        # remove scheme
-        if '://' in safe:
-            safe = safe.split('://', 1)[1]
-        # strip query/fragment
-        safe = safe.split('#')[0].split('?')[0]
-        safe = safe.rstrip('/')
-        # strip common prefixes
-        for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-            if safe.startswith(prefix):
-                safe = safe[len(prefix):]
-                break
-        # normalize known domain aliases without full parsing
-        safe = safe.lower()
-        host, _, rest = safe.partition('/')
-        if host in {'youtu.be', 'youtube-nocookie.com'}:
-            host = 'youtube.com'
-        return host + (('/' + rest) if rest else '')
+        return 0
+
+
+def _find_active_duplicate(post_url, task_type, social_network):
+    """
+    Возвращает id ACTIVE задания с тем же нормализованным URL, типом и соцсетью (или None).
+    """
+    return Task.objects.filter(
+        status='ACTIVE',
+        type=task_type,
+        social_network=social_network,
+        normalized_post_url=normalize_url(post_url)
+    ).values_list('id', flat=True).first()
 
 
 @api_view(['GET'])
@@ -129,6 +143,8 @@ def list_api_keys(request):
     """
     Возвращает список всех API ключей пользователя.
     Требует аутентификации через JWT токен в заголовке Authorization.
+    Для активного ключа возвращает лимит запросов и дневную статистику
+    использования за usage_days дней (1-90, по умолчанию 7).
     """
     from rest_framework.permissions import IsAuthenticated
     from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -160,6 +176,11 @@ def list_api_keys(request):
             status=status.HTTP_401_UNAUTHORIZED
         )
     
+    try:
+        usage_days = min(max(int(request.GET.get('usage_days', 7)), 1), 90)
+    except ValueError:
+        usage_days = 7
+    
     try:
         # Получаем только активный ключ пользователя (или последний созданный, если активных нет)
         # У пользователя может быть только один активный ключ
@@ -179,7 +200,10 @@ def list_api_keys(request):
                 'is_expired': active_key.is_expired(),
                 'created_at': active_key.created_at,
                 'last_used_at': active_key.last_used_at,
-                'expires_at': active_key.expires_at
+                'expires_at': active_key.expires_at,
+                'rate_limit_per_minute': rate_limit.get_limit(active_key),
+                # Дневные счётчики запросов (пишутся пачками, отставание до минуты)
+                'daily_usage': api_keys.get_daily_usage(active_key.id, days=usage_days)
             })
         
         logger.info(f"[public_api] Listed API key for user {user.id}: {'found' if active_key else 'not found'}")
@@ -298,6 +322,7 @@ def generate_api_key(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@_rate_limited
 def create_task_via_api(request):
     """
     Создает задание через публичный API используя API ключ.
@@ -306,8 +331,7 @@ def create_task_via_api(request):
     logger.info(f"[public_api] create_task_via_api called")
     
     # Аутентифицируем API ключ
-    api_key_str = _get_api_key_from_request(request)
-    api_key_obj = _authenticate_api_key(api_key_str)
+    api_key_obj = request.api_key_obj
     
     if not api_key_obj:
         return Response(
@@ -356,9 +380,6 @@ def create_task_via_api(request):
     task_type = request.data.get('type')
     social_network_code = request.data.get('social_network_code')
     
-    # Нормализуем входящий URL
-    normalized_post_url = _normalize_url(post_url)
-    
     # Получаем социальную сеть для проверки
     try:
         social_network = SocialNetwork.objects.get(code=social_network_code)
@@ -371,20 +392,14 @@ def create_task_via_api(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Ищем активные задания с той же комбинацией URL + TYPE + SOCIAL_NETWORK
-    active_tasks = Task.objects.filter(
-        status='ACTIVE',
-        type=task_type,
-        social_network=social_network
-    ).only('id', 'post_url')
-    
-    for task in active_tasks:
-        if _normalize_url(task.post_url) == normalized_post_url:
-            return Response({
-                'success': False,
-                'error': 'A task with this URL and action type already exists and is being completed by our community',
-                'existing_task_id': task.id
-            }, status=status.HTTP_400_BAD_REQUEST)
+    # Ищем активное задание с той же комбинацией URL + TYPE + SOCIAL_NETWORK (индекс по normalized_post_url)
+    existing_task_id = _find_active_duplicate(post_url, task_type, social_network)
+    if existing_task_id:
+        return Response({
+            'success': False,
+            'error': 'A task with this URL and action type already exists and is being completed by our community',
+            'existing_task_id': existing_task_id
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         with transaction.atomic():
@@ -412,18 +427,7 @@ def create_task_via_api(request):
             serializer = TaskSerializer(data=request.data)
             if not serializer.is_valid():
                 # Форматируем ошибки в читаемую строку
-                error_messages = []
-                for field, errors in serializer.errors.items():
-                    if isinstance(errors, list):
-                        for error in errors:
-                            if isinstance(error, dict):
-                                error_messages.append(f"{field}: {', '.join(str(v) for v in error.values())}")
-                            else:
-                                error_messages.append(f"{field}: {str(error)}")
-                    else:
-                        error_messages.append(f"{field}: {str(errors)}")
-                
-                error_detail = '; '.join(error_messages) if error_messages else 'Validation error'
+                error_detail = _format_serializer_errors(serializer.errors)
                 return Response(
                     {
                         'success': False,
@@ -437,17 +441,7 @@ def create_task_via_api(request):
             user_profile.save(update_fields=['balance'])
             
             # Рассчитываем бонусные действия для выбранных стран
-            chosen_country = (user_profile.chosen_country or user_profile.country_code or '').upper()
-            try:
-                base_actions_required = int(actions_required)
-            except Exception:
-                base_actions_required = actions_required
-            bonus_actions = 0
-            if chosen_country and chosen_country in BONUS_ACTION_COUNTRIES:
-                try:
-                    bonus_actions = int(round(base_actions_required * BONUS_ACTION_RATE))
-                except Exception:
-                    bonus_actions = 0
+            bonus_actions = _bonus_actions(user_profile, actions_required)
             
             # Сохраняем задание с оригинальной ценой и бонусными действиями
             task = serializer.save(
@@ -519,8 +513,172 @@ def create_task_via_api(request):
         )
 
 
+BULK_CREATE_MAX_TASKS = 500
+
+
+def _bulk_error(index, error, **extra):
+    return dict({'index': index, 'success': False, 'error': error}, **extra)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@_rate_limited
+def create_tasks_bulk_via_api(request):
+    """
+    Пакетное создание заданий через публичный API (до BULK_CREATE_MAX_TASKS за запрос).
+    Тело: {"tasks": [{post_url, type, price, actions_required, social_network_code, ...}, ...]}.
+    Все элементы проверяются одним запросом на дубликаты, баланс списывается один раз
+    под одной блокировкой профиля, задания создаются через bulk_create.
+    Ответ содержит результат по каждому элементу (index, success, task_id или error).
+    Crowd-задачи создаются только через create-crowd-task.
+    """
+    api_key_obj = request.api_key_obj
+    
+    if not api_key_obj:
+        return Response(
+            {
+                'success': False,
+                'error': 'Invalid or missing API key. Provide X-API-Key header or api_key parameter.'
+            },
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    
+    user = api_key_obj.user
+    items = request.data.get('tasks')
+    if not isinstance(items, list) or not items:
+        return Response(
+            {'success': False, 'error': 'tasks must be a non-empty array'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(items) > BULK_CREATE_MAX_TASKS:
+        return Response(
+            {'success': False, 'error': f'At most {BULK_CREATE_MAX_TASKS} tasks per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    logger.info(f"[public_api] create_tasks_bulk_via_api called with {len(items)} tasks, user_id={user.id}")
+    
+    # Сети со списками доступных действий — один раз на весь пакет
+    codes = {item.get('social_network_code') for item in items if isinstance(item, dict)}
+    social_networks = {
+        network.code: network
+        for network in SocialNetwork.objects.filter(code__in=codes).prefetch_related('available_actions')
+    }
+    
+    results = [None] * len(items)
+    valid = []  # (index, validated_data)
+    required_fields = ['post_url', 'type', 'price', 'actions_required', 'social_network_code']
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = _bulk_error(index, 'Each task must be an object')
+            continue
+        missing_fields = [field for field in required_fields if field not in item]
+        if missing_fields:
+            results[index] = _bulk_error(index, f'Missing required fields: {", ".join(missing_fields)}')
+            continue
+        if item.get('crowd_tasks_data') or item.get('task_type') == 'CROWD':
+            results[index] = _bulk_error(index, 'Crowd tasks are not supported in bulk, use create-crowd-task')
+            continue
+        serializer = TaskSerializer(data=item, context={'social_networks': social_networks})
+        if not serializer.is_valid():
+            results[index] = _bulk_error(index, _format_serializer_errors(serializer.errors))
+            continue
+        valid.append((index, serializer.validated_data))
+    
+    # Дубликаты: один запрос по индексу normalized_post_url + повторы внутри пакета
+    for _, data in valid:
+        data['normalized_post_url'] = normalize_url(data['post_url'])
+    existing = {
+        (task_type, network_id, normalized): task_id
+        for task_type, network_id, normalized, task_id in Task.objects.filter(
+            status='ACTIVE',
+            normalized_post_url__in={data['normalized_post_url'] for _, data in valid}
+        ).values_list('type', 'social_network_id', 'normalized_post_url', 'id')
+    }
+    unique = []
+    batch_keys = set()
+    for index, data in valid:
+        duplicate_key = (data['type'], data['social_network'].id, data['normalized_post_url'])
+        if duplicate_key in existing:
+            results[index] = _bulk_error(
+                index,
+                'A task with this URL and action type already exists and is being completed by our community',
+                existing_task_id=existing[duplicate_key]
+            )
+        elif duplicate_key in batch_keys:
+            results[index] = _bulk_error(index, 'Duplicate of another task in this request')
+        else:
+            batch_keys.add(duplicate_key)
+            unique.append((index, data))
+    
+    created = []
+    try:
+        with transaction.atomic():
+            user_profile = UserProfile.objects.select_for_update().get(user=user)
+            balance = user_profile.balance
+            available_tasks = user_profile.available_tasks
+            tasks = []
+            for index, data in unique:
+                if available_tasks <= 0:
+                    results[index] = _bulk_error(index, 'No available tasks left. Please purchase more tasks.')
+                    continue
+                discounted_cost, original_cost = user_profile.calculate_task_cost(data['price'], data['actions_required'])
+                if discounted_cost > balance:
+                    results[index] = _bulk_error(index, 'Insufficient balance to create task', required_balance=discounted_cost)
+                    continue
+                balance -= discounted_cost
+                available_tasks -= 1
+                fields = {key: value for key, value in data.items() if key not in ('social_network_code', 'crowd_tasks_data')}
+                tasks.append((index, Task(
+                    **fields,
+                    creator=user,
+                    original_price=original_cost,
+                    status='ACTIVE',
+                    bonus_actions=_bonus_actions(user_profile, data['actions_required']),
+                    bonus_actions_completed=0
+                )))
+            
+            if tasks:
+                # Списываем баланс и лимит заданий один раз на весь пакет
+                user_profile.balance = balance
+                user_profile.available_tasks = available_tasks
+                user_profile.save(update_fields=['balance', 'available_tasks'])
+                
+                created = Task.objects.bulk_create([task for _, task in tasks])
+                # bulk_create не вызывает post_save: записи ленты добавляем сами
+                task_feed.add_tasks(created, user_profile.status)
+                for (index, _), task in zip(tasks, created):
+                    results[index] = {'index': index, 'success': True, 'task_id': task.id}
+    except UserProfile.DoesNotExist:
+        logger.error(f"[public_api] UserProfile not found for user {user.id}")
+        return Response(
+            {'success': False, 'error': 'User profile not found'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    except Exception as e:
+        logger.error(f"[public_api] Error creating tasks in bulk via API: {str(e)}", exc_info=True)
+        return Response(
+            {'success': False, 'error': 'Internal server error'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    
+    logger.info(f"[public_api] Bulk created {len(created)} of {len(items)} tasks via API, user_id={user.id}")
+    return Response(
+        {
+            'success': bool(created),
+            'created': len(created),
+            'failed': len(items) - len(created),
+            'results': results,
+            'balance': user_profile.balance,
+            'available_tasks': user_profile.available_tasks
+        },
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+    )
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@_rate_limited
 def create_crowd_task_via_api(request):
     """
     Создает crowd-задачу через публичный API по API-ключу.
@@ -529,8 +687,7 @@ def create_crowd_task_via_api(request):
     """
     logger.info("[public_api] create_crowd_task_via_api called")
 
-    api_key_str = _get_api_key_from_request(request)
-    api_key_obj = _authenticate_api_key(api_key_str)
+    api_key_obj = request.api_key_obj
 
     if not api_key_obj:
         return Response(
@@ -650,20 +807,13 @@ def create_crowd_task_via_api(request):
         actions_required = len(crowd_tasks_data)
 
     # Проверяем дубликаты по URL + action + social_network
-    normalized_post_url = _normalize_url(post_url)
-    active_tasks = Task.objects.filter(
-        status='ACTIVE',
-        type=action_type,
-        social_network=social_network
-    ).only('id', 'post_url')
-
-    for task in active_tasks:
-        if _normalize_url(task.post_url) == normalized_post_url:
-            return Response({
-                'success': False,
-                'error': 'A task with this URL and action type already exists and is being completed by our community',
-                'existing_task_id': task.id
-            }, status=status.HTTP_400_BAD_REQUEST)
+    existing_task_id = _find_active_duplicate(post_url, action_type, social_network)
+    if existing_task_id:
+        return Response({
+            'success': False,
+            'error': 'A task with this URL and action type already exists and is being completed by our community',
+            'existing_task_id': existing_task_id
+        }, status=status.HTTP_400_BAD_REQUEST)
 
     try:
         with transaction.atomic():
@@ -696,18 +846,7 @@ def create_crowd_task_via_api(request):
 
             serializer = TaskSerializer(data=payload)
             if not serializer.is_valid():
-                error_messages = []
-                for field, errors in serializer.errors.items():
-                    if isinstance(errors, list):
-                        for error in errors:
-                            if isinstance(error, dict):
-                                error_messages.append(f"{field}: {', '.join(str(v) for v in error.values())}")
-                            else:
-                                error_messages.append(f"{field}: {str(error)}")
-                    else:
-                        error_messages.append(f"{field}: {str(errors)}")
-
-                error_detail = '; '.join(error_messages) if error_messages else 'Validation error'
+                error_detail = _format_serializer_errors(serializer.errors)
                 return Response(
                     {
                         'success': False,
@@ -794,6 +933,7 @@ def create_crowd_task_via_api(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@_rate_limited
 def get_task_status(request, task_id=None):
     """
     Возвращает статус задания по его ID.
@@ -803,8 +943,7 @@ def get_task_status(request, task_id=None):
     logger.info(f"[public_api] get_task_status called, task_id={task_id}")
     
     # Аутентифицируем API ключ
-    api_key_str = _get_api_key_from_request(request)
-    api_key_obj = _authenticate_api_key(api_key_str)
+    api_key_obj = request.api_key_obj
     
     if not api_key_obj:
         return Response(
@@ -905,3 +1044,119 @@ def get_task_status(request, task_id=None):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+
+MAX_WEBHOOKS_PER_KEY = 5
+
+_INVALID_API_KEY_RESPONSE = {
+    'success': False,
+    'error': 'Invalid or missing API key. Provide X-API-Key header or api_key parameter.'
+}
+
+
+def _webhook_data(subscription):
+    return {
+        'id': subscription.id,
+        'url': subscription.url,
+        'is_active': subscription.is_active,
+        'created_at': subscription.created_at,
+        'last_success_at': subscription.last_success_at,
+        'last_error': subscription.last_error,
+    }
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+@_rate_limited
+def webhooks_view(request):
+    """
+    GET — список вебхуков API ключа, POST {url} — регистрация нового.
+    На URL приходят изменения статусов заданий владельца ключа (см. api/webhooks.py);
+    secret для проверки подписи X-Webhook-Signature возвращается только при создании.
+    """
+    api_key_obj = request.api_key_obj
+    if not api_key_obj:
+        return Response(_INVALID_API_KEY_RESPONSE, status=status.HTTP_401_UNAUTHORIZED)
+
+    if request.method == 'GET':
+        subscriptions = WebhookSubscription.objects.filter(api_key=api_key_obj).order_by('id')
+        return Response({
+            'success': True,
+            'webhooks': [_webhook_data(subscription) for subscription in subscriptions]
+        }, status=status.HTTP_200_OK)
+
+    url = (request.data.get('url') or '').strip()
+    try:
+        URLValidator(schemes=['https'])(url)
+    except ValidationError:
+        return Response(
+            {
+                'success': False,
+                'error': 'A valid https url is required'
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        # Запросы к вебхукам идут из нашей сети: внутренние адреса запрещены
+        webhooks.check_url(url)
+    except ValueError as e:
+        return Response(
+            {
+                'success': False,
+                'error': str(e)
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    subscriptions = WebhookSubscription.objects.filter(api_key=api_key_obj)
+    if subscriptions.filter(url=url).exists():
+        return Response(
+            {
+                'success': False,
+                'error': 'Webhook with this url already exists'
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if subscriptions.count() >= MAX_WEBHOOKS_PER_KEY:
+        return Response(
+            {
+                'success': False,
+                'error': f'Maximum {MAX_WEBHOOKS_PER_KEY} webhooks per API key'
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    subscription = WebhookSubscription.objects.create(
+        api_key=api_key_obj,
+        url=url,
+        secret=secrets.token_hex(32),
+    )
+    logger.info(f"[public_api] Webhook {subscription.id} registered for API key {api_key_obj.id}")
+
+    return Response({
+        'success': True,
+        'webhook': {**_webhook_data(subscription), 'secret': subscription.secret},
+        'warning': 'Store the secret securely. It will not be shown again.'
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['DELETE'])
+@permission_classes([AllowAny])
+@_rate_limited
+def delete_webhook(request, webhook_id):
+    """Удаляет вебхук API ключа вместе с очередью его доставок."""
+    api_key_obj = request.api_key_obj
+    if not api_key_obj:
+        return Response(_INVALID_API_KEY_RESPONSE, status=status.HTTP_401_UNAUTHORIZED)
+
+    deleted, _ = WebhookSubscription.objects.filter(id=webhook_id, api_key=api_key_obj).delete()
+    if not deleted:
+        return Response(
+            {
+                'success': False,
+                'error': 'Webhook not found'
+            },
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    logger.info(f"[public_api] Webhook {webhook_id} deleted for API key {api_key_obj.id}")
+    return Response({'success': True}, status=status.HTTP_200_OK)
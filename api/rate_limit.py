@@ -0,0 +1,165 @@
+"""
+Token-bucket rate limiting of the public API per ApiKey.
+
+Every key has a bucket of `limit` tokens refilled at `limit` tokens per
+minute (ApiKey.rate_limit_per_minute, default PUBLIC_API_RATE_LIMIT_PER_MINUTE);
+a request takes one token or is rejected with 429.
+
+Buckets live in the shared cache when it is Redis (one Lua script per
+request, atomic across workers). With another shared backend (DatabaseCache
+when REDIS_URL is unset) the limit is a fixed one-minute window counter in
+that cache instead: it costs a cache write per request and its incr is not
+atomic, so concurrent requests may slightly undercount, but the limit holds
+across workers. Only without a 'shared' cache alias at all (tests) does each
+process keep its own buckets in memory, with a warning.
+"""
+from collections import namedtuple
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger('api')
+
+BUCKET_KEY_PREFIX = 'api_rate'
+DEFAULT_LIMIT_PER_MINUTE = 60
+
+WINDOW_SECONDS = 60
+
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'limit', 'remaining', 'reset', 'retry_after'])
+
+# KEYS[1] — ключ корзины; ARGV: ёмкость, пополнение в секунду, текущее время
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+def _bucket_state(allowed, tokens, capacity, rate):
+    """(allowed, remaining, reset, retry_after) of a token bucket holding `tokens`."""
+    return (
+        allowed,
+        int(tokens),
+        math.ceil((capacity - tokens) / rate),
+        0 if allowed else math.ceil((1 - tokens) / rate),
+    )
+
+
+class LocalBuckets:
+    """In-process stand-in for the shared buckets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+        return _bucket_state(allowed, tokens, capacity, rate)
+
+    def clear(self):
+        with self._lock:
+            self._buckets = {}
+
+
+class RedisBuckets:
+    def __init__(self, cache):
+        self.cache = cache
+
+    def take(self, key, capacity, rate, now):
+        redis_key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(redis_key, write=True)
+        allowed, tokens = client.eval(TOKEN_BUCKET_SCRIPT, 1, redis_key, capacity, rate, now)
+        return _bucket_state(bool(allowed), float(tokens), capacity, rate)
+
+
+class WindowCounters:
+    """Fixed-window request counters in a non-Redis shared cache."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def take(self, key, capacity, rate, now):
+        window = int(now // WINDOW_SECONDS)
+        window_key = f"{key}:{window}"
+        try:
+            count = self.cache.incr(window_key)
+        except ValueError:
+            if self.cache.add(window_key, 1, timeout=WINDOW_SECONDS * 2):
+                count = 1
+            else:
+                count = self.cache.incr(window_key)
+        allowed = count <= capacity
+        reset = math.ceil((window + 1) * WINDOW_SECONDS - now)
+        return allowed, max(0, capacity - count), reset, 0 if allowed else reset
+
+
+local_buckets = LocalBuckets()
+_warned_local = False
+
+
+def _buckets():
+    global _warned_local
+    if 'shared' in settings.CACHES:
+        shared = caches['shared']
+        if isinstance(shared, RedisCache):
+            return RedisBuckets(shared)
+        return WindowCounters(shared)
+    if not _warned_local:
+        _warned_local = True
+        logger.warning("[rate_limit] No 'shared' cache configured: public API limits are per process")
+    return local_buckets
+
+
+def get_limit(api_key_obj):
+    return api_key_obj.rate_limit_per_minute or getattr(
+        settings, 'PUBLIC_API_RATE_LIMIT_PER_MINUTE', DEFAULT_LIMIT_PER_MINUTE
+    )
+
+
+def consume(api_key_obj):
+    """Takes one token from the key's bucket. Returns RateLimitResult."""
+    limit = get_limit(api_key_obj)
+    rate = limit / 60
+    try:
+        allowed, remaining, reset, retry_after = _buckets().take(
+            f"{BUCKET_KEY_PREFIX}:{api_key_obj.id}", limit, rate, time.time()
+        )
+    except Exception as e:
+        # Лимитер не должен ронять API
+        logger.error(f"[rate_limit] Error consuming token for key {api_key_obj.id}: {str(e)}")
+        return RateLimitResult(True, limit, limit, 0, 0)
+    return RateLimitResult(allowed, limit, remaining, reset, retry_after)
+
+
+def headers(result):
+    values = {
+        'X-RateLimit-Limit': str(result.limit),
+        'X-RateLimit-Remaining': str(result.remaining),
+        'X-RateLimit-Reset': str(result.reset),
+    }
+    if not result.allowed:
+        values['Retry-After'] = str(result.retry_after)
+    return values
@@ -3,9 +3,10 @@ from .models import UserProfile, Task, TaskCompletion, InviteCode, SocialNetwork
 from django.utils import timezone
 import logging
 from django.utils.dateparse import parse_datetime
-from django.db.models import Exists, OuterRef, Sum
-from django.db import connection
+from django.db.models import Exists, OuterRef, Sum, Count, F, Window
+from django.db.models.functions import RowNumber
 from django.db import transaction
+from . import leaderboard, task_feed
 
 logger = logging.getLogger(__name__)
 
@@ -57,19 +58,33 @@ class TaskCompletionSerializer(serializers.ModelSerializer):
             'metadata'
         ]
 
+    def _get_social_profile(self, obj):
+        """
+        Профиль пользователя в соц. сети задания.
+        В списке заданий берётся из карты, собранной TaskListSerializer одним запросом.
+        """
+        network_id = obj.task.social_network_id
+        profiles = self.context.get('completion_social_profiles')
+        if profiles is not None:
+            return profiles.get((obj.user_id, network_id))
+        prefetched = getattr(obj.user, 'user_social_profiles', None)
+        if prefetched is not None:
+            return next((p for p in prefetched if p.social_network_id == network_id), None)
+        return obj.user.social_profiles.filter(social_network_id=network_id).first()
+
     def get_username(self, obj):
         try:
-            social_profile = obj.user.social_profiles.filter(social_network=obj.task.social_network).first()
+            social_profile = self._get_social_profile(obj)
             if social_profile:
                 return social_profile.username
             return obj.user.username
         except Exception as e:
-            print(f"Error getting username: {str(e)}")
+            logger.error(f"Error getting username: {str(e)}")
             return obj.user.username
 
     def get_social_data(self, obj):
         try:
-            social_profile = obj.user.social_profiles.filter(social_network=obj.task.social_network).first()
+            social_profile = self._get_social_profile(obj)
             # Получаем firebase-аватарку пользователя (если есть)
             firebase_avatar = None
             if hasattr(obj.user, 'avatar_url') and obj.user.avatar_url:
@@ -89,11 +104,64 @@ class TaskCompletionSerializer(serializers.ModelSerializer):
                 'profile_url': None
             }
         except Exception as e:
-            print(f"Error getting social data: {str(e)}")
+            logger.error(f"Error getting social data: {str(e)}")
             return None
 
+
+class TaskListSerializer(serializers.ListSerializer):
+    """
+    Сериализация страницы заданий без N+1: перед обходом заданий одним запросом
+    собирает профили соц. сетей исполнителей и одним запросом — отзывы текущего
+    пользователя, дальше поля берут данные из словарей в context.
+    """
+
+    def to_representation(self, data):
+        tasks = list(data.all() if hasattr(data, 'all') else data)
+        self._preload(tasks)
+        return super().to_representation(tasks)
+
+    def _preload(self, tasks):
+        context = self.context
+        if 'completion_social_profiles' not in context:
+            completions = [completion for task in tasks for completion in task.completions.all()]
+            context['completion_social_profiles'] = self._load_social_profiles(completions)
+        if 'reviews_by_task' not in context:
+            context['reviews_by_task'] = self._load_reviews(tasks)
+
+    def _load_social_profiles(self, completions):
+        profiles = {}
+        user_ids = set()
+        network_ids = set()
+        for completion in completions:
+            prefetched = getattr(completion.user, 'user_social_profiles', None)
+            if prefetched is not None:
+                for profile in prefetched:
+                    profiles.setdefault((profile.user_id, profile.social_network_id), profile)
+            else:
+                user_ids.add(completion.user_id)
+                network_ids.add(completion.task.social_network_id)
+        if user_ids:
+            missing = UserSocialProfile.objects.filter(
+                user_id__in=user_ids,
+                social_network_id__in=network_ids
+            ).order_by('pk')
+            for profile in missing:
+                profiles.setdefault((profile.user_id, profile.social_network_id), profile)
+        return profiles
+
+    def _load_reviews(self, tasks):
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if not user or not user.is_authenticated or not tasks:
+            return {}
+        reviews = {}
+        for review in Review.objects.filter(user=user, task_id__in=[t.id for t in tasks]).order_by('pk'):
+            reviews.setdefault(review.task_id, review)
+        return reviews
+
+
 class TaskSerializer(serializers.ModelSerializer):
-    creator_id = serializers.IntegerField(source='creator.id', read_only=True)
+    creator_id = serializers.IntegerField(read_only=True)
     completions = TaskCompletionSerializer(many=True, read_only=True)
     crowd_tasks = CrowdTaskSerializer(many=True, read_only=True)
     social_network = SocialNetworkSerializer(read_only=True)
@@ -111,6 +179,7 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
+        list_serializer_class = TaskListSerializer
         fields = '__all__'  # чтобы is_pinned точно был в выдаче
         read_only_fields = [
             'id', 
@@ -240,12 +309,20 @@ class TaskSerializer(serializers.ModelSerializer):
         elif actions_required == 0:
             raise serializers.ValidationError("Actions required must be greater than 0 for Engagement tasks or tasks without crowd tasks")
 
-        try:
-            social_network = SocialNetwork.objects.get(code=social_network_code)
-            # Добавляем social_network в data для создания Task
+        # Пакетное создание передаёт сети заранее: {code: SocialNetwork с prefetch available_actions}
+        social_networks = self.context.get('social_networks')
+        if social_networks is not None:
+            social_network = social_networks.get(social_network_code)
+            if social_network is None:
+                raise serializers.ValidationError(f"Social network with code {social_network_code} not found")
             data['social_network'] = social_network
-        except SocialNetwork.DoesNotExist:
-            raise serializers.ValidationError(f"Social network with code {social_network_code} not found")
+        else:
+            try:
+                social_network = SocialNetwork.objects.get(code=social_network_code)
+                # Добавляем social_network в data для создания Task
+                data['social_network'] = social_network
+            except SocialNetwork.DoesNotExist:
+                raise serializers.ValidationError(f"Social network with code {social_network_code} not found")
 
         if not task_type:
             raise serializers.ValidationError("Task type is required")
@@ -253,7 +330,11 @@ class TaskSerializer(serializers.ModelSerializer):
         if not post_url:
             raise serializers.ValidationError("Post URL is required")
 
-        if not social_network.available_actions.filter(code=task_type).exists():
+        if social_networks is not None:
+            action_available = any(action.code == task_type for action in social_network.available_actions.all())
+        else:
+            action_available = social_network.available_actions.filter(code=task_type).exists()
+        if not action_available:
             raise serializers.ValidationError(f"Action type {task_type} is not available for {social_network.name}")
 
         # Проверка URL в зависимости от социальной сети
@@ -300,22 +381,132 @@ class TaskSerializer(serializers.ModelSerializer):
 
         return data
 
-    def get_my_review(self, obj):
+    def _get_my_review(self, obj):
+        reviews = self.context.get('reviews_by_task')
+        if reviews is not None:
+            return reviews.get(obj.id)
         user = self.context.get('request').user if self.context.get('request') else None
         if not user or not user.is_authenticated:
             return None
-        from .models import Review
-        review = Review.objects.filter(user=user, task=obj).first()
+        return Review.objects.filter(user=user, task=obj).first()
+
+    def get_my_review(self, obj):
+        review = self._get_my_review(obj)
         if review:
             return ReviewSerializer(review).data
         return None
 
     def get_has_review(self, obj):
-        user = self.context.get('request').user if self.context.get('request') else None
-        if not user or not user.is_authenticated:
-            return False
-        from .models import Review
-        return Review.objects.filter(user=user, task=obj).exists()
+        return self._get_my_review(obj) is not None
+
+class TaskCompletionPreviewSerializer(TaskCompletionSerializer):
+    """Исполнитель в компактной ленте: только имя и аватарка"""
+
+    class Meta(TaskCompletionSerializer.Meta):
+        fields = ['user_id', 'username', 'social_data', 'created_at']
+
+
+class TaskFeedListSerializer(TaskListSerializer):
+    """
+    Компактная лента: вместо всех выполнений задания грузит одним запросом
+    их количество и одним запросом (оконная функция) последние
+    RECENT_COMPLETIONS_LIMIT выполнений на задание.
+    """
+
+    def _preload(self, tasks):
+        context = self.context
+        task_ids = [task.id for task in tasks]
+        tasks_by_id = {task.id: task for task in tasks}
+
+        counts = dict(
+            TaskCompletion.objects.filter(task_id__in=task_ids)
+            .values('task_id').annotate(count=Count('id')).values_list('task_id', 'count')
+        ) if task_ids else {}
+
+        recent = {}
+        if task_ids:
+            latest = TaskCompletion.objects.filter(task_id__in=task_ids).select_related('user').annotate(
+                position=Window(
+                    expression=RowNumber(),
+                    partition_by=[F('task_id')],
+                    order_by=[F('created_at').desc(), F('id').desc()],
+                )
+            ).filter(position__lte=TaskFeedSerializer.RECENT_COMPLETIONS_LIMIT).order_by('task_id', 'position')
+            for completion in latest:
+                completion.task = tasks_by_id[completion.task_id]
+                recent.setdefault(completion.task_id, []).append(completion)
+
+        context['completions_count_by_task'] = counts
+        context['recent_completions_by_task'] = recent
+        if 'completion_social_profiles' not in context:
+            context['completion_social_profiles'] = self._load_social_profiles(
+                [completion for completions in recent.values() for completion in completions]
+            )
+        if 'reviews_by_task' not in context:
+            context['reviews_by_task'] = self._load_reviews(tasks)
+
+
+class TaskFeedSerializer(TaskSerializer):
+    """
+    Компактное представление задания для ленты исполнителя (?mode=compact):
+    без полного списка completions — только их количество, последние исполнители
+    и оставшиеся действия. Полный список: GET /api/tasks/<id>/completions/.
+    """
+    RECENT_COMPLETIONS_LIMIT = 5
+
+    completions_count = serializers.SerializerMethodField()
+    recent_completions = serializers.SerializerMethodField()
+    remaining_actions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Task
+        list_serializer_class = TaskFeedListSerializer
+        fields = [
+            'id',
+            'creator_id',
+            'social_network',
+            'type',
+            'task_type',
+            'post_url',
+            'price',
+            'actions_required',
+            'actions_completed',
+            'remaining_actions',
+            'bonus_actions',
+            'bonus_actions_completed',
+            'status',
+            'created_at',
+            'target_user_id',
+            'is_pinned',
+            'longview',
+            'meaningful_comment',
+            'meaningful_comments',
+            'crowd_tasks',
+            'completions_count',
+            'recent_completions',
+            'my_review',
+            'has_review',
+        ]
+
+    def get_completions_count(self, obj):
+        counts = self.context.get('completions_count_by_task')
+        if counts is not None:
+            return counts.get(obj.id, 0)
+        return obj.completions.count()
+
+    def get_recent_completions(self, obj):
+        recent = self.context.get('recent_completions_by_task')
+        if recent is not None:
+            completions = recent.get(obj.id, [])
+        else:
+            completions = obj.completions.select_related('user', 'task').order_by(
+                '-created_at', '-id'
+            )[:self.RECENT_COMPLETIONS_LIMIT]
+        return TaskCompletionPreviewSerializer(completions, many=True, context=self.context).data
+
+    def get_remaining_actions(self, obj):
+        return max((obj.actions_required or 0) - (obj.actions_completed or 0), 0)
+
 
 class UserProfileSerializer(serializers.ModelSerializer):
     daily_task_limit = serializers.SerializerMethodField()
@@ -349,56 +540,19 @@ class UserProfileSerializer(serializers.ModelSerializer):
     def get_daily_task_limit(self, obj):
         return obj.get_daily_task_limit()
 
+    def _user_counters(self, obj):
+        # Оба поля берутся из одних счётчиков — считаем их один раз на сериализацию
+        counters = self.context.setdefault('user_counters', {})
+        if obj.user_id not in counters:
+            counters[obj.user_id] = task_feed.get_user_counters(obj.user)
+        return counters[obj.user_id]
+
     def get_available_tasks_for_completion(self, obj):
-        """Возвращает количество доступных для выполнения заданий с учетом всех фильтров"""
-        # Используем тот же SQL запрос, что и в TaskViewSet
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                WITH CompletedCombinations AS (
-                    SELECT DISTINCT t.post_url, t.type, t.social_network_id
-                    FROM api_taskcompletion tc
-                    JOIN api_task t ON tc.task_id = t.id
-                    WHERE tc.user_id = %s
-                ),
-                RankedTasks AS (
-                    SELECT 
-                        t.id,
-                        ROW_NUMBER() OVER (
-                            PARTITION BY t.post_url, t.type, t.social_network_id
-                            ORDER BY t.price DESC, t.created_at DESC
-                        ) as rn
-                    FROM api_task t
-                    WHERE t.status = 'ACTIVE' 
-                    AND t.creator_id != %s
-                    AND NOT EXISTS (
-                        SELECT 1 
-                        FROM CompletedCombinations cc
-                        WHERE cc.post_url = t.post_url 
-                        AND cc.type = t.type
-                        AND cc.social_network_id = t.social_network_id
-                    )
-                    AND NOT EXISTS (
-                        SELECT 1 
-                        FROM api_taskreport tr
-                        WHERE tr.task_id = t.id 
-                        AND tr.user_id = %s
-                    )
-                )
-                SELECT COUNT(*) FROM RankedTasks WHERE rn = 1
-            """, [obj.user.id, obj.user.id, obj.user.id])
-            
-            count = cursor.fetchone()[0]
-            
-            logger.info(f"""
-                [get_available_tasks_for_completion] Counting available tasks for user {obj.user.id}:
-                - Total count: {count}
-                - SQL params: user_id={obj.user.id}
-            """)
-            
-        return count
+        """Возвращает количество доступных для выполнения заданий с учетом всех фильтров (как в ленте)"""
+        return self._user_counters(obj)['available_tasks']
 
     def get_potential_earnings(self, obj):
-        return obj.get_potential_earnings()
+        return self._user_counters(obj)['potential_earnings']
 
     def get_active_invite_code(self, obj):
         invite = InviteCode.objects.filter(
@@ -427,43 +581,12 @@ class UserProfileSerializer(serializers.ModelSerializer):
         Возвращает место пользователя в комьюнити на основе количества выполненных заданий.
         Чем больше заданий выполнено, тем выше место (меньше число).
         Место 1 = самый активный пользователь.
+        Считается по гистограмме из api/leaderboard.py, без COUNT(*) по UserProfile.
         """
         try:
-            from django.db.models import Count, Q
-            
-            # Получаем количество выполненных заданий текущего пользователя
-            current_user_tasks_count = obj.completed_tasks_count or 0
-            
-            print(f"[get_community_rank] Calculating rank for user {obj.user.id}")
-            print(f"[get_community_rank] User's completed tasks count: {current_user_tasks_count}")
-            
-            # Подсчитываем количество пользователей, у которых больше выполненных заданий
-            users_with_more_tasks = UserProfile.objects.filter(
-                completed_tasks_count__gt=current_user_tasks_count
-            ).count()
-            
-            print(f"[get_community_rank] Users with more tasks: {users_with_more_tasks}")
-            
-            # Место пользователя = количество пользователей выше него + 1
-            rank = users_with_more_tasks + 1
-            
-            # Дополнительно: подсчитываем общее количество активных пользователей
-            total_users = UserProfile.objects.filter(
-                completed_tasks_count__gt=0
-            ).count()
-            
-            print(f"[get_community_rank] User rank: {rank} out of {total_users} active users")
-            
-            return {
-                'rank': rank,
-                'total_users': total_users,
-                'completed_tasks': current_user_tasks_count
-            }
-            
+            return leaderboard.get_rank(obj.completed_tasks_count or 0)
         except Exception as e:
-            print(f"[get_community_rank] Error calculating rank: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"[get_community_rank] Error calculating rank for user {obj.user_id}: {str(e)}", exc_info=True)
             return {
                 'rank': None,
                 'total_users': None,
@@ -1151,6 +1274,8 @@ class MedianSpeedResponseSerializer(serializers.Serializer):
     action = serializers.CharField(help_text='Action type code')
     actions_count = serializers.IntegerField(help_text='Number of actions required')
     median_speed_minutes = serializers.FloatField(help_text='Median completion speed in minutes')
+    p90_speed_minutes = serializers.FloatField(allow_null=True, help_text='90th percentile of completion speed in minutes')
+    stats_date = serializers.DateField(allow_null=True, help_text='Day of completed tasks the speeds are computed from')
     cached_at = serializers.DateTimeField(help_text='When the result was cached')
     cache_expires_in = serializers.CharField(help_text='Cache expiration time')
 
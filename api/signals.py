@@ -1,21 +1,43 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from django.core.cache import cache
-from .models import BuyLanding, ActionLanding
+from django.db import transaction
+from django.contrib.auth.models import User
+from .models import BuyLanding, ActionLanding, Task, UserProfile, TaskCompletion, TaskReport, ApiKey, SocialNetwork
+from . import task_feed, platform_stats, landing_cache, earnings, firebase_tokens, api_keys, webhooks
 import logging
 
 logger = logging.getLogger('api')
 
 
+@receiver(pre_save, sender=BuyLanding)
+@receiver(pre_save, sender=ActionLanding)
+def remember_landing_cache_tags(sender, instance, **kwargs):
+    """
+    Remember slug / social network before save: entries cached under the old
+    values must be invalidated too
+    """
+    instance._cache_old_slug = None
+    instance._cache_old_network_code = None
+    if not instance.pk:
+        return
+    try:
+        old = sender.objects.filter(pk=instance.pk).values('slug', 'social_network__code').first()
+        if old:
+            instance._cache_old_slug = old['slug']
+            instance._cache_old_network_code = old['social_network__code']
+    except Exception as e:
+        logger.error(f"Error reading previous {sender.__name__} state: {str(e)}")
+
+
 @receiver([post_save, post_delete], sender=BuyLanding)
 def clear_buy_landing_cache_on_change(sender, instance, **kwargs):
     """
-    Automatically clear cache when BuyLanding is saved or deleted
+    Invalidate BuyLanding list/detail caches (generation bump) when a landing is saved or deleted
     """
     try:
-        cache.delete('buy_landings_list')
-        cache.delete('buy_landings_all')
-        cache.delete(f'buy_landing_{instance.slug}')
+        landing_cache.invalidate_buy_landing(
+            slugs=[instance.slug, getattr(instance, '_cache_old_slug', None)]
+        )
     except Exception as e:
         logger.error(f"Error clearing BuyLanding cache: {str(e)}")
 
@@ -23,19 +45,175 @@ def clear_buy_landing_cache_on_change(sender, instance, **kwargs):
 @receiver([post_save, post_delete], sender=ActionLanding)
 def clear_action_landing_cache_on_change(sender, instance, **kwargs):
     """
-    Automatically clear cache when ActionLanding is saved or deleted
+    Invalidate ActionLanding list/detail/by-path caches (generation bump) when a landing is saved or deleted
     """
     try:
-        cache.delete('action_landings_list_all_all')
-        cache.delete(f'action_landing_{instance.slug}')
-        cache.delete(f'action_landing_by_path_{instance.slug}')
-        
-        if instance.social_network and instance.action:
-            social_code = instance.social_network.code.lower()
-            action_code = instance.action.upper()
-            path_key = f'{social_code}/{action_code.lower()}'
-            cache.delete(f'action_landing_by_path_{path_key}')
-            cache.delete(f'action_landings_list_{social_code}_{action_code}')
-        
+        landing_cache.invalidate_action_landing(
+            slugs=[instance.slug, getattr(instance, '_cache_old_slug', None)],
+            network_codes=[
+                instance.social_network.code if instance.social_network_id else None,
+                getattr(instance, '_cache_old_network_code', None),
+            ]
+        )
     except Exception as e:
         logger.error(f"Error clearing ActionLanding cache: {str(e)}")
+
+
+@receiver([post_save, post_delete], sender=SocialNetwork)
+def clear_social_network_codes_on_change(sender, instance, **kwargs):
+    """
+    Landing views validate network codes against the cached code list
+    """
+    try:
+        landing_cache.invalidate_social_network_codes()
+    except Exception as e:
+        logger.error(f"Error clearing social network codes cache: {str(e)}")
+
+
+@receiver(m2m_changed, sender=BuyLanding.reviews.through)
+@receiver(m2m_changed, sender=ActionLanding.reviews.through)
+def clear_landing_cache_on_reviews_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """
+    Reviews are embedded in landing responses: invalidate when the M2M changes
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # review.action_landings.add(...): instance — Review, model — модель лендинга
+        landings = model.objects.select_related('social_network')
+        if pk_set is not None:
+            landings = landings.filter(pk__in=pk_set)
+    else:
+        landings = [instance]
+    for landing in landings:
+        if isinstance(landing, ActionLanding):
+            clear_action_landing_cache_on_change(ActionLanding, landing)
+        else:
+            clear_buy_landing_cache_on_change(BuyLanding, landing)
+
+
+@receiver(post_save, sender=Task)
+def sync_task_feed_on_task_save(sender, instance, **kwargs):
+    """
+    Keep the precomputed performer feed entry in sync with the task
+    """
+    try:
+        task_feed.sync_task(instance)
+    except Exception as e:
+        logger.error(f"Error syncing task feed entry for task {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=Task)
+def enqueue_task_status_webhooks(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Queue webhook deliveries when a loaded task changes status
+    (close/delete commands, admin, owner); complete_task enqueues itself
+    """
+    if created or (update_fields is not None and 'status' not in update_fields):
+        return
+    if getattr(instance, '_loaded_status', instance.status) == instance.status:
+        return
+    try:
+        webhooks.enqueue_task_status([instance])
+    except Exception as e:
+        logger.error(f"Error enqueuing status webhooks for task {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=UserProfile)
+def sync_task_feed_on_status_change(sender, instance, **kwargs):
+    """
+    Re-rank creator's feed entries when subscription status changes
+    """
+    if not getattr(instance, '_status_changed', False):
+        return
+    try:
+        task_feed.update_creator_priority(instance.user_id, instance.status)
+    except Exception as e:
+        logger.error(f"Error updating feed priority for user {instance.user_id}: {str(e)}")
+    finally:
+        instance._status_changed = False
+
+
+@receiver(post_save, sender=TaskCompletion)
+def record_completion_in_daily_stats(sender, instance, created, **kwargs):
+    """
+    Increment DailyCompletionStat rollup for platform stats after commit:
+    the rollup rows are shared by all completions of the day and must not be
+    locked until complete_task's transaction ends
+    """
+    if not created:
+        return
+
+    def _record():
+        try:
+            platform_stats.record_completion(instance)
+        except Exception as e:
+            logger.error(f"Error recording completion {instance.pk} in daily stats: {str(e)}")
+
+    transaction.on_commit(_record)
+
+
+@receiver(post_save, sender=TaskCompletion)
+def record_completion_in_daily_earnings(sender, instance, created, **kwargs):
+    """
+    Increment the user's DailyEarningStat rollup for task_completion_stats
+    after commit, outside complete_task's transaction
+    """
+    if not created:
+        return
+
+    def _record():
+        try:
+            earnings.record_completion(instance)
+        except Exception as e:
+            logger.error(f"Error recording completion {instance.pk} in daily earnings: {str(e)}")
+
+    transaction.on_commit(_record)
+
+
+@receiver(post_delete, sender=Task)
+def invalidate_feed_counters_on_task_delete(sender, instance, **kwargs):
+    """
+    The feed entry is deleted with the task (CASCADE): users' counters are stale
+    """
+    try:
+        transaction.on_commit(task_feed.invalidate_active_tasks)
+    except Exception as e:
+        logger.error(f"Error invalidating feed counters for deleted task {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=TaskCompletion)
+@receiver(post_save, sender=TaskReport)
+def invalidate_feed_stats(sender, instance, created, **kwargs):
+    """
+    Drop cached feed counters of the user after they complete or report a task
+    """
+    if not created:
+        return
+    user_id = instance.user_id
+
+    def _invalidate():
+        try:
+            task_feed.invalidate_network_stats(user_id)
+        except Exception as e:
+            logger.error(f"Error invalidating feed stats for user {user_id}: {str(e)}")
+
+    transaction.on_commit(_invalidate)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_firebase_user_cache(sender, instance, **kwargs):
+    """Drop the cached uid -> User entry used by FirebaseAuthentication"""
+    try:
+        firebase_tokens.invalidate_user(instance.username)
+    except Exception as e:
+        logger.error(f"Error invalidating Firebase user cache for {instance.username}: {str(e)}")
+
+
+@receiver([post_save, post_delete], sender=ApiKey)
+def invalidate_api_key_cache(sender, instance, **kwargs):
+    """Drop the cached public API key (deactivation, expiry change, deletion)"""
+    try:
+        api_keys.invalidate(instance.key_hash)
+    except Exception as e:
+        logger.error(f"Error invalidating API key cache for key {instance.id}: {str(e)}")
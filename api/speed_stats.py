@@ -0,0 +1,134 @@
+"""
+Completion speed percentiles for the public median speed calculator.
+
+The speed of a task is the time between created_at and completed_at in
+minutes. Once a night `rebuild_speed_stats` reads yesterday's completed tasks
+with one values_list query, computes p50/p90 for every
+network x action x actions_required combination plus the network x action
+fallback over all counts, and stores them as CompletionSpeedStat rows.
+
+MedianSpeedView answers from a snapshot of the latest stored day (a dict kept
+in the cache, i.e. in process memory with the two-tier backend), so a request
+never scans Task:
+
+  * exact actions_required match -> its p50/p90;
+  * otherwise the network x action row over all counts;
+  * otherwise DEFAULT_SPEED_MINUTES.
+
+Percentiles are linearly interpolated (same as percentile_cont in Postgres),
+so p50 equals the median the view used to compute.
+"""
+from datetime import timedelta
+from itertools import groupby
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ActionType, CompletionSpeedStat, SocialNetwork, Task
+
+logger = logging.getLogger('api')
+
+SPEED_SNAPSHOT_CACHE_KEY = 'median_speed_snapshot'
+SPEED_SNAPSHOT_CACHE_TIMEOUT = 86400  # 24 часа, пересчёт раз в сутки
+DEFAULT_SPEED_MINUTES = 60.0
+ANY_ACTIONS_COUNT = CompletionSpeedStat.ANY_ACTIONS_COUNT
+
+
+def percentile(sorted_values, q):
+    """Linearly interpolated percentile (0 <= q <= 1) of a sorted non-empty list."""
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _stat(day, network_id, action, actions_required, speeds):
+    speeds.sort()
+    return CompletionSpeedStat(
+        date=day,
+        social_network_id=network_id,
+        action=action,
+        actions_required=actions_required,
+        samples=len(speeds),
+        p50_minutes=round(percentile(speeds, 0.5), 2),
+        p90_minutes=round(percentile(speeds, 0.9), 2),
+    )
+
+
+def compute_speed_stats(day):
+    """CompletionSpeedStat rows (unsaved) for tasks completed on `day`."""
+    rows = Task.objects.filter(
+        status='COMPLETED',
+        completed_at__date=day,
+        created_at__isnull=False,
+    ).order_by('social_network_id', 'type', 'actions_required').values_list(
+        'social_network_id', 'type', 'actions_required', 'created_at', 'completed_at'
+    )
+
+    stats = []
+    for (network_id, action), group in groupby(rows.iterator(), key=lambda row: row[:2]):
+        all_speeds = []
+        for actions_required, tasks in groupby(group, key=lambda row: row[2]):
+            speeds = [(completed_at - created_at).total_seconds() / 60 for *_, created_at, completed_at in tasks]
+            all_speeds.extend(speeds)
+            stats.append(_stat(day, network_id, action, actions_required, speeds))
+        stats.append(_stat(day, network_id, action, ANY_ACTIONS_COUNT, all_speeds))
+    return stats
+
+
+def rebuild_speed_stats(day=None):
+    """
+    Recomputes the speed table for `day` (default: yesterday) and refreshes
+    the cached snapshot. Returns the number of rows written.
+    """
+    day = day or timezone.localdate() - timedelta(days=1)
+    stats = compute_speed_stats(day)
+    with transaction.atomic():
+        CompletionSpeedStat.objects.filter(date=day).delete()
+        CompletionSpeedStat.objects.bulk_create(stats, batch_size=1000)
+
+    cache.set(SPEED_SNAPSHOT_CACHE_KEY, load_snapshot(), SPEED_SNAPSHOT_CACHE_TIMEOUT)
+    logger.info(f"[speed_stats] Rebuilt {len(stats)} completion speed rows for {day}")
+    return len(stats)
+
+
+def load_snapshot():
+    """
+    {'date', 'computed_at', 'networks', 'actions', 'speeds': {(network_code, action, actions_required): (p50, p90)}}
+    for the latest stored day.
+    """
+    latest = CompletionSpeedStat.objects.aggregate(latest=Max('date'))['latest']
+    rows = CompletionSpeedStat.objects.filter(date=latest).values_list(
+        'social_network__code', 'action', 'actions_required', 'p50_minutes', 'p90_minutes'
+    )
+    return {
+        'date': latest,
+        'computed_at': timezone.now(),
+        'networks': set(SocialNetwork.objects.values_list('code', flat=True)),
+        'actions': set(ActionType.objects.values_list('code', flat=True)),
+        'speeds': {(code, action, count): (p50, p90) for code, action, count, p50, p90 in rows},
+    }
+
+
+def get_snapshot():
+    snapshot = cache.get(SPEED_SNAPSHOT_CACHE_KEY)
+    if snapshot is None:
+        snapshot = load_snapshot()
+        cache.set(SPEED_SNAPSHOT_CACHE_KEY, snapshot, SPEED_SNAPSHOT_CACHE_TIMEOUT)
+    return snapshot
+
+
+def get_speed(network_code, action, actions_count, snapshot=None):
+    """
+    (p50, p90) in minutes for the exact actions count, falling back to the
+    network x action row and then to (DEFAULT_SPEED_MINUTES, None).
+    """
+    speeds = (snapshot or get_snapshot())['speeds']
+    return (
+        speeds.get((network_code, action, actions_count))
+        or speeds.get((network_code, action, ANY_ACTIONS_COUNT))
+        or (DEFAULT_SPEED_MINUTES, None)
+    )
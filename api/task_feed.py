@@ -0,0 +1,308 @@
+"""
+Precomputed performer feed for TaskViewSet.
+
+Every ACTIVE task has a TaskFeedEntry row holding the values the feed is
+ranked by (creator status priority, remaining actions, freshness, pin flag)
+and its normalized post URL.
+The entries are kept in sync from Task/UserProfile signals and can be rebuilt
+from scratch with the `rebuild_task_feed` management command.
+
+A feed page is then one ordered query over TaskFeedEntry filtered by the
+user's exclusions, instead of loading and sorting every ACTIVE task in Python.
+The same exclusion queryset feeds the per-user counters: available tasks and
+potential earnings per social network (stats_by_network of the feed and the
+available_tasks_for_completion / potential_earnings of the profile). They are
+computed lazily with one grouped query and cached per user under a key that
+carries the generation of the ACTIVE task set (see api/landing_cache.py): the
+generation is bumped whenever a task enters or leaves the feed, and the user's
+entry is dropped when they complete or report a task.
+"""
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, When, Value, IntegerField, Exists, OuterRef, F, Prefetch, Count, Sum
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from . import landing_cache
+from .models import Task, TaskFeedEntry, TaskCompletion, TaskReport, UserProfile, UserSocialProfile
+
+logger = logging.getLogger('api')
+
+CREATOR_STATUS_PRIORITY = {
+    'MATE': 0,
+    'BUDDY': 1,
+    'MEMBER': 2,
+    'FREE': 3,
+}
+DEFAULT_CREATOR_PRIORITY = 4
+
+PINNED_LIMIT = 10
+FRESH_WINDOW = timedelta(days=1)
+ALMOST_DONE_THRESHOLD = 2
+
+FEED_COUNTERS_CACHE_TIMEOUT = 300  # секунд
+# Поколение множества ACTIVE заданий в ленте
+ACTIVE_TASKS_TAG = 'task_feed_active'
+
+FEED_PREFETCH = (
+    'completions',
+    'completions__user',
+    'social_network',
+    'crowd_tasks',
+    Prefetch(
+        'completions__user__social_profiles',
+        queryset=UserSocialProfile.objects.all(),
+        to_attr='user_social_profiles'
+    ),
+)
+# Компактная лента (?mode=compact) не грузит completions целиком
+COMPACT_FEED_PREFETCH = (
+    'social_network',
+    'crowd_tasks',
+)
+
+
+def creator_priority(status):
+    return CREATOR_STATUS_PRIORITY.get(status, DEFAULT_CREATOR_PRIORITY)
+
+
+def _entry_fields(task):
+    return {
+        'social_network_id': task.social_network_id,
+        'type': task.type,
+        'task_type': task.task_type,
+        'normalized_post_url': task.normalized_post_url,
+        'is_pinned': task.is_pinned,
+        'remaining_actions': (task.actions_required or 0) - (task.actions_completed or 0),
+        'created_at': task.created_at,
+    }
+
+
+def sync_task(task):
+    """Creates, refreshes or drops the feed entry of a single task."""
+    if task.status != 'ACTIVE':
+        removed, _ = TaskFeedEntry.objects.filter(task_id=task.pk).delete()
+        if removed:
+            transaction.on_commit(invalidate_active_tasks)
+        return
+
+    fields = _entry_fields(task)
+    fields['updated_at'] = timezone.now()
+    # Горячий путь (complete_task): запись уже есть, обходимся одним UPDATE
+    if TaskFeedEntry.objects.filter(task_id=task.pk).update(**fields):
+        return
+
+    status = UserProfile.objects.filter(user_id=task.creator_id).values_list('status', flat=True).first()
+    fields.pop('updated_at')
+    TaskFeedEntry.objects.update_or_create(
+        task_id=task.pk,
+        defaults=dict(fields, creator_id=task.creator_id, creator_priority=creator_priority(status))
+    )
+    transaction.on_commit(invalidate_active_tasks)
+
+
+def add_tasks(tasks, creator_status):
+    """
+    Feed entries for tasks created with bulk_create (no post_save signal).
+    All tasks belong to one creator with the given subscription status.
+    """
+    priority = creator_priority(creator_status)
+    entries = [
+        TaskFeedEntry(task_id=task.pk, creator_id=task.creator_id, creator_priority=priority, **_entry_fields(task))
+        for task in tasks if task.status == 'ACTIVE'
+    ]
+    if entries:
+        _upsert_entries(entries)
+        transaction.on_commit(invalidate_active_tasks)
+    return len(entries)
+
+
+def update_creator_priority(user_id, status):
+    """Re-ranks all feed entries of a creator after their status changed."""
+    return TaskFeedEntry.objects.filter(creator_id=user_id).update(
+        creator_priority=creator_priority(status),
+        updated_at=timezone.now()
+    )
+
+
+def rebuild_task_feed(batch_size=1000):
+    """
+    Reconciles TaskFeedEntry with the Task table: drops entries of tasks that are
+    no longer ACTIVE and upserts an entry for every ACTIVE task.
+    Returns (upserted, removed).
+    """
+    removed, _ = TaskFeedEntry.objects.exclude(task__status='ACTIVE').delete()
+
+    active_tasks = Task.objects.filter(status='ACTIVE').annotate(
+        creator_status=F('creator__userprofile__status')
+    ).only(
+        'id', 'creator_id', 'social_network_id', 'type', 'task_type', 'normalized_post_url',
+        'is_pinned', 'actions_required', 'actions_completed', 'created_at', 'status'
+    )
+
+    now = timezone.now()
+    upserted = 0
+    batch = []
+    for task in active_tasks.iterator(chunk_size=batch_size):
+        batch.append(TaskFeedEntry(
+            task_id=task.pk,
+            creator_id=task.creator_id,
+            creator_priority=creator_priority(task.creator_status),
+            updated_at=now,
+            **_entry_fields(task)
+        ))
+        if len(batch) >= batch_size:
+            upserted += _upsert_entries(batch)
+            batch = []
+    if batch:
+        upserted += _upsert_entries(batch)
+
+    invalidate_active_tasks()
+    logger.info(f"[task_feed] Rebuilt feed: upserted={upserted}, removed={removed}")
+    return upserted, removed
+
+
+def _upsert_entries(entries):
+    TaskFeedEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=['task'],
+        update_fields=[
+            'creator', 'social_network', 'type', 'task_type', 'normalized_post_url', 'is_pinned',
+            'creator_priority', 'remaining_actions', 'created_at', 'updated_at',
+        ],
+    )
+    return len(entries)
+
+
+def available_entries(user, social_network_code=None):
+    """ACTIVE feed entries the user is allowed to see (not own, not reported, not completed)."""
+    entries = TaskFeedEntry.objects.filter(task__status='ACTIVE').exclude(creator=user).exclude(
+        Exists(TaskReport.objects.filter(user=user, task_id=OuterRef('task_id')))
+    ).exclude(
+        TaskCompletion.completed_post_exists(user)
+    )
+    if social_network_code:
+        entries = entries.filter(social_network__code=social_network_code.upper())
+    return entries
+
+
+def get_task_feed(user, social_network_code=None, task_type=None, limit=None, entries=None,
+                  prefetch=FEED_PREFETCH):
+    """
+    Returns the ordered list of tasks for the performer feed:
+    up to PINNED_LIMIT pinned tasks (newest first), then unpinned tasks ranked by
+    block (fresh < 24h, almost done, other), creator status, remaining actions and age.
+    `entries` is the user's available_entries() queryset when the caller already built it,
+    `prefetch` the relations loaded for the serializer (COMPACT_FEED_PREFETCH for the compact feed).
+    """
+    limit = limit or settings.TASKS_PER_REQUEST
+    if entries is None:
+        entries = available_entries(user)
+    if social_network_code:
+        entries = entries.filter(social_network__code=social_network_code.upper())
+
+    pinned_ids = list(
+        entries.filter(is_pinned=True)
+        .order_by('-created_at')
+        .values_list('task_id', flat=True)[:PINNED_LIMIT]
+    )
+
+    regular = entries.filter(is_pinned=False, remaining_actions__gt=0)
+    if task_type:
+        regular = regular.filter(task_type=task_type.upper())
+    regular_ids = list(
+        regular.annotate(
+            feed_block=Case(
+                When(created_at__gte=timezone.now() - FRESH_WINDOW, then=Value(0)),
+                When(remaining_actions__lte=ALMOST_DONE_THRESHOLD, then=Value(1)),
+                default=Value(2),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by('feed_block', 'creator_priority', 'remaining_actions', '-created_at')
+        .values_list('task_id', flat=True)[:limit]
+    )
+
+    ordered_ids = pinned_ids + regular_ids
+    if not ordered_ids:
+        return []
+    tasks_by_id = Task.objects.prefetch_related(*prefetch).in_bulk(ordered_ids)
+    return [tasks_by_id[task_id] for task_id in ordered_ids if task_id in tasks_by_id]
+
+
+def invalidate_active_tasks():
+    """A task entered or left the feed: every user's counters are stale."""
+    landing_cache.bump(ACTIVE_TASKS_TAG)
+
+
+def feed_counters_cache_key(user_id):
+    return landing_cache.versioned_key(f'feed_counters_{user_id}', ACTIVE_TASKS_TAG)
+
+
+def get_user_counters(user, entries=None):
+    """
+    Available tasks and potential earnings (half of the task price) of the user,
+    in total and per social network (biggest first):
+    {'available_tasks', 'potential_earnings', 'networks': [...]}.
+    available_tasks counts each post once per action type and network (several
+    ACTIVE tasks on the same post are one task to complete), the per-network
+    available_count and potential_earnings include every task, as before.
+    Cached for FEED_COUNTERS_CACHE_TIMEOUT seconds or until the ACTIVE task set
+    changes or the user completes/reports a task.
+    """
+    cache_key = feed_counters_cache_key(user.id)
+    counters = cache.get(cache_key)
+    if counters is not None:
+        return counters
+
+    if entries is None:
+        entries = available_entries(user)
+    grouped = entries.values(
+        'social_network_id',
+        'social_network__name',
+        'social_network__code',
+        'social_network__icon'
+    ).annotate(
+        count=Count('task_id'),
+        posts=Count(Concat('type', Value(' '), 'normalized_post_url'), distinct=True),
+        price=Sum('task__price'),
+    ).order_by('-count')
+
+    networks = [
+        {
+            'social_network_id': row['social_network_id'],
+            'social_network_name': row['social_network__name'],
+            'social_network_code': row['social_network__code'],
+            'social_network_icon': row['social_network__icon'],
+            'available_count': row['count'],
+            'potential_earnings': (row['price'] or 0) / 2,
+        }
+        for row in grouped
+    ]
+    counters = {
+        'available_tasks': sum(row['posts'] for row in grouped),
+        'potential_earnings': sum(network['potential_earnings'] for network in networks),
+        'networks': networks,
+    }
+    cache.set(cache_key, counters, FEED_COUNTERS_CACHE_TIMEOUT)
+    return counters
+
+
+def get_network_stats(user, entries=None):
+    """
+    Number of available tasks per social network for the user (stats_by_network
+    of TaskViewSet.list), biggest first.
+    """
+    return [
+        {key: value for key, value in network.items() if key != 'potential_earnings'}
+        for network in get_user_counters(user, entries=entries)['networks']
+    ]
+
+
+def invalidate_network_stats(user_id):
+    cache.delete(feed_counters_cache_key(user_id))
@@ -0,0 +1,56 @@
+"""Fixtures shared by the api test modules."""
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from api.models import SocialNetwork, Task, UserProfile
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def worker_caches(location):
+    """
+    The production default cache (TwoTierCache with its OPTIONS from settings)
+    over a LocMemCache shared tier: TwoTierCache instances built from it act as
+    separate worker processes sharing one backend. EXCLUDED_LOCAL_TIMEOUT=0
+    gives excluded keys the same behaviour as over Redis in production.
+    """
+    default = settings.CACHES['default']
+    return {
+        'default': {**default, 'OPTIONS': {**default['OPTIONS'], 'EXCLUDED_LOCAL_TIMEOUT': 0}},
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': location},
+    }
+
+
+def create_user(username, **profile_fields):
+    """User with a UserProfile."""
+    user = User.objects.create_user(username=username, password='x')
+    UserProfile.objects.create(user=user, **profile_fields)
+    return user
+
+
+def create_task(creator, social_network, post_url, price=10, actions_required=5, **fields):
+    fields.setdefault('type', 'LIKE')
+    fields.setdefault('original_price', price * actions_required)
+    return Task.objects.create(
+        creator=creator, social_network=social_network, post_url=post_url,
+        price=price, actions_required=actions_required, **fields
+    )
+
+
+class CompletionFixtureMixin:
+    def _setup_task(self, actions_required, bonus_actions=0, price=10):
+        self.network = SocialNetwork.objects.create(name='Complete Twitter', code='COMPLTW')
+        self.creator = create_user('complete_creator', balance=100000)
+        self.task = create_task(
+            self.creator, self.network, 'https://x.com/a/status/1',
+            price=price, actions_required=actions_required, bonus_actions=bonus_actions,
+        )
+
+    def _performer(self, index, **profile_fields):
+        return create_user(f'complete_performer_{index}', **profile_fields)
+
+    def _complete(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(f'/api/complete-task/{self.task.id}/', {'action': 'LIKE'}, format='json')
@@ -0,0 +1,109 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import api_keys, rate_limit
+from api.cache_backends import TwoTierCache
+from api.models import ApiKey, ApiKeyDailyUsage
+from api.tests.helpers import LOCMEM_CACHES, CompletionFixtureMixin, worker_caches
+
+WORKER_CACHES = worker_caches('api-key-workers')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ApiKeyCacheTests(CompletionFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limit.local_buckets.clear()
+        # Несброшенные счётчики пишутся внутри транзакции теста и откатываются вместе с ней
+        self.addCleanup(api_keys.flush_usage, force=True)
+        self._setup_task(actions_required=5)
+        self.api_key = ApiKey.objects.create(user=self.creator, key_hash=api_keys.hash_api_key('upv_test'))
+        self.client = APIClient(HTTP_X_API_KEY='upv_test')
+
+    def _status(self):
+        return self.client.get(f'/api/public-api/task-status/{self.task.id}/')
+
+    def test_polling_does_no_auth_queries_or_writes(self):
+        with self.assertNumQueries(3):  # ключ + задания (exists + выборка)
+            self.assertEqual(self._status().status_code, 200)
+        with self.assertNumQueries(2):
+            self.assertEqual(self._status().status_code, 200)
+        self.assertIsNone(ApiKey.objects.get(pk=self.api_key.pk).last_used_at)
+
+        with self.assertNumQueries(5):  # last_used_at + первая строка дневной статистики
+            self.assertEqual(api_keys.flush_usage(force=True), 1)
+        self.assertIsNotNone(ApiKey.objects.get(pk=self.api_key.pk).last_used_at)
+        self.assertEqual(api_keys.flush_usage(force=True), 0)
+
+    def test_deactivated_key_is_rejected_immediately(self):
+        self.assertEqual(self._status().status_code, 200)
+        self.api_key.is_active = False
+        self.api_key.save(update_fields=['is_active'])
+        self.assertEqual(self._status().status_code, 401)
+
+    @override_settings(CACHES=WORKER_CACHES)
+    def test_deactivated_key_is_rejected_by_other_workers(self):
+        cache.clear()
+        other_worker = TwoTierCache('', WORKER_CACHES['default'])
+        with mock.patch.object(api_keys, 'cache', other_worker):
+            self.assertIsNotNone(api_keys.get_active_key('upv_test'))
+
+        # Ключ отключают в этом воркере, другой держал его в памяти
+        self.api_key.is_active = False
+        self.api_key.save(update_fields=['is_active'])
+
+        with mock.patch.object(api_keys, 'cache', other_worker):
+            self.assertIsNone(api_keys.get_active_key('upv_test'))
+
+    def test_expired_key_is_rejected(self):
+        self.api_key.expires_at = timezone.now() + timedelta(seconds=30)
+        self.api_key.save()
+        self.assertEqual(self._status().status_code, 200)
+
+        ApiKey.objects.filter(pk=self.api_key.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        cached = cache.get(f'api_key:{self.api_key.key_hash}')
+        cached.expires_at = timezone.now() - timedelta(seconds=1)
+        cache.set(f'api_key:{self.api_key.key_hash}', cached)
+        self.assertEqual(self._status().status_code, 401)
+        self.assertIsNone(cache.get(f'api_key:{self.api_key.key_hash}'))
+
+    def test_rate_limit_and_daily_usage(self):
+        self.api_key.rate_limit_per_minute = 3
+        self.api_key.save()
+
+        responses = [self._status() for _ in range(4)]
+        self.assertEqual([r.status_code for r in responses], [200, 200, 200, 429])
+        self.assertEqual(responses[0]['X-RateLimit-Limit'], '3')
+        self.assertEqual([r['X-RateLimit-Remaining'] for r in responses], ['2', '1', '0', '0'])
+        self.assertEqual(responses[3]['Retry-After'], '20')
+        self.assertNotIn('Retry-After', responses[0])
+        self.assertEqual(self.client.get('/api/public-api/task-status/1/', HTTP_X_API_KEY='wrong').status_code, 401)
+
+        api_keys.flush_usage(force=True)
+        usage = ApiKeyDailyUsage.objects.get(api_key=self.api_key)
+        self.assertEqual((usage.date, usage.requests, usage.throttled), (timezone.localdate(), 3, 1))
+
+        owner = APIClient()
+        owner.force_authenticate(self.creator)
+        data = owner.get('/api/public-api/list-keys/').data['keys'][0]
+        self.assertEqual(data['rate_limit_per_minute'], 3)
+        self.assertEqual(data['daily_usage'], [{'date': timezone.localdate(), 'requests': 3, 'throttled': 1}])
+
+    @override_settings(CACHES=WORKER_CACHES)
+    def test_rate_limit_without_redis_is_shared_by_workers(self):
+        self.api_key.rate_limit_per_minute = 2
+        now = 1_000_000 * 60 + 45  # 15 секунд до конца минутного окна
+        with mock.patch('api.rate_limit.time.time', return_value=now):
+            results = [rate_limit.consume(self.api_key) for _ in range(3)]
+            # Счётчик в общем кеше, а не в памяти процесса
+            self.assertEqual(caches['shared'].get(f'{rate_limit.BUCKET_KEY_PREFIX}:{self.api_key.id}:1000000'), 3)
+        self.assertEqual([(r.allowed, r.remaining) for r in results], [(True, 1), (True, 0), (False, 0)])
+        self.assertEqual((results[2].reset, results[2].retry_after), (15, 15))
+
+        with mock.patch('api.rate_limit.time.time', return_value=now + 15):
+            self.assertTrue(rate_limit.consume(self.api_key).allowed)
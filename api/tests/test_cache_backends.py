@@ -0,0 +1,145 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, override_settings
+
+from api.cache_backends import TwoTierCache, get_cache_stats, metric_prefix
+
+TWO_TIER_CACHES = {
+    'default': {
+        'BACKEND': 'api.cache_backends.TwoTierCache',
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'LOCAL_MAX_ENTRIES': 3,
+            'LOCAL_TIMEOUT': 30,
+            'LOCK_WAIT': 1,
+            'STATS_FLUSH_INTERVAL': 3600,
+        }
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-tests',
+    },
+}
+
+
+@override_settings(CACHES=TWO_TIER_CACHES)
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.shared = caches['shared']
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    def test_reads_are_served_from_local_tier(self):
+        self.shared.set('buy_landing_a', {'slug': 'a'})
+
+        self.assertEqual(self.cache.get('buy_landing_a'), {'slug': 'a'})
+        # Вторая копия в shared меняется, но процесс видит локальную до LOCAL_TIMEOUT
+        self.shared.set('buy_landing_a', {'slug': 'b'})
+        self.assertEqual(self.cache.get('buy_landing_a'), {'slug': 'a'})
+
+        self.cache.clear_local()
+        self.assertEqual(self.cache.get('buy_landing_a'), {'slug': 'b'})
+
+    def test_local_copies_are_isolated_from_mutation(self):
+        self.cache.set('action_landing_a', {'items': [1]})
+        self.cache.get('action_landing_a')['items'].append(2)
+        self.assertEqual(self.cache.get('action_landing_a'), {'items': [1]})
+
+    def test_delete_clears_both_tiers(self):
+        self.cache.set('buy_landings_list', [1, 2])
+        self.cache.delete('buy_landings_list')
+
+        self.assertIsNone(self.cache.get('buy_landings_list'))
+        self.assertIsNone(self.shared.get('buy_landings_list'))
+
+    def test_lru_eviction(self):
+        for key in ('k1', 'k2', 'k3'):
+            self.cache.set(key, key)
+        self.cache.get('k1')
+        self.cache.set('k4', 'k4')
+        self.shared.clear()
+
+        self.assertEqual(self.cache.get('k1'), 'k1')
+        self.assertIsNone(self.cache.get('k2'))
+
+    def test_get_or_set_computes_once_under_concurrency(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'median': 42}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_set('median_speed_x', compute, 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'median': 42}] * 5)
+
+    def test_get_or_set_waits_for_other_process_holding_the_lock(self):
+        self.shared.add('median_speed_y:lock', 1, 10)
+        threading.Timer(0.2, lambda: self.shared.set('median_speed_y', 'from-other-worker')).start()
+
+        value = self.cache.get_or_set('median_speed_y', lambda: self.fail('must not recompute'), 60)
+
+        self.assertEqual(value, 'from-other-worker')
+
+    def test_hit_miss_counters_by_prefix(self):
+        self.assertEqual(metric_prefix('action_landings_list_all_all'), 'action_landings_list')
+        self.assertEqual(metric_prefix('action_landing_twitter'), 'action_landing')
+        self.assertEqual(metric_prefix('something_else'), 'other')
+
+        self.cache.get('buy_landing_a')
+        self.shared.set('buy_landing_a', 1)
+        self.cache.get('buy_landing_a')
+        self.cache.get('buy_landing_a')
+
+        stats = {row['prefix']: row for row in get_cache_stats()}
+        self.assertEqual(
+            (stats['buy_landing']['local_hits'], stats['buy_landing']['shared_hits'], stats['buy_landing']['misses']),
+            (1, 1, 1)
+        )
+        self.assertEqual(stats['buy_landing']['hit_rate'], 66.7)
+
+    def test_excluded_prefixes_skip_local_tier_over_redis(self):
+        # LocMemCache в роли Redis
+        with mock.patch('api.cache_backends.RedisCache', LocMemCache):
+            first = TwoTierCache('', TWO_TIER_CACHES['default'])
+            other = TwoTierCache('', TWO_TIER_CACHES['default'])
+            first.set('cache_gen:action_landings', 100, timeout=None)
+            self.assertEqual(other.get('cache_gen:action_landings'), 100)
+
+            # bump в одном процессе сразу виден другому
+            first.incr('cache_gen:action_landings')
+            self.assertEqual(other.get('cache_gen:action_landings'), 101)
+            self.assertEqual(first.get('cache_gen:action_landings'), 101)
+
+        # Обычные ключи по-прежнему живут в локальной копии
+        other.set('buy_landing_b', 2)
+        self.shared.set('buy_landing_b', 3)
+        self.assertEqual(other.get('buy_landing_b'), 2)
+
+    def test_excluded_prefixes_keep_short_local_copy_without_redis(self):
+        params = {**TWO_TIER_CACHES['default'], 'OPTIONS': {**TWO_TIER_CACHES['default']['OPTIONS'], 'EXCLUDED_LOCAL_TIMEOUT': 0.2}}
+        first = TwoTierCache('', params)
+        with self.assertLogs('api', 'WARNING'):
+            first.set('cache_gen:action_landings', 100, timeout=None)
+        self.assertEqual(first.get('cache_gen:action_landings'), 100)
+
+        # Копия в памяти живёт EXCLUDED_LOCAL_TIMEOUT, а не LOCAL_TIMEOUT
+        self.shared.set('cache_gen:action_landings', 101, timeout=None)
+        self.assertEqual(first.get('cache_gen:action_landings'), 100)
+        time.sleep(0.25)
+        self.assertEqual(first.get('cache_gen:action_landings'), 101)
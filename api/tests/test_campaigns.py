@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from api import campaigns
+from api.models import EmailCampaign, EmailCampaignDelivery, EmailSubscriptionType, UserEmailSubscription
+
+
+@override_settings(DEFAULT_FROM_EMAIL='noreply@upvote.club', EMAIL_SEND_RATE=0, EMAIL_BATCH_SIZE=2)
+class CampaignEngineTests(TestCase):
+    def setUp(self):
+        self.subscription_type = EmailSubscriptionType.objects.create(name='campaign_test', description='x')
+        self.users = [
+            User.objects.create_user(username=f'campaign_user_{i}', email=f'user{i}@example.com', password='x')
+            for i in range(5)
+        ]
+        self.campaign = EmailCampaign.objects.create(
+            subject='News',
+            body_html='<p>Hi {{ user.username }}</p><a href="{{ unsubscribe_url }}">unsubscribe</a>',
+            subscription_type=self.subscription_type,
+        )
+
+    def _subscribe(self, users, is_subscribed=True):
+        for user in users:
+            UserEmailSubscription.objects.create(
+                user=user, subscription_type=self.subscription_type, is_subscribed=is_subscribed
+            )
+
+    def test_ensure_subscriptions_creates_missing_rows_in_bulk(self):
+        self._subscribe(self.users[:1], is_subscribed=False)
+
+        with self.assertNumQueries(3):
+            subscriptions = campaigns.ensure_subscriptions(self.subscription_type, [u.id for u in self.users])
+
+        self.assertEqual(len(subscriptions), 5)
+        self.assertFalse(subscriptions[self.users[0].id].is_subscribed)
+        self.assertTrue(all(subscriptions[u.id].is_subscribed for u in self.users[1:]))
+
+    def test_run_campaign_sends_to_subscribers_and_fills_ledger(self):
+        self._subscribe(self.users[:4])
+        self._subscribe(self.users[4:], is_subscribed=False)
+
+        counts = campaigns.run_campaign(self.campaign, workers=1)
+
+        self.assertEqual(counts, {'SENT': 4})
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f'user{i}@example.com' for i in range(4)])
+        self.assertIn('campaign_user_0', mail.outbox[0].alternatives[0][0])
+        self.campaign.refresh_from_db()
+        self.assertEqual(
+            (self.campaign.status, self.campaign.total_recipients, self.campaign.successful_sends, self.campaign.failed_sends),
+            ('COMPLETED', 4, 4, 0),
+        )
+        self.assertIsNotNone(self.campaign.sent_at)
+
+    def test_unsubscribe_after_prepare_is_skipped(self):
+        self._subscribe(self.users[:2])
+        campaigns.prepare_campaign(self.campaign)
+        UserEmailSubscription.objects.filter(user=self.users[1]).update(is_subscribed=False)
+
+        counts = campaigns.dispatch_campaign(self.campaign, workers=1)
+
+        self.assertEqual(counts, {'SENT': 1, 'SKIPPED': 1})
+        self.assertEqual(EmailCampaignDelivery.objects.get(user=self.users[1]).error, 'Unsubscribed')
+
+    def test_resume_does_not_send_twice(self):
+        self._subscribe(self.users)
+        campaigns.prepare_campaign(self.campaign)
+        # Процесс упал: одно письмо уже ушло, второе было в отправке
+        EmailCampaignDelivery.objects.filter(user=self.users[0]).update(status='SENT')
+        EmailCampaignDelivery.objects.filter(user=self.users[1]).update(status='SENDING')
+        EmailCampaign.objects.filter(pk=self.campaign.pk).update(status='SENDING')
+
+        counts = campaigns.run_campaign(self.campaign, workers=1)
+
+        self.assertEqual(counts, {'SENT': 4, 'FAILED': 1})
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f'user{i}@example.com' for i in range(2, 5)])
+        self.assertEqual(EmailCampaignDelivery.objects.filter(campaign=self.campaign).count(), 5)
+
+        # Повторный запуск завершённой кампании ничего не отправляет
+        mail.outbox = []
+        campaigns.dispatch_campaign(self.campaign, workers=1)
+        self.assertEqual(mail.outbox, [])
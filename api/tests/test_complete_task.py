@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from api.models import Task, TaskCompletion, TaskFeedEntry, UserProfile
+from api.tests.helpers import LOCMEM_CACHES, CompletionFixtureMixin
+from api.views import _increment_task_progress
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CompleteTaskTests(CompletionFixtureMixin, TestCase):
+    def test_main_bonus_alternation_and_completion(self):
+        self._setup_task(actions_required=3, bonus_actions=2)
+        progress = []
+        for i in range(5):
+            response = self._complete(self._performer(i))
+            self.assertEqual(response.status_code, 200, response.data)
+            self.task.refresh_from_db()
+            progress.append((self.task.actions_completed, self.task.bonus_actions_completed))
+
+        self.assertEqual(progress, [(1, 0), (1, 1), (2, 1), (2, 2), (3, 2)])
+        self.assertEqual(self.task.status, 'COMPLETED')
+        self.assertIsNotNone(self.task.completed_at)
+        self.assertEqual(self.task.completion_duration, self.task.completed_at - self.task.created_at)
+        self.assertFalse(TaskFeedEntry.objects.filter(task=self.task).exists())
+        self.assertEqual(self._complete(self._performer(99)).status_code, 400)
+
+    def test_reward_counters_and_feed_entry(self):
+        self._setup_task(actions_required=4, price=5)
+        user = self._performer(0, balance=7)
+
+        response = self._complete(user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['reward'], 2.5)
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual(
+            (profile.balance, profile.completed_tasks_count, profile.bonus_tasks_completed), (9, 1, 1)
+        )
+        self.assertEqual(response.data['new_balance'], 9)
+        self.assertEqual(TaskFeedEntry.objects.get(task=self.task).remaining_actions, 3)
+        self.assertEqual(self._complete(user).status_code, 400)
+        self.assertEqual(TaskCompletion.objects.filter(task=self.task).count(), 1)
+
+    def test_referral_reward_on_twentieth_task(self):
+        self._setup_task(actions_required=10)
+        inviter = self._performer('inviter', balance=0)
+        user = self._performer(0, balance=0, bonus_tasks_completed=19, invited_by=inviter)
+
+        response = self._complete(user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserProfile.objects.get(user=user).balance, 5 + 30)
+        self.assertEqual(UserProfile.objects.get(user=inviter).balance, 30)
+
+    def test_stale_copies_never_overshoot(self):
+        # Как параллельные запросы: все копии загружены до первого UPDATE
+        self._setup_task(actions_required=2)
+        copies = [Task.objects.get(pk=self.task.pk) for _ in range(3)]
+        self.assertTrue(all(copy.status == 'ACTIVE' for copy in copies))
+
+        # Третий условный UPDATE (WHERE status = 'ACTIVE') не затрагивает ни одной строки
+        self.assertEqual([_increment_task_progress(copy) for copy in copies], [True, True, False])
+
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.actions_completed, self.task.status), (2, 'COMPLETED'))
+        self.assertEqual(copies[2].actions_completed, 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Parallel writes need a server database (SQLite locks the whole table)')
+@override_settings(CACHES=LOCMEM_CACHES)
+class ParallelCompleteTaskTests(CompletionFixtureMixin, TransactionTestCase):
+    PERFORMERS = 300
+
+    def test_parallel_completions_are_exact(self):
+        self._setup_task(actions_required=200, bonus_actions=50, price=2)
+        users = [self._performer(i) for i in range(self.PERFORMERS)]
+
+        def complete(user):
+            try:
+                return self._complete(user).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            statuses = list(pool.map(complete, users))
+
+        self.task.refresh_from_db()
+        self.assertEqual(statuses.count(200), 250)
+        self.assertEqual(TaskCompletion.objects.filter(task=self.task).count(), 250)
+        self.assertEqual((self.task.actions_completed, self.task.bonus_actions_completed), (200, 50))
+        self.assertEqual(self.task.status, 'COMPLETED')
+        rewarded = UserProfile.objects.filter(user__in=users, completed_tasks_count=1)
+        self.assertEqual(rewarded.count(), 250)
+        self.assertEqual(sum(rewarded.values_list('balance', flat=True)), 250 * 1)
@@ -0,0 +1,68 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from api import daily_jobs
+from api.cron import update_all_user_tasks
+from api.models import DailyJobRun, UserProfile
+from api.tests.helpers import create_user
+
+RUN_DATE = date(2026, 10, 1)  # 31 день: BUDDY +9, MATE +33
+
+
+class DailyJobsTests(TestCase):
+    def setUp(self):
+        self.profiles = {}
+        for status in ['FREE', 'MEMBER', 'BUDDY', 'MATE', 'BUDDY']:
+            user = create_user(f'daily_{status}_{len(self.profiles)}', status=status, balance=100)
+            self.profiles[user.username] = user.userprofile
+        UserProfile.objects.update(available_tasks=0)
+
+    def _values(self, field):
+        return {
+            username: getattr(profile, field)
+            for username, profile in ((p.user.username, p) for p in UserProfile.objects.select_related('user'))
+        }
+
+    def test_refresh_available_tasks_uses_status_case(self):
+        update_all_user_tasks()
+
+        self.assertEqual(self._values('available_tasks'), {
+            'daily_FREE_0': 0, 'daily_MEMBER_1': 1, 'daily_BUDDY_2': 10, 'daily_MATE_3': 10000, 'daily_BUDDY_4': 10,
+        })
+        run = DailyJobRun.objects.get(job=daily_jobs.REFRESH_TASKS_JOB)
+        self.assertEqual((run.status, run.processed), ('COMPLETED', 4))
+
+    def test_query_count_does_not_depend_on_profiles(self):
+        # Журнал + один чанк + завершающая проверка, без запросов на каждый профиль
+        with self.assertNumQueries(15):
+            daily_jobs.refresh_available_tasks(RUN_DATE)
+        for i in range(5):
+            create_user(f'daily_more_{i}', status='BUDDY')
+        with self.assertNumQueries(15):
+            daily_jobs.refresh_available_tasks(date(2026, 10, 2))
+
+    def test_grant_is_applied_once_per_day(self):
+        daily_jobs.grant_daily_subscription_points(RUN_DATE, chunk_size=2)
+        call_command('grant_daily_subscription_points', date=RUN_DATE, stdout=StringIO())
+
+        self.assertEqual(self._values('balance'), {
+            'daily_FREE_0': 100, 'daily_MEMBER_1': 100, 'daily_BUDDY_2': 109, 'daily_MATE_3': 133, 'daily_BUDDY_4': 109,
+        })
+
+        daily_jobs.grant_daily_subscription_points(date(2026, 10, 2))
+        self.assertEqual(self._values('balance')['daily_MATE_3'], 166)
+
+    def test_interrupted_run_resumes_after_checkpoint(self):
+        mate = self.profiles['daily_MATE_3']
+        # Прошлый запуск упал после чанка, закончившегося на MATE-профиле
+        UserProfile.objects.filter(id__lte=mate.id, status__in=['BUDDY', 'MATE']).update(balance=200)
+        DailyJobRun.objects.create(job=daily_jobs.GRANT_POINTS_JOB, run_date=RUN_DATE, last_id=mate.id, processed=2)
+
+        run = daily_jobs.grant_daily_subscription_points(RUN_DATE)
+
+        self.assertEqual((run.status, run.processed), ('COMPLETED', 3))
+        balances = self._values('balance')
+        self.assertEqual((balances['daily_BUDDY_2'], balances['daily_MATE_3'], balances['daily_BUDDY_4']), (200, 200, 109))
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.earnings import rebuild_daily_earnings
+from api.models import DailyEarningStat, SocialNetwork, TaskCompletion
+from api.tests.helpers import create_task, create_user
+
+
+class DailyEarningsTests(TestCase):
+    def setUp(self):
+        network = SocialNetwork.objects.create(name='Earnings Twitter', code='EARNTW')
+        creator = create_user('earnings_creator')
+        self.user = create_user('earnings_user')
+        # Награда: 50 / 5 / 2 = 5 и 30 / 4 / 2 = 3.75
+        self.tasks = [
+            create_task(
+                creator, network, f'https://x.com/a/status/{i}', actions_required=actions, original_price=price
+            )
+            for i, (price, actions) in enumerate([(50, 5), (30, 4)] * 3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _complete(self, task, days_ago):
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskCompletion.objects.create(
+                task=task, user=self.user, action='LIKE', created_at=timezone.now() - timedelta(days=days_ago)
+            )
+
+    def _populate(self):
+        for task, days_ago in zip(self.tasks, [0, 0, 2, 40, 100, 500]):
+            self._complete(task, days_ago)
+
+    def _rollup(self):
+        return sorted(
+            (day, tasks, points, round(usd, 6))
+            for day, tasks, points, usd in DailyEarningStat.objects.values_list('date', 'tasks', 'points', 'usd')
+        )
+
+    def test_rollup_is_written_on_completion_and_matches_rebuild(self):
+        self._populate()
+        incremental = self._rollup()
+        today = timezone.localdate()
+        self.assertEqual(incremental[-1], (today, 2, 8.75, 0.0875))
+        self.assertEqual(len(incremental), 5)
+
+        self.assertEqual(rebuild_daily_earnings(), 5)
+        self.assertEqual(self._rollup(), incremental)
+
+    def test_stats_are_read_from_rollup(self):
+        self._populate()
+
+        # Целые дни — из агрегата, первый и последний день периода — из TaskCompletion
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/task-completion-stats/', {'period': 'year'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary']['total_tasks_completed'], 5)
+        self.assertEqual(response.data['summary']['total_earnings_points'], 5 + 3.75 + 5 + 3.75 + 5)
+        self.assertEqual(sum(point['tasks_completed'] for point in response.data['chart_data']), 5)
+        self.assertEqual(response.data['chart_data'][-1]['date'], timezone.localdate().strftime('%Y-%m'))
+
+        response = self.client.get('/api/task-completion-stats/', {'period': 'week'})
+        self.assertEqual([point['tasks_completed'] for point in response.data['chart_data']], [1, 2])
+        self.assertAlmostEqual(response.data['summary']['total_earnings_usd'], 0.1375)
+
+        response = self.client.get('/api/task-completion-stats/', {'period': 'day'})
+        self.assertEqual(response.data['summary']['total_tasks_completed'], 2)
+
+    def test_week_is_a_rolling_window(self):
+        now = timezone.now()
+        for task, age in zip(self.tasks, [timedelta(days=7, minutes=1), timedelta(days=7) - timedelta(minutes=1)]):
+            with self.captureOnCommitCallbacks(execute=True):
+                TaskCompletion.objects.create(task=task, user=self.user, action='LIKE', created_at=now - age)
+
+        response = self.client.get('/api/task-completion-stats/', {'period': 'week'})
+
+        # Как до агрегата: now - 7 дней, без остатка первого календарного дня
+        self.assertEqual(response.data['summary']['total_tasks_completed'], 1)
+        self.assertEqual(response.data['summary']['total_earnings_points'], 3.75)
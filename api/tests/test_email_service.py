@@ -0,0 +1,90 @@
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+
+from api.email_service import EmailService, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class CountingBackend(EmailBackend):
+    """locmem backend that counts opened connections and rejects one address."""
+    opened = 0
+    reject = 'broken@example.com'
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if any(self.reject in message.to for message in messages):
+            raise ConnectionError('550 rejected')
+        return super().send_messages(messages)
+
+
+def _messages(count):
+    return [
+        {'to_email': f'user{i}@example.com', 'subject': f'Hello {i}', 'html_content': '<p>Hi</p>',
+         'unsubscribe_url': f'https://upvote.club/api/unsubscribe/{i}/'}
+        for i in range(count)
+    ]
+
+
+class TokenBucketTests(TestCase):
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, clock=clock, sleep=clock.sleep)
+        for _ in range(30):
+            bucket.acquire()
+        # 10 писем сразу (burst), остальные 20 — по 10 в секунду
+        self.assertAlmostEqual(clock.now, 2.0, places=5)
+
+    def test_no_rate_never_sleeps(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=0, clock=clock, sleep=clock.sleep)
+        for _ in range(100):
+            bucket.acquire()
+        self.assertEqual(clock.sleeps, [])
+
+
+@override_settings(DEFAULT_FROM_EMAIL='noreply@upvote.club')
+class SendBulkTests(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def test_one_connection_per_batch(self):
+        results = EmailService().send_bulk(
+            _messages(7), batch_size=3, rate=0, connection_factory=CountingBackend
+        )
+
+        self.assertEqual(CountingBackend.opened, 3)
+        self.assertEqual([r['sent'] for r in results], [True] * 7)
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertEqual(mail.outbox[0].to, ['user0@example.com'])
+        self.assertIn('List-Unsubscribe', mail.outbox[0].extra_headers)
+
+    def test_per_message_results(self):
+        messages = _messages(3)
+        messages[1]['to_email'] = CountingBackend.reject
+
+        results = EmailService().send_bulk(messages, rate=0, connection_factory=CountingBackend)
+
+        self.assertEqual([r['sent'] for r in results], [True, False, True])
+        self.assertEqual(results[1]['to_email'], CountingBackend.reject)
+        self.assertIn('550', results[1]['error'])
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_send_email_uses_default_backend(self):
+        self.assertTrue(EmailService().send_email('user@example.com', 'Subject', '<p>Hi</p>', bcc_email='bcc@example.com'))
+        self.assertEqual(mail.outbox[0].bcc, ['bcc@example.com'])
@@ -0,0 +1,76 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api import firebase_identity
+from api.models import FirebaseIdentity
+from api.utils.email_utils import get_firebase_email
+
+
+def _record(uid, disabled=False):
+    return SimpleNamespace(uid=uid, email=f'{uid}@example.com', email_verified=True, disabled=disabled)
+
+
+def _get_users(identifiers):
+    """Fake auth.get_users: uids starting with 'missing' do not exist."""
+    uids = [identifier.uid for identifier in identifiers]
+    return SimpleNamespace(
+        users=[_record(uid, disabled=uid.startswith('disabled')) for uid in uids if not uid.startswith('missing')],
+        not_found=[SimpleNamespace(uid=uid) for uid in uids if uid.startswith('missing')],
+    )
+
+
+class FirebaseIdentityTests(TestCase):
+    def test_lookups_are_batched_and_mirrored(self):
+        uids = [f'uid{i}' for i in range(250)] + ['missing1', 'disabled1']
+
+        with mock.patch('api.firebase_identity.auth.get_users', side_effect=_get_users) as get_users:
+            emails = firebase_identity.get_emails(uids)
+
+        self.assertEqual(get_users.call_count, 3)
+        self.assertTrue(all(len(call.args[0]) <= 100 for call in get_users.call_args_list))
+        self.assertEqual(len(emails), 251)
+        self.assertNotIn('missing1', emails)
+        self.assertTrue(FirebaseIdentity.objects.get(uid='missing1').not_found)
+
+        # Второй проход читает только зеркало
+        with mock.patch('api.firebase_identity.auth.get_users', side_effect=_get_users) as get_users, \
+                self.assertNumQueries(1):
+            self.assertEqual(firebase_identity.get_emails(uids, include_disabled=False), {
+                uid: email for uid, email in emails.items() if uid != 'disabled1'
+            })
+        get_users.assert_not_called()
+
+    def test_stale_rows_are_refreshed(self):
+        FirebaseIdentity.objects.create(
+            uid='uid1', email='old@example.com', synced_at=timezone.now() - timedelta(days=2)
+        )
+        with mock.patch('api.firebase_identity.auth.get_users', side_effect=_get_users) as get_users:
+            self.assertEqual(get_firebase_email('uid1'), 'uid1@example.com')
+        get_users.assert_called_once()
+
+    def test_firebase_errors_keep_stale_data(self):
+        FirebaseIdentity.objects.create(
+            uid='uid1', email='old@example.com', synced_at=timezone.now() - timedelta(days=2)
+        )
+        with mock.patch('api.firebase_identity.auth.get_users', side_effect=Exception('firebase down')):
+            self.assertEqual(firebase_identity.get_emails(['uid1', 'uid2']), {'uid1': 'old@example.com'})
+            with self.assertRaises(Exception):
+                firebase_identity.get_emails(['uid1'], fail_silently=False)
+
+    def test_sync_all_pages_and_marks_deleted_users(self):
+        FirebaseIdentity.objects.create(uid='gone', email='gone@example.com', synced_at=timezone.now())
+        second_page = SimpleNamespace(users=[_record('uid3')], get_next_page=lambda: None)
+        first_page = SimpleNamespace(users=[_record('uid1'), _record('uid2')], get_next_page=lambda: second_page)
+
+        with mock.patch('api.firebase_identity.auth.list_users', return_value=first_page):
+            self.assertEqual(firebase_identity.sync_all(page_size=2), 3)
+
+        self.assertEqual(
+            set(FirebaseIdentity.objects.filter(not_found=False).values_list('uid', flat=True)),
+            {'uid1', 'uid2', 'uid3'},
+        )
+        self.assertTrue(FirebaseIdentity.objects.get(uid='gone').not_found)
@@ -0,0 +1,83 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from firebase_admin import auth
+from rest_framework import exceptions
+
+from api import firebase_tokens
+from api.authentication import FirebaseAuthentication
+from api.cache_backends import TwoTierCache
+from api.tests.helpers import LOCMEM_CACHES, worker_caches
+
+WORKER_CACHES = worker_caches('firebase-workers')
+
+
+def _claims(uid='firebase_uid', ttl=3600):
+    return {'uid': uid, 'email': f'{uid}@example.com', 'exp': time.time() + ttl}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FirebaseTokenCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/', HTTP_AUTHORIZATION='Firebase token-1')
+
+    def _authenticate(self, **verify_kwargs):
+        with mock.patch('api.firebase_tokens.auth.verify_id_token', **verify_kwargs) as verify:
+            result = FirebaseAuthentication().authenticate(self.request)
+        return result, verify
+
+    def test_token_and_user_are_cached(self):
+        (user, _), verify = self._authenticate(return_value=_claims())
+        self.assertEqual(verify.call_count, 1)
+        self.assertEqual(verify.call_args.kwargs, {'check_revoked': True})
+        self.assertEqual((user.username, user.email), ('firebase_uid', 'firebase_uid@example.com'))
+
+        with self.assertNumQueries(0):
+            (cached_user, _), verify = self._authenticate(return_value=_claims())
+        verify.assert_not_called()
+        self.assertEqual(cached_user.pk, user.pk)
+
+        # Изменение пользователя сбрасывает кэш uid -> User
+        user.email = 'new@example.com'
+        user.save()
+        (cached_user, _), _ = self._authenticate(return_value=_claims())
+        self.assertEqual(cached_user.email, 'new@example.com')
+
+    @override_settings(FIREBASE_AUTH={'REVOCATION_CHECK_INTERVAL': 0})
+    def test_revocation_is_rechecked_after_interval(self):
+        self._authenticate(return_value=_claims())
+
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'revoked'):
+            self._authenticate(side_effect=auth.RevokedIdTokenError('revoked'))
+
+        # Отозванный токен не остаётся в кэше
+        with override_settings(FIREBASE_AUTH={'REVOCATION_CHECK_INTERVAL': 300}):
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                self._authenticate(side_effect=auth.RevokedIdTokenError('revoked'))
+
+    def test_expired_token_is_not_served_from_cache(self):
+        self._authenticate(return_value=_claims(ttl=1))
+        with mock.patch('api.firebase_tokens.time.time', return_value=time.time() + 5):
+            with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'expired'):
+                self._authenticate(side_effect=auth.ExpiredIdTokenError('expired', cause=None))
+
+    @override_settings(CACHES=WORKER_CACHES, FIREBASE_AUTH={'REVOCATION_CHECK_INTERVAL': 3600})
+    def test_eviction_reaches_other_workers(self):
+        cache.clear()
+        other_worker = TwoTierCache('', WORKER_CACHES['default'])
+        with mock.patch.object(firebase_tokens, 'cache', other_worker):
+            (user, _), _ = self._authenticate(return_value=_claims())
+
+        # Этот воркер узнаёт об отзыве токена и удаляет пользователя
+        with override_settings(FIREBASE_AUTH={'REVOCATION_CHECK_INTERVAL': 0}):
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                self._authenticate(side_effect=auth.RevokedIdTokenError('revoked'))
+        user.delete()
+
+        with mock.patch.object(firebase_tokens, 'cache', other_worker):
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                self._authenticate(side_effect=auth.RevokedIdTokenError('revoked'))
+            self.assertNotEqual(firebase_tokens.get_user(_claims()).pk, user.pk)
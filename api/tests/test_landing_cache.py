@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import landing_cache
+from api.models import ActionLanding, SocialNetwork
+from api.tests.helpers import LOCMEM_CACHES
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LandingCacheGenerationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.twitter = SocialNetwork.objects.create(name='Cache Twitter', code='CTWITTER')
+        self.reddit = SocialNetwork.objects.create(name='Cache Reddit', code='CREDDIT')
+        self.landing = ActionLanding.objects.create(
+            title='Twitter likes', slug='ctwitter-like', social_network=self.twitter, action='LIKE'
+        )
+        self.client = APIClient()
+
+    def test_save_bumps_only_dependent_keys(self):
+        twitter_list = landing_cache.action_landings_list_key('CTWITTER', 'LIKE')
+        reddit_list = landing_cache.action_landings_list_key('CREDDIT')
+        all_list = landing_cache.action_landings_list_key()
+        twitter_path = landing_cache.action_landing_by_path_key('CTWITTER', 'ctwitter/like')
+        detail = landing_cache.action_landing_key('ctwitter-like')
+
+        self.landing.title = 'Twitter likes v2'
+        self.landing.save()
+
+        self.assertNotEqual(landing_cache.action_landings_list_key('CTWITTER', 'LIKE'), twitter_list)
+        self.assertNotEqual(landing_cache.action_landings_list_key(), all_list)
+        self.assertNotEqual(landing_cache.action_landing_by_path_key('CTWITTER', 'ctwitter/like'), twitter_path)
+        self.assertNotEqual(landing_cache.action_landing_key('ctwitter-like'), detail)
+        self.assertEqual(landing_cache.action_landings_list_key('CREDDIT'), reddit_list)
+
+    def test_moving_landing_invalidates_old_network_and_slug(self):
+        old_network_path = landing_cache.action_landing_by_path_key('CTWITTER', 'ctwitter/like')
+        old_detail = landing_cache.action_landing_key('ctwitter-like')
+
+        self.landing.social_network = self.reddit
+        self.landing.slug = 'creddit-like'
+        self.landing.save()
+
+        self.assertNotEqual(landing_cache.action_landing_by_path_key('CTWITTER', 'ctwitter/like'), old_network_path)
+        self.assertNotEqual(landing_cache.action_landing_key('ctwitter-like'), old_detail)
+
+    def test_by_path_entry_is_refreshed_after_save(self):
+        first = self.client.get('/api/landings/by-path/?path=ctwitter/like')
+        second = self.client.get('/api/landings/by-path/?path=CTwitter/Like/')
+        self.assertEqual(first['X-Cache-Status'], 'MISS')
+        self.assertEqual(second['X-Cache-Status'], 'HIT')
+
+        self.landing.title = 'Updated title'
+        self.landing.save()
+
+        third = self.client.get('/api/landings/by-path/?path=ctwitter/like')
+        self.assertEqual(third['X-Cache-Status'], 'MISS')
+        self.assertEqual(third.data['title'], 'Updated title')
+
+    def test_unknown_network_path_creates_no_generation_counter(self):
+        response = self.client.get('/api/landings/by-path/?path=nope-network/like')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(cache.get('cache_gen:' + landing_cache.action_network_tag('nope-network')))
+
+    def test_anonymous_input_creates_no_generation_counters(self):
+        self.assertEqual(self.client.get('/api/landings/', {'social_network': 'made-up'}).data, [])
+        self.assertEqual(self.client.get('/api/landings/nonexistent-slug-123/').status_code, 404)
+        self.assertEqual(self.client.get('/api/buy-landings/nonexistent-slug-123/').status_code, 404)
+
+        self.assertIsNone(cache.get('cache_gen:' + landing_cache.action_network_tag('made-up')))
+        self.assertIsNone(cache.get('cache_gen:' + landing_cache.action_slug_tag('nonexistent-slug-123')))
+        self.assertIsNone(cache.get('cache_gen:' + landing_cache.buy_slug_tag('nonexistent-slug-123')))
+
+    def test_existing_slug_is_cached_after_validation(self):
+        first = self.client.get('/api/landings/ctwitter-like/')
+        second = self.client.get('/api/landings/ctwitter-like/')
+        self.assertEqual((first['X-Cache-Status'], second['X-Cache-Status']), ('MISS', 'HIT'))
+
+        self.landing.title = 'Twitter likes v2'
+        self.landing.save()
+        third = self.client.get('/api/landings/ctwitter-like/')
+        self.assertEqual((third['X-Cache-Status'], third.data['title']), ('MISS', 'Twitter likes v2'))
+
+    def test_by_path_hit_needs_no_database_query(self):
+        self.client.get('/api/landings/by-path/?path=ctwitter/like')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/landings/by-path/?path=ctwitter/like')
+        self.assertEqual(response['X-Cache-Status'], 'HIT')
+
+        # Новая соцсеть сразу попадает в список кодов
+        SocialNetwork.objects.create(name='Cache Threads', code='CTHREADS')
+        self.assertEqual(self.client.get('/api/landings/by-path/?path=cthreads').status_code, 404)
+        self.assertIn('CTHREADS', landing_cache.social_network_codes())
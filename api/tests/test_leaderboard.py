@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import leaderboard
+from api.models import CompletedTasksBucket, UserProfile
+from api.tests.helpers import LOCMEM_CACHES, CompletionFixtureMixin
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LeaderboardTests(CompletionFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self._setup_task(actions_required=10)
+        self.profiles = [
+            UserProfile.objects.get(user=self._performer(i, completed_tasks_count=count, chosen_country='DE'))
+            for i, count in enumerate([5, 3, 3, 0])
+        ]
+        leaderboard.rebuild_leaderboard()
+
+    def _expected_rank(self, count):
+        """Прежний расчёт: два COUNT(*) по UserProfile"""
+        return {
+            'rank': UserProfile.objects.filter(completed_tasks_count__gt=count).count() + 1,
+            'total_users': UserProfile.objects.filter(completed_tasks_count__gt=0).count(),
+            'completed_tasks': count,
+        }
+
+    def test_rank_matches_count_queries(self):
+        for count in [0, 1, 3, 4, 5, 6]:
+            self.assertEqual(leaderboard.get_rank(count), self._expected_rank(count))
+
+    def test_rank_is_served_from_cache(self):
+        leaderboard.get_rank(3)
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.get_rank(3)['rank'], 2)
+
+    def test_completion_moves_user_between_buckets(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self._complete(self.profiles[1].user)
+        self.assertEqual(response.status_code, 200)
+        # До коммита гистограмма не тронута
+        self.assertEqual(
+            dict(CompletedTasksBucket.objects.filter(users__gt=0).values_list('completed_tasks', 'users')),
+            {5: 1, 3: 2},
+        )
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(
+            dict(CompletedTasksBucket.objects.filter(users__gt=0).values_list('completed_tasks', 'users')),
+            {5: 1, 4: 1, 3: 1},
+        )
+        cache.clear()
+        self.assertEqual(leaderboard.get_rank(4), self._expected_rank(4))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._complete(self.profiles[3].user)
+        cache.clear()
+        self.assertEqual(leaderboard.get_rank(1), {'rank': 4, 'total_users': 4, 'completed_tasks': 1})
+
+    def test_public_top_endpoint(self):
+        response = APIClient().get('/api/leaderboard/', {'limit': 3})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_users'], 3)
+        self.assertEqual([(row['rank'], row['completed_tasks']) for row in response.data['top']], [(1, 5), (2, 3), (2, 3)])
+        self.assertEqual(set(response.data['top'][0]), {'rank', 'completed_tasks'})
+        self.assertEqual(APIClient().get('/api/leaderboard/', {'limit': 'x'}).status_code, 400)
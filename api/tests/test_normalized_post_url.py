@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.models import Task, TaskCompletion, UserProfile, SocialNetwork
+from api.utils.url_normalizer import normalize_url
+
+
+class NormalizedPostUrlTests(TestCase):
+    def setUp(self):
+        self.network = SocialNetwork.objects.create(name='Norm Network', code='NORMNET')
+        self.creator = User.objects.create_user(username='norm_creator', password='x')
+        UserProfile.objects.create(user=self.creator)
+        self.performer = User.objects.create_user(username='norm_performer', password='x')
+        UserProfile.objects.create(user=self.performer)
+
+    def _task(self, url):
+        return Task.objects.create(
+            creator=self.creator,
+            social_network=self.network,
+            type='LIKE',
+            post_url=url,
+            price=10,
+            actions_required=1,
+            original_price=10,
+        )
+
+    def test_normalize_url(self):
+        self.assertEqual(normalize_url('https://www.x.com/a/status/1/?s=20#top'), 'x.com/a/status/1')
+        self.assertEqual(normalize_url('http://m.youtube.com/watch'), 'youtube.com/watch')
+        self.assertEqual(normalize_url('https://youtu.be/abc'), 'youtube.com/abc')
+        self.assertEqual(normalize_url('https://Reddit.com/'), 'reddit.com')
+        self.assertEqual(normalize_url(None), '')
+
+    def test_populated_on_save(self):
+        task = self._task('https://www.x.com/a/status/1/')
+        self.assertEqual(task.normalized_post_url, 'x.com/a/status/1')
+
+        task.post_url = 'https://x.com/b/status/2'
+        task.save(update_fields=['post_url'])
+        task.refresh_from_db()
+        self.assertEqual(task.normalized_post_url, 'x.com/b/status/2')
+
+        completion = TaskCompletion.objects.create(task=task, user=self.performer, action='LIKE')
+        self.assertEqual(completion.normalized_post_url, 'x.com/b/status/2')
+
+    def test_completed_post_exists_matches_same_post_on_other_task(self):
+        done = self._task('https://x.com/a/status/1')
+        duplicate = self._task('https://mobile.x.com/a/status/1?ref=feed')
+        other = self._task('https://x.com/a/status/2')
+        TaskCompletion.objects.create(task=done, user=self.performer, action='LIKE')
+
+        remaining = Task.objects.exclude(TaskCompletion.completed_post_exists(self.performer))
+
+        self.assertEqual(list(remaining.values_list('id', flat=True)), [other.id])
+        self.assertNotIn(duplicate.id, remaining.values_list('id', flat=True))
+
+    def test_backfill_command(self):
+        task = self._task('https://www.x.com/a/status/1')
+        completion = TaskCompletion.objects.create(task=task, user=self.performer, action='LIKE')
+        Task.objects.filter(pk=task.pk).update(normalized_post_url='')
+        TaskCompletion.objects.filter(pk=completion.pk).update(normalized_post_url='')
+
+        call_command('backfill_normalized_post_urls', stdout=StringIO())
+
+        task.refresh_from_db()
+        completion.refresh_from_db()
+        self.assertEqual(task.normalized_post_url, 'x.com/a/status/1')
+        self.assertEqual(completion.normalized_post_url, 'x.com/a/status/1')
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import outbox
+from api.models import OutboxEvent, UserProfile
+from api.tests.helpers import LOCMEM_CACHES, CompletionFixtureMixin
+
+
+def _firebase_users(*uids, not_found=()):
+    return SimpleNamespace(
+        users=[
+            SimpleNamespace(uid=uid, email=f'{uid}@example.com', email_verified=True, disabled=False)
+            for uid in uids
+        ],
+        not_found=[SimpleNamespace(uid=uid) for uid in not_found],
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReferralOutboxTests(CompletionFixtureMixin, TestCase):
+    def test_twentieth_task_enqueues_event_without_third_party_calls(self):
+        self._setup_task(actions_required=10)
+        inviter = self._performer('inviter', balance=0)
+        user = self._performer(0, balance=0, bonus_tasks_completed=19, invited_by=inviter)
+
+        with mock.patch('firebase_admin.auth.get_user') as get_user, \
+                mock.patch('api.email_service.EmailService.send_email') as send_email:
+            response = self._complete(user)
+
+        self.assertEqual(response.status_code, 200)
+        get_user.assert_not_called()
+        send_email.assert_not_called()
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.event_type, outbox.REFERRAL_REWARD)
+        self.assertEqual(event.payload, {'user_id': user.id, 'inviter_id': inviter.id})
+        self.assertEqual(event.status, 'PENDING')
+
+    def test_failed_completion_enqueues_nothing(self):
+        self._setup_task(actions_required=10)
+        inviter = self._performer('inviter')
+        user = self._performer(0, bonus_tasks_completed=19, invited_by=inviter)
+        self._complete(user)
+        OutboxEvent.objects.all().delete()
+
+        self.assertEqual(self._complete(user).status_code, 400)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+
+class ProcessOutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='outbox_user', password='x')
+        self.inviter = User.objects.create_user(username='outbox_inviter', password='x')
+        UserProfile.objects.create(user=self.user)
+        UserProfile.objects.create(user=self.inviter)
+
+    def _enqueue(self):
+        return outbox.enqueue(outbox.REFERRAL_REWARD, {'user_id': self.user.id, 'inviter_id': self.inviter.id})
+
+    def test_batches_firebase_lookups_and_marks_done(self):
+        events = [self._enqueue() for _ in range(3)]
+
+        with mock.patch('api.firebase_identity.auth.get_users', return_value=_firebase_users('outbox_user', 'outbox_inviter')) as get_users, \
+                mock.patch('api.outbox.EmailService.send_email', return_value=True) as send_email:
+            self.assertEqual(outbox.process_outbox(), (3, 0))
+
+        get_users.assert_called_once()
+        self.assertEqual(send_email.call_count, 6)
+        self.assertEqual(
+            {call.kwargs['to_email'] for call in send_email.call_args_list},
+            {'outbox_user@example.com', 'outbox_inviter@example.com'},
+        )
+        for event in events:
+            event.refresh_from_db()
+            self.assertEqual(event.status, 'DONE')
+            self.assertIsNotNone(event.processed_at)
+        # Повторный запуск ничего не делает
+        self.assertEqual(outbox.process_outbox(), (0, 0))
+
+    def test_failure_backs_off_and_retry_skips_sent_emails(self):
+        event = self._enqueue()
+
+        def send_email(to_email, **kwargs):
+            return to_email == 'outbox_user@example.com'
+
+        with mock.patch('api.firebase_identity.auth.get_users', return_value=_firebase_users('outbox_user', 'outbox_inviter')), \
+                mock.patch('api.outbox.EmailService.send_email', side_effect=send_email):
+            self.assertEqual(outbox.process_outbox(), (0, 1))
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'PENDING')
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('inviter', event.last_error)
+        self.assertEqual(event.payload['sent'], ['invited'])
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+        # До наступления next_attempt_at событие не берётся
+        self.assertEqual(outbox.process_outbox(), (0, 0))
+
+        OutboxEvent.objects.filter(id=event.id).update(next_attempt_at=timezone.now())
+        with mock.patch('api.firebase_identity.auth.get_users', return_value=_firebase_users('outbox_user', 'outbox_inviter')), \
+                mock.patch('api.outbox.EmailService.send_email', return_value=True) as retry_send:
+            self.assertEqual(outbox.process_outbox(), (1, 0))
+
+        retry_send.assert_called_once()
+        self.assertEqual(retry_send.call_args.kwargs['to_email'], 'outbox_inviter@example.com')
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'DONE')
+
+    def test_gives_up_after_max_attempts(self):
+        event = self._enqueue()
+        OutboxEvent.objects.filter(id=event.id).update(attempts=outbox.MAX_ATTEMPTS - 1)
+
+        with mock.patch('api.firebase_identity.auth.get_users', side_effect=Exception('firebase down')):
+            self.assertEqual(outbox.process_outbox(), (0, 1))
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'FAILED')
+        self.assertEqual(event.last_error, 'firebase down')
+
+    def test_expired_lease_is_picked_up_again(self):
+        event = self._enqueue()
+        self.assertEqual([e.id for e in outbox.claim_batch()], [event.id])
+        # Воркер "упал": пока lease не истёк, событие никто не берёт
+        self.assertEqual(outbox.claim_batch(), [])
+
+        OutboxEvent.objects.filter(id=event.id).update(next_attempt_at=timezone.now())
+        self.assertEqual([e.id for e in outbox.claim_batch()], [event.id])
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import TaskCompletion, DailyCompletionStat, SocialNetwork
+from api.platform_stats import compute_platform_stats, rebuild_completion_stats
+from api.tests.helpers import LOCMEM_CACHES, create_task, create_user
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PlatformStatsTests(TestCase):
+    def setUp(self):
+        self.twitter = SocialNetwork.objects.create(name='Stats Twitter', code='STATSTW')
+        self.reddit = SocialNetwork.objects.create(name='Stats Reddit', code='STATSRD')
+        self.creator = create_user('stats_creator')
+        self.users = [create_user(f'stats_user_{i}') for i in range(3)]
+
+    def _task(self, network, task_type, url):
+        return create_task(self.creator, network, url, type=task_type)
+
+    def _complete(self, task, user, days_ago=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            return TaskCompletion.objects.create(
+                task=task, user=user, action=task.type,
+                created_at=timezone.now() - timedelta(days=days_ago)
+            )
+
+    def _populate(self):
+        like = self._task(self.twitter, 'LIKE', 'https://x.com/a/status/1')
+        repost = self._task(self.twitter, 'REPOST', 'https://x.com/a/status/2')
+        upvote = self._task(self.reddit, 'UPVOTE', 'https://reddit.com/r/a/1')
+        self._complete(like, self.users[0])
+        self._complete(like, self.users[1], days_ago=1)
+        self._complete(like, self.users[2], days_ago=5)
+        self._complete(repost, self.users[0], days_ago=1)
+        self._complete(upvote, self.users[1])
+
+    def test_rollup_is_incremented_on_completion(self):
+        self._populate()
+        self.assertEqual(
+            sum(DailyCompletionStat.objects.values_list('count', flat=True)),
+            TaskCompletion.objects.count()
+        )
+
+    def test_rollup_is_incremented_after_commit(self):
+        task = self._task(self.twitter, 'LIKE', 'https://x.com/a/status/1')
+        with self.captureOnCommitCallbacks() as callbacks:
+            TaskCompletion.objects.create(task=task, user=self.users[0], action='LIKE')
+        self.assertFalse(DailyCompletionStat.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(DailyCompletionStat.objects.get().count, 1)
+
+    def test_payload(self):
+        self._populate()
+
+        stats = compute_platform_stats()
+
+        self.assertEqual(stats['total_actions'], 5)
+        self.assertEqual(stats['total_actions_yesterday'], 2)
+        self.assertEqual(stats['reach'], 500)
+        twitter = stats['by_network']['STATSTW']
+        self.assertEqual((twitter['total'], twitter['yesterday']), (4, 2))
+        self.assertEqual(
+            [(a['action'], a['total'], a['yesterday']) for a in twitter['actions']],
+            [('LIKE', 3, 1), ('REPOST', 1, 1)]
+        )
+        self.assertEqual(
+            [(a['action'], a['total']) for a in stats['by_action']],
+            [('LIKE', 3), ('REPOST', 1), ('UPVOTE', 1)]
+        )
+
+    def test_rebuild_matches_incremental_rollup(self):
+        self._populate()
+        expected = compute_platform_stats()
+        DailyCompletionStat.objects.all().delete()
+
+        rebuild_completion_stats()
+
+        self.assertEqual(compute_platform_stats(), expected)
+
+    def test_partial_rebuild_keeps_older_days(self):
+        self._populate()
+        DailyCompletionStat.objects.update(count=0)
+
+        rebuild_completion_stats(days=2)
+
+        self.assertEqual(compute_platform_stats()['total_actions'], 4)
+
+    @override_settings(TIME_ZONE='Pacific/Kiritimati')
+    def test_days_are_utc_days(self):
+        # 12:00 UTC вчера — уже сегодня по местному времени (UTC+14)
+        created_at = (timezone.now() - timedelta(days=1)).replace(hour=12, minute=0, second=0, microsecond=0)
+        utc_yesterday = created_at.date()
+        task = self._task(self.twitter, 'LIKE', 'https://x.com/a/status/1')
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskCompletion.objects.create(task=task, user=self.users[0], action='LIKE', created_at=created_at)
+
+        self.assertEqual(list(DailyCompletionStat.objects.values_list('date', flat=True)), [utc_yesterday])
+        self.assertEqual(compute_platform_stats()['total_actions_yesterday'], 1)
+
+        rebuild_completion_stats(days=3)
+        self.assertEqual(list(DailyCompletionStat.objects.values_list('date', flat=True)), [utc_yesterday])
@@ -0,0 +1,81 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import ActionType, FirebaseIdentity, UserProfile, Withdrawal
+from api.tests.helpers import LOCMEM_CACHES, CompletionFixtureMixin
+
+
+class StatusTrackingTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='status_user', password='x')
+        UserProfile.objects.create(user=user, status='FREE', balance=10)
+        self.profile = UserProfile.objects.get(user=user)
+
+    def test_save_without_status_change_skips_select(self):
+        self.profile.balance = 20
+        with self.assertNumQueries(1):
+            self.profile.save(update_fields=['balance'])
+        with self.assertNumQueries(1):
+            self.profile.save()
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).balance, 20)
+
+    def test_status_change_is_detected(self):
+        self.profile.status = 'BUDDY'
+        with self.assertNumQueries(3):  # SELECT старого профиля + UPDATE + пересчёт приоритета в ленте
+            self.profile.save(update_fields=['status', 'available_tasks', 'daily_task_limit'])
+        profile = UserProfile.objects.get(pk=self.profile.pk)
+        self.assertEqual((profile.status, profile.available_tasks, profile.daily_task_limit), ('BUDDY', 10, 10))
+
+        # После сохранения новый статус считается загруженным
+        with self.assertNumQueries(1):
+            self.profile.save(update_fields=['status'])
+
+    def test_status_changed_elsewhere_is_tracked_after_refresh(self):
+        UserProfile.objects.filter(pk=self.profile.pk).update(status='MATE')
+        self.profile.refresh_from_db()
+        self.profile.status = 'MEMBER'
+        self.profile.save()
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).available_tasks, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DEFAULT_FROM_EMAIL='noreply@upvote.club')
+class WriteEndpointQueryCountTests(CompletionFixtureMixin, TestCase):
+    """Query budget of the main write endpoints (no re-fetch of UserProfile on save)."""
+
+    def setUp(self):
+        self._setup_task(actions_required=5)
+        self.user = self._performer(0, balance=100000, available_tasks=5)
+        FirebaseIdentity.objects.create(uid=self.user.username, email='performer@example.com', synced_at=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_complete_task(self):
+        # Агрегаты платформенной статистики и заработка и гистограмма лидерборда
+        # пишутся после коммита и сюда не входят
+        with self.assertNumQueries(11):
+            response = self.client.post(f'/api/complete-task/{self.task.id}/', {'action': 'LIKE'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_create_task(self):
+        like, _ = ActionType.objects.get_or_create(code='LIKE', defaults={'name': 'Like'})
+        self.network.available_actions.add(like)
+        with self.assertNumQueries(23):
+            response = self.client.post('/api/create-task/', {
+                'post_url': 'https://x.com/a/status/2', 'type': 'LIKE', 'price': 10,
+                'actions_required': 5, 'social_network_code': self.network.code,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_create_and_cancel_withdrawal(self):
+        with self.assertNumQueries(6):
+            response = self.client.post('/api/withdrawal/create/', {
+                'amount_usd': '5.00', 'withdrawal_method': 'PAYPAL', 'withdrawal_address': 'me@example.com',
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        withdrawal = Withdrawal.objects.get(user=self.user)
+        with self.assertNumQueries(8):
+            response = self.client.post(f'/api/withdrawal/{withdrawal.id}/cancel/')
+        self.assertEqual(response.status_code, 200, response.data)
@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APIClient
+
+from api import api_keys, rate_limit
+from api.models import ActionType, ApiKey, Task, TaskFeedEntry, UserProfile
+from api.tests.helpers import LOCMEM_CACHES, CompletionFixtureMixin
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BulkCreateTasksTests(CompletionFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limit.local_buckets.clear()
+        self.addCleanup(api_keys.flush_usage, force=True)
+        self._setup_task(actions_required=5)
+        like, _ = ActionType.objects.get_or_create(code='LIKE', defaults={'name': 'Like'})
+        self.network.available_actions.add(like)
+        UserProfile.objects.filter(user=self.creator).update(balance=1000, available_tasks=100, status='FREE')
+        ApiKey.objects.create(user=self.creator, key_hash=api_keys.hash_api_key('upv_bulk'))
+        self.client = APIClient(HTTP_X_API_KEY='upv_bulk')
+
+    def _item(self, n, **fields):
+        return dict({
+            'post_url': f'https://x.com/bulk/status/{n}', 'type': 'LIKE', 'price': 10,
+            'actions_required': 5, 'social_network_code': self.network.code,
+        }, **fields)
+
+    def _post(self, items):
+        return self.client.post('/api/public-api/create-tasks/bulk/', {'tasks': items}, format='json')
+
+    def test_per_item_results_and_single_debit(self):
+        response = self._post([
+            self._item(1),
+            self._item(2),
+            self._item(1, post_url='https://x.com/bulk/status/1?utm_source=x'),  # повтор внутри пакета
+            self._item(3, post_url=self.task.post_url),  # уже есть ACTIVE задание
+            self._item(4, social_network_code='NOPE'),
+            {'post_url': 'https://x.com/bulk/status/5'},
+        ])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 4))
+        results = response.data['results']
+        self.assertEqual([r['success'] for r in results], [True, True, False, False, False, False])
+        self.assertIn('Duplicate of another task', results[2]['error'])
+        self.assertEqual(results[3]['existing_task_id'], self.task.id)
+        self.assertIn('not found', results[4]['error'])
+        self.assertIn('Missing required fields', results[5]['error'])
+
+        profile = UserProfile.objects.get(user=self.creator)
+        self.assertEqual((profile.balance, profile.available_tasks), (1000 - 2 * 50, 98))
+        created = Task.objects.filter(id__in=[results[0]['task_id'], results[1]['task_id']])
+        self.assertEqual(
+            sorted(created.values_list('normalized_post_url', 'original_price', 'status')),
+            [('x.com/bulk/status/1', 50, 'ACTIVE'), ('x.com/bulk/status/2', 50, 'ACTIVE')],
+        )
+        self.assertEqual(TaskFeedEntry.objects.filter(task__in=created).count(), 2)
+
+    def test_balance_limits_partial_batch(self):
+        UserProfile.objects.filter(user=self.creator).update(balance=120)
+        response = self._post([self._item(n) for n in range(4)])
+
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['results'][2]['error'], 'Insufficient balance to create task')
+        self.assertEqual(UserProfile.objects.get(user=self.creator).balance, 20)
+
+        UserProfile.objects.filter(user=self.creator).update(balance=0)
+        self.assertEqual(self._post([self._item(10)]).status_code, 400)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        self._post([self._item(0)])  # ключ API попадает в кэш
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self._post([self._item(n) for n in range(1, 3)]).status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self._post([self._item(n) for n in range(100, 150)]).status_code, 201)
+        self.assertEqual(len(large), len(small))
+
+    def test_validation_of_payload(self):
+        self.assertEqual(self._post([]).status_code, 400)
+        self.assertEqual(self._post([self._item(n) for n in range(501)]).status_code, 400)
+        self.assertEqual(
+            APIClient().post('/api/public-api/create-tasks/bulk/', {'tasks': [self._item(1)]}, format='json').status_code,
+            401,
+        )
@@ -0,0 +1,77 @@
+from datetime import timedelta
+from statistics import median
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import speed_stats
+from api.models import ActionType, CompletionSpeedStat, SocialNetwork, Task
+from api.tests.helpers import LOCMEM_CACHES, create_task, create_user
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SpeedStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.network = SocialNetwork.objects.create(name='Speed Twitter', code='SPEEDTW')
+        ActionType.objects.get_or_create(code='LIKE', defaults={'name': 'Like'})
+        ActionType.objects.get_or_create(code='REPOST', defaults={'name': 'Repost'})
+        self.creator = create_user('speed_creator')
+        self.yesterday_noon = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+    def _task(self, minutes, actions_required=5, action='LIKE', days_ago=1, status='COMPLETED'):
+        completed_at = self.yesterday_noon - timedelta(days=days_ago - 1)
+        task = create_task(
+            self.creator, self.network, 'https://x.com/a/status/1', actions_required=actions_required,
+            type=action, original_price=10, status=status, completed_at=completed_at,
+        )
+        Task.objects.filter(pk=task.pk).update(created_at=completed_at - timedelta(minutes=minutes))
+
+    def _get(self, **params):
+        query = {'social_network': 'SPEEDTW', 'action': 'LIKE', 'actions_count': 5, **params}
+        return self.client.get('/api/median-speed/', query)
+
+    def test_percentiles_match_median_of_durations(self):
+        for minutes in [10, 20, 30, 40]:
+            self._task(minutes)
+        self._task(100, actions_required=10)
+        self._task(5, days_ago=2)
+        self._task(7, status='ACTIVE')
+
+        self.assertEqual(speed_stats.rebuild_speed_stats(), 2 + 1)
+        rows = {
+            row.actions_required: (row.samples, row.p50_minutes, row.p90_minutes)
+            for row in CompletionSpeedStat.objects.all()
+        }
+        self.assertEqual(rows[5], (4, median([10, 20, 30, 40]), 37.0))
+        self.assertEqual(rows[10], (1, 100.0, 100.0))
+        self.assertEqual(rows[CompletionSpeedStat.ANY_ACTIONS_COUNT], (5, 30.0, 76.0))
+
+    def test_view_answers_from_snapshot(self):
+        for minutes in [10, 20, 30]:
+            self._task(minutes)
+        speed_stats.rebuild_speed_stats()
+
+        with self.assertNumQueries(0):
+            response = self._get()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['median_speed_minutes'], data['p90_speed_minutes']), (20.0, 28.0))
+        self.assertEqual(data['stats_date'], self.yesterday_noon.date().isoformat())
+
+        # Нет точного совпадения — строка по всем количествам действий, нет данных — дефолт
+        self.assertEqual(self._get(actions_count=7).json()['median_speed_minutes'], 20.0)
+        self.assertEqual(self._get(action='REPOST').json()['median_speed_minutes'], speed_stats.DEFAULT_SPEED_MINUTES)
+
+    def test_validation_and_unknown_codes(self):
+        self.assertEqual(self._get(actions_count=0).status_code, 400)
+        self.assertEqual(self._get(actions_count='x').status_code, 400)
+        self.assertEqual(self._get(social_network='NOPE').status_code, 404)
+        self.assertEqual(self._get(action='NOPE').status_code, 404)
+
+        # Сеть, созданная после снимка, находится в БД
+        SocialNetwork.objects.create(name='New network', code='NEWNET')
+        response = self._get(social_network='NEWNET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['median_speed_minutes'], speed_stats.DEFAULT_SPEED_MINUTES)
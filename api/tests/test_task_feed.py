@@ -0,0 +1,199 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import Task, TaskCompletion, TaskFeedEntry, TaskReport, UserProfile, SocialNetwork
+from api.serializers import UserProfileSerializer
+from api.task_feed import get_task_feed, get_network_stats, get_user_counters, rebuild_task_feed
+from api.tests.helpers import LOCMEM_CACHES
+
+
+class TaskFeedTests(TestCase):
+    def setUp(self):
+        self.network = SocialNetwork.objects.create(name='Feed Twitter', code='FEEDTW')
+        self.performer = User.objects.create_user(username='performer', password='x')
+        UserProfile.objects.create(user=self.performer, status='FREE')
+        self.mate = User.objects.create_user(username='mate_creator', password='x')
+        self.mate_profile = UserProfile.objects.create(user=self.mate, status='MATE')
+        self.free = User.objects.create_user(username='free_creator', password='x')
+        self.free_profile = UserProfile.objects.create(user=self.free, status='FREE')
+
+    def _task(self, creator, url, actions_required=10, actions_completed=0, **kwargs):
+        return Task.objects.create(
+            creator=creator,
+            social_network=self.network,
+            type='LIKE',
+            post_url=url,
+            price=10,
+            actions_required=actions_required,
+            actions_completed=actions_completed,
+            original_price=10 * actions_required,
+            **kwargs
+        )
+
+    def _age(self, task, days):
+        created_at = timezone.now() - timedelta(days=days)
+        Task.objects.filter(pk=task.pk).update(created_at=created_at)
+        TaskFeedEntry.objects.filter(task_id=task.pk).update(created_at=created_at)
+
+    def test_entries_follow_task_lifecycle(self):
+        task = self._task(self.free, 'https://x.com/a/status/1')
+        entry = TaskFeedEntry.objects.get(task=task)
+        self.assertEqual(entry.creator_priority, 3)
+        self.assertEqual(entry.remaining_actions, 10)
+
+        task.actions_completed = 4
+        task.save()
+        self.assertEqual(TaskFeedEntry.objects.get(task=task).remaining_actions, 6)
+
+        self.free_profile.status = 'BUDDY'
+        self.free_profile.save()
+        self.assertEqual(TaskFeedEntry.objects.get(task=task).creator_priority, 1)
+
+        task.status = 'COMPLETED'
+        task.save()
+        self.assertFalse(TaskFeedEntry.objects.filter(task=task).exists())
+
+    def test_feed_ordering(self):
+        old_free = self._task(self.free, 'https://x.com/a/status/1')
+        old_almost_done = self._task(self.free, 'https://x.com/a/status/2', actions_required=3, actions_completed=2)
+        fresh_free = self._task(self.free, 'https://x.com/a/status/3')
+        fresh_mate = self._task(self.mate, 'https://x.com/a/status/4')
+        pinned = self._task(self.free, 'https://x.com/a/status/5', is_pinned=True)
+        self._age(old_free, 3)
+        self._age(old_almost_done, 3)
+
+        feed = get_task_feed(self.performer)
+
+        self.assertEqual(
+            [t.id for t in feed],
+            [pinned.id, fresh_mate.id, fresh_free.id, old_almost_done.id, old_free.id]
+        )
+
+    def test_feed_excludes_own_reported_and_completed_posts(self):
+        own = self._task(self.performer, 'https://x.com/me/status/1')
+        reported = self._task(self.free, 'https://x.com/a/status/1')
+        done = self._task(self.free, 'https://x.com/a/status/2')
+        same_post = self._task(self.mate, 'https://www.x.com/a/status/2/?utm=1')
+        visible = self._task(self.mate, 'https://x.com/a/status/3')
+        TaskReport.objects.create(user=self.performer, task=reported, reason='not_working')
+        TaskCompletion.objects.create(task=done, user=self.performer, action='LIKE')
+
+        feed_ids = [t.id for t in get_task_feed(self.performer)]
+
+        self.assertEqual(feed_ids, [visible.id])
+        self.assertNotIn(own.id, feed_ids)
+        self.assertNotIn(same_post.id, feed_ids)
+
+    def test_rebuild_recreates_missing_and_drops_stale_entries(self):
+        task = self._task(self.mate, 'https://x.com/a/status/1')
+        closed = self._task(self.mate, 'https://x.com/a/status/2')
+        TaskFeedEntry.objects.all().delete()
+        Task.objects.filter(pk=closed.pk).update(status='DELETED')
+
+        upserted, removed = rebuild_task_feed()
+
+        self.assertEqual(upserted, 1)
+        self.assertEqual(list(TaskFeedEntry.objects.values_list('task_id', flat=True)), [task.id])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FeedNetworkStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.twitter = SocialNetwork.objects.create(name='Stats Twitter', code='FSTW')
+        self.reddit = SocialNetwork.objects.create(name='Stats Reddit', code='FSRD')
+        self.performer = User.objects.create_user(username='stats_performer', password='x')
+        UserProfile.objects.create(user=self.performer, status='FREE')
+        self.creator = User.objects.create_user(username='stats_creator', password='x')
+        UserProfile.objects.create(user=self.creator, status='MEMBER')
+        self.tasks = [
+            self._task(self.twitter, 'https://x.com/a/status/1'),
+            self._task(self.twitter, 'https://x.com/a/status/2'),
+            self._task(self.reddit, 'https://reddit.com/r/a/1'),
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.performer)
+
+    def _task(self, network, url):
+        return Task.objects.create(
+            creator=self.creator, social_network=network, type='LIKE', post_url=url,
+            price=10, actions_required=5, original_price=50,
+        )
+
+    def _counts(self):
+        return {s['social_network_code']: s['available_count'] for s in get_network_stats(self.performer)}
+
+    def test_stats_are_cached_and_dropped_on_complete_and_report(self):
+        self.assertEqual(self._counts(), {'FSTW': 2, 'FSRD': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskCompletion.objects.create(task=self.tasks[0], user=self.performer, action='LIKE')
+        self.assertEqual(self._counts(), {'FSTW': 1, 'FSRD': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskReport.objects.create(user=self.performer, task=self.tasks[2], reason='not_working')
+        self.assertEqual(self._counts(), {'FSTW': 1})
+
+    def test_list_reuses_cached_stats(self):
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_available'], 3)
+        self.assertEqual(len(response.data['tasks']), 3)
+
+        # Повторный запрос берёт статистику из кеша, без агрегации по ленте
+        cached = get_network_stats(self.performer)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/tasks/?social_network=fsrd')
+        self.assertEqual(response.data['stats_by_network'], cached)
+        self.assertEqual(response.data['total_available'], 3)
+        self.assertEqual([t['id'] for t in response.data['tasks']], [self.tasks[2].id])
+        self.assertFalse(any('GROUP BY' in q['sql'] for q in ctx.captured_queries))
+
+    def test_profile_counters_are_cached_and_follow_active_tasks(self):
+        profile = UserProfile.objects.get(user=self.performer)
+        serializer = UserProfileSerializer()
+        self.assertEqual(
+            (serializer.get_available_tasks_for_completion(profile), serializer.get_potential_earnings(profile)), (3, 15.0)
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_counters(self.performer)['available_tasks'], 3)
+
+        # Новое задание и завершённое задание меняют поколение ACTIVE заданий
+        with self.captureOnCommitCallbacks(execute=True):
+            self._task(self.reddit, 'https://reddit.com/r/a/2')
+        self.assertEqual(get_user_counters(self.performer)['available_tasks'], 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(pk=self.tasks[0].pk).update(status='COMPLETED')
+            self.tasks[0].refresh_from_db()
+            self.tasks[0].save()
+        counters = get_user_counters(self.performer)
+        self.assertEqual((counters['available_tasks'], counters['potential_earnings']), (3, 15.0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tasks[2].delete()
+        self.assertEqual(get_user_counters(self.performer)['available_tasks'], 2)
+
+    def test_profile_serializer_computes_counters_once(self):
+        profile = UserProfile.objects.get(user=self.performer)
+        with mock.patch('api.serializers.task_feed.get_user_counters', wraps=get_user_counters) as counters:
+            data = UserProfileSerializer(profile).data
+        self.assertEqual((data['available_tasks_for_completion'], data['potential_earnings']), (3, 15.0))
+        self.assertEqual(counters.call_count, 1)
+
+    def test_profile_counts_duplicate_posts_once(self):
+        # Второе задание на тот же пост (другой вариант URL) — одно доступное выполнение
+        self._task(self.twitter, 'https://x.com/a/status/1?utm_source=feed')
+
+        counters = get_user_counters(self.performer)
+        self.assertEqual(counters['available_tasks'], 3)
+        self.assertEqual(counters['potential_earnings'], 20.0)
+        self.assertEqual(self._counts(), {'FSTW': 3, 'FSRD': 1})
@@ -0,0 +1,143 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import (
+    Task, TaskCompletion, UserProfile, UserSocialProfile, SocialNetwork, ActionType, Review
+)
+from api.serializers import TaskSerializer, TaskFeedSerializer
+from api.task_feed import FEED_PREFETCH, COMPACT_FEED_PREFETCH
+from api.tests.helpers import LOCMEM_CACHES
+
+
+class TaskPageFixtureMixin:
+    def setUp(self):
+        self.network = SocialNetwork.objects.create(name='Serializer Twitter', code='SERTW')
+        self.action = ActionType.objects.create(name='Serializer Like', code='SERLIKE')
+        self.viewer = User.objects.create_user(username='viewer', password='x')
+        UserProfile.objects.create(user=self.viewer)
+        self.creator = User.objects.create_user(username='ser_creator', password='x')
+        UserProfile.objects.create(user=self.creator)
+        self.request = RequestFactory().get('/api/tasks/')
+        self.request.user = self.viewer
+        self.task_count = 0
+
+    def _add_tasks(self, count, completions_per_task=3):
+        for _ in range(count):
+            self.task_count += 1
+            task = Task.objects.create(
+                creator=self.creator, social_network=self.network, type='LIKE',
+                post_url=f'https://x.com/a/status/{self.task_count}',
+                price=10, actions_required=10, original_price=100,
+            )
+            for i in range(completions_per_task):
+                user = User.objects.create_user(username=f'performer_{self.task_count}_{i}', password='x')
+                UserSocialProfile.objects.create(
+                    user=user, social_network=self.network, username=f'handle_{self.task_count}_{i}',
+                    profile_url=f'https://x.com/handle_{self.task_count}_{i}'
+                )
+                TaskCompletion.objects.create(task=task, user=user, action='LIKE')
+            Review.objects.create(
+                user=self.viewer, social_network=self.network, action=self.action,
+                actions_count=10, task=task, rating=5
+            )
+
+
+class TaskSerializerQueryCountTests(TaskPageFixtureMixin, TestCase):
+    def _serialize(self, queryset):
+        with CaptureQueriesContext(connection) as ctx:
+            data = TaskSerializer(queryset, many=True, context={'request': self.request}).data
+        return data, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self._add_tasks(2)
+        small_data, small_queries = self._serialize(Task.objects.prefetch_related(*FEED_PREFETCH))
+        self._add_tasks(8)
+        large_data, large_queries = self._serialize(Task.objects.prefetch_related(*FEED_PREFETCH))
+
+        self.assertEqual(len(small_data), 2)
+        self.assertEqual(len(large_data), 10)
+        self.assertEqual(small_queries, large_queries)
+
+        # То же без prefetch профилей: карта собирается одним запросом
+        plain = Task.objects.prefetch_related('completions', 'completions__user', 'social_network', 'crowd_tasks')
+        _, plain_queries = self._serialize(plain)
+        self.assertEqual(plain_queries, large_queries)
+
+    def test_batched_fields_match_per_object_serialization(self):
+        self._add_tasks(2)
+        tasks = list(Task.objects.prefetch_related(*FEED_PREFETCH).order_by('id'))
+
+        batched = TaskSerializer(tasks, many=True, context={'request': self.request}).data
+        single = [TaskSerializer(Task.objects.get(pk=t.pk), context={'request': self.request}).data for t in tasks]
+
+        self.assertEqual([dict(d) for d in batched], [dict(d) for d in single])
+        completion = batched[0]['completions'][0]
+        self.assertTrue(completion['username'].startswith('handle_'))
+        self.assertEqual(completion['social_data']['profile_url'], f"https://x.com/{completion['username']}")
+        self.assertTrue(batched[0]['has_review'])
+        self.assertEqual(batched[0]['my_review']['rating'], 5)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CompactFeedTests(TaskPageFixtureMixin, TestCase):
+    def _serialize_compact(self, queryset):
+        with CaptureQueriesContext(connection) as ctx:
+            data = TaskFeedSerializer(queryset, many=True, context={'request': self.request}).data
+        return data, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self._add_tasks(2, completions_per_task=7)
+        _, small_queries = self._serialize_compact(Task.objects.prefetch_related(*COMPACT_FEED_PREFETCH))
+        self._add_tasks(8, completions_per_task=7)
+        data, large_queries = self._serialize_compact(Task.objects.prefetch_related(*COMPACT_FEED_PREFETCH))
+
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(len(data), 10)
+
+    def test_compact_payload(self):
+        self._add_tasks(1, completions_per_task=7)
+        task = Task.objects.get()
+        latest = list(task.completions.order_by('-created_at', '-id')[:5])
+
+        item = TaskFeedSerializer([task], many=True, context={'request': self.request}).data[0]
+
+        self.assertNotIn('completions', item)
+        self.assertEqual(item['completions_count'], 7)
+        self.assertEqual(item['remaining_actions'], 10)
+        self.assertTrue(item['has_review'])
+        self.assertEqual([c['user_id'] for c in item['recent_completions']], [c.user_id for c in latest])
+        self.assertTrue(item['recent_completions'][0]['social_data']['username'].startswith('handle_'))
+
+    def test_feed_mode_param_and_completions_endpoint(self):
+        self._add_tasks(1, completions_per_task=7)
+        task = Task.objects.get()
+        client = APIClient()
+        client.force_authenticate(self.viewer)
+
+        compact = client.get('/api/tasks/?mode=compact')
+        full = client.get('/api/tasks/')
+        owner = APIClient()
+        owner.force_authenticate(self.creator)
+        detail = owner.get(f'/api/tasks/{task.id}/completions/')
+
+        self.assertEqual(compact.data['tasks'][0]['completions_count'], 7)
+        self.assertNotIn('completions', compact.data['tasks'][0])
+        self.assertEqual(len(full.data['tasks'][0]['completions']), 7)
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual(detail.data['count'], 7)
+        self.assertTrue(all(c['username'].startswith('handle_') for c in detail.data['completions']))
+        self.assertEqual(owner.get('/api/tasks/999999/completions/').status_code, 404)
+
+    def test_completions_endpoint_is_denied_to_non_owner(self):
+        self._add_tasks(1)
+        task = Task.objects.get()
+        client = APIClient()
+        client.force_authenticate(self.viewer)
+
+        response = client.get(f'/api/tasks/{task.id}/completions/')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('completions', response.data)
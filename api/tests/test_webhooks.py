@@ -0,0 +1,201 @@
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import socket
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import api_keys, rate_limit, webhooks
+from api.models import ApiKey, Task, WebhookDelivery, WebhookSubscription
+from api.tests.helpers import LOCMEM_CACHES, CompletionFixtureMixin
+
+
+class _Receiver(BaseHTTPRequestHandler):
+    """Stand-in for a customer endpoint: records requests, answers server.status_code."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((dict(self.headers), body))
+        self.send_response(self.server.status_code)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WebhookTests(CompletionFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limit.local_buckets.clear()
+        self.addCleanup(api_keys.flush_usage, force=True)
+        self._setup_task(actions_required=1)
+
+        self.server = HTTPServer(('127.0.0.1', 0), _Receiver)
+        self.server.received = []
+        self.server.status_code = 200
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        # Локальный приёмник — внутренний адрес, проверку адреса здесь отключаем
+        # (её покрывает WebhookUrlCheckTests)
+        patcher = mock.patch('api.webhooks.check_url')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.api_key = ApiKey.objects.create(user=self.creator, key_hash=api_keys.hash_api_key('upv_hooks'))
+        self.subscription = WebhookSubscription.objects.create(
+            api_key=self.api_key, url=f'http://127.0.0.1:{self.server.server_port}/hook', secret='s3cret',
+        )
+
+    def _close(self, task):
+        task.status = 'CLOSED'
+        task.deletion_reason = 'CLOSED_BY_OWNER'
+        task.save(update_fields=['status', 'deletion_reason'])
+
+    def test_completion_is_pushed_signed(self):
+        self.assertEqual(self._complete(self._performer(0)).status_code, 200)
+
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual((delivery.event_type, delivery.payload['task_id']), (webhooks.TASK_STATUS_CHANGED, self.task.id))
+        self.assertEqual(delivery.payload['status'], 'COMPLETED')
+
+        self.assertEqual(webhooks.deliver_due(), (1, 0))
+        headers, body = self.server.received[0]
+        self.assertEqual(
+            headers['X-Webhook-Signature'],
+            webhooks.sign('s3cret', headers['X-Webhook-Timestamp'], body),
+        )
+        events = json.loads(body)['events']
+        self.assertEqual([(e['id'], e['data']['status']) for e in events], [(delivery.id, 'COMPLETED')])
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts, delivery.response_status), ('DONE', 1, 200))
+
+    def test_events_of_subscription_are_batched(self):
+        tasks = [self.task] + [
+            Task.objects.create(
+                creator=self.creator, social_network=self.network, type='LIKE',
+                post_url=f'https://x.com/a/status/{n}', price=10, actions_required=1, original_price=10,
+            )
+            for n in range(2, 5)
+        ]
+        for task in tasks:
+            self._close(task)
+        # Сохранение без смены статуса событий не создаёт
+        tasks[0].save()
+
+        self.assertEqual(WebhookDelivery.objects.count(), 4)
+        self.assertEqual(webhooks.deliver_due(), (4, 0))
+        self.assertEqual(len(self.server.received), 1)
+        events = json.loads(self.server.received[0][1])['events']
+        self.assertEqual(
+            [(e['data']['task_id'], e['data']['status'], e['data']['deletion_reason']) for e in events],
+            [(task.id, 'CLOSED', 'CLOSED_BY_OWNER') for task in tasks],
+        )
+
+    def test_failed_delivery_backs_off_then_fails(self):
+        self.server.status_code = 500
+        self._close(self.task)
+
+        self.assertEqual(webhooks.deliver_due(), (0, 1))
+        delivery = WebhookDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.attempts, delivery.last_error), ('PENDING', 1, 'HTTP 500'))
+        self.assertGreater(delivery.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        # Ещё не пора — повторной отправки нет
+        self.assertEqual(webhooks.deliver_due(), (0, 0))
+
+        WebhookDelivery.objects.update(attempts=webhooks.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        self.assertEqual(webhooks.deliver_due(), (0, 1))
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts), ('FAILED', webhooks.MAX_ATTEMPTS))
+        self.assertEqual(len(self.server.received), 2)
+
+    def test_no_deliveries_without_active_subscription(self):
+        self.subscription.delete()
+        self._close(self.task)
+        self.assertFalse(WebhookDelivery.objects.exists())
+
+    def test_subscription_endpoints(self):
+        client = APIClient(HTTP_X_API_KEY='upv_hooks')
+        self.assertEqual(client.get('/api/public-api/webhooks/').status_code, 200)
+        self.assertEqual(APIClient().get('/api/public-api/webhooks/').status_code, 401)
+
+        response = client.post('/api/public-api/webhooks/', {'url': 'ftp://example.com/hook'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = client.post('/api/public-api/webhooks/', {'url': 'https://example.com/hook'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        created = WebhookSubscription.objects.get(id=response.data['webhook']['id'])
+        self.assertEqual(response.data['webhook']['secret'], created.secret)
+        self.assertEqual(len(created.secret), 64)
+
+        listed = client.get('/api/public-api/webhooks/').data['webhooks']
+        self.assertEqual([hook['id'] for hook in listed], [self.subscription.id, created.id])
+        self.assertNotIn('secret', listed[0])
+
+        self.assertEqual(client.delete(f'/api/public-api/webhooks/{created.id}/').status_code, 200)
+        self.assertEqual(client.delete(f'/api/public-api/webhooks/{created.id}/').status_code, 404)
+        self.assertFalse(WebhookSubscription.objects.filter(id=created.id).exists())
+
+
+def _resolves_to(*addresses):
+    return mock.patch(
+        'api.webhooks.socket.getaddrinfo',
+        return_value=[(socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, 443)) for address in addresses],
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WebhookUrlCheckTests(CompletionFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        rate_limit.local_buckets.clear()
+        self.addCleanup(api_keys.flush_usage, force=True)
+        self._setup_task(actions_required=1)
+        self.api_key = ApiKey.objects.create(user=self.creator, key_hash=api_keys.hash_api_key('upv_hooks'))
+        self.client = APIClient(HTTP_X_API_KEY='upv_hooks')
+
+    def _register(self, url):
+        return self.client.post('/api/public-api/webhooks/', {'url': url}, format='json')
+
+    def test_internal_and_plain_http_urls_are_rejected(self):
+        for url in [
+            'http://127.0.0.1/hook',
+            'http://169.254.169.254/latest/meta-data/',
+            'http://example.com/hook',
+            'https://127.0.0.1/hook',
+            'https://169.254.169.254/latest/meta-data/',
+            'https://[::1]/hook',
+            'https://[::ffff:10.0.0.1]/hook',
+        ]:
+            self.assertEqual(self._register(url).status_code, 400, url)
+
+        # Публичное имя, которое резолвится во внутреннюю сеть
+        with _resolves_to('93.184.216.34', '10.1.2.3'):
+            self.assertEqual(self._register('https://hooks.example.com/a').status_code, 400)
+        with _resolves_to('93.184.216.34'):
+            self.assertEqual(self._register('https://hooks.example.com/a').status_code, 201)
+        self.assertEqual(WebhookSubscription.objects.count(), 1)
+
+    def test_host_is_checked_again_before_sending(self):
+        with _resolves_to('93.184.216.34'):
+            self._register('https://hooks.example.com/a')
+        task = Task.objects.get(pk=self.task.pk)
+        task.status = 'CLOSED'
+        task.save(update_fields=['status'])
+
+        # DNS хоста поменялся на адрес метаданных облака
+        with _resolves_to('169.254.169.254'), mock.patch.object(webhooks._session, 'post') as post:
+            self.assertEqual(webhooks.deliver_due(), (0, 1))
+        post.assert_not_called()
+        self.assertIn('public address', WebhookDelivery.objects.get().last_error)
+
+        WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+        with _resolves_to('93.184.216.34'), mock.patch.object(webhooks._session, 'post') as post:
+            post.return_value.status_code = 200
+            self.assertEqual(webhooks.deliver_due(), (1, 0))
+        self.assertFalse(post.call_args.kwargs['allow_redirects'])
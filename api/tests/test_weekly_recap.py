@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api import weekly_recap
+from api.models import (
+    EmailSubscriptionType, FirebaseIdentity, SocialNetwork, Task, TaskCompletion, UserEmailSubscription,
+)
+
+# Понедельник
+NOW = datetime(2026, 10, 12, 9, 0, tzinfo=dt_timezone.utc)
+
+
+@override_settings(DEFAULT_FROM_EMAIL='noreply@upvote.club', EMAIL_SEND_RATE=0)
+class WeeklyRecapTests(TestCase):
+    def setUp(self):
+        self.subscription_type = EmailSubscriptionType.objects.create(name='weekly_recap', description='x')
+        self.twitter = SocialNetwork.objects.create(name='Recap Twitter', code='RECAPTW')
+        self.reddit = SocialNetwork.objects.create(name='Recap Reddit', code='RECAPRD')
+        creator = User.objects.create_user(username='recap_creator', password='x')
+        self.tasks = [
+            Task.objects.create(
+                creator=creator, social_network=network, type=action,
+                post_url=f'https://example.com/{i}', price=10, actions_required=100, original_price=1000,
+            )
+            for i, (network, action) in enumerate([
+                (self.twitter, 'LIKE'), (self.twitter, 'REPOST'), (self.twitter, 'LIKE'), (self.reddit, 'UPVOTE'),
+            ])
+        ]
+        self.users = [User.objects.create_user(username=f'recap_uid_{i}', password='x') for i in range(4)]
+        for user in self.users[:3]:
+            UserEmailSubscription.objects.create(user=user, subscription_type=self.subscription_type)
+        FirebaseIdentity.objects.bulk_create([
+            FirebaseIdentity(uid=user.username, email=f'{user.username}@example.com', synced_at=timezone.now())
+            for user in self.users
+        ])
+        _, self.current_week_start, _ = weekly_recap.week_bounds(NOW)
+
+    def _complete(self, user, task, days_ago):
+        TaskCompletion.objects.create(
+            user=user, task=task, action=task.type, created_at=NOW - timedelta(days=days_ago, hours=1)
+        )
+
+    def _activity(self):
+        # user 0: 3 задания на этой неделе, 2 на прошлой
+        for task in self.tasks[:3]:
+            self._complete(self.users[0], task, days_ago=1)
+        self._complete(self.users[0], self.tasks[3], days_ago=9)
+        # user 1: только прошлая неделя
+        self._complete(self.users[1], self.tasks[0], days_ago=10)
+        # user 2 неактивен, user 3 не подписан
+        self._complete(self.users[3], self.tasks[3], days_ago=2)
+
+    def test_recaps_are_computed_in_constant_queries(self):
+        self._activity()
+        subscriptions = UserEmailSubscription.objects.filter(subscription_type=self.subscription_type)
+
+        with self.assertNumQueries(4):
+            recaps = {subscription.user: data for subscription, data in weekly_recap.iter_recaps(subscriptions, self.current_week_start)}
+
+        self.assertEqual(set(recaps), {self.users[0], self.users[1]})
+        first = recaps[self.users[0]]
+        self.assertEqual((first['total_tasks'], first['tasks_change_percentage']), (3, 200.0))
+        self.assertEqual(first['networks'], [{
+            'name': 'Recap Twitter',
+            'actions': [
+                {'name': 'LIKE', 'count': 2, 'emoji': '❤️'},
+                {'name': 'REPOST', 'count': 1, 'emoji': '🔄'},
+            ],
+        }])
+        self.assertEqual(first['leaderboard'], [
+            {'username': 'recap_uid_0', 'points': 3}, {'username': 'recap_uid_3', 'points': 1},
+        ])
+        second = recaps[self.users[1]]
+        self.assertEqual((second['total_tasks'], second['tasks_change_percentage'], second['networks']), (0, -100.0, []))
+
+    def test_command_sends_recaps_and_reports_queries(self):
+        self._activity()
+        out = StringIO()
+
+        with mock.patch('api.management.commands.send_weekly_recap.timezone.now', return_value=NOW):
+            call_command('send_weekly_recap', stdout=out)
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['recap_uid_0@example.com', 'recap_uid_1@example.com'])
+        self.assertIn('↓ 100.0% from last week', mail.outbox[[m.to[0] for m in mail.outbox].index('recap_uid_1@example.com')].alternatives[0][0])
+        self.assertIn('Successful: 2', out.getvalue())
+        self.assertIn('Queries: ', out.getvalue())
@@ -15,7 +15,7 @@ from .views import (
 from .stripe_webhooks import stripe_webhook
 from .views_landings import ActionLandingViewSet
 from .views_median_speed import MedianSpeedView
-from .public_api_views import generate_api_key, create_task_via_api, get_task_status, list_api_keys, create_crowd_task_via_api
+from .public_api_views import generate_api_key, create_task_via_api, create_tasks_bulk_via_api, get_task_status, list_api_keys, create_crowd_task_via_api, webhooks_view, delete_webhook
 
 router = DefaultRouter()
 router.register(r'profile', views.UserProfileViewSet)
@@ -77,6 +77,8 @@ urlpatterns = [
     path('tasks/<int:task_id>/promote/', views.promote_task, name='promote_task'),
     path('points-available-for-purchase/', views.points_available_for_purchase, name='points_available_for_purchase'),
     path('verified-accounts-count/', get_verified_accounts_count, name='verified_accounts_count'),
+    path('platform-stats/', views.get_platform_stats, name='platform_stats'),
+    path('leaderboard/', views.get_leaderboard, name='leaderboard'),
     path('onboarding-progress/', views.onboarding_progress, name='onboarding_progress'),
     path('save-referrer-tracking/', views.save_referrer_tracking, name='save_referrer_tracking'),
     path('telegram/webhook/', views.telegram_webhook, name='telegram_webhook'),
@@ -98,7 +100,10 @@ urlpatterns = [
     path('public-api/generate-key/', generate_api_key, name='generate_api_key'),
     path('public-api/list-keys/', list_api_keys, name='list_api_keys'),
     path('public-api/create-task/', create_task_via_api, name='create_task_via_api'),
+    path('public-api/create-tasks/bulk/', create_tasks_bulk_via_api, name='create_tasks_bulk_via_api'),
     path('public-api/create-crowd-task/', create_crowd_task_via_api, name='create_crowd_task_via_api'),
     path('public-api/task-status/<int:task_id>/', get_task_status, name='get_task_status'),
     path('public-api/task-status/', get_task_status, name='get_task_status_list'),
+    path('public-api/webhooks/', webhooks_view, name='webhooks'),
+    path('public-api/webhooks/<int:webhook_id>/', delete_webhook, name='delete_webhook'),
 ]
\ No newline at end of file
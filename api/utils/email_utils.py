@@ -6,6 +6,7 @@ from django.contrib.auth.models import User
 from urllib.parse import urlencode
 from ..models import UserEmailSubscription, EmailSubscriptionType, Task
 from ..email_service import EmailService
+from .. import firebase_identity
 from firebase_admin import auth
 from ..models import TaskCompletion
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -14,10 +15,12 @@ import time
 logger = logging.getLogger(__name__)
 
 def get_firebase_email(firebase_uid):
+    """Email из локального зеркала Firebase (см. api/firebase_identity.py)"""
     try:
-        user = auth.get_user(firebase_uid)
-        logger.info(f"Retrieved Firebase email for UID {firebase_uid}: {user.email}")
-        return user.email
+        email = firebase_identity.get_email(firebase_uid)
+        if not email:
+            logger.error(f"No Firebase email for UID {firebase_uid}")
+        return email
     except Exception as e:
         logger.error(f"Error getting Firebase email for UID {firebase_uid}: {str(e)}")
         return None
@@ -373,8 +376,9 @@ def send_new_task_notification(task):
             subscription_type=subscription_type,
             is_subscribed=True
         ).select_related('user').exclude(user=task.creator)  # Исключаем создателя задания
+        subscriptions = list(subscriptions)
 
-        logger.info(f"Found {subscriptions.count()} subscribed users (excluding task creator)")
+        logger.info(f"Found {len(subscriptions)} subscribed users (excluding task creator)")
 
         success_count = 0
         failed_count = 0
@@ -409,16 +413,13 @@ def send_new_task_notification(task):
             }
             return emoji_map.get(task_type, '🎯')
 
-        for i, subscription in enumerate(subscriptions, 1):
+        emails = firebase_identity.get_emails([subscription.user.username for subscription in subscriptions])
+        messages = []
+
+        for subscription in subscriptions:
             try:
                 user = subscription.user
-                logger.info(f"""
-                    Processing user {i}/{subscriptions.count()}:
-                    Username: {user.username}
-                    Subscription ID: {subscription.id}
-                """)
-
-                user_email = get_firebase_email(user.username)
+                user_email = emails.get(user.username)
 
                 if not user_email:
                     error_msg = f"Could not get Firebase email for user {user.username}"
@@ -426,8 +427,6 @@ def send_new_task_notification(task):
                     failed_count += 1
                     continue
 
-                logger.info(f"Retrieved email {user_email} for user {user.username}")
-
                 # Формируем контекст для шаблона
                 context = {
                     'task': {
@@ -441,41 +440,29 @@ def send_new_task_notification(task):
                     'unsubscribe_url': f"{settings.SITE_URL}/api/unsubscribe/{subscription.unsubscribe_token}/"
                 }
 
-                logger.info(f"""
-                    Email context prepared for user {user.username}:
-                    Display Type: {context['task']['display_type']}
-                    Task URL: {context['task']['task_url']}
-                """)
-
-                html_content = render_to_string('email/new_task.html', context)
-                logger.info(f"Email template rendered for user {user.username}")
-
-                email_service = EmailService()
-                if email_service.send_email(
-                    to_email=user_email,
-                    subject=f'New Task & {task.price} points commes to you from upvote.club',
-                    html_content=html_content,
-                    unsubscribe_url=context['unsubscribe_url']
-                ):
-                    success_count += 1
-                    logger.info(f"Successfully sent new task notification to {user_email}")
-                else:
-                    failed_count += 1
-                    logger.error(f"Failed to send new task notification to {user_email}")
-
-                # Делаем паузу между отправками
-                if i < subscriptions.count():
-                    logger.info("Waiting 10 seconds before next email...")
-                    time.sleep(10)
+                messages.append({
+                    'to_email': user_email,
+                    'subject': f'New Task & {task.price} points commes to you from upvote.club',
+                    'html_content': render_to_string('email/new_task.html', context),
+                    'unsubscribe_url': context['unsubscribe_url'],
+                })
 
             except Exception as e:
                 failed_count += 1
-                logger.error(f"Error sending new task notification to user {user.username}: {str(e)}", exc_info=True)
+                logger.error(f"Error preparing new task notification for user {user.username}: {str(e)}", exc_info=True)
+
+        # Одно соединение на пачку писем, скорость ограничена EMAIL_SEND_RATE
+        for result in EmailService().send_bulk(messages):
+            if result['sent']:
+                success_count += 1
+            else:
+                failed_count += 1
+                logger.error(f"Failed to send new task notification to {result['to_email']}: {result['error']}")
 
         logger.info(f"""
             New task notification sending completed:
             Task ID: {task.id}
-            Total subscribers: {subscriptions.count()}
+            Total subscribers: {len(subscriptions)}
             Successfully sent: {success_count}
             Failed: {failed_count}
         """)
@@ -619,10 +606,10 @@ def send_inviter_notification_email(inviter, invited_user):
         logger.error(f"[send_inviter_notification_email] Error sending notification: {str(e)}", exc_info=True)
         return False
 
-def send_weekly_recap_email(user, data):
+def build_weekly_recap_email(user, data, user_email, subscription):
     """
-    Отправляет еженедельный отчет пользователю
-    
+    Еженедельный отчет: kwargs для EmailService.send_email / send_bulk
+
     Args:
         user: User object
         data: dict с данными для шаблона:
@@ -637,6 +624,29 @@ def send_weekly_recap_email(user, data):
             - leaderboard: list[dict]
                 - username: str
                 - points: int
+        user_email: email пользователя из Firebase
+        subscription: UserEmailSubscription на weekly_recap
+    """
+    unsubscribe_url = f"{settings.SITE_URL}/api/unsubscribe/{subscription.unsubscribe_token}/"
+
+    # Формируем контекст для шаблона
+    context = {
+        'user': user,
+        'user_email': user_email,
+        'unsubscribe_url': unsubscribe_url,
+        **data  # Добавляем все данные из аргумента data
+    }
+
+    return {
+        'to_email': user_email,
+        'subject': 'Your Weekly Recap 📊',
+        'html_content': render_to_string('email/weekly_recap.html', context),
+        'unsubscribe_url': unsubscribe_url,
+    }
+
+def send_weekly_recap_email(user, data):
+    """
+    Отправляет еженедельный отчет пользователю (data — см. build_weekly_recap_email)
     """
     try:
         logger.info(f"Starting weekly recap email preparation for user {user.username}")
@@ -655,8 +665,6 @@ def send_weekly_recap_email(user, data):
             is_subscribed=True
         )
         
-        unsubscribe_url = f"{settings.SITE_URL}/api/unsubscribe/{subscription.unsubscribe_token}/"
-        
         logger.info(f"""
             Weekly recap stats for user {user.username}:
             Total tasks: {data['total_tasks']}
@@ -665,23 +673,8 @@ def send_weekly_recap_email(user, data):
             Leaderboard entries: {len(data['leaderboard'])}
         """)
 
-        # Формируем контекст для шаблона
-        context = {
-            'user': user,
-            'user_email': user_email,
-            'unsubscribe_url': unsubscribe_url,
-            **data  # Добавляем все данные из аргумента data
-        }
-
-        html_content = render_to_string('email/weekly_recap.html', context)
-        
         email_service = EmailService()
-        result = email_service.send_email(
-            to_email=user_email,
-            subject='Your Weekly Recap 📊',
-            html_content=html_content,
-            unsubscribe_url=unsubscribe_url
-        )
+        result = email_service.send_email(**build_weekly_recap_email(user, data, user_email, subscription))
         
         if result:
             logger.info(f"Successfully sent weekly recap to {user_email}")
@@ -954,6 +947,58 @@ def send_task_created_email(task):
         logger.error(f"Error sending task created email for task #{task.id}: {str(e)}", exc_info=True)
         return False
 
+def build_producthunt_upvote_request_email(user, task, user_email):
+    """
+    Письмо с призывом поддержать ProductHunt задание: kwargs для EmailService.send_email / send_bulk
+    Args:
+        user: User object - пользователь с подтвержденным ProductHunt
+        task: Task object - ProductHunt задание для апвота
+        user_email: email пользователя из Firebase
+    """
+    # Получаем или создаем подписку для отписки
+    unsubscribe_url = None
+    try:
+        subscription_type = EmailSubscriptionType.objects.get(name='new_task')
+        subscription, _ = UserEmailSubscription.objects.get_or_create(
+            user=user,
+            subscription_type=subscription_type,
+            defaults={'is_subscribed': True}
+        )
+        unsubscribe_url = f"{settings.SITE_URL}/api/unsubscribe/{subscription.unsubscribe_token}/"
+    except EmailSubscriptionType.DoesNotExist:
+        logger.warning(f"EmailSubscriptionType 'new_task' not found for user {user.username}")
+        unsubscribe_url = f"{settings.SITE_URL}/settings"
+    except Exception as e:
+        logger.warning(f"Could not generate unsubscribe URL for user {user.username}: {str(e)}")
+        unsubscribe_url = f"{settings.SITE_URL}/settings"
+
+    # Формируем ссылку на задание с параметрами taskid и userid
+    base_url = task.post_url
+    separator = '&' if '?' in base_url else '?'
+    task_url = f"{base_url}{separator}taskid={task.id}&userid={user.id}"
+
+    # Вычисляем награду (половина от цены за действие)
+    reward = task.original_price / task.actions_required / 2
+
+    # Формируем context для html шаблона
+    context = {
+        'username': user.username,
+        'task': task,
+        'task_url': task_url,
+        'reward': int(reward),
+        'user_email': user_email,
+        'unsubscribe_url': unsubscribe_url
+    }
+
+    return {
+        'to_email': user_email,
+        'subject': 'Help us launch on Product Hunt - Earn points!',
+        'html_content': render_to_string('email/producthunt_upvote_request.html', context),
+        'unsubscribe_url': unsubscribe_url,
+        'bcc_email': 'yesupvote@gmail.com',
+    }
+
+
 def send_producthunt_upvote_request_email(user, task):
     """
     Отправляет пользователю письмо с призывом поддержать ProductHunt задание
@@ -962,67 +1007,13 @@ def send_producthunt_upvote_request_email(user, task):
         task: Task object - ProductHunt задание для апвота
     """
     try:
-        logger.info(f"""
-            Starting ProductHunt upvote request email preparation:
-            User: {user.username}
-            Task ID: {task.id}
-            Task URL: {task.post_url}
-        """)
-
         # Получаем email пользователя из Firebase
         user_email = get_firebase_email(user.username)
         if not user_email:
             logger.error(f"Could not get Firebase email for user {user.username}")
             return False
 
-        # Получаем или создаем подписку для отписки
-        unsubscribe_url = None
-        try:
-            subscription_type = EmailSubscriptionType.objects.get(name='new_task')
-            subscription, _ = UserEmailSubscription.objects.get_or_create(
-                user=user,
-                subscription_type=subscription_type,
-                defaults={'is_subscribed': True}
-            )
-            unsubscribe_url = f"{settings.SITE_URL}/api/unsubscribe/{subscription.unsubscribe_token}/"
-            logger.info(f"Unsubscribe URL for new_task: {unsubscribe_url}")
-        except EmailSubscriptionType.DoesNotExist:
-            logger.warning(f"EmailSubscriptionType 'new_task' not found for user {user.username}")
-            unsubscribe_url = f"{settings.SITE_URL}/settings"
-        except Exception as e:
-            logger.warning(f"Could not generate unsubscribe URL for user {user.username}: {str(e)}")
-            unsubscribe_url = f"{settings.SITE_URL}/settings"
-
-        # Формируем ссылку на задание с параметрами taskid и userid
-        base_url = task.post_url
-        separator = '&' if '?' in base_url else '?'
-        task_url = f"{base_url}{separator}taskid={task.id}&userid={user.id}"
-        
-        # Вычисляем награду (половина от цены за действие)
-        reward = task.original_price / task.actions_required / 2
-
-        # Формируем context для html шаблона
-        context = {
-            'username': user.username,
-            'task': task,
-            'task_url': task_url,
-            'reward': int(reward),
-            'user_email': user_email,
-            'unsubscribe_url': unsubscribe_url
-        }
-        
-        logger.info(f"Rendering HTML email template for ProductHunt upvote request (user={user.username}, task_id={task.id})")
-        html_content = render_to_string('email/producthunt_upvote_request.html', context)
-        logger.info(f"HTML content rendered for ProductHunt upvote request email, length: {len(html_content)} chars")
-
-        email_service = EmailService()
-        result = email_service.send_email(
-            to_email=user_email,
-            subject='Help us launch on Product Hunt - Earn points!',
-            html_content=html_content,
-            unsubscribe_url=unsubscribe_url,
-            bcc_email='yesupvote@gmail.com'
-        )
+        result = EmailService().send_email(**build_producthunt_upvote_request_email(user, task, user_email))
 
         if result:
             logger.info(f"Successfully sent ProductHunt upvote request email to {user_email} (user: {user.username}, task: {task.id})")
@@ -1074,6 +1065,10 @@ def send_producthunt_campaign_emails(task):
         failed_count = 0
         skipped_count = 0
         processed_users = set()  # Отслеживаем обработанных пользователей (защита от дублей)
+        verified_profiles = list(verified_profiles)
+        emails = firebase_identity.get_emails([profile.user.username for profile in verified_profiles])
+        completed_user_ids = set(task.taskcompletion_set.values_list('user_id', flat=True))
+        messages = []
         
         for profile in verified_profiles:
             try:
@@ -1091,7 +1086,7 @@ def send_producthunt_campaign_emails(task):
                     continue
                 
                 # Проверяем что пользователь еще не выполнял это задание
-                if task.taskcompletion_set.filter(user=user).exists():
+                if user.id in completed_user_ids:
                     logger.info(f"User {user.username} already completed this task")
                     skipped_count += 1
                     continue
@@ -1111,20 +1106,25 @@ def send_producthunt_campaign_emails(task):
                     # Если подписки еще нет, значит пользователь не отписывался
                     pass
                 
-                # Отправляем email
-                if send_producthunt_upvote_request_email(user, task):
-                    sent_count += 1
-                    logger.info(f"Sent ProductHunt campaign email to {user.username}")
-                else:
+                user_email = emails.get(user.username)
+                if not user_email:
                     failed_count += 1
-                    logger.warning(f"Failed to send ProductHunt campaign email to {user.username}")
+                    logger.error(f"Could not get Firebase email for user {user.username}")
+                    continue
                 
-                # Небольшая задержка между отправками
-                time.sleep(1)
+                messages.append(build_producthunt_upvote_request_email(user, task, user_email))
                 
             except Exception as e:
                 failed_count += 1
-                logger.error(f"Error sending campaign email to {profile.user.username}: {str(e)}", exc_info=True)
+                logger.error(f"Error preparing campaign email for {profile.user.username}: {str(e)}", exc_info=True)
+        
+        # Отправляем пачками через одно соединение (скорость — EMAIL_SEND_RATE)
+        for result in EmailService().send_bulk(messages):
+            if result['sent']:
+                sent_count += 1
+            else:
+                failed_count += 1
+                logger.warning(f"Failed to send ProductHunt campaign email to {result['to_email']}: {result['error']}")
         
         total_unique_users = len(processed_users)
         
@@ -1146,7 +1146,7 @@ def send_producthunt_campaign_emails(task):
 def send_task_promotion_emails(task):
     """
     Отправляет промо-письма о задании всем пользователям с верифицированным аккаунтом в данной социальной сети.
-    Ограничение: не более 10 писем в секунду.
+    Ограничение скорости — settings.EMAIL_SEND_RATE (по умолчанию 10 писем в секунду).
     
     Args:
         task: объект Task для промоушена
@@ -1215,9 +1215,9 @@ def send_task_promotion_emails(task):
             )
             logger.info(f"Created subscription type: {subscription_type.name}")
         
-        # Счетчик для ограничения скорости отправки (10 писем/сек)
-        emails_in_current_second = 0
-        current_second_start = time.time()
+        verified_profiles = list(verified_profiles)
+        emails = firebase_identity.get_emails([profile.user.username for profile in verified_profiles])
+        messages = []
         
         for profile in verified_profiles:
             try:
@@ -1260,30 +1260,13 @@ def send_task_promotion_emails(task):
                     logger.warning(f"Could not check status for user {user.username}: {str(e)}")
                 
                 # Получаем email из Firebase
-                firebase_uid = user.username
-                user_email = get_firebase_email(firebase_uid)
+                user_email = emails.get(user.username)
                 
                 if not user_email:
                     failed_count += 1
                     logger.warning(f"Could not get Firebase email for user {user.username}")
                     continue
                 
-                # Ограничение скорости: не более 10 писем в секунду
-                current_time = time.time()
-                if current_time - current_second_start >= 1.0:
-                    # Прошла секунда, сбрасываем счетчик
-                    emails_in_current_second = 0
-                    current_second_start = current_time
-                
-                if emails_in_current_second >= 10:
-                    # Достигли лимита, ждем до конца секунды
-                    time_to_wait = 1.0 - (current_time - current_second_start)
-                    if time_to_wait > 0:
-                        logger.debug(f"Rate limit: waiting {time_to_wait:.2f}s before next batch")
-                        time.sleep(time_to_wait)
-                    emails_in_current_second = 0
-                    current_second_start = time.time()
-                
                 # Формируем context для html шаблона
                 context = {
                     'task': task,
@@ -1295,27 +1278,25 @@ def send_task_promotion_emails(task):
                 logger.debug(f"Rendering promotion email for user {user.username}")
                 html_content = render_to_string('email/task_promotion.html', context)
                 
-                # Отправляем email
-                email_service = EmailService()
-                result = email_service.send_email(
-                    to_email=user_email,
-                    subject=f'🚀 New {task.type} task on {task.social_network.name} - Earn {task.price} points!',
-                    html_content=html_content,
-                    unsubscribe_url=context['unsubscribe_url'],
-                    bcc_email='yesupvote@gmail.com'
-                )
-                
-                if result:
-                    sent_count += 1
-                    emails_in_current_second += 1
-                    logger.info(f"✓ Sent promotion email to {user.username} ({user_email})")
-                else:
-                    failed_count += 1
-                    logger.warning(f"✗ Failed to send promotion email to {user.username}")
+                messages.append({
+                    'to_email': user_email,
+                    'subject': f'🚀 New {task.type} task on {task.social_network.name} - Earn {task.price} points!',
+                    'html_content': html_content,
+                    'unsubscribe_url': context['unsubscribe_url'],
+                    'bcc_email': 'yesupvote@gmail.com',
+                })
                 
             except Exception as e:
                 failed_count += 1
-                logger.error(f"Error sending promotion email to {profile.user.username}: {str(e)}", exc_info=True)
+                logger.error(f"Error preparing promotion email for {profile.user.username}: {str(e)}", exc_info=True)
+        
+        # Пачки по EMAIL_BATCH_SIZE писем через одно соединение, token bucket по EMAIL_SEND_RATE
+        for result in EmailService().send_bulk(messages):
+            if result['sent']:
+                sent_count += 1
+            else:
+                failed_count += 1
+                logger.warning(f"✗ Failed to send promotion email to {result['to_email']}: {result['error']}")
         
         total_unique_users = len(processed_users)
         
@@ -0,0 +1,50 @@
+from urllib.parse import urlsplit
+
+# Мобильные/пустые поддомены, которые считаем тем же хостом
+_HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'vm.')
+# Известные алиасы доменов -> канонический хост
+_HOST_ALIASES = {
+    'youtu.be': 'youtube.com',
+    'youtube-nocookie.com': 'youtube.com',
+}
+
+
+def normalize_url(raw_url: str) -> str:
+    """Normalize URL for duplicate detection.
+    Rules:
+      - ignore query and fragment
+      - lowercase hostname
+      - drop trailing '/'
+      - treat http/https as the same (ignore scheme)
+      - strip leading 'www.' (and 'm.', 'mobile.', 'vm.')
+      - map known domain aliases to a canonical host
+    Returns a comparison key in the form 'host/path'.
+    Stored as Task.normalized_post_url / TaskCompletion.normalized_post_url.
+    """
+    try:
+        parts = urlsplit(raw_url or '')
+        netloc = parts.netloc.lower()
+        for prefix in _HOST_PREFIXES:
+            if netloc.startswith(prefix):
+                netloc = netloc[len(prefix):]
+                break
+        netloc = _HOST_ALIASES.get(netloc, netloc)
+        path = parts.path.rstrip('/') if parts.path != '/' else ''
+        return f"{netloc}{path}"
+    except Exception:
+        safe = (raw_url or '')
+        # remove scheme
+        if '://' in safe:
+            safe = safe.split('://', 1)[1]
+        # strip query/fragment
+        safe = safe.split('#')[0].split('?')[0]
+        safe = safe.rstrip('/')
+        for prefix in _HOST_PREFIXES:
+            if safe.startswith(prefix):
+                safe = safe[len(prefix):]
+                break
+        # normalize known domain aliases without full parsing
+        safe = safe.lower()
+        host, _, rest = safe.partition('/')
+        host = _HOST_ALIASES.get(host, host)
+        return host + (('/' + rest) if rest else '')
@@ -27,7 +27,7 @@ from .models import (
 from firebase_admin import auth
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.conf import settings
-from .serializers import UserProfileSerializer, TaskSerializer, BlogPostSerializer, TaskReportSerializer, SocialNetworkWithActionsSerializer, ActionLandingSerializer, BuyLandingSerializer, InvitedUserSerializer, UserSocialProfileSerializer, CreateUserSocialProfileSerializer, WithdrawalSerializer, CreateWithdrawalSerializer, WithdrawalStatsSerializer, OnboardingProgressSerializer, ReviewSerializer, ReferrerTrackingSerializer
+from .serializers import UserProfileSerializer, TaskSerializer, BlogPostSerializer, TaskReportSerializer, SocialNetworkWithActionsSerializer, ActionLandingSerializer, BuyLandingSerializer, InvitedUserSerializer, UserSocialProfileSerializer, CreateUserSocialProfileSerializer, WithdrawalSerializer, CreateWithdrawalSerializer, WithdrawalStatsSerializer, OnboardingProgressSerializer, ReviewSerializer, ReferrerTrackingSerializer, TaskFeedSerializer, TaskCompletionSerializer
 from .constants import BONUS_ACTION_COUNTRIES, BONUS_ACTION_RATE, REDDIT_VERIFICATION_CONFIG
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.db import transaction as db_transaction
@@ -45,7 +45,8 @@ import tweepy
 from django.http import HttpResponseBadRequest, HttpResponseRedirect, HttpResponse
 import uuid
 from rest_framework.decorators import action
-from django.db.models import Case, When, IntegerField, F, Q
+from django.db.models import Case, When, IntegerField, F, Q, Value, ExpressionWrapper, DateTimeField, DurationField
+from django.db.models.lookups import Exact
 from django.db.models import Prefetch
 from .models import UserSocialProfile
 from rest_framework.filters import SearchFilter, OrderingFilter
@@ -61,10 +62,12 @@ import stripe
 from django.core.cache import cache
 from .constants import SUBSCRIPTION_PLAN_CONFIG, SUBSCRIPTION_PERIODS
 from .views_landings import ActionLandingViewSet
+from .task_feed import get_task_feed, get_network_stats, available_entries, FEED_PREFETCH, COMPACT_FEED_PREFETCH
+from . import platform_stats, landing_cache, task_feed, outbox, firebase_identity, leaderboard, earnings, webhooks
+from .utils.url_normalizer import normalize_url
 import traceback
 import random
 from django.db.models import Sum, Count
-from django.db.models.functions import TruncHour, TruncDay, TruncMonth
 from django.db.models import Value
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
@@ -663,6 +666,10 @@ def resend_confirmation_email(request):
         logger.error(f"[resend_confirmation_email] Error: {str(e)}", exc_info=True)
         return Response({'success': False, 'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def is_compact_feed_request(request):
+    return (request.query_params.get('mode') or '').lower() == 'compact'
+
+
 class TaskViewSet(viewsets.ModelViewSet):
     queryset = Task.objects.all().prefetch_related(
         'completions',
@@ -679,261 +686,39 @@ class TaskViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     authentication_classes = [JWTAuthentication]
     
-    def get_queryset(self):
-        try:
-            user = self.request.user
-
-            social_network_code = self.request.query_params.get('social_network')
-
-            # --- PINNED TASKS ---
-            # Получаем id задач, которые пользователь уже выполнял
-            completed_task_ids = set(TaskCompletion.objects.filter(user=user).values_list('task_id', flat=True))
-
-            pinned_tasks_qs = Task.objects.filter(
-                status='ACTIVE',
-                is_pinned=True
-            ).exclude(creator=user)
-            if social_network_code:
-                pinned_tasks_qs = pinned_tasks_qs.filter(social_network__code=social_network_code.upper())
-            if completed_task_ids:
-                pinned_tasks_qs = pinned_tasks_qs.exclude(id__in=completed_task_ids)
-            pinned_tasks_qs = pinned_tasks_qs.prefetch_related('crowd_tasks').order_by('-created_at')
-            pinned_tasks = list(pinned_tasks_qs)
-
-            # --- ORDINARY TASKS ---
-            completed_combinations = TaskCompletion.objects.filter(
-                user=user
-            ).values_list(
-                'task__post_url',
-                'task__type',
-                'task__social_network'
-            ).distinct()
-
-            # Нормализация URL: убрать query/fragment, нижний регистр хоста, убрать финальный '/'
-            def _normalize_url(raw_url: str) -> str:
-                """Normalize URL for duplicate detection.
-                Rules:
-                  - ignore query and fragment
-                  - lowercase hostname
-                  - drop trailing '/'
-                  - treat http/https as the same (ignore scheme)
-                  - strip leading 'www.'
-                Returns a comparison key in the form 'host/path'.
-                """
-                try:
-                    from urllib.parse import urlsplit
-                    parts = urlsplit(raw_url)
-                    netloc = parts.netloc.lower()
-                    # unify common mobile/bare subdomains
-                    for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-                        if netloc.startswith(prefix):
-                            netloc = netloc[len(prefix):]
-                            break
-                    # map known domain aliases to a canonical host
-                    if netloc in {'youtu.be', 'youtube-nocookie.com'}:
-                        netloc = 'youtube.com'
-                    path = parts.path.rstrip('/') if parts.path != '/' else ''
-                    return f"{netloc}{path}"
-                except Exception:
-                    safe = (raw_url or '')
-                    # remove scheme
-                    if '://' in safe:
-                        safe = safe.split('://', 1)[1]
-                    # strip query/fragment
-                    safe = safe.split('#')[0].split('?')[0]
-                    safe = safe.rstrip('/')
-                    # strip common prefixes
-                    for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-                        if safe.startswith(prefix):
-                            safe = safe[len(prefix):]
-                            break
-                    # normalize known domain aliases without full parsing
-                    safe = safe.lower()
-                    host, _, rest = safe.partition('/')
-                    if host in {'youtu.be', 'youtube-nocookie.com'}:
-                        host = 'youtube.com'
-                    return host + (('/' + rest) if rest else '')
-
-            # Собираем множество завершённых комбинаций с нормализованным post_url
-            completed_combo_set = set(
-                (
-                    _normalize_url(url or ''),
-                    t_type,
-                    sn_id,
-                )
-                for (url, t_type, sn_id) in completed_combinations
-            )
-
-            # Дополнительно исключаем закреплённые задания по нормализованной комбинации
-            try:
-                before_pinned_count = len(pinned_tasks)
-                pinned_tasks = [
-                    t for t in pinned_tasks
-                    if (
-                        _normalize_url(getattr(t, 'post_url', '') or ''),
-                        getattr(t, 'type', None),
-                        getattr(t, 'social_network_id', None),
-                    ) not in completed_combo_set
-                ]
-                # Ограничиваем количество закрепленных задач до 10
-                pinned_tasks = pinned_tasks[:10]
-            except Exception as e:
-                pass
-
-            reported_tasks = TaskReport.objects.filter(
-                user=user
-            ).values_list('task_id', flat=True)
+    def is_compact_feed(self):
+        """?mode=compact — лента без полного списка completions (см. TaskFeedSerializer)"""
+        return is_compact_feed_request(self.request)
 
-            available_tasks = Task.objects.filter(
-                status='ACTIVE',
-                is_pinned=False  # исключаем закреплённые
-            ).exclude(
-                creator=user
-            ).exclude(
-                id__in=reported_tasks
-            )
-
-            # Исключаем обычные задания по нормализованной комбинации
-            try:
-                if completed_combo_set:
-                    # Ограничим кандидатов по типам и соцсетям для эффективности
-                    types_set = list({t for (_, t, _) in completed_combo_set if t is not None})
-                    sn_ids_set = list({sn for (_, _, sn) in completed_combo_set if sn is not None})
-
-                    candidates = available_tasks.filter(
-                        type__in=types_set,
-                        social_network_id__in=sn_ids_set
-                    ).values('id', 'post_url', 'type', 'social_network_id')
-
-                    ids_to_exclude = []
-                    for c in candidates:
-                        if (
-                            _normalize_url(c.get('post_url') or ''),
-                            c.get('type'),
-                            c.get('social_network_id'),
-                        ) in completed_combo_set:
-                            ids_to_exclude.append(c['id'])
-
-                    if ids_to_exclude:
-                        available_tasks = available_tasks.exclude(id__in=ids_to_exclude)
-            except Exception as e:
-                pass
+    def get_serializer_class(self):
+        if self.action == 'list' and self.is_compact_feed():
+            return TaskFeedSerializer
+        return super().get_serializer_class()
 
-            if social_network_code:
-                available_tasks = available_tasks.filter(
-                    social_network__code=social_network_code.upper()
-                )
-
-            # Фильтрация по task_type если указан параметр
-            task_type_filter = self.request.query_params.get('task_type')
-            if task_type_filter:
-                available_tasks = available_tasks.filter(task_type=task_type_filter.upper())
-            
-            available_tasks = available_tasks.prefetch_related(
-                'completions',
-                'completions__user',
-                'social_network',
-                'crowd_tasks',  # Добавляем prefetch для crowd_tasks
-                Prefetch(
-                    'completions__user__social_profiles',
-                    queryset=UserSocialProfile.objects.all(),
-                    to_attr='user_social_profiles'
-                )
-            )
-
-            now = timezone.now()
-            available_tasks = available_tasks.annotate(
-                remaining_actions=F('actions_required') - F('actions_completed'),
-                is_fresh=Case(
-                    When(created_at__gte=now - timezone.timedelta(days=1), then=1),
-                    default=0,
-                    output_field=IntegerField(),
-                ),
-                is_almost_done=Case(
-                    When(remaining_actions__lte=2, then=1),
-                    default=0,
-                    output_field=IntegerField(),
-                ),
-                is_completed=Case(
-                    When(actions_completed__gte=F('actions_required'), then=1),
-                    default=0,
-                    output_field=IntegerField(),
-                )
-            )
-
-            # 1. Свежие задания (<24ч, не завершённые)
-            fresh_tasks = list(
-                available_tasks.filter(is_fresh=1, is_completed=0)
-                .order_by('remaining_actions', '-created_at')
-            )
-
-            # 2. Почти завершённые старые (не свежие)
-            almost_done_tasks = list(
-                available_tasks.filter(is_fresh=0, is_almost_done=1, is_completed=0)
-                .order_by('remaining_actions', '-created_at')
-            )
-
-            # 3. Остальные
-            other_tasks = list(
-                available_tasks.exclude(id__in=[t.id for t in fresh_tasks + almost_done_tasks])
-                .filter(is_completed=0)
-                .order_by('-created_at')
-            )
+    def get_available_entries(self):
+        """
+        Доступные пользователю записи ленты (без своих, репортнутых и выполненных).
+        Строится один раз на запрос и используется и для страницы заданий, и для статистики.
+        """
+        if not hasattr(self, '_available_entries'):
+            self._available_entries = available_entries(self.request.user)
+        return self._available_entries
 
-            # --- АННОТИРУЕМ статус создателя задачи ---
-            available_tasks = available_tasks.select_related('creator__userprofile').annotate(
-                creator_status=F('creator__userprofile__status')
+    def get_queryset(self):
+        """
+        Лента заданий для исполнителя: закреплённые + ранжированные ACTIVE задания
+        из предрассчитанной таблицы TaskFeedEntry (см. api/task_feed.py).
+        """
+        try:
+            return get_task_feed(
+                self.request.user,
+                social_network_code=self.request.query_params.get('social_network'),
+                task_type=self.request.query_params.get('task_type'),
+                entries=self.get_available_entries(),
+                prefetch=COMPACT_FEED_PREFETCH if self.is_compact_feed() else FEED_PREFETCH,
             )
-
-            # --- МАППИНГ ПРИОРИТЕТОВ ---
-            STATUS_PRIORITY = {
-                'MATE': 0,
-                'BUDDY': 1,
-                'MEMBER': 2,
-                'FREE': 3
-            }
-
-            def status_priority(task):
-                status = getattr(task, 'creator_status', None)
-                prio = STATUS_PRIORITY.get(status, 4)
-                return prio
-
-            # --- СОРТИРОВКА ВНУТРИ КАЖДОГО БЛОКА ---
-            def sort_by_status(tasks, block_name):
-                sorted_tasks = sorted(
-                    tasks,
-                    key=lambda t: (status_priority(t),
-                                   t.remaining_actions if hasattr(t, 'remaining_actions') else 0,
-                                   -t.created_at.timestamp() if hasattr(t, 'created_at') else 0)
-                )
-                return sorted_tasks
-
-            fresh_tasks = sort_by_status(fresh_tasks, 'fresh_tasks')
-            almost_done_tasks = sort_by_status(almost_done_tasks, 'almost_done_tasks')
-            other_tasks = sort_by_status(other_tasks, 'other_tasks')
-
-            # Собираем выдачу с лимитом
-            mixed_tasks = []
-            for t in fresh_tasks:
-                if len(mixed_tasks) >= settings.TASKS_PER_REQUEST:
-                    break
-                mixed_tasks.append(t)
-            if len(mixed_tasks) < settings.TASKS_PER_REQUEST:
-                for t in almost_done_tasks:
-                    if len(mixed_tasks) >= settings.TASKS_PER_REQUEST:
-                        break
-                    mixed_tasks.append(t)
-            if len(mixed_tasks) < settings.TASKS_PER_REQUEST:
-                for t in other_tasks:
-                    if len(mixed_tasks) >= settings.TASKS_PER_REQUEST:
-                        break
-                    mixed_tasks.append(t)
-
-            # --- ФИНАЛЬНАЯ СБОРКА: pinned + обычные ---
-            final_tasks = pinned_tasks + mixed_tasks
-            return final_tasks
-
         except Exception as e:
+            logger.error(f"[TaskViewSet.get_queryset] Error building task feed: {str(e)}", exc_info=True)
             return Task.objects.none()
 
     def list(self, request, *args, **kwargs):
@@ -943,163 +728,57 @@ class TaskViewSet(viewsets.ModelViewSet):
         - stats_by_network: список статистики по каждой соц. сети
         - total_available: общее количество доступных задач
         - tasks: список задач (обработанный через get_queryset)
+        Статистика считается по тем же записям ленты, что и задания, и кешируется
+        на пользователя (сбрасывается при выполнении/репорте задания).
         """
         try:
-            from django.db.models import Count
-            
-            user = request.user
-            social_network_code = request.query_params.get('social_network')
-            
-            # Получаем задачи через get_queryset (это уже отфильтрованный список)
             queryset = self.filter_queryset(self.get_queryset())
-            
-            # Теперь нужно получить полную статистику для фильтров
-            # Строим базовый queryset для подсчета статистики (без пагинации и лимитов)
-            
-            # Получаем id задач, которые пользователь уже выполнял
-            completed_task_ids = set(TaskCompletion.objects.filter(user=user).values_list('task_id', flat=True))
-            
-            # Получаем id репортнутых задач
-            reported_tasks = TaskReport.objects.filter(user=user).values_list('task_id', flat=True)
-            
-            # Базовый queryset для статистики
-            stats_queryset = Task.objects.filter(
-                status='ACTIVE'
-            ).exclude(
-                creator=user
-            ).exclude(
-                id__in=reported_tasks
-            )
-            
-            # Исключаем выполненные задания по ID
-            if completed_task_ids:
-                stats_queryset = stats_queryset.exclude(id__in=completed_task_ids)
-            
-            # Исключаем задания с таким же нормализованным URL (аналогично логике в get_queryset)
-            completed_combinations = TaskCompletion.objects.filter(
-                user=user
-            ).values_list(
-                'task__post_url',
-                'task__type',
-                'task__social_network'
-            ).distinct()
-            
-            # Функция нормализации URL (та же, что в get_queryset)
-            def _normalize_url(raw_url: str) -> str:
-                """Normalize URL for duplicate detection."""
-                try:
-                    from urllib.parse import urlsplit
-                    parts = urlsplit(raw_url)
-                    netloc = parts.netloc.lower()
-                    for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-                        if netloc.startswith(prefix):
-                            netloc = netloc[len(prefix):]
-                            break
-                    if netloc in {'youtu.be', 'youtube-nocookie.com'}:
-                        netloc = 'youtube.com'
-                    path = parts.path.rstrip('/') if parts.path != '/' else ''
-                    return f"{netloc}{path}"
-                except Exception:
-                    safe = (raw_url or '')
-                    if '://' in safe:
-                        safe = safe.split('://', 1)[1]
-                    safe = safe.split('#')[0].split('?')[0]
-                    safe = safe.rstrip('/')
-                    for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-                        if safe.startswith(prefix):
-                            safe = safe[len(prefix):]
-                            break
-                    safe = safe.lower()
-                    host, _, rest = safe.partition('/')
-                    if host in {'youtu.be', 'youtube-nocookie.com'}:
-                        host = 'youtube.com'
-                    return host + (('/' + rest) if rest else '')
-            
-            # Собираем множество завершённых комбинаций
-            completed_combo_set = set(
-                (
-                    _normalize_url(url or ''),
-                    t_type,
-                    sn_id,
-                )
-                for (url, t_type, sn_id) in completed_combinations
-            )
-            
-            # Исключаем задания по нормализованной комбинации
-            if completed_combo_set:
-                try:
-                    types_set = list({t for (_, t, _) in completed_combo_set if t is not None})
-                    sn_ids_set = list({sn for (_, _, sn) in completed_combo_set if sn is not None})
-                    
-                    if types_set and sn_ids_set:
-                        candidates = stats_queryset.filter(
-                            type__in=types_set,
-                            social_network_id__in=sn_ids_set
-                        ).values('id', 'post_url', 'type', 'social_network_id')
-                        
-                        ids_to_exclude = []
-                        for c in candidates:
-                            if (
-                                _normalize_url(c.get('post_url') or ''),
-                                c.get('type'),
-                                c.get('social_network_id'),
-                            ) in completed_combo_set:
-                                ids_to_exclude.append(c['id'])
-                        
-                        if ids_to_exclude:
-                            stats_queryset = stats_queryset.exclude(id__in=ids_to_exclude)
-                except Exception:
-                    pass
-            
-            # Подсчитываем статистику по социальным сетям
-            stats_by_network = stats_queryset.values(
-                'social_network__id',
-                'social_network__name',
-                'social_network__code',
-                'social_network__icon'
-            ).annotate(
-                count=Count('id')
-            ).order_by('-count')
-            
-            # Формируем список статистики
-            stats_list = []
-            total_tasks = 0
-            
-            print(f"[TaskViewSet.list] Building stats for available tasks (user: {user.id})")
-            
-            for stat in stats_by_network:
-                network_data = {
-                    'social_network_id': stat['social_network__id'],
-                    'social_network_name': stat['social_network__name'],
-                    'social_network_code': stat['social_network__code'],
-                    'social_network_icon': stat['social_network__icon'],
-                    'available_count': stat['count']
-                }
-                stats_list.append(network_data)
-                total_tasks += stat['count']
-                print(f"[TaskViewSet.list] Network: {stat['social_network__name']}, Available: {stat['count']}")
-            
-            print(f"[TaskViewSet.list] Total available tasks across all networks: {total_tasks}")
-            
-            # Сериализуем задачи
+
+            stats_list = get_network_stats(request.user, entries=self.get_available_entries())
+            total_tasks = sum(stat['available_count'] for stat in stats_list)
+
             serializer = self.get_serializer(queryset, many=True)
-            
-            # Возвращаем статистику и задания
+
             return Response({
                 'stats_by_network': stats_list,
                 'total_available': total_tasks,
                 'tasks': serializer.data
             })
-            
+
         except Exception as e:
-            print(f"[TaskViewSet.list] Error building stats: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error(f"[TaskViewSet.list] Error building stats: {str(e)}", exc_info=True)
             # В случае ошибки возвращаем стандартный формат
             queryset = self.filter_queryset(self.get_queryset())
             serializer = self.get_serializer(queryset, many=True)
             return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def completions(self, request, pk=None):
+        """
+        Полный список выполнений задания (в компактной ленте отдаются только
+        количество и последние исполнители). Доступен только создателю задания.
+        """
+        task = Task.objects.filter(pk=pk, creator=request.user).only('id', 'social_network_id').first()
+        if not task:
+            return Response({'error': 'Task not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        completions = list(TaskCompletion.objects.filter(task=task).select_related('user').prefetch_related(
+            Prefetch(
+                'user__social_profiles',
+                queryset=UserSocialProfile.objects.filter(social_network_id=task.social_network_id),
+                to_attr='user_social_profiles'
+            )
+        ).order_by('-created_at'))
+        for completion in completions:
+            completion.task = task
+
+        serializer = TaskCompletionSerializer(completions, many=True, context={'request': request})
+        return Response({
+            'task_id': task.id,
+            'count': len(serializer.data),
+            'completions': serializer.data
+        })
+
     @action(detail=False, methods=['get'])
     def my_tasks(self, request):
         tasks = Task.objects.filter(creator=request.user).prefetch_related(
@@ -1207,6 +886,7 @@ def tasks1(request):
     Страна определяется по chosen_country в UserProfile.
     Поддерживает фильтрацию по social_network через query параметр.
     Исключает задания, которые пользователь уже выполнил (по ID и по нормализованному URL).
+    ?mode=compact — компактные задания без полного списка completions (TaskFeedSerializer).
     """
     try:
         social_network_code = request.query_params.get('social_network')
@@ -1226,102 +906,9 @@ def tasks1(request):
         # Фильтрация выполненных заданий (если пользователь авторизован)
         user = getattr(request, 'user', None)
         if user and user.is_authenticated:
-            # 1. Исключаем задания по ID (которые пользователь уже выполнил)
-            completed_task_ids = set(TaskCompletion.objects.filter(user=user).values_list('task_id', flat=True))
-            if completed_task_ids:
-                tasks = tasks.exclude(id__in=completed_task_ids)
-            
-            # 2. Исключаем задания с таким же нормализованным URL
-            # Получаем комбинации выполненных заданий
-            completed_combinations = TaskCompletion.objects.filter(
-                user=user
-            ).values_list(
-                'task__post_url',
-                'task__type',
-                'task__social_network_id'
-            ).distinct()
-            
-            # Функция нормализации URL (та же, что в TaskViewSet)
-            def _normalize_url(raw_url: str) -> str:
-                """Normalize URL for duplicate detection.
-                Rules:
-                  - ignore query and fragment
-                  - lowercase hostname
-                  - drop trailing '/'
-                  - treat http/https as the same (ignore scheme)
-                  - strip leading 'www.'
-                Returns a comparison key in the form 'host/path'.
-                """
-                try:
-                    from urllib.parse import urlsplit
-                    parts = urlsplit(raw_url)
-                    netloc = parts.netloc.lower()
-                    # unify common mobile/bare subdomains
-                    for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-                        if netloc.startswith(prefix):
-                            netloc = netloc[len(prefix):]
-                            break
-                    # map known domain aliases to a canonical host
-                    if netloc in {'youtu.be', 'youtube-nocookie.com'}:
-                        netloc = 'youtube.com'
-                    path = parts.path.rstrip('/') if parts.path != '/' else ''
-                    return f"{netloc}{path}"
-                except Exception:
-                    safe = (raw_url or '')
-                    # remove scheme
-                    if '://' in safe:
-                        safe = safe.split('://', 1)[1]
-                    # strip query/fragment
-                    safe = safe.split('#')[0].split('?')[0]
-                    safe = safe.rstrip('/')
-                    # strip common prefixes
-                    for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-                        if safe.startswith(prefix):
-                            safe = safe[len(prefix):]
-                            break
-                    # normalize known domain aliases without full parsing
-                    safe = safe.lower()
-                    host, _, rest = safe.partition('/')
-                    if host in {'youtu.be', 'youtube-nocookie.com'}:
-                        host = 'youtube.com'
-                    return host + (('/' + rest) if rest else '')
-            
-            # Собираем множество завершённых комбинаций с нормализованным post_url
-            completed_combo_set = set(
-                (
-                    _normalize_url(url or ''),
-                    t_type,
-                    sn_id,
-                )
-                for (url, t_type, sn_id) in completed_combinations
-            )
-            
-            # Исключаем задания по нормализованной комбинации
-            if completed_combo_set:
-                try:
-                    # Ограничим кандидатов по типам и соцсетям для эффективности
-                    types_set = list({t for (_, t, _) in completed_combo_set if t is not None})
-                    sn_ids_set = list({sn for (_, _, sn) in completed_combo_set if sn is not None})
-                    
-                    if types_set and sn_ids_set:
-                        candidates = tasks.filter(
-                            type__in=types_set,
-                            social_network_id__in=sn_ids_set
-                        ).values('id', 'post_url', 'type', 'social_network_id')
-                        
-                        ids_to_exclude = []
-                        for c in candidates:
-                            if (
-                                _normalize_url(c.get('post_url') or ''),
-                                c.get('type'),
-                                c.get('social_network_id'),
-                            ) in completed_combo_set:
-                                ids_to_exclude.append(c['id'])
-                        
-                        if ids_to_exclude:
-                            tasks = tasks.exclude(id__in=ids_to_exclude)
-                except Exception:
-                    pass
+            # Исключаем выполненные задания и задания с таким же нормализованным URL
+            # (покрывает и сами выполненные задания — их URL совпадает)
+            tasks = tasks.exclude(TaskCompletion.completed_post_exists(user))
         
         # Подсчитываем статистику по социальным сетям ДО применения лимита
         # Группируем по social_network и считаем количество
@@ -1360,15 +947,21 @@ def tasks1(request):
             'creator',
             'creator__userprofile',
             'social_network'
-        ).prefetch_related(
-            'completions',
-            'completions__user',
-            Prefetch(
-                'completions__user__social_profiles',
-                queryset=UserSocialProfile.objects.all(),
-                to_attr='user_social_profiles'
-            )
         )
+        compact = is_compact_feed_request(request)
+        if compact:
+            # ?mode=compact: completions не грузим, сериализатор берёт счётчики и последних исполнителей
+            tasks = tasks.prefetch_related('crowd_tasks')
+        else:
+            tasks = tasks.prefetch_related(
+                'completions',
+                'completions__user',
+                Prefetch(
+                    'completions__user__social_profiles',
+                    queryset=UserSocialProfile.objects.all(),
+                    to_attr='user_social_profiles'
+                )
+            )
         
         # Сортировка: сначала закрепленные, потом по дате создания
         tasks = tasks.order_by('-is_pinned', '-created_at')
@@ -1376,7 +969,8 @@ def tasks1(request):
         # Ограничиваем количество заданий до 20
         tasks = tasks[:20]
         
-        serializer = TaskSerializer(tasks, many=True, context={'request': request})
+        serializer_class = TaskFeedSerializer if compact else TaskSerializer
+        serializer = serializer_class(tasks, many=True, context={'request': request})
         
         # Возвращаем статистику и задания
         return Response({
@@ -1388,6 +982,68 @@ def tasks1(request):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _next_completion_is_bonus():
+    """
+    Условие (в SQL) того, что очередное выполнение засчитывается в бонусные действия.
+    Чередование: Основное -> Бонусное -> Основное ...
+      1) Если остался только один шаг — он всегда основной
+      2) Иначе, если main_done == bonus_done — основной
+      3) Иначе, если бонусы ещё остались и main_done > bonus_done — бонус
+      4) Иначе — основной
+    """
+    total_remaining = (
+        F('actions_required') + F('bonus_actions') - F('actions_completed') - F('bonus_actions_completed')
+    )
+    return (
+        ~Q(Exact(total_remaining, 1))
+        & Q(actions_completed__gt=F('bonus_actions_completed'))
+        & Q(bonus_actions__gt=F('bonus_actions_completed'))
+    )
+
+
+def _increment_task_progress(task):
+    """
+    Атомарно засчитывает одно выполнение задания:
+    UPDATE ... SET actions_completed = actions_completed + 1 (или bonus_actions_completed) WHERE status = 'ACTIVE',
+    затем условный UPDATE статуса в COMPLETED, когда выполнены и основные, и бонусные действия.
+    Строка задания блокируется только этими UPDATE до конца транзакции, без select_for_update.
+    Возвращает False, если задание уже не активно.
+    """
+    is_bonus = _next_completion_is_bonus()
+    updated = Task.objects.filter(pk=task.pk, status='ACTIVE').update(
+        actions_completed=F('actions_completed') + Case(When(is_bonus, then=0), default=1),
+        bonus_actions_completed=F('bonus_actions_completed') + Case(When(is_bonus, then=1), default=0),
+    )
+    if not updated:
+        return False
+
+    now = timezone.now()
+    completed = Task.objects.filter(
+        pk=task.pk,
+        status='ACTIVE',
+        actions_completed__gte=F('actions_required'),
+        bonus_actions_completed__gte=F('bonus_actions'),
+    ).filter(
+        Q(actions_required__gt=0) | Q(bonus_actions__gt=0)
+    ).update(
+        status='COMPLETED',
+        completed_at=now,
+        completion_duration=ExpressionWrapper(
+            Value(now, output_field=DateTimeField()) - F('created_at'),
+            output_field=DurationField()
+        ),
+    )
+
+    task.refresh_from_db(fields=[
+        'actions_completed', 'bonus_actions_completed', 'status', 'completed_at', 'completion_duration'
+    ])
+    # queryset.update() не шлёт post_save — обновляем ленту и вебхуки вручную
+    task_feed.sync_task(task)
+    if completed:
+        webhooks.enqueue_task_status([task])
+    return True
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 @authentication_classes([JWTAuthentication])
@@ -1416,23 +1072,23 @@ def complete_task(request, task_id):
         if action.upper() != task.type.upper():
             return Response({'error': f'Invalid action type. Expected: {task.type}'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Безопасно парсим metadata, если пришла строка
         try:
-            with db_transaction.atomic():
-                task.refresh_from_db()
-                
-                if task.status != 'ACTIVE':
-                    raise ValidationError('Task is no longer active')
+            if isinstance(metadata, str):
+                metadata_parsed = json.loads(metadata)
+            else:
+                metadata_parsed = metadata
+        except Exception:
+            metadata_parsed = {'raw': metadata}
 
-                # Безопасно парсим metadata, если пришла строка
-                try:
-                    if isinstance(metadata, str):
-                        metadata_parsed = json.loads(metadata)
-                    else:
-                        metadata_parsed = metadata
-                except Exception:
-                    metadata_parsed = {'raw': metadata}
+        # Награда начисляется только за основные действия, бонусы бесплатные для автора
+        reward = task.original_price / task.actions_required / 2
+        # balance — IntegerField: дробная часть награды отбрасывается (как и при save() профиля)
+        reward_points = int(reward)
 
-                completion = TaskCompletion.objects.create(
+        try:
+            with db_transaction.atomic():
+                TaskCompletion.objects.create(
                     task=task,
                     user=user,
                     action=action,
@@ -1441,127 +1097,54 @@ def complete_task(request, task_id):
                     metadata=metadata_parsed
                 )
 
-                # Чередование: Основное -> Бонусное -> Основное ...
-                main_required = task.actions_required or 0
-                bonus_required = task.bonus_actions or 0
-                main_done = task.actions_completed or 0
-                bonus_done = task.bonus_actions_completed or 0
-                total_required = main_required + bonus_required
-                total_done = main_done + bonus_done
-
-                # Осталось выполнить
-                total_remaining = max(0, total_required - total_done)
-                main_remaining = max(0, main_required - main_done)
-                bonus_remaining = max(0, bonus_required - bonus_done)
-
-                # Правило выбора следующего инкремента:
-                # 1) Если остался только один шаг — он всегда основной
-                # 2) Иначе, если main_done == bonus_done — делаем основной
-                # 3) Иначе, если бонусы ещё остались и main_done > bonus_done — делаем бонус
-                # 4) Иначе — основной
-                if total_remaining == 1:
-                    if main_remaining > 0:
-                        task.actions_completed = main_done + 1
-                    else:
-                        # На всякий случай: не позволяем завершать последним бонусом
-                        task.actions_completed = main_done + 1
-                elif main_done == bonus_done:
-                    task.actions_completed = main_done + 1
-                elif bonus_remaining > 0 and main_done > bonus_done:
-                    task.bonus_actions_completed = bonus_done + 1
-                else:
-                    task.actions_completed = main_done + 1
-
-                # Завершение задачи только после выполнения и основных, и бонусных
-                if (task.actions_completed >= main_required) and (task.bonus_actions_completed >= bonus_required) and total_required > 0:
-                    task.status = 'COMPLETED'
-                    task.completed_at = timezone.now()
-                    task.completion_duration = task.completed_at - task.created_at
-
-                task.save()
+                if not _increment_task_progress(task):
+                    raise ValidationError('Task is no longer active')
 
-                # Награда начисляется только за основные действия, бонусы бесплатные для автора
-                reward = task.original_price / task.actions_required / 2
-                
-                # Сохраняем старое значение bonus_tasks_completed для проверки награды за 20 заданий
-                old_bonus_tasks_completed = user_profile.bonus_tasks_completed
-                
-                user_profile.balance += reward
-                user_profile.completed_tasks_count += 1
-                user_profile.bonus_tasks_completed += 1
-                user_profile.save()
-                
-                # Проверяем, достиг ли приглашенный пользователь 20 заданий для награды реферальной программы
-                if old_bonus_tasks_completed == 19 and user_profile.bonus_tasks_completed == 20 and user_profile.invited_by:
+                UserProfile.objects.filter(pk=user_profile.pk).update(
+                    balance=F('balance') + reward_points,
+                    completed_tasks_count=F('completed_tasks_count') + 1,
+                    bonus_tasks_completed=F('bonus_tasks_completed') + 1,
+                )
+                # Строка профиля заблокирована нашим UPDATE до коммита — значения точные
+                new_balance, bonus_tasks_completed, completed_tasks_count = UserProfile.objects.filter(
+                    pk=user_profile.pk
+                ).values_list('balance', 'bonus_tasks_completed', 'completed_tasks_count').get()
+
+                # Строки гистограммы лидерборда общие для всех пользователей —
+                # не держим их заблокированными до конца транзакции
+                def _move_in_leaderboard():
                     try:
-                        inviter_user = user_profile.invited_by
-                        inviter_profile = inviter_user.userprofile
-                        
-                        # Начисляем по 30 поинтов обоим пользователям
-                        user_profile.balance += 30
-                        inviter_profile.balance += 30
-                        user_profile.save(update_fields=['balance'])
-                        inviter_profile.save(update_fields=['balance'])
-                        
-                        logger.info(f"[complete_task] Referral reward: User {user.id} completed 20 tasks. Rewarded {user.id} and {inviter_user.id} with 30 points each")
-                        
-                        # Отправляем email приглашенному пользователю
-                        try:
-                            invited_firebase_user = auth.get_user(user.username)
-                            invited_email = invited_firebase_user.email
-                            
-                            if invited_email:
-                                email_service = EmailService()
-                                html_content = (
-                                    "<p>Congratulations! You completed your first 20 tasks!</p>"
-                                    "<p>You received 30 extra points as a reward.</p>"
-                                    "<p>Invite more friends: <a href='https://upvote.club/dashboard/referral' target='_blank'>https://upvote.club/dashboard/referral</a></p>"
-                                )
-                                email_service.send_email(
-                                    to_email=invited_email,
-                                    subject='Congratulations! You completed 20 tasks and earned 30 extra points!',
-                                    html_content=html_content
-                                )
-                                logger.info(f"[complete_task] Sent 20 tasks completion email to {invited_email}")
-                        except Exception as e:
-                            logger.error(f"[complete_task] Error sending email to invited user: {str(e)}")
-                        
-                        # Отправляем email пригласившему пользователю
-                        try:
-                            inviter_firebase_user = auth.get_user(inviter_user.username)
-                            inviter_email = inviter_firebase_user.email
-                            
-                            if inviter_email:
-                                email_service = EmailService()
-                                html_content = (
-                                    "<p>Great news! Your friend completed 20 tasks!</p>"
-                                    "<p>You received 30 points as a reward.</p>"
-                                    "<p>Invite more friends: <a href='https://upvote.club/dashboard/referral' target='_blank'>https://upvote.club/dashboard/referral</a></p>"
-                                )
-                                email_service.send_email(
-                                    to_email=inviter_email,
-                                    subject='Your friend completed 20 tasks - You earned 30 points!',
-                                    html_content=html_content
-                                )
-                                logger.info(f"[complete_task] Sent referral reward email to {inviter_email}")
-                        except Exception as e:
-                            logger.error(f"[complete_task] Error sending email to inviter user: {str(e)}")
-                            
+                        leaderboard.record_completion_count(completed_tasks_count)
                     except Exception as e:
-                        logger.error(f"[complete_task] Error processing referral reward: {str(e)}", exc_info=True)
-                
-                return Response({
-                    'message': 'Task completed successfully',
-                    'reward': reward,
-                    'new_balance': user_profile.balance,
-                    'task_status': task.status
-                }, status=status.HTTP_200_OK)
+                        logger.error(f"[complete_task] Failed to update leaderboard for user {user.id}: {str(e)}")
+
+                db_transaction.on_commit(_move_in_leaderboard)
+
+                # Приглашенный пользователь достиг 20 заданий — награда реферальной программы
+                if bonus_tasks_completed == 20 and user_profile.invited_by_id:
+                    UserProfile.objects.filter(
+                        user_id__in=[user.id, user_profile.invited_by_id]
+                    ).update(balance=F('balance') + 30)
+                    new_balance += 30
+                    # Письма отправит воркер outbox, если транзакция закоммитится
+                    outbox.enqueue(outbox.REFERRAL_REWARD, {
+                        'user_id': user.id,
+                        'inviter_id': user_profile.invited_by_id,
+                    })
+                    logger.info(f"[complete_task] Referral reward: User {user.id} completed 20 tasks. Rewarded {user.id} and {user_profile.invited_by_id} with 30 points each")
 
         except IntegrityError as e:
             return Response({'error': 'Duplicate completion'}, status=status.HTTP_400_BAD_REQUEST)
         except ValidationError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        return Response({
+            'message': 'Task completed successfully',
+            'reward': reward,
+            'new_balance': new_balance,
+            'task_status': task.status
+        }, status=status.HTTP_200_OK)
+
     except Exception as e:
         return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -1619,73 +1202,25 @@ def create_task(request):
     task_type = request.data.get('type')
     social_network_code = request.data.get('social_network_code')
     
-    # Функция нормализации URL (та же, что в TaskViewSet)
-    def _normalize_url(raw_url: str) -> str:
-        """Normalize URL for duplicate detection.
-        Rules:
-          - ignore query and fragment
-          - lowercase hostname
-          - drop trailing '/'
-          - treat http/https as the same (ignore scheme)
-          - strip leading 'www.'
-        Returns a comparison key in the form 'host/path'.
-        """
-        try:
-            from urllib.parse import urlsplit
-            parts = urlsplit(raw_url)
-            netloc = parts.netloc.lower()
-            # unify common mobile/bare subdomains
-            for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-                if netloc.startswith(prefix):
-                    netloc = netloc[len(prefix):]
-                    break
-            # map known domain aliases to a canonical host
-            if netloc in {'youtu.be', 'youtube-nocookie.com'}:
-                netloc = 'youtube.com'
-            path = parts.path.rstrip('/') if parts.path != '/' else ''
-            return f"{netloc}{path}"
-        except Exception:
-            safe = (raw_url or '')
-            # remove scheme
-            if '://' in safe:
-                safe = safe.split('://', 1)[1]
-            # strip query/fragment
-            safe = safe.split('#')[0].split('?')[0]
-            safe = safe.rstrip('/')
-            # strip common prefixes
-            for prefix in ('www.', 'm.', 'mobile.', 'vm.'):
-                if safe.startswith(prefix):
-                    safe = safe[len(prefix):]
-                    break
-            # normalize known domain aliases without full parsing
-            safe = safe.lower()
-            host, _, rest = safe.partition('/')
-            if host in {'youtu.be', 'youtube-nocookie.com'}:
-                host = 'youtube.com'
-            return host + (('/' + rest) if rest else '')
-    
-    # Нормализуем входящий URL
-    normalized_post_url = _normalize_url(post_url)
-    
     # Получаем социальную сеть для проверки
     try:
         social_network = SocialNetwork.objects.get(code=social_network_code)
     except SocialNetwork.DoesNotExist:
         pass  # Ошибку валидации обработает сериализатор позже
     else:
-        # Ищем активные задания с той же комбинацией URL + TYPE + SOCIAL_NETWORK
-        active_tasks = Task.objects.filter(
+        # Ищем активное задание с той же комбинацией URL + TYPE + SOCIAL_NETWORK (индекс по normalized_post_url)
+        existing_task_id = Task.objects.filter(
             status='ACTIVE',
             type=task_type,
-            social_network=social_network
-        ).only('id', 'post_url')
+            social_network=social_network,
+            normalized_post_url=normalize_url(post_url)
+        ).values_list('id', flat=True).first()
         
-        for task in active_tasks:
-            if _normalize_url(task.post_url) == normalized_post_url:
-                return Response({
-                    'detail': 'A task with this URL and action type already exists and is being completed by our community',
-                    'existing_task_id': task.id
-                }, status=status.HTTP_400_BAD_REQUEST)
+        if existing_task_id:
+            return Response({
+                'detail': 'A task with this URL and action type already exists and is being completed by our community',
+                'existing_task_id': existing_task_id
+            }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         with transaction.atomic():
@@ -4180,27 +3715,6 @@ def task_completion_stats(request):
         
         logger.info(f"[task_completion_stats] Request params: period={period}, start_date={start_date}, end_date={end_date}")
         
-        # Базовый queryset для выполненных заданий пользователя
-        user_id = request.user.id
-        logger.info(f"[task_completion_stats] Looking for completions for user_id: {user_id}")
-        
-        # Сначала проверим все записи для пользователя без фильтров
-        all_completions_count = TaskCompletion.objects.filter(user=request.user).count()
-        completed_completions_count = TaskCompletion.objects.filter(
-            user=request.user,
-            completed_at__isnull=False
-        ).count()
-        
-        logger.info(f"""
-            [task_completion_stats] User {user_id} task completions:
-            Total completions: {all_completions_count}
-            Completions with completed_at: {completed_completions_count}
-        """)
-        
-        completions = TaskCompletion.objects.filter(
-            user=request.user
-        ).select_related('task')
-        
         # Определяем диапазон дат
         now = timezone.now()
         
@@ -4246,93 +3760,53 @@ def task_completion_stats(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Фильтруем по диапазону дат
-        completions_before_date_filter = completions.count()
-        logger.info(f"[task_completion_stats] Completions before date filter: {completions_before_date_filter}")
-        
-        completions = completions.filter(
-            created_at__gte=start_dt,
-            created_at__lte=end_dt
-        )
-        
-        completions_after_date_filter = completions.count()
-        logger.info(f"""
-            [task_completion_stats] Date filtering results:
-            Start date: {start_dt}
-            End date: {end_dt}
-            Completions before filter: {completions_before_date_filter}
-            Completions after filter: {completions_after_date_filter}
-        """)
-        
-        # Определяем функцию группировки в зависимости от периода
-        # Используем created_at для группировки, так как completed_at может быть пустым
+        # Определяем группировку в зависимости от периода
         if period == 'day':
             # Группируем по часам
-            trunc_func = TruncHour('created_at')
-            date_format = '%Y-%m-%d %H:00'
+            grouping = 'hour'
         elif period in ['week', 'month']:
             # Группируем по дням
-            trunc_func = TruncDay('created_at')
-            date_format = '%Y-%m-%d'
+            grouping = 'day'
         elif period in ['quarter', 'year']:
             # Группируем по месяцам
-            trunc_func = TruncMonth('created_at')
-            date_format = '%Y-%m'
+            grouping = 'month'
         elif period == 'custom':
             # Для кастомного периода определяем группировку по разности дат
             days_diff = (end_dt - start_dt).days
             if days_diff <= 1:
-                trunc_func = TruncHour('created_at')
-                date_format = '%Y-%m-%d %H:00'
+                grouping = 'hour'
             elif days_diff <= 31:
-                trunc_func = TruncDay('created_at')
-                date_format = '%Y-%m-%d'
+                grouping = 'day'
             else:
-                trunc_func = TruncMonth('created_at')
-                date_format = '%Y-%m'
-        
-        # Группируем и агрегируем данные
-        # Для каждого completion вычисляем reward в поинтах: (original_price / actions_required) / 2
-        # Затем конвертируем в доллары через conversion_rate
-        stats = completions.annotate(
-            period_date=trunc_func,
-            task_reward_points=F('task__original_price') / F('task__actions_required') / 2,
-            task_reward_usd=F('task__original_price') / F('task__actions_required') / 2 * Value(0.01)
-        ).values('period_date').annotate(
-            tasks_completed=Count('id'),
-            total_earnings_points=Sum('task_reward_points'),
-            total_earnings_usd=Sum('task_reward_usd')
-        ).order_by('period_date')
-        
-        logger.info(f"[task_completion_stats] Aggregation query result count: {stats.count()}")
-        if stats.count() > 0:
-            logger.info(f"[task_completion_stats] First few aggregated records: {list(stats[:3])}")
-        
+                grouping = 'month'
+
+        # Дневные и месячные ряды берутся из агрегата DailyEarningStat (api/earnings.py)
+        # с точными границами периода, почасовой ряд (не больше суток) — из TaskCompletion
+        # Награда за выполнение: (original_price / actions_required) / 2, 1 поинт = $0.01
+        if grouping == 'hour':
+            series = earnings.get_hourly_series(request.user, start_dt, end_dt)
+            date_format = '%Y-%m-%d %H:00'
+        else:
+            series = earnings.get_daily_series(request.user, start_dt, end_dt, by_month=grouping == 'month')
+            date_format = '%Y-%m' if grouping == 'month' else '%Y-%m-%d'
+
         # Форматируем результат
         chart_data = []
-        for stat in stats:
+        for stat in series:
             if stat['period_date']:
                 chart_data.append({
                     'date': stat['period_date'].strftime(date_format),
                     'tasks_completed': stat['tasks_completed'],
-                    'total_earnings_points': float(stat['total_earnings_points'] or 0),
-                    'total_earnings_usd': float(stat['total_earnings_usd'] or 0)
+                    'total_earnings_points': stat['total_earnings_points'],
+                    'total_earnings_usd': stat['total_earnings_usd']
                 })
-        
-        # Подсчитываем общую статистику за период
-        # Используем ту же формулу что и при начислении: (original_price / actions_required) / 2
-        # Рассчитываем как в поинтах, так и в долларах
-        total_stats = completions.annotate(
-            task_reward_points=F('task__original_price') / F('task__actions_required') / 2,
-            task_reward_usd=F('task__original_price') / F('task__actions_required') / 2 * Value(0.01)
-        ).aggregate(
-            total_tasks=Count('id'),
-            total_earnings_points=Sum('task_reward_points'),
-            total_earnings_usd=Sum('task_reward_usd')
-        )
-        
-        total_earnings_points = float(total_stats['total_earnings_points'] or 0)
-        total_earnings_usd = float(total_stats['total_earnings_usd'] or 0)
+
+        # Общая статистика за период — сумма ряда
+        total_stats = {
+            'total_tasks': sum(stat['tasks_completed'] for stat in series),
+        }
+        total_earnings_points = float(sum(stat['total_earnings_points'] for stat in series))
+        total_earnings_usd = float(sum(stat['total_earnings_usd'] for stat in series))
         
         response_data = {
             'period': period,
@@ -4792,103 +4266,34 @@ def get_platform_stats(request):
     1. Всего завершённых действий на платформе + за вчера (по всем соцсетям и по каждой отдельно)
     2. Всего каждого действия на платформе + за вчера (по всем соцсетям и по каждой отдельно, не показывать если 0)
     3. Охват = количество действий * 100
+    Данные берутся из агрегатной таблицы DailyCompletionStat (api/platform_stats.py) и кэшируются.
     """
-    logger.info('[get_platform_stats] Запрос статистики платформы')
     try:
-        from django.db.models import Q
-        from collections import defaultdict
-        now = timezone.now()
-        yesterday_start = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        yesterday_end = yesterday_start + timedelta(days=1)
-
-        # Получаем все соцсети
-        social_networks = SocialNetwork.objects.all()
-        logger.info(f'[get_platform_stats] Найдено соцсетей: {social_networks.count()}')
-
-        # Получаем все действия (action)
-        all_action_types = list(TaskCompletion.objects.values_list('action', flat=True).distinct())
-        logger.info(f'[get_platform_stats] Найдено типов действий: {all_action_types}')
-
-        # --- 1. Всего завершённых действий на платформе ---
-        total_actions = TaskCompletion.objects.count()
-        total_actions_yesterday = TaskCompletion.objects.filter(
-            created_at__gte=yesterday_start, created_at__lt=yesterday_end
-        ).count()
-        logger.info(f'[get_platform_stats] Всего действий: {total_actions}, за вчера: {total_actions_yesterday}')
-
-        # --- 2. По каждой соцсети и по каждому действию ---
-        # Формируем структуру: {network_code: {action: {total, yesterday}}}
-        stats_by_network = {}
-        for network in social_networks:
-            network_code = network.code
-            # Всего действий по соцсети
-            network_total = TaskCompletion.objects.filter(task__social_network=network).count()
-            network_yesterday = TaskCompletion.objects.filter(
-                task__social_network=network,
-                created_at__gte=yesterday_start, created_at__lt=yesterday_end
-            ).count()
-            logger.info(f'[get_platform_stats] Соцсеть {network_code}: всего={network_total}, вчера={network_yesterday}')
-            # По каждому действию
-            actions_stats = []
-            for action in all_action_types:
-                action_total = TaskCompletion.objects.filter(
-                    task__social_network=network, action=action
-                ).count()
-                action_yesterday = TaskCompletion.objects.filter(
-                    task__social_network=network, action=action,
-                    created_at__gte=yesterday_start, created_at__lt=yesterday_end
-                ).count()
-                if action_total > 0:
-                    logger.info(f'[get_platform_stats]   Действие {action}: всего={action_total}, вчера={action_yesterday}')
-                    actions_stats.append({
-                        'action': action,
-                        'total': action_total,
-                        'yesterday': action_yesterday,
-                        'reach': action_total * 100,
-                        'reach_yesterday': action_yesterday * 100
-                    })
-            stats_by_network[network_code] = {
-                'network_name': network.name,
-                'total': network_total,
-                'yesterday': network_yesterday,
-                'reach': network_total * 100,
-                'reach_yesterday': network_yesterday * 100,
-                'actions': actions_stats
-            }
-
-        # --- 3. По каждому действию на платформе (без соцсети) ---
-        actions_platform_stats = []
-        for action in all_action_types:
-            action_total = TaskCompletion.objects.filter(action=action).count()
-            action_yesterday = TaskCompletion.objects.filter(
-                action=action,
-                created_at__gte=yesterday_start, created_at__lt=yesterday_end
-            ).count()
-            if action_total > 0:
-                logger.info(f'[get_platform_stats] Платформа: действие {action}: всего={action_total}, вчера={action_yesterday}')
-                actions_platform_stats.append({
-                    'action': action,
-                    'total': action_total,
-                    'yesterday': action_yesterday,
-                    'reach': action_total * 100,
-                    'reach_yesterday': action_yesterday * 100
-                })
-
-        # --- Формируем финальный ответ ---
-        response = {
-            'total_actions': total_actions,
-            'total_actions_yesterday': total_actions_yesterday,
-            'reach': total_actions * 100,
-            'reach_yesterday': total_actions_yesterday * 100,
-            'by_network': stats_by_network,
-            'by_action': actions_platform_stats
-        }
-        logger.info(f'[get_platform_stats] Финальный ответ: {response}')
-        return Response(response, status=status.HTTP_200_OK)
+        return Response(platform_stats.get_platform_stats(), status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f'[get_platform_stats] Ошибка: {str(e)}', exc_info=True)
         return Response({'error': 'Failed to get platform stats', 'detail': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_leaderboard(request):
+    """
+    Публичный топ пользователей по количеству выполненных заданий (?limit=, до 100).
+    Данные из api/leaderboard.py, кэшируются.
+    """
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except (TypeError, ValueError):
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return Response({
+            'top': leaderboard.get_top(limit),
+            'total_users': leaderboard.get_snapshot()['total_users'],
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f'[get_leaderboard] Ошибка: {str(e)}', exc_info=True)
+        return Response({'error': 'Failed to get leaderboard'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
 @csrf_exempt
@@ -4946,9 +4351,7 @@ def telegram_webhook(request):
                         try:
                             user_email = profile.user.email
                             if not user_email:
-                                from firebase_admin import auth
-                                firebase_user = auth.get_user(profile.user.username)
-                                user_email = firebase_user.email
+                                user_email = firebase_identity.get_email(profile.user.username)
                             
                             if user_email:
                                 email_service = EmailService()
@@ -4987,9 +4390,7 @@ def telegram_webhook(request):
                         try:
                             user_email = profile.user.email
                             if not user_email:
-                                from firebase_admin import auth
-                                firebase_user = auth.get_user(profile.user.username)
-                                user_email = firebase_user.email
+                                user_email = firebase_identity.get_email(profile.user.username)
                             
                             if user_email:
                                 email_service = EmailService()
@@ -5030,9 +4431,7 @@ def telegram_webhook(request):
                         try:
                             user_email = profile.user.email
                             if not user_email:
-                                from firebase_admin import auth
-                                firebase_user = auth.get_user(profile.user.username)
-                                user_email = firebase_user.email
+                                user_email = firebase_identity.get_email(profile.user.username)
                             
                             if user_email:
                                 email_service = EmailService()
@@ -5072,9 +4471,7 @@ def telegram_webhook(request):
                         try:
                             user_email = profile.user.email
                             if not user_email:
-                                from firebase_admin import auth
-                                firebase_user = auth.get_user(profile.user.username)
-                                user_email = firebase_user.email
+                                user_email = firebase_identity.get_email(profile.user.username)
                             
                             if user_email:
                                 email_service = EmailService()
@@ -5118,9 +4515,7 @@ def telegram_webhook(request):
                     try:
                         user_email = user.email
                         if not user_email:
-                            from firebase_admin import auth
-                            firebase_user = auth.get_user(user.username)
-                            user_email = firebase_user.email
+                            user_email = firebase_identity.get_email(user.username)
                         
                         if user_email:
                             email_service = EmailService()
@@ -6258,7 +5653,7 @@ class BuyLandingViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Cached list of buy landings
         """
-        cache_key = 'buy_landings_list'
+        cache_key = landing_cache.buy_landings_key('list')
         cached_data = cache.get(cache_key)
         
         if cached_data is not None:
@@ -6266,12 +5661,14 @@ class BuyLandingViewSet(viewsets.ReadOnlyModelViewSet):
             response['X-Cache-Status'] = 'HIT'
             return response
         
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        
-        cache.set(cache_key, serializer.data, timeout=31536000)
+        # При промахе данные строит один воркер, остальные ждут его результат
+        data = cache.get_or_set(
+            cache_key,
+            lambda: self.get_serializer(self.filter_queryset(self.get_queryset()), many=True).data,
+            timeout=landing_cache.LANDING_CACHE_TIMEOUT
+        )
         
-        response = Response(serializer.data, status=status.HTTP_200_OK)
+        response = Response(data, status=status.HTTP_200_OK)
         response['X-Cache-Status'] = 'MISS'
         return response
     
@@ -6280,7 +5677,7 @@ class BuyLandingViewSet(viewsets.ReadOnlyModelViewSet):
         Cached retrieve of single buy landing by slug
         """
         slug = kwargs.get('slug')
-        cache_key = f'buy_landing_{slug}'
+        cache_key = landing_cache.buy_landing_key(slug, create=False)
         cached_data = cache.get(cache_key)
         
         if cached_data is not None:
@@ -6288,12 +5685,17 @@ class BuyLandingViewSet(viewsets.ReadOnlyModelViewSet):
             response['X-Cache-Status'] = 'HIT'
             return response
         
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
+        # Несуществующий slug — 404 до создания счётчика поколения
+        landing = self.get_object()
         
-        cache.set(cache_key, serializer.data, timeout=31536000)
+        # При промахе данные строит один воркер, остальные ждут его результат
+        data = cache.get_or_set(
+            landing_cache.buy_landing_key(slug),
+            lambda: self.get_serializer(landing).data,
+            timeout=landing_cache.LANDING_CACHE_TIMEOUT
+        )
         
-        response = Response(serializer.data, status=status.HTTP_200_OK)
+        response = Response(data, status=status.HTTP_200_OK)
         response['X-Cache-Status'] = 'MISS'
         return response
 
@@ -6302,7 +5704,7 @@ class BuyLandingViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Cached endpoint returning all buy landings with full content
         """
-        cache_key = 'buy_landings_all'
+        cache_key = landing_cache.buy_landings_key('all')
         cached_data = cache.get(cache_key)
         
         if cached_data is not None:
@@ -6310,11 +5712,13 @@ class BuyLandingViewSet(viewsets.ReadOnlyModelViewSet):
             response['X-Cache-Status'] = 'HIT'
             return response
         
-        landings = self.get_queryset()
-        serializer = self.get_serializer(landings, many=True)
-        
-        cache.set(cache_key, serializer.data, timeout=31536000)
+        # При промахе данные строит один воркер, остальные ждут его результат
+        data = cache.get_or_set(
+            cache_key,
+            lambda: self.get_serializer(self.get_queryset(), many=True).data,
+            timeout=landing_cache.LANDING_CACHE_TIMEOUT
+        )
         
-        response = Response(serializer.data, status=status.HTTP_200_OK)
+        response = Response(data, status=status.HTTP_200_OK)
         response['X-Cache-Status'] = 'MISS'
         return response
\ No newline at end of file
@@ -7,6 +7,7 @@ from .models import ActionLanding, SocialNetwork
 from .serializers import ActionLandingSerializer
 import logging
 from django.core.cache import cache
+from . import landing_cache
 
 logger = logging.getLogger('api')
 
@@ -28,7 +29,8 @@ class ActionLandingViewSet(viewsets.ReadOnlyModelViewSet):
         social_network_code = request.query_params.get('social_network')
         action_code = request.query_params.get('action')
         
-        cache_key = f'action_landings_list_{social_network_code or "all"}_{action_code or "all"}'
+        # Счётчик поколения не создаём для произвольного ?social_network= (см. landing_cache)
+        cache_key = landing_cache.action_landings_list_key(social_network_code, action_code, create=False)
         cached_data = cache.get(cache_key)
         
         if cached_data is not None:
@@ -36,12 +38,21 @@ class ActionLandingViewSet(viewsets.ReadOnlyModelViewSet):
             response['X-Cache-Status'] = 'HIT'
             return response
         
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        if social_network_code and social_network_code.upper() not in landing_cache.social_network_codes():
+            # Неизвестная соцсеть: пустой список, без записи в кэш
+            response = Response([], status=status.HTTP_200_OK)
+            response['X-Cache-Status'] = 'MISS'
+            return response
         
-        cache.set(cache_key, serializer.data, timeout=31536000)
+        # При промахе данные строит один воркер, остальные ждут его результат
+        cache_key = landing_cache.action_landings_list_key(social_network_code, action_code)
+        data = cache.get_or_set(
+            cache_key,
+            lambda: self.get_serializer(self.filter_queryset(self.get_queryset()), many=True).data,
+            timeout=landing_cache.LANDING_CACHE_TIMEOUT
+        )
         
-        response = Response(serializer.data, status=status.HTTP_200_OK)
+        response = Response(data, status=status.HTTP_200_OK)
         response['X-Cache-Status'] = 'MISS'
         return response
     
@@ -50,7 +61,7 @@ class ActionLandingViewSet(viewsets.ReadOnlyModelViewSet):
         Cached retrieve of single action landing by slug
         """
         slug = kwargs.get('slug')
-        cache_key = f'action_landing_{slug}'
+        cache_key = landing_cache.action_landing_key(slug, create=False)
         cached_data = cache.get(cache_key)
         
         if cached_data is not None:
@@ -58,12 +69,17 @@ class ActionLandingViewSet(viewsets.ReadOnlyModelViewSet):
             response['X-Cache-Status'] = 'HIT'
             return response
         
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
+        # Несуществующий slug — 404 до создания счётчика поколения
+        landing = self.get_object()
         
-        cache.set(cache_key, serializer.data, timeout=31536000)
+        # При промахе данные строит один воркер, остальные ждут его результат
+        data = cache.get_or_set(
+            landing_cache.action_landing_key(slug),
+            lambda: self.get_serializer(landing).data,
+            timeout=landing_cache.LANDING_CACHE_TIMEOUT
+        )
         
-        response = Response(serializer.data, status=status.HTTP_200_OK)
+        response = Response(data, status=status.HTTP_200_OK)
         response['X-Cache-Status'] = 'MISS'
         return response
 
@@ -117,13 +133,6 @@ class ActionLandingViewSet(viewsets.ReadOnlyModelViewSet):
             )
         
         path_normalized = path.strip('/').lower()
-        cache_key = f'action_landing_by_path_{path_normalized}'
-        cached_data = cache.get(cache_key)
-        
-        if cached_data is not None:
-            response = Response(cached_data, status=status.HTTP_200_OK)
-            response['X-Cache-Status'] = 'HIT'
-            return response
         
         # Убираем ведущий и trailing слэш
         path = path.strip('/')
@@ -137,8 +146,25 @@ class ActionLandingViewSet(viewsets.ReadOnlyModelViewSet):
         
         platform_code = parts[0].upper()
         
+        # Код соцсети проверяем по закэшированному списку кодов, без запроса к БД
+        network_code = landing_cache.social_network_codes().get(platform_code)
+        if network_code is None:
+            return Response(
+                {'error': f'Social network "{platform_code}" not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Ключ строим только от проверенного кода соцсети (см. landing_cache.action_landing_by_path_key)
+        cache_key = landing_cache.action_landing_by_path_key(network_code, path_normalized)
+        cached_data = cache.get(cache_key)
+        
+        if cached_data is not None:
+            response = Response(cached_data, status=status.HTTP_200_OK)
+            response['X-Cache-Status'] = 'HIT'
+            return response
+        
         try:
-            social_network = SocialNetwork.objects.get(code__iexact=platform_code)
+            social_network = SocialNetwork.objects.get(code=network_code)
         except SocialNetwork.DoesNotExist:
             return Response(
                 {'error': f'Social network "{platform_code}" not found'},
@@ -155,7 +181,7 @@ class ActionLandingViewSet(viewsets.ReadOnlyModelViewSet):
             
             if landing:
                 serializer = self.get_serializer(landing)
-                cache.set(cache_key, serializer.data, timeout=31536000)
+                cache.set(cache_key, serializer.data, timeout=landing_cache.LANDING_CACHE_TIMEOUT)
                 response = Response(serializer.data)
                 response['X-Cache-Status'] = 'MISS'
                 return response
@@ -180,7 +206,7 @@ class ActionLandingViewSet(viewsets.ReadOnlyModelViewSet):
             
             if landing:
                 serializer = self.get_serializer(landing)
-                cache.set(cache_key, serializer.data, timeout=31536000)
+                cache.set(cache_key, serializer.data, timeout=landing_cache.LANDING_CACHE_TIMEOUT)
                 response = Response(serializer.data)
                 response['X-Cache-Status'] = 'MISS'
                 return response
@@ -194,7 +220,7 @@ class ActionLandingViewSet(viewsets.ReadOnlyModelViewSet):
             
             if landing:
                 serializer = self.get_serializer(landing)
-                cache.set(cache_key, serializer.data, timeout=31536000)
+                cache.set(cache_key, serializer.data, timeout=landing_cache.LANDING_CACHE_TIMEOUT)
                 response = Response(serializer.data)
                 response['X-Cache-Status'] = 'MISS'
                 return response
@@ -0,0 +1,257 @@
+"""
+Webhook push of task status changes for public API customers.
+
+Instead of polling get_task_status, the owner of an ApiKey registers a URL
+(WebhookSubscription). When one of their tasks changes status (completed in
+complete_task, closed / deleted by commands, admin or the owner), a
+WebhookDelivery row per active subscription is inserted in the same
+transaction (`enqueue_task_status`).
+
+The `deliver_webhooks` worker (a loop with a short interval, plus a cron
+fallback) claims due rows, POSTs all events of a subscription in one request
+(up to MAX_EVENTS_PER_REQUEST) over a pooled HTTP session and retries failures
+with exponential backoff. Request body:
+
+    {"events": [{"id": 1, "type": "task.status_changed", "created_at": "...", "data": {...}}]}
+
+Headers X-Webhook-Timestamp and X-Webhook-Signature
+("sha256=" + HMAC-SHA256(secret, "<timestamp>.<body>")) let the receiver
+verify the sender; event ids let it drop duplicates of retried requests.
+
+Webhook URLs are customer input posted to from inside our network, so
+`check_url` only accepts https URLs whose host resolves to public addresses
+(no loopback, private, link-local, reserved or multicast ranges). It runs when
+the webhook is registered and again before every send, and redirects are not
+followed.
+"""
+from datetime import timedelta
+from itertools import groupby
+from operator import attrgetter
+from urllib.parse import urlsplit
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import socket
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+import requests
+
+from .models import WebhookDelivery, WebhookSubscription
+
+logger = logging.getLogger('api')
+
+TASK_STATUS_CHANGED = 'task.status_changed'
+
+DEFAULT_BATCH_SIZE = 500
+MAX_EVENTS_PER_REQUEST = 100
+MAX_ATTEMPTS = 10
+REQUEST_TIMEOUT = 10
+# Сколько доставка считается занятой воркером; после этого её может забрать другой
+LEASE = timedelta(minutes=2)
+
+# Одна сессия на процесс воркера: keep-alive соединения к адресам клиентов
+_session = requests.Session()
+
+
+def _is_public_address(address):
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return not (
+        ip.is_loopback or ip.is_private or ip.is_link_local or ip.is_reserved
+        or ip.is_multicast or ip.is_unspecified
+    )
+
+
+def check_url(url):
+    """
+    Raises ValueError unless url is https and every address its host resolves
+    to is public.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != 'https' or not parts.hostname:
+        raise ValueError('Webhook url must be an https url')
+    try:
+        addresses = {
+            info[4][0]
+            for info in socket.getaddrinfo(parts.hostname, parts.port or 443, type=socket.SOCK_STREAM)
+        }
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise ValueError(f'Cannot resolve webhook host {parts.hostname}')
+    if not addresses or not all(_is_public_address(address) for address in addresses):
+        raise ValueError('Webhook host must resolve to a public address')
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(15 * 2 ** attempts, 6 * 3600))
+
+
+def sign(secret, timestamp, body):
+    message = f"{timestamp}.".encode() + body
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _task_event(task):
+    return {
+        'task_id': task.id,
+        'status': task.status,
+        'post_url': task.post_url,
+        'type': task.type,
+        'actions_required': task.actions_required,
+        'actions_completed': task.actions_completed,
+        'deletion_reason': task.deletion_reason,
+        'completed_at': task.completed_at.isoformat() if task.completed_at else None,
+        'changed_at': timezone.now().isoformat(),
+    }
+
+
+def enqueue_task_status(tasks):
+    """
+    Queues a status change event of each task for the active webhooks of its
+    creator. Call inside the transaction of the change. Returns the number of
+    deliveries created.
+    """
+    tasks = list(tasks)
+    subscriptions = WebhookSubscription.objects.filter(
+        is_active=True,
+        api_key__is_active=True,
+        api_key__user_id__in={task.creator_id for task in tasks},
+    ).values_list('id', 'api_key__user_id')
+    subscription_ids = {}
+    for subscription_id, user_id in subscriptions:
+        subscription_ids.setdefault(user_id, []).append(subscription_id)
+    if not subscription_ids:
+        return 0
+
+    deliveries = [
+        WebhookDelivery(subscription_id=subscription_id, event_type=TASK_STATUS_CHANGED, payload=_task_event(task))
+        for task in tasks
+        for subscription_id in subscription_ids.get(task.creator_id, [])
+    ]
+    WebhookDelivery.objects.bulk_create(deliveries)
+    return len(deliveries)
+
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Marks up to batch_size due deliveries as PROCESSING and returns them
+    (with subscriptions), ordered by subscription and id.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            WebhookDelivery.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='PENDING') | Q(status='PROCESSING'), next_attempt_at__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        WebhookDelivery.objects.filter(id__in=ids).update(status='PROCESSING', next_attempt_at=now + LEASE)
+    return list(
+        WebhookDelivery.objects.filter(id__in=ids).select_related('subscription').order_by('subscription_id', 'id')
+    )
+
+
+def _post(subscription, deliveries):
+    """Sends events of one subscription. Returns (response_status, error or None)."""
+    body = json.dumps({
+        'events': [
+            {
+                'id': delivery.id,
+                'type': delivery.event_type,
+                'created_at': delivery.created_at,
+                'data': delivery.payload,
+            }
+            for delivery in deliveries
+        ]
+    }, cls=DjangoJSONEncoder).encode()
+    timestamp = str(int(time.time()))
+    try:
+        # Адрес проверяется и перед каждой отправкой: DNS хоста мог поменяться
+        check_url(subscription.url)
+    except ValueError as e:
+        return None, str(e)
+    try:
+        response = _session.post(
+            subscription.url,
+            data=body,
+            headers={
+                'Content-Type': 'application/json',
+                'User-Agent': 'UpvoteClub-Webhooks/1.0',
+                'X-Webhook-Timestamp': timestamp,
+                'X-Webhook-Signature': sign(subscription.secret, timestamp, body),
+            },
+            timeout=REQUEST_TIMEOUT,
+            allow_redirects=False,
+        )
+    except requests.RequestException as e:
+        return None, str(e)
+    if 200 <= response.status_code < 300:
+        return response.status_code, None
+    return response.status_code, f'HTTP {response.status_code}'
+
+
+def _finish(subscription, deliveries, response_status, error):
+    now = timezone.now()
+    ids = [delivery.id for delivery in deliveries]
+    if error is None:
+        WebhookDelivery.objects.filter(id__in=ids).update(
+            status='DONE', delivered_at=now, response_status=response_status,
+            last_error=None, attempts=F('attempts') + 1,
+        )
+        WebhookSubscription.objects.filter(id=subscription.id).update(last_success_at=now, last_error=None)
+        return
+
+    # У событий одной подписки число попыток обычно совпадает — одно UPDATE на группу
+    by_attempts = attrgetter('attempts')
+    for attempts, group in groupby(sorted(deliveries, key=by_attempts), key=by_attempts):
+        attempts += 1
+        failed = attempts >= MAX_ATTEMPTS
+        WebhookDelivery.objects.filter(id__in=[delivery.id for delivery in group]).update(
+            status='FAILED' if failed else 'PENDING',
+            attempts=attempts,
+            response_status=response_status,
+            last_error=error[:2000],
+            next_attempt_at=now + _retry_delay(attempts),
+        )
+    WebhookSubscription.objects.filter(id=subscription.id).update(last_error=error[:2000])
+    logger.warning(f"[webhooks] Delivery of {len(ids)} events to subscription {subscription.id} failed: {error}")
+
+
+def deliver_due(batch_size=DEFAULT_BATCH_SIZE, max_batches=None):
+    """
+    Sends due deliveries, grouped per subscription. Returns (delivered, failed)
+    event counts.
+    """
+    delivered = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        deliveries = claim_batch(batch_size)
+        if not deliveries:
+            break
+        batches += 1
+
+        for _, group in groupby(deliveries, key=lambda delivery: delivery.subscription_id):
+            group = list(group)
+            subscription = group[0].subscription
+            for start in range(0, len(group), MAX_EVENTS_PER_REQUEST):
+                chunk = group[start:start + MAX_EVENTS_PER_REQUEST]
+                if not subscription.is_active:
+                    response_status, error = None, 'Subscription is disabled'
+                else:
+                    response_status, error = _post(subscription, chunk)
+                _finish(subscription, chunk, response_status, error)
+                if error is None:
+                    delivered += len(chunk)
+                else:
+                    failed += len(chunk)
+
+    if delivered or failed:
+        logger.info(f"[webhooks] Delivered {delivered} events, {failed} failed")
+    return delivered, failed
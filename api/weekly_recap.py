@@ -0,0 +1,151 @@
+"""
+Set-based data for the weekly recap email.
+
+Instead of several TaskCompletion queries per recipient, the recap for all
+subscribers of a subscription type is computed with a fixed number of grouped
+queries:
+
+  * per-user completion counts for the current and the previous week (one
+    GROUP BY user_id with two filtered COUNTs);
+  * per-(user, social network, action) counts for the current week, streamed
+    in user order and merged with the subscriber stream;
+  * the weekly leaderboard, computed once and shared by every email.
+
+iter_recaps() yields (subscription, data) so rendering and sending can consume
+it chunk by chunk without holding every recap in memory.
+"""
+from datetime import timedelta
+from itertools import groupby
+import logging
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Q
+
+from .models import TaskCompletion
+
+logger = logging.getLogger('api')
+
+STREAM_CHUNK_SIZE = 2000
+LEADERBOARD_SIZE = 10
+
+ACTION_EMOJI = {
+    'LIKE': '❤️',
+    'REPOST': '🔄',
+    'COMMENT': '💬',
+    'FOLLOW': '👥',
+    'SAVE': '🔖',
+    'CONNECT': '🤝',
+    'RESTACK': '📢',
+    'UPVOTE': '⬆️',
+}
+
+
+def week_bounds(now):
+    """(previous_week_start, current_week_start, current_week_end) for a recap sent at `now`."""
+    current_week_end = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    current_week_start = current_week_end - timedelta(days=7)
+    return current_week_start - timedelta(days=7), current_week_start, current_week_end
+
+
+def change_percentage(current, previous):
+    if previous > 0:
+        return ((current - previous) / previous) * 100
+    return 100 if current > 0 else 0
+
+
+def get_task_counts(user_ids, current_week_start):
+    """
+    {user_id: (current_week, previous_week)} for users with completions in
+    either week. user_ids may be a list or a values_list subquery.
+    """
+    previous_week_start = current_week_start - timedelta(days=7)
+    current_week_end = current_week_start + timedelta(days=7)
+    rows = TaskCompletion.objects.filter(
+        user_id__in=user_ids,
+        created_at__gte=previous_week_start,
+        created_at__lt=current_week_end,
+    ).values('user_id').annotate(
+        current=Count('id', filter=Q(created_at__gte=current_week_start)),
+        previous=Count('id', filter=Q(created_at__lt=current_week_start)),
+    ).order_by()
+    return {row['user_id']: (row['current'], row['previous']) for row in rows}
+
+
+def iter_network_stats(user_ids, current_week_start):
+    """
+    Yields (user_id, networks) in user_id order, networks being the template
+    list [{'name', 'actions': [{'name', 'count', 'emoji'}]}] for the current week.
+    Rows are streamed from the database, not loaded at once.
+    """
+    rows = TaskCompletion.objects.filter(
+        user_id__in=user_ids,
+        created_at__gte=current_week_start,
+        created_at__lt=current_week_start + timedelta(days=7),
+    ).values(
+        'user_id',
+        'task__social_network__name',
+        'task__type',
+    ).annotate(
+        count=Count('id')
+    ).order_by('user_id', 'task__social_network__name', '-count', 'task__type')
+
+    for user_id, user_rows in groupby(rows.iterator(chunk_size=STREAM_CHUNK_SIZE), key=lambda row: row['user_id']):
+        # Группируем по соцсетям
+        networks = {}
+        for row in user_rows:
+            network_name = row['task__social_network__name']
+            network = networks.setdefault(network_name, {'name': network_name, 'actions': []})
+            network['actions'].append({
+                'name': row['task__type'],
+                'count': row['count'],
+                'emoji': ACTION_EMOJI.get(row['task__type'], '🎯'),
+            })
+        yield user_id, list(networks.values())
+
+
+def get_leaderboard(current_week_start):
+    """Топ пользователей по числу выполненных заданий за неделю"""
+    return list(User.objects.filter(
+        taskcompletion__created_at__gte=current_week_start,
+        taskcompletion__created_at__lt=current_week_start + timedelta(days=7)
+    ).annotate(
+        points=Count('taskcompletion')
+    ).order_by('-points', 'id')[:LEADERBOARD_SIZE].values('username', 'points'))
+
+
+def iter_recaps(subscriptions, current_week_start):
+    """
+    Yields (subscription, data) for every subscription (a UserEmailSubscription
+    queryset) whose user had activity in the current or previous week.
+    data is the context expected by build_weekly_recap_email.
+
+    Runs four queries regardless of the number of subscribers.
+    """
+    subscriptions = subscriptions.select_related('user').order_by('user_id')
+    user_ids = subscriptions.values_list('user_id', flat=True)
+
+    counts = get_task_counts(user_ids, current_week_start)
+    leaderboard = get_leaderboard(current_week_start)
+    network_stats = iter_network_stats(user_ids, current_week_start)
+    pending_stats = next(network_stats, None)
+
+    for subscription in subscriptions.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        user_id = subscription.user_id
+        # Оба потока упорядочены по user_id — сливаем их за один проход
+        while pending_stats is not None and pending_stats[0] < user_id:
+            pending_stats = next(network_stats, None)
+        networks = []
+        if pending_stats is not None and pending_stats[0] == user_id:
+            networks = pending_stats[1]
+
+        total_tasks, previous_tasks = counts.get(user_id, (0, 0))
+        # Если у пользователя нет активности за две недели, пропускаем
+        if total_tasks == 0 and previous_tasks == 0:
+            continue
+
+        yield subscription, {
+            'total_tasks': total_tasks,
+            'tasks_change_percentage': round(change_percentage(total_tasks, previous_tasks), 1),
+            'networks': networks,
+            'leaderboard': leaderboard,
+        }
@@ -110,8 +110,18 @@ else:
     }
 
 # Cache configuration
-CACHES = {
-    'default': {
+# default — двухуровневый кеш (api/cache_backends.py): LRU в памяти процесса поверх shared.
+# shared — общий для всех процессов backend: Redis при REDIS_URL, иначе django_cache_table.
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'TIMEOUT': 31536000,
+    }
+else:
+    SHARED_CACHE = {
         'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
         'LOCATION': 'django_cache_table',
         'TIMEOUT': 31536000,  # 1 year (365 days × 24 hours × 3600 seconds)
@@ -119,6 +129,29 @@ CACHES = {
             'MAX_ENTRIES': 10000
         }
     }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'api.cache_backends.TwoTierCache',
+        'TIMEOUT': 31536000,
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'LOCAL_MAX_ENTRIES': int(os.getenv('CACHE_LOCAL_MAX_ENTRIES', '1000')),
+            'LOCAL_TIMEOUT': int(os.getenv('CACHE_LOCAL_TIMEOUT', '30')),
+            # Эти ключи читаются из shared: устаревшая локальная копия недопустима.
+            # Без Redis (DatabaseCache) это был бы запрос в БД на каждое чтение, поэтому
+            # тогда они живут в памяти процесса EXCLUDED_LOCAL_TIMEOUT секунд.
+            'EXCLUDED_LOCAL_TIMEOUT': int(os.getenv('CACHE_EXCLUDED_LOCAL_TIMEOUT', '2')),
+            'LOCAL_EXCLUDE_PREFIXES': (
+                'cache_gen:',
+                # Отозванный токен / удалённый пользователь не должны жить в памяти других воркеров
+                'firebase_token:',
+                'firebase_uid_user:',
+                'api_key:',
+            ),
+        }
+    },
+    'shared': SHARED_CACHE,
 }
 
 # Password validation
@@ -418,6 +451,8 @@ if 'CORS_ORIGIN_WHITELIST' in locals() or 'CORS_ORIGIN_WHITELIST' in globals():
 
 
 CRONJOBS = [
+    # Зеркало Firebase-пользователей (email) — до ежедневных рассылок
+    ('30 3 * * *', 'api.firebase_identity.sync_all'),
     # Сначала обновляем задачи
     ('0 4 * * *', 'api.cron.update_all_user_tasks'),
     # Потом отправляем письма
@@ -425,6 +460,19 @@ CRONJOBS = [
     # Новая задача - проверять каждые 5 минут
     ('*/5 * * * *', 'api.management.commands.send_delayed_onboarding_emails.Command.handle'),
     ('*/11 * * * *', 'api.management.commands.process_auto_actions.Command.handle'),
+    # Сверка предрассчитанной ленты заданий с таблицей Task
+    ('*/30 * * * *', 'api.task_feed.rebuild_task_feed'),
+    # Пересчёт агрегатов статистики платформы за последние дни
+    ('15 0 * * *', 'api.platform_stats.rebuild_completion_stats', [], {'days': 3}),
+    ('17 0 * * *', 'api.earnings.rebuild_daily_earnings', [], {'days': 3}),
+    # Сверка гистограммы лидерборда с UserProfile.completed_tasks_count
+    ('20 0 * * *', 'api.leaderboard.rebuild_leaderboard'),
+    # Перцентили скорости выполнения за вчера для калькулятора median-speed
+    ('25 0 * * *', 'api.speed_stats.rebuild_speed_stats'),
+    # Отложенные побочные эффекты (письма реферальной программы и т.п.)
+    ('* * * * *', 'api.outbox.process_outbox'),
+    # Вебхуки о смене статуса заданий; основной путь — воркер `deliver_webhooks --loop`, cron подстраховывает
+    ('* * * * *', 'api.webhooks.deliver_due'),
 ]
 
 # Email settings
@@ -463,14 +511,28 @@ elif EMAIL_BACKEND_TYPE == 'smtp':
 else:
     raise ValueError(f"Invalid EMAIL_BACKEND_TYPE: {EMAIL_BACKEND_TYPE}. Must be 'ses' or 'smtp'")
 
+# Массовые рассылки (EmailService.send_bulk): писем в секунду (квота SES/SMTP, 0 — без ограничения)
+# и писем на одно соединение с backend
+EMAIL_SEND_RATE = float(os.getenv('EMAIL_SEND_RATE', 10))
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 50))
+# Потоки, параллельно отправляющие пачки писем кампании (api/campaigns.py)
+EMAIL_CAMPAIGN_WORKERS = int(os.getenv('EMAIL_CAMPAIGN_WORKERS', 4))
+
 SITE_URL = os.getenv('SITE_URL', 'https://upvote.club')
 
 # Firebase Settings
 FIREBASE_AUTH = {
     'TOKEN_EXPIRY': 60 * 60 * 24 * 30,  # 30 дней в секундах
     'SESSION_COOKIE_EXPIRY': 60 * 60 * 24 * 30,  # 30 дней в секундах
+    # Как часто повторять проверку отзыва токена (запрос в Firebase) для закэшированного токена
+    'REVOCATION_CHECK_INTERVAL': int(os.getenv('FIREBASE_REVOCATION_CHECK_INTERVAL', 300)),
+    # Время жизни кэша uid -> User
+    'USER_CACHE_TIMEOUT': int(os.getenv('FIREBASE_USER_CACHE_TIMEOUT', 300)),
 }
 
+# Лимит публичного API на ключ (token bucket, api/rate_limit.py); переопределяется в ApiKey.rate_limit_per_minute
+PUBLIC_API_RATE_LIMIT_PER_MINUTE = int(os.getenv('PUBLIC_API_RATE_LIMIT_PER_MINUTE', 60))
+
 COMPLETE_TASK_REQUIRES_AUTH = os.getenv('COMPLETE_TASK_REQUIRES_AUTH', 'True').lower() == 'true'
 
 BACKEND_ADMIN_URL = SITE_URL
\ No newline at end of file